@@ -0,0 +1,300 @@
+"""
+Event-driven cache of Docker container and image state shared by EvoDev services
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Try to import docker, but handle the case where it's not installed
+try:
+    import docker
+except ImportError:
+    docker = None
+
+from evodev import docker_client
+
+logger = logging.getLogger("evodev.container_state")
+
+# Container events that do not change the state kept in the cache
+IGNORED_ACTIONS = ("exec_", "attach", "detach", "top", "resize", "export", "commit", "copy", "archive-path")
+
+
+def _is_not_found(error: Exception) -> bool:
+    return docker is not None and isinstance(error, docker.errors.NotFound)
+
+
+class ContainerStateCache:
+    """In-memory snapshot of containers, images, health and restart counts
+
+    One background thread does a full sync and then follows docker.events(),
+    re-inspecting only the container or image an event refers to (network
+    connect/disconnect events re-inspect the attached container). Reads never
+    call the Docker API: every change replaces the snapshot dictionaries, so
+    lookups are plain dict reads. Consumers can subscribe to change
+    notifications instead of polling.
+    """
+
+    def __init__(self, client=None, reconnect_delay: float = 5.0):
+        self.client = client
+        self.reconnect_delay = reconnect_delay
+        self._containers: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._images: Dict[str, List[str]] = {}
+        self._write_lock = threading.Lock()
+        self._subscribers: List[Callable] = []
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stream = None
+        self.stats = {"events": 0, "syncs": 0, "inspects": 0, "reconnects": 0, "errors": 0}
+
+    # Lifecycle
+
+    def start(self) -> "ContainerStateCache":
+        """Start following Docker events in the background (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        if self.client is None:
+            self.client = docker_client.get_client()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="container-state-events", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the events thread"""
+        self._stop.set()
+        stream = self._stream
+        if stream is not None and hasattr(stream, "close"):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    @property
+    def ready(self) -> bool:
+        """True once the first full sync has completed"""
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    # Reads
+
+    def containers(self, all: bool = True) -> List[Dict[str, Any]]:
+        """Return container records, optionally only running ones"""
+        records = list(self._containers.values())
+        if all:
+            return records
+        return [record for record in records if record["status"] == "running"]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a container record by full id, short id or name"""
+        containers = self._containers
+        record = containers.get(key)
+        if record is None:
+            record = containers.get(self._aliases.get(key, ""))
+        return record
+
+    def image_tags(self, image_id: str) -> List[str]:
+        return self._images.get(image_id, [])
+
+    def ip_map(self, network: Optional[str] = None) -> Dict[str, str]:
+        """Map container IP addresses to names, optionally for one network"""
+        ips = {}
+        for record in self._containers.values():
+            for name, ip in record["networks"].items():
+                if ip and (network is None or name == network):
+                    ips[ip] = record["name"]
+        return ips
+
+    # Notifications
+
+    def subscribe(self, callback: Callable[[str, Optional[Dict], Optional[Dict]], None]) -> Callable[[], None]:
+        """Call callback(action, record, previous) on every change; returns an unsubscribe function
+
+        record is None when a container was removed. Callbacks run on the
+        events thread and must not block.
+        """
+        with self._write_lock:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._write_lock:
+                self._subscribers = [s for s in self._subscribers if s is not callback]
+
+        return unsubscribe
+
+    def _notify(self, action: str, record: Optional[Dict], previous: Optional[Dict]):
+        for callback in self._subscribers:
+            try:
+                callback(action, record, previous)
+            except Exception as e:
+                logger.error(f"Container state subscriber failed: {str(e)}")
+
+    # Updates
+
+    def _record(self, info: Dict[str, Any]) -> Dict[str, Any]:
+        state = info.get("State") or {}
+        config = info.get("Config") or {}
+        settings = info.get("NetworkSettings") or {}
+        tags = self._images.get(info.get("Image", ""), [])
+        return {
+            "id": info["Id"],
+            "short_id": info["Id"][:12],
+            "name": info.get("Name", "").lstrip("/"),
+            "status": state.get("Status", "unknown"),
+            "health": (state.get("Health") or {}).get("Status", "unknown"),
+            "restart_count": info.get("RestartCount", 0),
+            "image": tags[0] if tags else None,
+            "image_id": info.get("Image", ""),
+            "image_config": config.get("Image"),
+            "created": info.get("Created", ""),
+            "started_at": state.get("StartedAt", ""),
+            "labels": config.get("Labels") or {},
+            "networks": {name: (net or {}).get("IPAddress", "") for name, net in (settings.get("Networks") or {}).items()},
+            "ports": settings.get("Ports") or {},
+        }
+
+    def _inspect(self, container_id: str) -> Optional[Dict[str, Any]]:
+        self.stats["inspects"] += 1
+        try:
+            return self.client.api.inspect_container(container_id)
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            return None
+
+    def _replace(self, containers: Dict[str, Dict[str, Any]]):
+        aliases = {}
+        for record in containers.values():
+            aliases[record["short_id"]] = record["id"]
+            aliases[record["name"]] = record["id"]
+        self._containers = containers
+        self._aliases = aliases
+
+    def _put(self, action: str, container_id: str, record: Optional[Dict[str, Any]]):
+        with self._write_lock:
+            containers = dict(self._containers)
+            previous = containers.pop(container_id, None)
+            if record is not None:
+                containers[container_id] = record
+            self._replace(containers)
+        if record != previous:
+            self._notify(action, record, previous)
+
+    def sync(self):
+        """Rebuild the whole snapshot from the Docker API"""
+        self._images = {image.id: list(image.tags) for image in self.client.images.list()}
+        containers = {}
+        for item in self.client.api.containers(all=True):
+            info = self._inspect(item["Id"])
+            if info is not None:
+                containers[info["Id"]] = self._record(info)
+
+        with self._write_lock:
+            previous = self._containers
+            self._replace(containers)
+        self.stats["syncs"] += 1
+        self._ready.set()
+
+        for container_id in set(previous) | set(containers):
+            if previous.get(container_id) != containers.get(container_id):
+                self._notify("sync", containers.get(container_id), previous.get(container_id))
+
+    def handle_event(self, event: Dict[str, Any]):
+        """Apply one event from docker.events(decode=True)"""
+        try:
+            self._apply_event(event)
+        finally:
+            self.stats["events"] += 1
+
+    def _apply_event(self, event: Dict[str, Any]):
+        event_type = event.get("Type")
+        action = event.get("Action") or event.get("status") or ""
+        actor_id = (event.get("Actor") or {}).get("ID") or event.get("id")
+        if not actor_id:
+            return
+
+        if event_type == "container":
+            if action.startswith(IGNORED_ACTIONS):
+                return
+            if action == "destroy":
+                self._put(action, actor_id, None)
+            elif action.startswith("health_status") and actor_id in self._containers:
+                record = dict(self._containers[actor_id])
+                record["health"] = action.split(":", 1)[1].strip()
+                self._put("health_status", actor_id, record)
+            else:
+                info = self._inspect(actor_id)
+                self._put(action, actor_id, self._record(info) if info is not None else None)
+
+        elif event_type == "image":
+            self._handle_image_event(action, actor_id)
+
+        elif event_type == "network" and action in ("connect", "disconnect"):
+            # Actor is the network; the container whose addresses changed is an attribute
+            container_id = ((event.get("Actor") or {}).get("Attributes") or {}).get("container")
+            if container_id:
+                info = self._inspect(container_id)
+                self._put(f"network_{action}", container_id, self._record(info) if info is not None else None)
+
+    def _handle_image_event(self, action: str, image_ref: str):
+        try:
+            image = self.client.api.inspect_image(image_ref)
+            image_id, tags = image["Id"], list(image.get("RepoTags") or [])
+        except Exception as e:
+            if not _is_not_found(e):
+                raise
+            image_id, tags = image_ref, []
+
+        images = dict(self._images)
+        if tags:
+            images[image_id] = tags
+        else:
+            images.pop(image_id, None)
+        self._images = images
+
+        for record in self.containers():
+            if record["image_id"] == image_id and record["image"] != (tags[0] if tags else None):
+                updated = dict(record)
+                updated["image"] = tags[0] if tags else None
+                self._put(f"image_{action}", record["id"], updated)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                # Events after this point are replayed by the daemon, so none are lost during the sync
+                since = int(time.time())
+                self.sync()
+                self._stream = self.client.events(decode=True, since=since,
+                                                  filters={"type": ["container", "image", "network"]})
+                for event in self._stream:
+                    if self._stop.is_set():
+                        break
+                    try:
+                        self.handle_event(event)
+                    except Exception as e:
+                        self.stats["errors"] += 1
+                        logger.error(f"Error applying Docker event: {str(e)}")
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Docker events stream failed: {str(e)}")
+            if self._stop.is_set():
+                break
+            self.stats["reconnects"] += 1
+            self._stop.wait(self.reconnect_delay)
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_cache(client=None) -> ContainerStateCache:
+    """Return the process-wide cache, starting it on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ContainerStateCache(client).start()
+        return _shared
@@ -0,0 +1,201 @@
+"""
+Shared Docker client for EvoDev services: one connection pool, timeouts, retries and latency counters
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+# Try to import docker, but handle the case where it's not installed
+try:
+    import docker
+    import requests
+except ImportError:
+    docker = None
+
+logger = logging.getLogger("evodev.docker_client")
+
+# Client configuration
+POOL_SIZE = int(os.environ.get("EVODEV_DOCKER_POOL_SIZE", 16))
+TIMEOUT = float(os.environ.get("EVODEV_DOCKER_TIMEOUT", 60))
+RETRIES = int(os.environ.get("EVODEV_DOCKER_RETRIES", 3))
+# Base and cap of the exponential backoff; each sleep is drawn uniformly below it (full jitter)
+RETRY_BACKOFF = float(os.environ.get("EVODEV_DOCKER_RETRY_BACKOFF", 0.2))
+RETRY_BACKOFF_MAX = float(os.environ.get("EVODEV_DOCKER_RETRY_BACKOFF_MAX", 2.0))
+
+# Gateway errors from a restarting daemon or proxy; other 5xx are real API errors
+RETRY_STATUS = (502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+# Path segments that name a collection action rather than an object id
+COLLECTION_ACTIONS = ("json", "create", "prune", "load", "search", "get", "build")
+VERSION_PREFIX = re.compile(r"^v\d+\.\d+$")
+
+_local = threading.local()
+
+
+def endpoint(method: str, url: str) -> str:
+    """Counter key for a call, with the API version and object ids removed"""
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if parts and VERSION_PREFIX.match(parts[0]):
+        parts = parts[1:]
+    if len(parts) >= 2 and parts[1] not in COLLECTION_ACTIONS:
+        parts = [parts[0], "{id}"] + parts[2:][-1:]
+    return f"{method} /{'/'.join(parts)}"
+
+
+def _connect_failed(error: BaseException) -> bool:
+    """True when the request never reached the daemon, so even a POST is safe to resend"""
+    seen = set()
+    pending = [error]
+    while pending:
+        current = pending.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        if isinstance(current, (ConnectionRefusedError, FileNotFoundError)):
+            return True
+        if type(current).__name__ in ("NewConnectionError", "ConnectTimeout", "ConnectTimeoutError"):
+            return True
+        pending.extend(arg for arg in getattr(current, "args", ()) if isinstance(arg, BaseException))
+        for linked in (current.__cause__, current.__context__):
+            if linked is not None:
+                pending.append(linked)
+    return False
+
+
+class CallStats:
+    """Per-endpoint call, error and retry counts with latency totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, list] = {}
+
+    def record(self, key: str, seconds: float, error: bool = False, retry: bool = False):
+        with self._lock:
+            entry = self._calls.get(key)
+            if entry is None:
+                entry = self._calls[key] = [0, 0, 0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += error
+            entry[2] += retry
+            entry[3] += seconds
+            entry[4] = max(entry[4], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            calls = {key: list(entry) for key, entry in self._calls.items()}
+        return {
+            key: {
+                "calls": count,
+                "errors": errors,
+                "retries": retries,
+                "avg_ms": round(total * 1000 / count, 3) if count else 0.0,
+                "max_ms": round(peak * 1000, 3),
+            }
+            for key, (count, errors, retries, total, peak) in sorted(calls.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._calls = {}
+
+
+stats = CallStats()
+
+
+if docker is not None:
+
+    class InstrumentedAPIClient(docker.APIClient):
+        """APIClient whose HTTP requests are timed, counted and retried
+
+        Idempotent calls are retried on connection errors, timeouts and
+        gateway errors; other methods only when the connection itself
+        failed, so a request is never applied twice.
+        """
+
+        retries = RETRIES
+
+        def request(self, method, url, *args, **kwargs):
+            timeout = getattr(_local, "timeout", None)
+            if timeout is not None and kwargs.get("timeout") is not None:
+                kwargs["timeout"] = timeout
+            key = endpoint(method, url)
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    response = super().request(method, url, *args, **kwargs)
+                except requests.exceptions.RequestException as e:
+                    elapsed = time.monotonic() - started
+                    retry = attempt < self.retries and (method in IDEMPOTENT_METHODS or _connect_failed(e))
+                    stats.record(key, elapsed, error=True, retry=retry)
+                    if not retry:
+                        raise
+                    logger.warning(f"Docker API {key} failed ({str(e)}), retry {attempt + 1}/{self.retries}")
+                else:
+                    elapsed = time.monotonic() - started
+                    retry = (response.status_code in RETRY_STATUS and method in IDEMPOTENT_METHODS
+                             and attempt < self.retries)
+                    stats.record(key, elapsed, error=response.status_code >= 500, retry=retry)
+                    if not retry:
+                        return response
+                    response.close()
+                    logger.warning(f"Docker API {key} returned {response.status_code}, retry {attempt + 1}/{self.retries}")
+                time.sleep(random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF * 2 ** attempt)))
+                attempt += 1
+
+    class SharedDockerClient(docker.DockerClient):
+        """DockerClient on top of InstrumentedAPIClient"""
+
+        def __init__(self, *args, **kwargs):
+            self.api = InstrumentedAPIClient(*args, **kwargs)
+
+
+@contextmanager
+def call_timeout(seconds: Optional[float]):
+    """Override the timeout of Docker calls made by this thread inside the block
+
+    Streaming calls that were opened without a timeout keep none.
+    """
+    previous = getattr(_local, "timeout", None)
+    _local.timeout = seconds
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def create_client(pool_size: int = POOL_SIZE, timeout: float = TIMEOUT, retries: int = RETRIES, **kwargs):
+    """Create an instrumented client configured from the environment (DOCKER_HOST etc.)"""
+    if docker is None:
+        raise RuntimeError("docker module not available")
+    client = SharedDockerClient.from_env(max_pool_size=pool_size, timeout=timeout, **kwargs)
+    client.api.retries = retries
+    return client
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Docker client, creating it on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = create_client()
+        return _shared
+
+
+def close():
+    """Close the process-wide client; the next get_client() creates a new one"""
+    global _shared
+    with _shared_lock:
+        client, _shared = _shared, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,151 @@
+"""
+Content-addressed cache of deterministic LLM answers: an in-memory LRU in front of an SQLite store
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger("evodev.llm_cache")
+
+# Cache configuration; EVODEV_LLM_CACHE=0 turns it off
+ENABLED = os.environ.get("EVODEV_LLM_CACHE", "1").lower() not in ("0", "false", "no", "off")
+CACHE_DIR = os.environ.get("EVODEV_LLM_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "evodev", "llm"))
+MEMORY_BYTES = int(os.environ.get("EVODEV_LLM_CACHE_MEMORY_BYTES", 32 * 1024 * 1024))
+DISK_BYTES = int(os.environ.get("EVODEV_LLM_CACHE_DISK_BYTES", 512 * 1024 * 1024))
+
+# Endpoints whose answers are cached, and request fields that do not change the answer
+CACHED_PATHS = ("/api/generate", "/api/chat")
+TRANSIENT_FIELDS = ("stream", "keep_alive")
+
+
+def deterministic(payload: Dict[str, Any]) -> bool:
+    """True when the request pins sampling: temperature 0 or a fixed seed"""
+    options = payload.get("options") or {}
+    return options.get("temperature") == 0 or options.get("seed") is not None
+
+
+def cache_key(path: str, model: str, digest: str, payload: Dict[str, Any]) -> str:
+    """Key over the endpoint, model, model digest and every field that shapes the answer"""
+    fields = {name: value for name, value in payload.items() if name not in TRANSIENT_FIELDS}
+    return hashlib.sha256(json.dumps(
+        [path, model, digest, fields], sort_keys=True, ensure_ascii=False, default=str
+    ).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Answers by key, LRU-evicted by size both in memory and on disk
+
+    Disk entries record their last use, so an entry that is hit often
+    survives eviction after a restart too.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, memory_bytes: int = MEMORY_BYTES, disk_bytes: int = DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._counts = dict.fromkeys(("memory_hits", "disk_hits", "misses", "stores", "evictions"), 0)
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, "responses.db"), isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, body BLOB, size INTEGER, created REAL, used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_used ON responses (used)")
+        self._disk_size = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _remember(self, key: str, body: bytes):
+        """Put an entry in the memory LRU; caller holds the lock"""
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous)
+        if len(body) > self.memory_bytes:
+            return
+        self._memory[key] = body
+        self._memory_size += len(body)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._memory.get(key)
+            if body is not None:
+                self._memory.move_to_end(key)
+                self._counts["memory_hits"] += 1
+                return body
+            row = self._db.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counts["misses"] += 1
+                return None
+            body = bytes(row[0])
+            self._db.execute("UPDATE responses SET used = ? WHERE key = ?", (time.time(), key))
+            self._counts["disk_hits"] += 1
+            self._remember(key, body)
+            return body
+
+    def put(self, key: str, model: str, body: bytes):
+        if len(body) > self.disk_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, model, body, len(body), now, now))
+            self._disk_size += len(body) - (row[0] if row else 0)
+            self._counts["stores"] += 1
+            self._remember(key, body)
+            if self._disk_size > self.disk_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used disk entries until the store is back under its size; caller holds the lock"""
+        freed = 0
+        keys = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY used"):
+            if self._disk_size - freed <= self.disk_bytes:
+                break
+            keys.append(key)
+            freed += size
+        self._db.execute("BEGIN")
+        self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in keys])
+        self._db.execute("COMMIT")
+        for key in keys:
+            body = self._memory.pop(key, None)
+            if body is not None:
+                self._memory_size -= len(body)
+        self._disk_size -= freed
+        self._counts["evictions"] += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._memory.clear()
+            self._memory_size = self._disk_size = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts.update({
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_bytes": self._disk_size,
+            })
+        lookups = counts["memory_hits"] + counts["disk_hits"] + counts["misses"]
+        counts["hit_ratio"] = round((lookups - counts["misses"]) / lookups, 3) if lookups else None
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._db.close()
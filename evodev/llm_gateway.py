@@ -0,0 +1,563 @@
+"""
+Shared gateway for Ollama calls: pooled keep-alive sessions, pools of backends with failover,
+priority scheduling with per-backend and per-model concurrency limits, coalescing of identical
+in-flight requests, a response cache for deterministic calls, a circuit breaker per backend
+and shared metrics
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from evodev import llm_cache, llm_pool, llm_scheduler
+
+logger = logging.getLogger("evodev.llm_gateway")
+
+# Gateway configuration
+POOL_SIZE = int(os.environ.get("EVODEV_LLM_POOL_SIZE", 16))
+CONNECT_TIMEOUT = float(os.environ.get("EVODEV_LLM_CONNECT_TIMEOUT", 5))
+TIMEOUT = float(os.environ.get("EVODEV_LLM_TIMEOUT", 120))
+# Concurrent generations per (backend, model); "llama3:7b=2,mistral=1" overrides single models
+MODEL_CONCURRENCY = int(os.environ.get("EVODEV_LLM_MODEL_CONCURRENCY", 4))
+MODEL_LIMITS = os.environ.get("EVODEV_LLM_MODEL_LIMITS", "")
+# Longest wait for a free generation slot before the call fails
+QUEUE_TIMEOUT = float(os.environ.get("EVODEV_LLM_QUEUE_TIMEOUT", 300))
+# Consecutive failures that open the circuit of a backend, and seconds until a probe is let through
+BREAKER_FAILURES = int(os.environ.get("EVODEV_LLM_BREAKER_FAILURES", 5))
+BREAKER_COOLDOWN = float(os.environ.get("EVODEV_LLM_BREAKER_COOLDOWN", 30))
+# Seconds model digests from /api/tags are trusted before the cache asks again
+DIGEST_TTL = float(os.environ.get("EVODEV_LLM_DIGEST_TTL", 60))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+GENERATION_PATHS = ("/api/generate", "/api/chat")
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """The backend failed repeatedly; calls fail fast until the cooldown ends"""
+
+
+class ModelBusyError(requests.exceptions.Timeout):
+    """No generation slot became free within the queue timeout"""
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """Per-model limits from "model=n,model=n" """
+    limits = {}
+    for item in spec.split(","):
+        name, _, value = item.strip().rpartition("=")
+        if name and value.isdigit():
+            limits[name] = int(value)
+    return limits
+
+
+def model_name(model: Optional[str]) -> Optional[str]:
+    """Model name as Ollama lists it: without a tag, "llama3" stands for "llama3:latest"
+
+    Only the part after the last "/" can carry a tag, so the port of a
+    registry host ("registry:5000/llama3") is not taken for one.
+    """
+    if model and ":" not in model.rsplit("/", 1)[-1]:
+        return f"{model}:latest"
+    return model
+
+
+def backend(url: str) -> str:
+    """scheme://host:port of a URL; circuits and slots are kept per backend"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class CircuitBreaker:
+    """Closed -> open after `failures` consecutive errors -> half-open after `cooldown`
+
+    In the half-open state one probe request is let through; its outcome
+    closes the circuit again or restarts the cooldown.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.consecutive = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.consecutive += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive >= self.failures):
+                self.state = OPEN
+                self.opened += 1
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a probe whose outcome says nothing about the backend (e.g. a 4xx answer)"""
+        with self._lock:
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive, "opened": self.opened}
+
+
+class GatewayStats:
+    """Per-call-key counts: calls, errors, coalesced, rejected, with latency and slot wait totals"""
+
+    FIELDS = ("calls", "errors", "coalesced", "cached", "rejected")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, key: str) -> Dict[str, float]:
+        entry = self._keys.get(key)
+        if entry is None:
+            entry = self._keys[key] = dict.fromkeys(self.FIELDS + ("seconds", "max", "wait"), 0)
+        return entry
+
+    def record(self, key: str, seconds: float = 0.0, wait: float = 0.0, error: bool = False):
+        with self._lock:
+            entry = self._entry(key)
+            entry["calls"] += 1
+            entry["errors"] += error
+            entry["seconds"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["wait"] += wait
+
+    def count(self, key: str, field: str):
+        with self._lock:
+            self._entry(key)[field] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            keys = {key: dict(entry) for key, entry in self._keys.items()}
+        result = {}
+        for key, entry in sorted(keys.items()):
+            calls = entry["calls"]
+            result[key] = {field: entry[field] for field in self.FIELDS}
+            result[key].update({
+                "avg_ms": round(entry["seconds"] * 1000 / calls, 3) if calls else 0.0,
+                "max_ms": round(entry["max"] * 1000, 3),
+                "avg_wait_ms": round(entry["wait"] * 1000 / calls, 3) if calls else 0.0,
+            })
+        return result
+
+
+class _Flight:
+    """One upstream call shared by every caller that asked for the same thing meanwhile"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+        self.followers = 0
+
+
+class LLMGateway:
+    """Process-wide entry point for HTTP calls to Ollama backends
+
+    get()/post() take the same arguments as requests and return a
+    requests.Response. Non-streamed POSTs with identical URL and body that
+    overlap in time are sent once and share the response. Generations
+    (/api/generate, /api/chat) are admitted by the backend's
+    llm_scheduler.BackendScheduler: by priority class, taking turns between
+    tenants, within the backend and model concurrency limits. The class and
+    tenant come from the priority/tenant arguments or llm_scheduler.context().
+    Connection errors, timeouts and 5xx answers count against the backend's
+    circuit; while it is open, calls raise CircuitOpenError at once.
+
+    A URL whose backend names a pool (llm_pool.BACKENDS) is sent to one of
+    the pool's members; connection errors and 5xx answers are retried on the
+    next member.
+
+    With a cache, deterministic /api/generate and /api/chat calls (temperature
+    0 or a fixed seed) are answered from it while the model digest reported by
+    /api/tags is unchanged.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, timeout: float = TIMEOUT,
+                 connect_timeout: float = CONNECT_TIMEOUT, model_concurrency: int = MODEL_CONCURRENCY,
+                 model_limits: Optional[Dict[str, int]] = None, queue_timeout: float = QUEUE_TIMEOUT,
+                 breaker_failures: int = BREAKER_FAILURES, breaker_cooldown: float = BREAKER_COOLDOWN,
+                 cache: Optional[llm_cache.ResponseCache] = None,
+                 backend_concurrency: int = llm_scheduler.BACKEND_CONCURRENCY,
+                 interactive_reserve: int = llm_scheduler.INTERACTIVE_RESERVE,
+                 pools: Optional[Dict[str, list]] = None):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.model_concurrency = model_concurrency
+        self.model_limits = parse_limits(MODEL_LIMITS) if model_limits is None else dict(model_limits)
+        self.queue_timeout = queue_timeout
+        self.backend_concurrency = backend_concurrency
+        self.interactive_reserve = interactive_reserve
+        self.breaker_failures = breaker_failures
+        self.breaker_cooldown = breaker_cooldown
+        self.stats = GatewayStats()
+        self.cache = cache
+        # ModelManager that sets keep_alive and tracks loaded models (llm_models.get_manager attaches it)
+        self.models = None
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._schedulers: Dict[str, llm_scheduler.BackendScheduler] = {}
+        self.pools = {name: llm_pool.BackendPool(name, members, self.session) for name, members in
+                      (llm_pool.parse_pools(llm_pool.BACKENDS) if pools is None else pools).items()}
+        self._started_pools = set()
+        self._flights: Dict[str, _Flight] = {}
+        self._digests: Dict[str, tuple] = {}
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        key = backend(url)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(self.breaker_failures, self.breaker_cooldown)
+            return breaker
+
+    def scheduler(self, url: str) -> llm_scheduler.BackendScheduler:
+        key = backend(url)
+        with self._lock:
+            scheduler = self._schedulers.get(key)
+            if scheduler is None:
+                scheduler = self._schedulers[key] = llm_scheduler.BackendScheduler(
+                    self.backend_concurrency, self.model_limit, self.interactive_reserve)
+            return scheduler
+
+    def model_limit(self, model: str) -> int:
+        return self.model_limits.get(model, self.model_concurrency)
+
+    def _acquire(self, url: str, model: Optional[str], priority: str, tenant: Optional[str], timeout: float):
+        """Wait for a generation slot on the backend; returns the release function
+
+        Only generations take a slot; pulls, /api/show and embeddings name a
+        model too but go through at once.
+        """
+        if not model or urlsplit(url).path not in GENERATION_PATHS:
+            return lambda: None
+        try:
+            return self.scheduler(url).acquire(model, priority, tenant, timeout)
+        except llm_scheduler.QueueTimeout as e:
+            raise ModelBusyError(f"{str(e)} on {backend(url)}") from None
+
+    def model_digest(self, url: str, model: str) -> Optional[str]:
+        """Digest of the model on the backend of url, from a cached /api/tags listing"""
+        base = backend(url)
+        with self._lock:
+            fetched = self._digests.get(base)
+        if fetched is None or time.monotonic() - fetched[0] > DIGEST_TTL:
+            try:
+                response = self.get(f"{base}/api/tags", timeout=(self.connect_timeout, self.connect_timeout))
+                models = response.json().get("models", []) if response.status_code == 200 else []
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Cannot list models of {base} for the response cache: {str(e)}")
+                models = []
+            fetched = (time.monotonic(), {model_name(entry.get("name")): entry.get("digest") for entry in models})
+            with self._lock:
+                self._digests[base] = fetched
+        return fetched[1].get(model_name(model))
+
+    def _cache_key(self, url: str, model: Optional[str], body) -> Optional[str]:
+        path = urlsplit(url).path
+        if not model or path not in llm_cache.CACHED_PATHS or not llm_cache.deterministic(body):
+            return None
+        digest = self.model_digest(url, model)
+        return llm_cache.cache_key(path, model, digest, body) if digest else None
+
+    def request(self, method: str, url: str, timeout=None, stream: bool = False,
+                coalesce: bool = True, cache: bool = True, priority: Optional[str] = None,
+                tenant: Optional[str] = None, **kwargs) -> requests.Response:
+        """Send one request through the gateway
+
+        A streamed response holds its generation slot until it is closed.
+        coalesce=False always sends a request of its own; cache=False
+        neither reads nor fills the response cache. priority and tenant
+        default to the thread's llm_scheduler.context().
+        """
+        default_priority, default_tenant = llm_scheduler.current()
+        kwargs["schedule"] = (priority or default_priority, tenant if tenant is not None else default_tenant)
+        body = kwargs.get("json")
+        model = body.get("model") if isinstance(body, dict) else None
+        path = urlsplit(url).path
+        key = f"{method} {path}" + (f" {model}" if model else "")
+        generation = (self.models is not None and model and path in GENERATION_PATHS
+                      and bool(body.get("prompt") or body.get("messages")))
+        if generation and "keep_alive" not in body:
+            kwargs["json"] = body = dict(body, keep_alive=self.models.keep_alive(url, model))
+        if method != "POST" or stream:
+            response = self._send(key, method, url, model, timeout, stream, **kwargs)
+            if generation and response.status_code == 200:
+                self.models.observe(url, model)
+            return response
+
+        cache_key = self._cache_key(url, model, body) if cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.stats.count(key, "cached")
+                return _cached_response(url, cached)
+        if coalesce:
+            response, leader = self._coalesced(key, method, url, model, timeout, **kwargs)
+        else:
+            response, leader = self._send(key, method, url, model, timeout, False, **kwargs), True
+        if leader and response.status_code == 200:
+            if cache_key is not None:
+                self.cache.put(cache_key, model, response.content)
+            if generation:
+                self.models.observe(url, model)
+        return response
+
+    def _coalesced(self, key, method, url, model, timeout, **kwargs):
+        """Send the request, or wait for an identical one already in flight; returns (response, leader)"""
+        body = kwargs.get("json")
+        fingerprint = hashlib.sha256(json.dumps(
+            [url, body, kwargs.get("data"), kwargs.get("params")], sort_keys=True, default=str
+        ).encode()).hexdigest()
+        with self._lock:
+            flight = self._flights.get(fingerprint)
+            leader = flight is None
+            if leader:
+                flight = self._flights[fingerprint] = _Flight()
+            else:
+                flight.followers += 1
+        if not leader:
+            self.stats.count(key, "coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response, False
+
+        try:
+            flight.response = self._send(key, method, url, model, timeout, False, **kwargs)
+            return flight.response, True
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[fingerprint]
+            flight.done.set()
+
+    def _pool(self, url: str) -> Optional[llm_pool.BackendPool]:
+        """Pool named by the backend of url, probed on first use"""
+        pool = self.pools.get(backend(url))
+        if pool is not None and pool.name not in self._started_pools:
+            with self._lock:
+                start = pool.name not in self._started_pools
+                self._started_pools.add(pool.name)
+            if start:
+                pool.start()
+        return pool
+
+    def _send(self, key, method, url, model, timeout, stream, schedule, **kwargs) -> requests.Response:
+        pool = self._pool(url)
+        if pool is None:
+            return self._send_to(key, method, url, model, timeout, stream, schedule, **kwargs)
+
+        tried = []
+        error = None
+        while True:
+            member = pool.route(model, exclude=tried)
+            if member is None:
+                raise error
+            tried.append(member)
+            last = len(tried) == len(pool.members)
+            try:
+                response = self._send_to(key, method, member + url[len(pool.name):], model, timeout, stream,
+                                         schedule, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                pool.done(member, failed=True)
+                if last:
+                    raise
+                error = e
+                logger.warning(f"LLM call {key} failing over from {member}: {str(e)}")
+                continue
+            except BaseException:
+                pool.done(member)
+                raise
+
+            if response.status_code >= 500 and not last:
+                pool.done(member, failed=True)
+                logger.warning(f"LLM call {key} failing over from {member}: HTTP {response.status_code}")
+                response.close()
+                continue
+            if not stream:
+                pool.done(member, failed=response.status_code >= 500)
+            else:
+                close = response.close
+
+                def close_and_finish(member=member, close=close):
+                    try:
+                        close()
+                    finally:
+                        pool.done(member)
+                response.close = close_and_finish
+            return response
+
+    def _send_to(self, key, method, url, model, timeout, stream, schedule, **kwargs) -> requests.Response:
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            self.stats.count(key, "rejected")
+            raise CircuitOpenError(f"Circuit open for {backend(url)} after repeated failures")
+        if timeout is None:
+            timeout = (self.connect_timeout, self.timeout)
+
+        queued = time.monotonic()
+        try:
+            release = self._acquire(url, model, *schedule, self.queue_timeout)
+        except ModelBusyError:
+            breaker.release()
+            self.stats.count(key, "rejected")
+            raise
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, timeout=timeout, stream=stream, **kwargs)
+        except requests.exceptions.RequestException as e:
+            release()
+            breaker.failure()
+            self.stats.record(key, time.monotonic() - started, started - queued, error=True)
+            logger.warning(f"LLM call {key} to {backend(url)} failed: {str(e)}")
+            raise
+        except BaseException:
+            release()
+            breaker.release()
+            raise
+
+        if response.status_code >= 500:
+            breaker.failure()
+        elif response.status_code < 400:
+            breaker.success()
+        else:
+            breaker.release()
+        self.stats.record(key, time.monotonic() - started, started - queued, error=response.status_code >= 500)
+        if not stream:
+            release()
+        else:
+            close = response.close
+
+            def close_and_release():
+                try:
+                    close()
+                finally:
+                    release()
+            response.close = close_and_release
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Metrics: per-call counters, circuit state per backend, busy model slots, queue times and pools"""
+        with self._lock:
+            breakers = dict(self._breakers)
+            schedulers = dict(self._schedulers)
+        queues = {url: scheduler.snapshot() for url, scheduler in sorted(schedulers.items())}
+        slots = {}
+        for url, queue in queues.items():
+            for model, in_use in queue["models"].items():
+                slots[f"{url} {model}"] = {"in_use": in_use, "limit": self.model_limit(model)}
+        return {
+            "calls": self.stats.snapshot(),
+            "backends": {url: breaker.snapshot() for url, breaker in sorted(breakers.items())},
+            "models": slots,
+            "schedulers": queues,
+            "pools": {name: pool.snapshot() for name, pool in sorted(self.pools.items())},
+            "cache": self.cache.snapshot() if self.cache is not None else None,
+        }
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.stop()
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+
+def _cached_response(url: str, body: bytes) -> requests.Response:
+    """A 200 response carrying a cached body"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.reason = "OK"
+    response.headers["Content-Type"] = "application/json"
+    response.headers["X-EvoDev-Cache"] = "hit"
+    response._content = body
+    return response
+
+
+def _default_cache() -> Optional[llm_cache.ResponseCache]:
+    if not llm_cache.ENABLED:
+        return None
+    try:
+        return llm_cache.ResponseCache()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"LLM response cache disabled: {str(e)}")
+        return None
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Return the process-wide gateway, creating it on first use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            # Imported here: llm_models builds on this module
+            from evodev import llm_models
+            _shared = LLMGateway(cache=_default_cache())
+            _shared.models = llm_models.ModelManager(_shared)
+        return _shared
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """requests.get through the process-wide gateway"""
+    return get_gateway().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """requests.post through the process-wide gateway"""
+    return get_gateway().post(url, **kwargs)
+
+
+def close():
+    """Close the process-wide gateway; the next call creates a new one"""
+    global _shared
+    with _shared_lock:
+        gateway, _shared = _shared, None
+    if gateway is not None:
+        gateway.close()
@@ -0,0 +1,263 @@
+"""
+Ollama model lifecycle: background pulls with progress, warm-up with an empty prompt,
+keep_alive tuned to observed traffic and the load state of every model
+"""
+import json
+import logging
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+import requests
+
+from evodev import llm_gateway
+
+logger = logging.getLogger("evodev.llm_models")
+
+# Models to pull and warm at startup, "model" or "http://host:11434=model", comma separated
+WARM_MODELS = os.environ.get("EVODEV_LLM_WARM_MODELS", "")
+# keep_alive stays between these bounds; in between it is FACTOR x the typical gap between requests
+KEEP_ALIVE_MIN = float(os.environ.get("EVODEV_LLM_KEEP_ALIVE_MIN", 300))
+KEEP_ALIVE_MAX = float(os.environ.get("EVODEV_LLM_KEEP_ALIVE_MAX", 3600))
+KEEP_ALIVE_FACTOR = float(os.environ.get("EVODEV_LLM_KEEP_ALIVE_FACTOR", 3))
+# Recent requests per model used for the gap estimate
+TRAFFIC_WINDOW = int(os.environ.get("EVODEV_LLM_TRAFFIC_WINDOW", 20))
+# Seconds a /api/ps listing is trusted
+STATE_TTL = float(os.environ.get("EVODEV_LLM_STATE_TTL", 10))
+PULL_TIMEOUT = float(os.environ.get("EVODEV_LLM_PULL_TIMEOUT", 600))
+WARM_TIMEOUT = float(os.environ.get("EVODEV_LLM_WARM_TIMEOUT", 300))
+
+# Model states
+UNKNOWN, MISSING, PULLING, AVAILABLE, LOADING, LOADED, ERROR = (
+    "unknown", "missing", "pulling", "available", "loading", "loaded", "error")
+
+
+class ModelManager:
+    """Pull, warm and track the models of Ollama backends
+
+    ensure() never blocks: a missing model is pulled and then warmed in a
+    background thread, and the progress is visible in state(). The gateway
+    reports every generation through observe(); keep_alive() turns the
+    recent gaps between requests into the keep_alive sent with the next one.
+    """
+
+    def __init__(self, gateway: llm_gateway.LLMGateway):
+        self.gateway = gateway
+        self._lock = threading.Lock()
+        self._models: Dict[tuple, Dict[str, Any]] = {}
+        self._traffic: Dict[tuple, deque] = {}
+        self._tasks: Dict[tuple, threading.Thread] = {}
+        self._listed: Dict[str, float] = {}
+
+    @staticmethod
+    def _key(url: str, model: str) -> tuple:
+        """(backend, model) with the model named as /api/tags and /api/ps list it"""
+        return llm_gateway.backend(url), llm_gateway.model_name(model)
+
+    def _entry(self, key: tuple) -> Dict[str, Any]:
+        """State record of (backend, model); caller holds the lock"""
+        entry = self._models.get(key)
+        if entry is None:
+            entry = self._models[key] = {"state": UNKNOWN, "progress": None, "error": None,
+                                         "loaded_until": None, "load_ms": None}
+        return entry
+
+    def _set(self, url: str, model: str, **fields):
+        with self._lock:
+            self._entry(self._key(url, model)).update(fields)
+
+    def observe(self, url: str, model: str):
+        """Record a generation request and mark the model as loaded by it"""
+        key = self._key(url, model)
+        now = time.monotonic()
+        with self._lock:
+            traffic = self._traffic.get(key)
+            if traffic is None:
+                traffic = self._traffic[key] = deque(maxlen=TRAFFIC_WINDOW)
+            traffic.append(now)
+            entry = self._entry(key)
+            if entry["state"] not in (PULLING, ERROR):
+                entry["state"] = LOADED
+                entry["loaded_until"] = time.time() + self._keep_alive_seconds(traffic)
+
+    def _keep_alive_seconds(self, traffic: deque) -> float:
+        if len(traffic) < 2:
+            return KEEP_ALIVE_MIN
+        times = list(traffic)
+        gap = statistics.median(later - earlier for earlier, later in zip(times, times[1:]))
+        return min(KEEP_ALIVE_MAX, max(KEEP_ALIVE_MIN, gap * KEEP_ALIVE_FACTOR))
+
+    def keep_alive(self, url: str, model: str) -> str:
+        """keep_alive for the next request: long for models in steady use, the minimum for rare ones"""
+        with self._lock:
+            traffic = self._traffic.get(self._key(url, model)) or ()
+            return f"{int(self._keep_alive_seconds(traffic))}s"
+
+    def refresh(self, url: str, force: bool = False):
+        """Update states from /api/tags (models on disk) and /api/ps (models in memory)"""
+        base = llm_gateway.backend(url)
+        with self._lock:
+            if not force and time.monotonic() - self._listed.get(base, 0) < STATE_TTL:
+                return
+            self._listed[base] = time.monotonic()
+        try:
+            tags = self.gateway.get(f"{base}/api/tags", timeout=(self.gateway.connect_timeout, 10))
+            ps = self.gateway.get(f"{base}/api/ps", timeout=(self.gateway.connect_timeout, 10))
+            present = ({llm_gateway.model_name(entry.get("name")) for entry in tags.json().get("models", [])}
+                       if tags.status_code == 200 else None)
+            loaded = ({llm_gateway.model_name(entry.get("name")) for entry in ps.json().get("models", [])}
+                      if ps.status_code == 200 else set())
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Cannot list models of {base}: {str(e)}")
+            return
+        if present is None:
+            return
+        with self._lock:
+            for (backend, model), entry in self._models.items():
+                if backend != base or entry["state"] in (PULLING, LOADING):
+                    continue
+                if model in loaded:
+                    entry["state"] = LOADED
+                    entry["loaded_until"] = None
+                elif model in present:
+                    entry["state"] = AVAILABLE
+                    entry["loaded_until"] = None
+                elif entry["state"] != ERROR:
+                    entry["state"] = MISSING
+            for model in present | loaded:
+                entry = self._entry((base, model))
+                if entry["state"] == UNKNOWN:
+                    entry["state"] = LOADED if model in loaded else AVAILABLE
+
+    def state(self, url: str, model: str) -> Dict[str, Any]:
+        """State of a model: unknown/missing/pulling/available/loading/loaded/error with pull progress"""
+        self.refresh(url)
+        with self._lock:
+            entry = dict(self._entry(self._key(url, model)))
+        if entry["state"] == LOADED and entry["loaded_until"] and entry["loaded_until"] < time.time():
+            entry["state"] = AVAILABLE
+        return entry
+
+    def is_warm(self, url: str, model: str) -> bool:
+        return self.state(url, model)["state"] == LOADED
+
+    def pick(self, url: str, candidates: Iterable[str]) -> Optional[str]:
+        """First already loaded model among candidates, else the first one on disk"""
+        candidates = list(candidates)
+        states = {model: self.state(url, model)["state"] for model in candidates}
+        for wanted in (LOADED, AVAILABLE, LOADING):
+            for model in candidates:
+                if states[model] == wanted:
+                    return model
+        return None
+
+    def ensure(self, url: str, model: str, warm: bool = True) -> Dict[str, Any]:
+        """Start pulling a missing model and warming it in the background; returns the current state"""
+        self.refresh(url, force=True)
+        key = self._key(url, model)
+        with self._lock:
+            entry = self._entry(key)
+            task = self._tasks.get(key)
+            needed = entry["state"] in (UNKNOWN, MISSING, ERROR) or (warm and entry["state"] == AVAILABLE)
+            if needed and (task is None or not task.is_alive()):
+                task = self._tasks[key] = threading.Thread(
+                    target=self._prepare, args=(key[0], model, warm), name=f"llm-model-{model}", daemon=True)
+                task.start()
+        return self.state(url, model)
+
+    def start(self, models: Iterable[tuple]):
+        """ensure() every (url, model)"""
+        for url, model in models:
+            self.ensure(url, model)
+
+    def wait(self, url: str, model: str, timeout: float) -> Dict[str, Any]:
+        """Wait for the background work on a model to finish"""
+        with self._lock:
+            task = self._tasks.get(self._key(url, model))
+        if task is not None:
+            task.join(timeout)
+        return self.state(url, model)
+
+    def _prepare(self, url: str, model: str, warm: bool):
+        with self._lock:
+            state = self._entry(self._key(url, model))["state"]
+        if state in (UNKNOWN, MISSING, ERROR) and not self.pull(url, model):
+            return
+        if warm:
+            self.warm(url, model)
+
+    def pull(self, url: str, model: str) -> bool:
+        """Pull a model, recording progress; blocking, ensure() runs it in the background"""
+        self._set(url, model, state=PULLING, progress=0.0, error=None)
+        logger.info(f"Pulling model {model} on {url}")
+        try:
+            response = self.gateway.post(f"{url}/api/pull", json={"model": model, "stream": True}, stream=True,
+                                         timeout=(self.gateway.connect_timeout, PULL_TIMEOUT))
+            with response:
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"])
+                    if chunk.get("total"):
+                        self._set(url, model, progress=round(100.0 * chunk.get("completed", 0) / chunk["total"], 1))
+                    if chunk.get("status") == "success":
+                        break
+                else:
+                    raise RuntimeError("pull ended without success")
+        except Exception as e:
+            logger.error(f"Pulling model {model} on {url} failed: {str(e)}")
+            self._set(url, model, state=ERROR, error=str(e))
+            return False
+        logger.info(f"Model {model} pulled on {url}")
+        self._set(url, model, state=AVAILABLE, progress=100.0)
+        return True
+
+    def warm(self, url: str, model: str) -> bool:
+        """Load a model into memory with an empty request"""
+        self._set(url, model, state=LOADING, error=None)
+        keep_alive = self.keep_alive(url, model)
+        started = time.monotonic()
+        try:
+            response = self.gateway.post(f"{url}/api/generate", json={"model": model, "keep_alive": keep_alive},
+                                         timeout=(self.gateway.connect_timeout, WARM_TIMEOUT), coalesce=False)
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        except Exception as e:
+            logger.error(f"Warming model {model} on {url} failed: {str(e)}")
+            self._set(url, model, state=ERROR, error=str(e))
+            return False
+        load_ms = round((time.monotonic() - started) * 1000, 1)
+        logger.info(f"Model {model} loaded on {url} in {load_ms} ms")
+        self._set(url, model, state=LOADED, load_ms=load_ms,
+                  loaded_until=time.time() + float(keep_alive.rstrip("s")))
+        return True
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            keys = list(self._models)
+        return {f"{url} {model}": dict(self.state(url, model), keep_alive=self.keep_alive(url, model))
+                for url, model in sorted(keys)}
+
+
+def configured_models(default_url: str, spec: str = WARM_MODELS) -> list:
+    """(url, model) pairs from "model,http://host:11434=model" """
+    models = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, separator, model = item.rpartition("=")
+        models.append((url, model) if separator and url.startswith("http") else (default_url, item))
+    return models
+
+
+def get_manager() -> ModelManager:
+    """Return the manager of the process-wide gateway"""
+    return llm_gateway.get_gateway().models
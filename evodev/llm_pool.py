@@ -0,0 +1,148 @@
+"""
+Pools of Ollama backends behind one URL: health probes of /api/tags, routing to the
+member with the fewest outstanding requests among those that have the model, and failover
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+
+logger = logging.getLogger("evodev.llm_pool")
+
+# Pools as "http://ollama:11434=http://gpu1:11434,http://gpu2:11434;http://test_ollama:11434=..."
+# Calls to a pool URL (OLLAMA_URL, TEST_OLLAMA_URL, LLM_URL) are spread over its members
+BACKENDS = os.environ.get("EVODEV_LLM_BACKENDS", "")
+PROBE_INTERVAL = float(os.environ.get("EVODEV_LLM_PROBE_INTERVAL", 10))
+PROBE_TIMEOUT = float(os.environ.get("EVODEV_LLM_PROBE_TIMEOUT", 2))
+
+
+def parse_pools(spec: str) -> Dict[str, List[str]]:
+    """Pool URL -> member URLs from "url=member,member;url=member" """
+    pools = {}
+    for item in spec.split(";"):
+        name, _, members = item.strip().partition("=")
+        members = [member.strip().rstrip("/") for member in members.split(",") if member.strip()]
+        if name.strip() and members:
+            pools[name.strip().rstrip("/")] = members
+    return pools
+
+
+class Member:
+    """One backend of a pool"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        # Model names from the last /api/tags; None until the first probe
+        self.models: Optional[set] = None
+        self.probed = 0.0
+        self.routed = 0
+        self.failures = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"healthy": self.healthy, "outstanding": self.outstanding, "routed": self.routed,
+                "failures": self.failures, "models": sorted(self.models) if self.models is not None else None}
+
+
+class BackendPool:
+    """Members of one pool and the choice between them
+
+    route() takes a healthy member that lists the model in /api/tags
+    (members not probed yet count as having it) with the fewest requests
+    in flight; ties go round-robin. When no such member exists it falls
+    back to any healthy member, then to members marked down. A failed
+    call marks its member down until a probe succeeds again.
+    """
+
+    def __init__(self, name: str, members: Iterable[str], session: requests.Session,
+                 probe_interval: float = PROBE_INTERVAL, probe_timeout: float = PROBE_TIMEOUT):
+        self.name = name
+        self.members = [Member(url) for url in members]
+        self.session = session
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._stop = threading.Event()
+        self._prober = None
+
+    def _member(self, url: str) -> Optional[Member]:
+        for member in self.members:
+            if member.url == url:
+                return member
+        return None
+
+    def route(self, model: Optional[str] = None, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Pick a member for a call and count it as outstanding; None when all are excluded"""
+        from evodev.llm_gateway import model_name  # llm_gateway imports this module
+        model = model_name(model)
+        exclude = set(exclude)
+        with self._lock:
+            candidates = [member for member in self.members if member.url not in exclude]
+            healthy = [member for member in candidates if member.healthy]
+            with_model = [member for member in healthy
+                          if not model or member.models is None or model in member.models]
+            chosen = with_model or healthy or candidates
+            if not chosen:
+                return None
+            fewest = min(member.outstanding for member in chosen)
+            least = [member for member in chosen if member.outstanding == fewest]
+            member = least[self._turn % len(least)]
+            self._turn += 1
+            member.outstanding += 1
+            member.routed += 1
+            return member.url
+
+    def done(self, url: str, failed: bool = False):
+        """End a call routed to url; a failure marks the member down"""
+        with self._lock:
+            member = self._member(url)
+            if member is None:
+                return
+            member.outstanding -= 1
+            if failed:
+                member.failures += 1
+                if member.healthy:
+                    logger.warning(f"Backend {url} of {self.name} marked down")
+                member.healthy = False
+
+    def probe(self):
+        """Check every member with /api/tags and record its models"""
+        from evodev.llm_gateway import model_name  # llm_gateway imports this module
+        for member in list(self.members):
+            try:
+                response = self.session.get(f"{member.url}/api/tags", timeout=self.probe_timeout)
+                healthy = response.status_code == 200
+                models = ({model_name(entry.get("name")) for entry in response.json().get("models", [])}
+                          if healthy else None)
+            except (requests.exceptions.RequestException, ValueError):
+                healthy, models = False, None
+            with self._lock:
+                if healthy != member.healthy:
+                    logger.info(f"Backend {member.url} of {self.name} is {'up' if healthy else 'down'}")
+                member.healthy = healthy
+                member.probed = time.monotonic()
+                if models is not None:
+                    member.models = models
+
+    def start(self):
+        """Probe now and then every probe_interval in a background thread"""
+        self.probe()
+        if self._prober is None:
+            self._prober = threading.Thread(target=self._probe_loop, name=f"llm-pool-{self.name}", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            self.probe()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {member.url: member.snapshot() for member in self.members}
@@ -0,0 +1,176 @@
+"""
+Priority scheduling of LLM generations: interactive before background before batch,
+round-robin between users or rooms within a class, bounded concurrency per backend and model
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from evodev.metrics import percentile
+
+logger = logging.getLogger("evodev.llm_scheduler")
+
+INTERACTIVE, BACKGROUND, BATCH = "interactive", "background", "batch"
+PRIORITIES = (INTERACTIVE, BACKGROUND, BATCH)
+
+# Generations running at once on one backend, and how many of them only interactive calls may use
+BACKEND_CONCURRENCY = int(os.environ.get("EVODEV_LLM_BACKEND_CONCURRENCY", 4))
+INTERACTIVE_RESERVE = int(os.environ.get("EVODEV_LLM_INTERACTIVE_RESERVE", 1))
+DEFAULT_PRIORITY = os.environ.get("EVODEV_LLM_DEFAULT_PRIORITY", BACKGROUND)
+# Recent queue waits per class kept for the percentiles
+STATS_WINDOW = int(os.environ.get("EVODEV_LLM_SCHEDULER_STATS_WINDOW", 1000))
+
+_local = threading.local()
+
+
+@contextmanager
+def context(priority: str, tenant: Optional[str] = None):
+    """Priority class and tenant (user, room, project) of LLM calls made by this thread inside the block"""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority!r}, expected one of {', '.join(PRIORITIES)}")
+    previous = getattr(_local, "context", None)
+    _local.context = (priority, tenant)
+    try:
+        yield
+    finally:
+        _local.context = previous
+
+
+def current() -> tuple:
+    """(priority, tenant) set by context() for this thread"""
+    return getattr(_local, "context", None) or (DEFAULT_PRIORITY, None)
+
+
+class QueueTimeout(Exception):
+    """The call was not admitted within its timeout"""
+
+
+class _Waiter:
+    __slots__ = ("model", "priority", "tenant", "event", "enqueued", "admitted")
+
+    def __init__(self, model, priority, tenant):
+        self.model = model
+        self.priority = priority
+        self.tenant = tenant
+        self.event = threading.Event()
+        self.enqueued = time.monotonic()
+        self.admitted = False
+
+
+class BackendScheduler:
+    """Admission of generations to one backend
+
+    A free slot goes to the highest priority class with an admissible
+    waiter; within a class tenants take turns, and each tenant's calls
+    keep their order. A waiter is admissible while its model is below the
+    model limit, and non-interactive waiters only while more than `reserve`
+    backend slots are free, so a chat message never waits behind a full
+    house of batch jobs.
+    """
+
+    def __init__(self, limit: int = BACKEND_CONCURRENCY, model_limit: Callable[[str], int] = lambda model: 1 << 30,
+                 reserve: int = INTERACTIVE_RESERVE):
+        self.limit = max(1, limit)
+        self.model_limit = model_limit
+        self.reserve = reserve if reserve < self.limit else 0
+        self.in_use = 0
+        self.model_in_use: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._queues = {priority: OrderedDict() for priority in PRIORITIES}
+        self._stats = {priority: {"admitted": 0, "timeouts": 0, "wait": 0.0, "max": 0.0,
+                                  "recent": deque(maxlen=STATS_WINDOW)} for priority in PRIORITIES}
+
+    def _admissible(self, waiter: _Waiter) -> bool:
+        limit = self.limit if waiter.priority == INTERACTIVE else self.limit - self.reserve
+        return (self.in_use < limit
+                and self.model_in_use.get(waiter.model, 0) < max(1, self.model_limit(waiter.model)))
+
+    def _dispatch(self):
+        """Admit waiters while slots are free; caller holds the lock"""
+        while self.in_use < self.limit:
+            chosen = None
+            for priority in PRIORITIES:
+                for tenant, waiters in self._queues[priority].items():
+                    if self._admissible(waiters[0]):
+                        chosen = (priority, tenant, waiters)
+                        break
+                if chosen:
+                    break
+            if chosen is None:
+                return
+            priority, tenant, waiters = chosen
+            waiter = waiters.popleft()
+            if waiters:
+                self._queues[priority].move_to_end(tenant)
+            else:
+                del self._queues[priority][tenant]
+            self._admit(waiter)
+
+    def _admit(self, waiter: _Waiter):
+        self.in_use += 1
+        self.model_in_use[waiter.model] = self.model_in_use.get(waiter.model, 0) + 1
+        waited = time.monotonic() - waiter.enqueued
+        stats = self._stats[waiter.priority]
+        stats["admitted"] += 1
+        stats["wait"] += waited
+        stats["max"] = max(stats["max"], waited)
+        stats["recent"].append(waited)
+        waiter.admitted = True
+        waiter.event.set()
+
+    def acquire(self, model: str, priority: str = DEFAULT_PRIORITY, tenant: Optional[str] = None,
+                timeout: Optional[float] = None) -> Callable[[], None]:
+        """Wait for a slot; returns the release function, raises QueueTimeout"""
+        if priority not in PRIORITIES:
+            priority = DEFAULT_PRIORITY
+        waiter = _Waiter(model, priority, tenant)
+        with self._lock:
+            self._queues[priority].setdefault(tenant, deque()).append(waiter)
+            self._dispatch()
+        if not waiter.event.wait(timeout):
+            with self._lock:
+                if not waiter.admitted:
+                    waiters = self._queues[priority].get(tenant)
+                    waiters.remove(waiter)
+                    if not waiters:
+                        del self._queues[priority][tenant]
+                    self._stats[priority]["timeouts"] += 1
+                    raise QueueTimeout(f"No slot for {model} ({priority}) within {timeout:.0f}s")
+
+        released = []
+
+        def release():
+            if released:
+                return
+            released.append(True)
+            with self._lock:
+                self.in_use -= 1
+                self.model_in_use[model] -= 1
+                self._dispatch()
+        return release
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = {priority: sum(len(waiters) for waiters in self._queues[priority].values())
+                      for priority in PRIORITIES}
+            tenants = {priority: len(self._queues[priority]) for priority in PRIORITIES}
+            stats = {priority: dict(entry, recent=list(entry["recent"])) for priority, entry in self._stats.items()}
+            models = dict(self.model_in_use)
+            in_use = self.in_use
+        classes = {}
+        for priority in PRIORITIES:
+            entry = stats[priority]
+            classes[priority] = {
+                "queued": queued[priority],
+                "queued_tenants": tenants[priority],
+                "admitted": entry["admitted"],
+                "timeouts": entry["timeouts"],
+                "avg_wait_ms": round(entry["wait"] * 1000 / entry["admitted"], 1) if entry["admitted"] else None,
+                "p95_wait_ms": percentile(entry["recent"], 95, 1000),
+                "max_wait_ms": round(entry["max"] * 1000, 1),
+            }
+        return {"limit": self.limit, "reserve": self.reserve, "in_use": in_use, "models": models, "classes": classes}
@@ -0,0 +1,132 @@
+"""
+Bounded, persistent set of handled message ids: a time-windowed in-memory LRU in front of an SQLite store
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from evodev import rocketchat_sync
+
+logger = logging.getLogger("evodev.message_dedupe")
+
+# Ids kept in memory, and how long an id stays there without being looked up
+MEMORY_IDS = int(os.environ.get("EVODEV_DEDUPE_MEMORY_IDS", 10000))
+MEMORY_WINDOW = float(os.environ.get("EVODEV_DEDUPE_MEMORY_WINDOW", 24 * 3600))
+# Ids kept on disk: at most this many, none older than the retention
+DISK_IDS = int(os.environ.get("EVODEV_DEDUPE_DISK_IDS", 1000000))
+RETENTION = float(os.environ.get("EVODEV_DEDUPE_RETENTION", 30 * 24 * 3600))
+# Adds between two prunes of the disk store
+PRUNE_EVERY = 1000
+
+
+class SeenMessages:
+    """Set-like store of message ids with bounded memory and disk use
+
+    Recently added or looked-up ids answer from memory; older ones from
+    SQLite, so a restart does not forget what was already handled. Ids older
+    than the retention, or beyond DISK_IDS, are dropped oldest first - a
+    RocketChat message that old is no longer returned by a poll anyway.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_ids: int = MEMORY_IDS, memory_window: float = MEMORY_WINDOW,
+                 disk_ids: int = DISK_IDS, retention: float = RETENTION):
+        self.path = path
+        self.memory_ids = memory_ids
+        self.memory_window = memory_window
+        self.disk_ids = disk_ids
+        self.retention = retention
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, float]" = OrderedDict()
+        self._counts = dict.fromkeys(("memory_hits", "disk_hits", "misses", "adds", "pruned"), 0)
+        self._since_prune = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY, added REAL) WITHOUT ROWID")
+        self._db.execute("CREATE INDEX IF NOT EXISTS seen_added ON seen (added)")
+        self._rows = self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        self._prune()
+
+    def _remember(self, message_id: str, now: float):
+        """Put an id in the memory LRU, dropping expired and surplus ones; caller holds the lock"""
+        self._memory[message_id] = now
+        self._memory.move_to_end(message_id)
+        while self._memory and (len(self._memory) > self.memory_ids
+                                or next(iter(self._memory.values())) < now - self.memory_window):
+            self._memory.popitem(last=False)
+
+    def __contains__(self, message_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            if message_id in self._memory:
+                self._counts["memory_hits"] += 1
+                self._remember(message_id, now)
+                return True
+            row = self._db.execute("SELECT added FROM seen WHERE id = ?", (message_id,)).fetchone()
+            if row is None:
+                self._counts["misses"] += 1
+                return False
+            self._counts["disk_hits"] += 1
+            self._remember(message_id, now)
+            return True
+
+    def add(self, message_id: str):
+        now = time.time()
+        with self._lock:
+            if self._db.execute("INSERT OR IGNORE INTO seen VALUES (?, ?)", (message_id, now)).rowcount:
+                self._rows += 1
+            else:
+                self._db.execute("UPDATE seen SET added = ? WHERE id = ?", (now, message_id))
+            self._remember(message_id, now)
+            self._counts["adds"] += 1
+            self._since_prune += 1
+            if self._since_prune >= PRUNE_EVERY or self._rows > self.disk_ids + PRUNE_EVERY:
+                self._prune()
+
+    def _prune(self):
+        """Drop ids past the retention and the oldest beyond disk_ids; caller holds the lock or owns the store"""
+        self._since_prune = 0
+        self._db.execute("BEGIN")
+        removed = self._db.execute("DELETE FROM seen WHERE added < ?", (time.time() - self.retention,)).rowcount
+        self._rows = self._db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+        if self._rows > self.disk_ids:
+            surplus = self._rows - self.disk_ids
+            removed += self._db.execute(
+                "DELETE FROM seen WHERE id IN (SELECT id FROM seen ORDER BY added LIMIT ?)", (surplus,)).rowcount
+            self._rows -= surplus
+        self._db.execute("COMMIT")
+        self._counts["pruned"] += removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._rows
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            counts.update({"memory_ids": len(self._memory), "disk_ids": self._rows})
+            return counts
+
+
+def store_path(server_url: str, username: str) -> str:
+    """Store of one bot account on one server, next to its room cursors"""
+    return os.path.join(rocketchat_sync.STATE_DIR, f"answered-{rocketchat_sync.account_key(server_url, username)}.db")
+
+
+def open_store(server_url: str, username: str) -> Optional[SeenMessages]:
+    """Persistent store for a bot account; None when the state directory is unusable"""
+    try:
+        return SeenMessages(store_path(server_url, username))
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Could not open the message store: %s", e)
+        return None
@@ -0,0 +1,170 @@
+"""
+Chat message pipeline: a worker pool that handles rooms in parallel, messages of one room in order,
+with bounded per-room queues and queue-wait / handler-time metrics
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from evodev.metrics import percentile
+
+logger = logging.getLogger("evodev.message_pipeline")
+
+# Worker threads shared by all rooms, and messages a room may have waiting before new ones are refused
+WORKERS = int(os.environ.get("EVODEV_PIPELINE_WORKERS", 4))
+ROOM_DEPTH = int(os.environ.get("EVODEV_PIPELINE_ROOM_DEPTH", 20))
+# Recent timings kept for the percentiles
+STATS_WINDOW = int(os.environ.get("EVODEV_PIPELINE_STATS_WINDOW", 1000))
+
+
+class _Timing:
+    """Count, total, max and a window of recent durations"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=STATS_WINDOW)
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total * 1000 / self.count, 1) if self.count else None,
+            "p50_ms": percentile(self.recent, 50, 1000),
+            "p95_ms": percentile(self.recent, 95, 1000),
+            "max_ms": round(self.max * 1000, 1),
+        }
+
+
+class RoomPipeline:
+    """Runs handler(item) for submitted items on a pool of worker threads
+
+    A room is served by at most one worker at a time, so its items are
+    handled in submission order; a worker that finishes an item puts the
+    room at the back of the ready queue, so a busy room does not starve the
+    others. Items with a key already queued or running are ignored, which
+    makes re-delivered messages harmless.
+    """
+
+    def __init__(self, handler: Callable[[Any], None], workers: int = WORKERS, room_depth: int = ROOM_DEPTH,
+                 name: str = "pipeline"):
+        self.handler = handler
+        self.workers = workers
+        self.room_depth = room_depth
+        self.name = name
+        self._cond = threading.Condition()
+        self._rooms: Dict[Hashable, deque] = {}
+        self._ready: "OrderedDict[Hashable, None]" = OrderedDict()
+        self._active = set()
+        self._keys = set()
+        self._stopping = False
+        self._threads = []
+        self._counts = dict.fromkeys(("submitted", "handled", "errors", "rejected", "duplicates"), 0)
+        self._wait = _Timing()
+        self._run = _Timing()
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [threading.Thread(target=self._worker, name=f"{self.name}-{n}", daemon=True)
+                             for n in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, room: Hashable, item: Any, key: Optional[Hashable] = None) -> bool:
+        """Queue an item for its room; False when the room's queue is full"""
+        with self._cond:
+            if key is not None and key in self._keys:
+                self._counts["duplicates"] += 1
+                return True
+            queue = self._rooms.setdefault(room, deque())
+            if len(queue) >= self.room_depth:
+                self._counts["rejected"] += 1
+                return False
+            queue.append((item, key, time.monotonic()))
+            if key is not None:
+                self._keys.add(key)
+            self._counts["submitted"] += 1
+            if room not in self._active:
+                self._ready[room] = None
+                self._cond.notify()
+            return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._ready or self._stopping)
+                if not self._ready:
+                    return
+                room, _ = self._ready.popitem(last=False)
+                item, key, queued = self._rooms[room].popleft()
+                self._active.add(room)
+                started = time.monotonic()
+                self._wait.record(started - queued)
+            try:
+                self.handler(item)
+                error = False
+            except Exception:
+                logger.exception("Handler failed in %s for room %s", self.name, room)
+                error = True
+            with self._cond:
+                self._run.record(time.monotonic() - started)
+                self._counts["errors" if error else "handled"] += 1
+                self._keys.discard(key)
+                self._active.discard(room)
+                if self._rooms[room]:
+                    self._ready[room] = None
+                    self._cond.notify()
+                else:
+                    del self._rooms[room]
+                self._cond.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued item has been handled"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._rooms, timeout)
+
+    def stop(self, wait: bool = True, timeout: Optional[float] = None):
+        """Stop the workers; with wait=True after the queued items are handled, otherwise dropping them"""
+        if wait:
+            self.join(timeout)
+        with self._cond:
+            self._stopping = True
+            if not wait:
+                self._ready.clear()
+                for room in list(self._rooms):
+                    for _, key, _ in self._rooms[room]:
+                        self._keys.discard(key)
+                    # A room being handled is removed by its worker when the item is done
+                    if room in self._active:
+                        self._rooms[room].clear()
+                    else:
+                        del self._rooms[room]
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for thread in threads:
+            thread.join(timeout)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return dict(
+                self._counts,
+                workers=self.workers,
+                room_depth=self.room_depth,
+                busy=len(self._active),
+                queued=sum(len(queue) for queue in self._rooms.values()),
+                rooms=len(self._rooms),
+                queue_wait=self._wait.snapshot(),
+                handler=self._run.snapshot(),
+            )
@@ -0,0 +1,17 @@
+"""
+Helpers shared by the metrics snapshots of evodev components and the monitor
+"""
+from typing import Iterable, Optional
+
+
+def percentile(values: Iterable[float], p: float, scale: float = 1.0) -> Optional[float]:
+    """p-th percentile of values times scale, rounded to 0.1; None without values
+
+    Takes the sorted value at the index nearest to p% of the way from the
+    first to the last one, without interpolation. Durations kept in seconds
+    are reported in milliseconds with scale=1000.
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * scale, 1)
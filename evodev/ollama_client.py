@@ -3,6 +3,8 @@ Moduł klienta Ollama do komunikacji z lokalnym serwerem Ollama LLM.
 """
 import requests
 
+from evodev import llm_gateway
+
 
 class OllamaClient:
     """Klient do komunikacji z serwerem Ollama LLM"""
@@ -26,7 +28,7 @@ class OllamaClient:
             dict: Odpowiedź z serwera Ollama lub informacja o błędzie
         """
         try:
-            response = requests.post(
+            response = llm_gateway.post(
                 f"{self.ollama_url}/api/generate",
                 json={"prompt": prompt, "model": model},
                 headers={"Content-Type": "application/json"},
@@ -56,7 +58,7 @@ class OllamaClient:
             dict: Status serwera Ollama
         """
         try:
-            response = requests.get(f"{self.ollama_url}/api/health", timeout=5)
+            response = llm_gateway.get(f"{self.ollama_url}/api/health", timeout=5)
             
             if response.status_code == 200:
                 return {"status": "available", "details": response.json()}
@@ -5,6 +5,7 @@ import os
 import json
 import datetime
 import threading
+import time
 import logging
 import requests
 
@@ -14,8 +15,13 @@ try:
 except ImportError:
     docker = None
 
+from evodev.container_state import ContainerStateCache
+
 class RecoverySystem:
     """System for monitoring and recovering EvoDev services"""
+
+    # List of critical services
+    CRITICAL_SERVICES = ["gitlab", "ollama", "autonomous-system", "recovery-system"]
     
     def __init__(self):
         """Initialize the recovery system with default settings"""
@@ -24,6 +30,7 @@ class RecoverySystem:
         self.gitlab_token = os.environ.get("GITLAB_API_TOKEN", "default-token")
         self.backup_dir = os.environ.get("BACKUP_DIR", "/var/backups/evodev")
         self.backup_interval = int(os.environ.get("BACKUP_INTERVAL", 3600))
+        self.event_interval = float(os.environ.get("RECOVERY_EVENT_INTERVAL", 30))
         
         # Create backup directory if it doesn't exist
         os.makedirs(self.backup_dir, exist_ok=True)
@@ -34,6 +41,10 @@ class RecoverySystem:
         else:
             self.docker_client = None
             self.logger.warning("Docker module not available, some functionality will be limited")
+
+        # Container state is followed through Docker events once monitoring starts
+        self.container_state = None
+        self._state_changed = threading.Event()
         
         # Start monitoring thread
         self.monitoring_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
@@ -43,9 +54,32 @@ class RecoverySystem:
         self.logger = logging.getLogger("evodev.recovery")
         self.logger.info("Recovery system initialized")
     
+    def _start_container_state(self):
+        """Start the event-driven container cache and wake the loop on critical changes"""
+        if self.docker_client is None:
+            return
+        try:
+            self.container_state = ContainerStateCache(self.docker_client).start()
+            self.container_state.subscribe(self._on_container_change)
+            self.container_state.wait_ready(timeout=10)
+        except Exception as e:
+            self.logger.error(f"Container state cache unavailable, polling instead: {str(e)}")
+            self.container_state = None
+
+    def _on_container_change(self, action, record, previous):
+        """Trigger an early integrity check when a critical service changes state"""
+        name = (record or previous or {}).get("name")
+        if name in self.CRITICAL_SERVICES:
+            before = (previous or {}).get("status"), (previous or {}).get("health")
+            after = (record or {}).get("status"), (record or {}).get("health")
+            if before != after:
+                self._state_changed.set()
+
     def _monitoring_loop(self):
         """Main monitoring loop that runs in a separate thread"""
+        self._start_container_state()
         while True:
+            started = time.monotonic()
             try:
                 # Check services status
                 services_status = self._check_services_status()
@@ -57,12 +91,25 @@ class RecoverySystem:
                 if not self._verify_system_integrity(services_status):
                     self._initiate_recovery(services_status)
                 
-                # Sleep for the configured interval
-                threading.Event().wait(self.backup_interval)
+                self._wait_for_next_check(started)
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {str(e)}")
                 threading.Event().wait(60)  # Wait a minute before retrying
 
+    def _wait_for_next_check(self, started):
+        """Sleep for the configured interval or until a critical service changes
+
+        Event-driven checks start at least event_interval seconds apart: the
+        recovery's own restarts emit container events too, and without the
+        limit every repair would immediately trigger another check.
+        """
+        if self._state_changed.wait(self.backup_interval):
+            remaining = started + self.event_interval - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        # Events that arrived meanwhile are covered by the next check
+        self._state_changed.clear()
+
     def _check_services_status(self):
         """Check the status of all Docker services"""
         services_status = {}
@@ -72,6 +119,17 @@ class RecoverySystem:
             self.logger.warning("Cannot check services: Docker client not available")
             return services_status
 
+        # Serve from the event-driven snapshot when it is available
+        if self.container_state is not None and self.container_state.ready:
+            for record in self.container_state.containers():
+                services_status[record["name"]] = {
+                    "status": record["status"],
+                    "image": record["image"] or "unknown",
+                    "created": record["created"],
+                    "health": record["health"]
+                }
+            return services_status
+
         for container in self.docker_client.containers.list(all=True):
             # Rest of the method remains the same
             health = "unknown"
@@ -104,11 +162,8 @@ class RecoverySystem:
     
     def _verify_system_integrity(self, services_status):
         """Verify that all critical services are running properly"""
-        # List of critical services
-        critical_services = ["gitlab", "ollama", "autonomous-system", "recovery-system"]
-        
         # Check if all critical services exist and are running
-        for service in critical_services:
+        for service in self.CRITICAL_SERVICES:
             if service not in services_status:
                 self.logger.error(f"Critical service {service} is missing")
                 return False
@@ -0,0 +1,348 @@
+"""
+RocketChat realtime API client: DDP over WebSocket with stream-room-messages and
+stream-notify-user subscriptions, keepalive pings, reconnect with backoff and resume
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("evodev.rocketchat_realtime")
+
+# Realtime ingestion on by default; "0" keeps the bots on REST polling
+ENABLED = os.environ.get("EVODEV_ROCKETCHAT_REALTIME", "1").lower() not in ("0", "false", "no")
+CONNECT_TIMEOUT = float(os.environ.get("EVODEV_ROCKETCHAT_CONNECT_TIMEOUT", 10))
+# Seconds of silence before the client pings the server, and how long it waits for the answer
+PING_INTERVAL = float(os.environ.get("EVODEV_ROCKETCHAT_PING_INTERVAL", 25))
+PING_TIMEOUT = float(os.environ.get("EVODEV_ROCKETCHAT_PING_TIMEOUT", 10))
+# Reconnect backoff bounds in seconds
+RECONNECT_MIN = float(os.environ.get("EVODEV_ROCKETCHAT_RECONNECT_MIN", 1))
+RECONNECT_MAX = float(os.environ.get("EVODEV_ROCKETCHAT_RECONNECT_MAX", 30))
+# Message ids remembered to drop duplicates between the stream and catch-up polls
+RECENT_IDS = int(os.environ.get("EVODEV_ROCKETCHAT_RECENT_IDS", 10000))
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class WebSocketClosed(ConnectionError):
+    """The WebSocket connection ended or the handshake failed"""
+
+
+class RealtimeError(Exception):
+    """The server rejected the DDP connection, login or a subscription"""
+
+
+def websocket_url(server_url: str) -> str:
+    """ws(s)://host/websocket for an http(s) RocketChat URL"""
+    parts = urlsplit(server_url.rstrip("/"))
+    scheme = "wss" if parts.scheme == "https" else "ws"
+    return f"{scheme}://{parts.netloc}{parts.path}/websocket"
+
+
+class WebSocket:
+    """Minimal RFC 6455 client: text messages, ping/pong and close, no extensions"""
+
+    def __init__(self, url: str, timeout: float = CONNECT_TIMEOUT):
+        parts = urlsplit(url)
+        secure = parts.scheme in ("wss", "https")
+        sock = socket.create_connection((parts.hostname, parts.port or (443 if secure else 80)), timeout)
+        if secure:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=parts.hostname)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        self._buffer = b""
+        self._fragments: List[bytes] = []
+        self._send_lock = threading.Lock()
+        self.closed = False
+
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        sock.sendall((f"GET {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUpgrade: websocket\r\n"
+                      f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+        while b"\r\n\r\n" not in self._buffer:
+            self._fill(len(self._buffer) + 1)
+        head, self._buffer = self._buffer.split(b"\r\n\r\n", 1)
+        status, *lines = head.decode("latin-1").split("\r\n")
+        headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        if status.split()[1:2] != ["101"] or headers.get("sec-websocket-accept") != accept:
+            sock.close()
+            raise WebSocketClosed(f"WebSocket handshake with {url} failed: {status}")
+
+    def _fill(self, size: int):
+        """Read until the buffer holds size bytes; a timeout keeps what was read"""
+        while len(self._buffer) < size:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                raise WebSocketClosed("Connection closed by the server")
+            self._buffer += chunk
+
+    def _frame(self) -> Tuple[bool, int, bytes]:
+        self._fill(2)
+        first, second = self._buffer[0], self._buffer[1]
+        length, offset = second & 0x7F, 2
+        if length == 126:
+            self._fill(4)
+            length, offset = struct.unpack("!H", self._buffer[2:4])[0], 4
+        elif length == 127:
+            self._fill(10)
+            length, offset = struct.unpack("!Q", self._buffer[2:10])[0], 10
+        mask = b""
+        if second & 0x80:
+            self._fill(offset + 4)
+            mask, offset = self._buffer[offset:offset + 4], offset + 4
+        self._fill(offset + length)
+        payload, self._buffer = self._buffer[offset:offset + length], self._buffer[offset + length:]
+        if mask:
+            payload = bytes(byte ^ mask[n % 4] for n, byte in enumerate(payload))
+        return bool(first & 0x80), first & 0x0F, payload
+
+    def recv(self, timeout: Optional[float] = None) -> Optional[str]:
+        """Next text message, None after timeout seconds without one; answers pings"""
+        self.sock.settimeout(timeout)
+        while True:
+            try:
+                final, opcode, payload = self._frame()
+            except socket.timeout:
+                return None
+            if opcode == OP_PING:
+                self._send(OP_PONG, payload)
+            elif opcode == OP_CLOSE:
+                self.close()
+                raise WebSocketClosed("Connection closed by the server")
+            elif opcode in (OP_TEXT, OP_BINARY, OP_CONTINUATION):
+                self._fragments.append(payload)
+                if final:
+                    message, self._fragments = b"".join(self._fragments), []
+                    return message.decode("utf-8")
+
+    def _send(self, opcode: int, payload: bytes):
+        header = bytes([0x80 | opcode])
+        if len(payload) < 126:
+            header += bytes([0x80 | len(payload)])
+        elif len(payload) < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack("!H", len(payload))
+        else:
+            header += bytes([0x80 | 127]) + struct.pack("!Q", len(payload))
+        mask = os.urandom(4)
+        masked = bytes(byte ^ mask[n % 4] for n, byte in enumerate(payload))
+        with self._send_lock:
+            self.sock.sendall(header + mask + masked)
+
+    def send(self, text: str):
+        self._send(OP_TEXT, text.encode("utf-8"))
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._send(OP_CLOSE, struct.pack("!H", 1000))
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class RealtimeClient:
+    """Messages of every room the user is in, pushed by the RocketChat realtime API
+
+    A background thread keeps one DDP connection: login with the REST
+    token (resume), a subscription to stream-room-messages/__my_messages__
+    and one to stream-notify-user/<user>/rooms-changed. Messages are queued
+    for get(); a dropped connection is reopened with exponential backoff.
+    Every successful subscription increments `generation` - the owner then
+    polls REST once (resync_due()) for what arrived while it was down.
+    """
+
+    def __init__(self, server_url: str, credentials: Callable[[], Tuple[str, str]],
+                 ping_interval: float = PING_INTERVAL, ping_timeout: float = PING_TIMEOUT,
+                 reconnect_min: float = RECONNECT_MIN, reconnect_max: float = RECONNECT_MAX):
+        self.url = websocket_url(server_url)
+        # Called at every connect, so a token renewed by a REST re-login is picked up
+        self.credentials = credentials
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.reconnect_min = reconnect_min
+        self.reconnect_max = reconnect_max
+        self.connected = False
+        self.generation = 0
+        # time.time() of the last frame; catch-up polls start shortly before it
+        self.last_alive = time.time()
+        self.room_types: Dict[str, str] = {}
+        self.stats = {"connects": 0, "disconnects": 0, "messages": 0, "duplicates": 0}
+        self._synced_generation = 0
+        self._events: deque = deque()
+        self._recent: OrderedDict = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._ws: Optional[WebSocket] = None
+        self._ids = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rocketchat-realtime", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            ws.close()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def wait_connected(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while not self.connected and time.monotonic() < deadline and not self._stop.is_set():
+            time.sleep(0.01)
+        return self.connected
+
+    def is_new(self, message_id: str) -> bool:
+        """Remember a message id; False if it was seen before"""
+        with self._cond:
+            return self._remember(message_id)
+
+    def _remember(self, message_id: str) -> bool:
+        if not message_id:
+            return True
+        if message_id in self._recent:
+            self._recent.move_to_end(message_id)
+            return False
+        self._recent[message_id] = True
+        if len(self._recent) > RECENT_IDS:
+            self._recent.popitem(last=False)
+        return True
+
+    def resync_due(self) -> bool:
+        """True once after every (re)connect: the owner should poll REST for missed messages"""
+        with self._cond:
+            if self.connected and self._synced_generation != self.generation:
+                self._synced_generation = self.generation
+                return True
+            return False
+
+    def wait(self, timeout: float) -> bool:
+        """Wait until a message is queued"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._events or self._stop.is_set(), timeout) and bool(self._events)
+
+    def get(self, timeout: float = 0) -> List[Dict[str, Any]]:
+        """Queued events {"message": doc, "room_type": "d"/"c"/"p"/None}, waiting up to timeout for one"""
+        with self._cond:
+            if timeout:
+                self._cond.wait_for(lambda: self._events or self._stop.is_set(), timeout)
+            events, self._events = list(self._events), deque()
+            return events
+
+    def _next_id(self) -> str:
+        self._ids += 1
+        return str(self._ids)
+
+    def _run(self):
+        backoff = self.reconnect_min
+        while not self._stop.is_set():
+            try:
+                self._session()
+                backoff = self.reconnect_min
+            except (OSError, WebSocketClosed, RealtimeError, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                logger.warning(f"RocketChat realtime connection to {self.url} lost: {str(e)}")
+            finally:
+                if self.connected:
+                    self.stats["disconnects"] += 1
+                self.connected = False
+            if self._stop.wait(backoff):
+                break
+            backoff = min(self.reconnect_max, backoff * 2)
+
+    def _call(self, ws: WebSocket, payload: Dict[str, Any], until: Callable[[Dict[str, Any]], bool]) -> Dict[str, Any]:
+        """Send a DDP message and read until the matching reply"""
+        ws.send(json.dumps(payload))
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while time.monotonic() < deadline:
+            text = ws.recv(timeout=max(0.01, deadline - time.monotonic()))
+            if text is None:
+                break
+            message = json.loads(text)
+            self.last_alive = time.time()
+            if until(message):
+                return message
+            self._handle(ws, message)
+        raise RealtimeError(f"No reply to {payload.get('msg')} {payload.get('method', payload.get('name', ''))}")
+
+    def _session(self):
+        ws = self._ws = WebSocket(self.url)
+        try:
+            self._call(ws, {"msg": "connect", "version": "1", "support": ["1"]},
+                       lambda message: message.get("msg") in ("connected", "failed"))
+            user_id, token = self.credentials()
+            login_id = self._next_id()
+            reply = self._call(ws, {"msg": "method", "method": "login", "id": login_id, "params": [{"resume": token}]},
+                               lambda message: message.get("msg") == "result" and message.get("id") == login_id)
+            if reply.get("error"):
+                raise RealtimeError(f"Realtime login failed: {reply['error'].get('reason') or reply['error']}")
+            for name, event in (("stream-room-messages", "__my_messages__"),
+                                ("stream-notify-user", f"{user_id}/rooms-changed")):
+                sub_id = self._next_id()
+                reply = self._call(ws, {"msg": "sub", "id": sub_id, "name": name, "params": [event, False]},
+                                   lambda message: sub_id in message.get("subs", ()) or message.get("id") == sub_id)
+                if reply.get("msg") == "nosub":
+                    raise RealtimeError(f"Subscription {name} {event} rejected: {reply.get('error')}")
+            with self._cond:
+                self.connected = True
+                self.generation += 1
+            self.stats["connects"] += 1
+            logger.info(f"RocketChat realtime connected to {self.url}")
+
+            pinged = None
+            while not self._stop.is_set():
+                text = ws.recv(timeout=1.0)
+                if text is None:
+                    silent = time.time() - self.last_alive
+                    if pinged is None and silent >= self.ping_interval:
+                        ws.send(json.dumps({"msg": "ping"}))
+                        pinged = time.monotonic()
+                    elif pinged is not None and time.monotonic() - pinged >= self.ping_timeout:
+                        raise WebSocketClosed(f"No answer to ping within {self.ping_timeout:.0f}s")
+                    continue
+                self.last_alive = time.time()
+                pinged = None
+                self._handle(ws, json.loads(text))
+        finally:
+            self._ws = None
+            ws.close()
+
+    def _handle(self, ws: WebSocket, message: Dict[str, Any]):
+        kind = message.get("msg")
+        if kind == "ping":
+            ws.send(json.dumps({"msg": "pong"}))
+        elif kind == "changed" and message.get("collection") == "stream-room-messages":
+            args = message.get("fields", {}).get("args", [])
+            if not args or not isinstance(args[0], dict):
+                return
+            doc = args[0]
+            info = args[1] if len(args) > 1 and isinstance(args[1], dict) else {}
+            room_type = info.get("roomType") or self.room_types.get(doc.get("rid"))
+            with self._cond:
+                if not self._remember(doc.get("_id")):
+                    self.stats["duplicates"] += 1
+                    return
+                self.stats["messages"] += 1
+                self._events.append({"message": doc, "room_type": room_type})
+                self._cond.notify_all()
+        elif kind == "changed" and message.get("collection") == "stream-notify-user":
+            args = message.get("fields", {}).get("args", [])
+            if len(args) > 1 and isinstance(args[1], dict) and args[1].get("_id"):
+                self.room_types[args[1]["_id"]] = args[1].get("t")
@@ -0,0 +1,191 @@
+"""
+Incremental RocketChat room sync: per-room high-water marks persisted on disk, so a poll
+fetches only rooms whose last message moved and only the messages after the mark
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("evodev.rocketchat_sync")
+
+STATE_DIR = os.environ.get("EVODEV_ROCKETCHAT_STATE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "evodev", "rocketchat"))
+# Messages per history request; a room with more new messages is read page by page
+PAGE_SIZE = int(os.environ.get("EVODEV_ROCKETCHAT_PAGE_SIZE", 100))
+# Seconds between cursor file writes; flush() writes immediately
+SAVE_INTERVAL = float(os.environ.get("EVODEV_ROCKETCHAT_SAVE_INTERVAL", 5))
+# Rooms first seen after a full sync are read from this many seconds before it
+SINCE_MARGIN = 60
+
+
+def to_millis(ts: Any) -> Optional[int]:
+    """Milliseconds since the epoch for an ISO 8601 string or a DDP {"$date": ms}; None if unparseable"""
+    if isinstance(ts, dict) and "$date" in ts:
+        return int(ts["$date"])
+    if isinstance(ts, str):
+        try:
+            return round(datetime.datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp() * 1000)
+        except ValueError:
+            return None
+    return None
+
+
+def iso(millis: int) -> str:
+    """RocketChat's ISO 8601 form of a millisecond timestamp"""
+    moment = datetime.datetime.fromtimestamp(millis / 1000, datetime.timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{millis % 1000:03d}Z"
+
+
+def account_key(server_url: str, username: str) -> str:
+    """Short stable name for one bot account on one server, used in state file names"""
+    return hashlib.sha1(f"{server_url.rstrip('/')}|{username}".encode()).hexdigest()[:16]
+
+
+def cursor_path(server_url: str, username: str, directory: Optional[str] = None) -> str:
+    """Cursor file of one bot account on one server"""
+    return os.path.join(directory or STATE_DIR, f"cursors-{account_key(server_url, username)}.json")
+
+
+class RoomCursors:
+    """Newest message seen in every room, as (timestamp in ms, ids at that timestamp)
+
+    History requests are inclusive of the mark, so a message sharing the
+    millisecond of the last one seen is not lost; the ids at the mark drop
+    the ones already returned. Rooms without a mark start at `since`, shortly
+    before the last full sync, so a restart neither replays history nor
+    skips rooms created while the bot was down.
+    """
+
+    def __init__(self, path: Optional[str] = None, page_size: int = PAGE_SIZE, save_interval: float = SAVE_INTERVAL):
+        self.path = path
+        self.page_size = page_size
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self.since = int(time.time() * 1000)
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._saved = time.monotonic()
+        self.stats = dict.fromkeys(("skipped", "synced", "requests", "messages"), 0)
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.since = int(data["since"])
+                self.rooms = {room_id: {"ts": int(mark["ts"]), "ids": list(mark["ids"])}
+                              for room_id, mark in data["rooms"].items()}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning("Ignoring unreadable cursor file %s: %s", path, e)
+
+    def mark(self, room_id: str) -> int:
+        with self._lock:
+            cursor = self.rooms.get(room_id)
+            return cursor["ts"] if cursor else self.since
+
+    def changed(self, room: Dict[str, Any]) -> bool:
+        """Whether a room from im.list/channels.list has a last message (lm) after its mark
+
+        A room seen for the first time is marked at `since`, so it does not
+        move back with the next full sync.
+        """
+        lm = room.get("lm")
+        last = to_millis(lm) if lm is not None else None
+        with self._lock:
+            cursor = self.rooms.get(room["_id"])
+            if cursor is None:
+                cursor = self.rooms[room["_id"]] = {"ts": self.since, "ids": []}
+                self._dirty = True
+            changed = lm is not None and (last is None or last > cursor["ts"])
+            self.stats["synced" if changed else "skipped"] += 1
+        return changed
+
+    def advance(self, room_id: str, millis: Optional[int], message_id: str) -> bool:
+        """Move the room's mark to a message; False when the message was already seen"""
+        if millis is None:
+            return True
+        with self._lock:
+            cursor = self.rooms.get(room_id)
+            if cursor is None or millis > cursor["ts"]:
+                self.rooms[room_id] = {"ts": millis, "ids": [message_id]}
+            elif millis == cursor["ts"] and message_id not in cursor["ids"]:
+                cursor["ids"].append(message_id)
+            else:
+                return False
+            self._dirty = True
+            return True
+
+    def sync(self, room_id: str, fetch: Callable[[Dict[str, Any]], Optional[List[Dict[str, Any]]]]) -> Optional[List[Dict[str, Any]]]:
+        """Messages of a room after its mark, oldest first, advancing the mark
+
+        `fetch(params)` runs one history request (im.history/channels.history)
+        with oldest/inclusive/count/offset and returns its messages newest
+        first, or None on error; the mark then stays put and None is returned.
+        """
+        with self._lock:
+            cursor = self.rooms.get(room_id)
+            start, seen = (cursor["ts"], set(cursor["ids"])) if cursor else (self.since, set())
+        params = {"oldest": iso(start), "inclusive": "true", "count": self.page_size}
+        collected: Dict[str, Dict[str, Any]] = {}
+        while True:
+            page = fetch(dict(params))
+            with self._lock:
+                self.stats["requests"] += 1
+            if page is None:
+                return None
+            for message in page:
+                if message.get("_id") not in seen:
+                    collected.setdefault(message.get("_id"), message)
+            if len(page) < self.page_size:
+                break
+            # Full page: the next one below it; a message arriving meanwhile only repeats one
+            params["offset"] = params.get("offset", 0) + self.page_size
+        # Pages come newest first; reversed before the stable sort so equal timestamps keep their order
+        messages = sorted(reversed(list(collected.values())), key=lambda message: to_millis(message.get("ts")) or 0)
+        for message in messages:
+            self.advance(room_id, to_millis(message.get("ts")), message.get("_id"))
+        with self._lock:
+            self.stats["messages"] += len(messages)
+        return messages
+
+    def synced(self):
+        """Record a full sync: rooms seen from now on start shortly before this moment"""
+        with self._lock:
+            since = int((time.time() - SINCE_MARGIN) * 1000)
+            if since > self.since:
+                self.since = since
+                self._dirty = True
+
+    def save(self, force: bool = False):
+        """Write the cursors if they changed, at most every save_interval seconds unless forced"""
+        with self._lock:
+            if not self.path or not self._dirty or (not force and time.monotonic() - self._saved < self.save_interval):
+                return
+            data = json.dumps({"since": self.since, "rooms": self.rooms})
+            self._dirty = False
+            self._saved = time.monotonic()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logger.warning("Could not save cursors to %s: %s", self.path, e)
+            with self._lock:
+                self._dirty = True
+
+    def flush(self):
+        self.save(force=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, rooms=len(self.rooms), since=self.since)
+
+
+def open_cursors(server_url: str, username: str) -> RoomCursors:
+    """Cursors of a bot account, loaded from STATE_DIR"""
+    return RoomCursors(cursor_path(server_url, username))
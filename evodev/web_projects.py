@@ -12,6 +12,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 import docker
 
+from evodev import docker_client
+
 # Konfiguracja loggera
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -341,7 +343,7 @@ CMD ["python", "app.py"]"""
     def deploy(self) -> bool:
         """Wdraża projekt jako kontener Docker"""
         try:
-            client = docker.from_env()
+            client = docker_client.get_client()
 
             # Sprawdź, czy kontener już istnieje
             try:
@@ -394,7 +396,7 @@ CMD ["python", "app.py"]"""
     def stop(self) -> bool:
         """Zatrzymuje kontener projektu"""
         try:
-            client = docker.from_env()
+            client = docker_client.get_client()
 
             try:
                 container = client.containers.get(self.container_name)
@@ -412,7 +414,7 @@ CMD ["python", "app.py"]"""
     def start(self) -> bool:
         """Uruchamia kontener projektu"""
         try:
-            client = docker.from_env()
+            client = docker_client.get_client()
 
             try:
                 container = client.containers.get(self.container_name)
@@ -433,7 +435,7 @@ CMD ["python", "app.py"]"""
             # Zatrzymaj i usuń kontener
             self.stop()
 
-            client = docker.from_env()
+            client = docker_client.get_client()
             try:
                 container = client.containers.get(self.container_name)
                 container.remove()
@@ -11,6 +11,25 @@ import subprocess
 from flask import Flask, request, jsonify
 from typing import Dict, List, Any, Optional
 
+# Współdzielony cache stanu kontenerów (pakiet evodev); bez niego stan jest odpytywany
+try:
+    from evodev.container_state import ContainerStateCache
+except ImportError:
+    ContainerStateCache = None
+
+# Współdzielony klient Docker z pulą połączeń i ponowieniami (pakiet evodev)
+try:
+    from evodev.docker_client import get_client as docker_from_env
+except ImportError:
+    docker_from_env = docker.from_env
+
+# Wspólna bramka LLM z pulą połączeń, limitami na model i wyłącznikiem (pakiet evodev)
+try:
+    from evodev import llm_gateway as llm_http, llm_models
+except ImportError:
+    llm_http = requests
+    llm_models = None
+
 # Konfiguracja logowania
 logging.basicConfig(
     level=logging.INFO,
@@ -34,9 +53,12 @@ class CoreManager:
         self.is_active = os.environ.get("IS_ACTIVE", "false").lower() == "true"
         self.gitlab_url = os.environ.get("GITLAB_URL", "http://gitlab")
         self.ollama_url = os.environ.get("OLLAMA_URL", "http://ollama:11434")
+        # Modele rozgrzewane przy starcie; polecenie generate bez modelu wybiera już załadowany
+        self.ollama_models = [model for _, model in llm_models.configured_models(
+            self.ollama_url, os.environ.get("EVODEV_LLM_WARM_MODELS", "llama3:7b"))] if llm_models else ["llama3:7b"]
 
         # Inicjalizacja klientów
-        self.docker_client = docker.from_env()
+        self.docker_client = docker_from_env()
 
         # Status systemu
         self.system_status = {
@@ -56,6 +78,9 @@ class CoreManager:
             self.monitor_thread = threading.Thread(target=self._monitor_system, daemon=True)
             self.monitor_thread.start()
 
+        if llm_models is not None:
+            llm_models.get_manager().start((self.ollama_url, model) for model in self.ollama_models)
+
         logger.info(f"Core Manager {self.core_id} initialized. Active: {self.is_active}")
 
     def init_database(self):
@@ -241,22 +266,62 @@ class CoreManager:
         except Exception as e:
             logger.error(f"Error registering component version: {str(e)}")
 
+    def _start_container_state(self):
+        """
+        Uruchomienie cache stanu kontenerów zasilanego zdarzeniami Dockera
+        """
+        if ContainerStateCache is None:
+            return None
+        try:
+            cache = ContainerStateCache(self.docker_client).start()
+            cache.subscribe(self._on_container_change)
+            cache.wait_ready(timeout=10)
+            return cache
+        except Exception as e:
+            logger.error(f"Container state cache unavailable, polling instead: {str(e)}")
+            return None
+
+    def _on_container_change(self, action, record, previous):
+        """
+        Wybudzenie pętli monitorowania po zmianie stanu kontenera rdzenia
+        """
+        name = (record or previous or {}).get("name", "")
+        if f"core{self.core_id}" in name:
+            self._state_changed.set()
+
+    def _collect_service_status(self, container_state):
+        """
+        Stan kontenerów rdzenia z migawki cache lub, bez niej, z API Dockera
+        """
+        service_status = {}
+        if container_state is not None and container_state.ready:
+            for record in container_state.containers(all=False):
+                if f"core{self.core_id}" in record["name"]:
+                    service_status[record["name"]] = {
+                        "status": record["status"],
+                        "image": record["image"] or "unknown"
+                    }
+            return service_status
+
+        containers = self.docker_client.containers.list()
+        for container in containers:
+            if f"core{self.core_id}" in container.name:
+                service_status[container.name] = {
+                    "status": container.status,
+                    "image": container.image.tags[0] if container.image.tags else "unknown"
+                }
+        return service_status
+
     def _monitor_system(self):
         """
         Ciągłe monitorowanie stanu systemu
         """
+        self._state_changed = threading.Event()
+        container_state = self._start_container_state()
         while True:
             try:
                 # Sprawdzenie stanu kontenerów
-                containers = self.docker_client.containers.list()
-                core_containers = [c for c in containers if f"core{self.core_id}" in c.name]
-
-                service_status = {}
-                for container in core_containers:
-                    service_status[container.name] = {
-                        "status": container.status,
-                        "image": container.image.tags[0] if container.image.tags else "unknown"
-                    }
+                service_status = self._collect_service_status(container_state)
 
                 # Aktualizacja statusu
                 self.system_status["services"] = service_status
@@ -273,8 +338,9 @@ class CoreManager:
                 logger.error(f"Error in system monitoring: {str(e)}")
                 self.system_status["status"] = "error"
 
-            # Pauza przed kolejnym sprawdzeniem
-            time.sleep(30)
+            # Pauza przed kolejnym sprawdzeniem (lub do zmiany stanu kontenera)
+            self._state_changed.wait(30)
+            self._state_changed.clear()
 
     def _save_status_to_shared(self):
         """
@@ -617,14 +683,17 @@ class CoreManager:
         try:
             if command == "generate":
                 prompt = params.get("prompt")
-                model = params.get("model", "llama3:7b")
+                model = params.get("model")
+                if not model and llm_models is not None:
+                    model = llm_models.get_manager().pick(self.ollama_url, self.ollama_models)
+                model = model or self.ollama_models[0]
 
                 if not prompt:
                     self.update_command_result(command_id, "error",
                                                {"error": "Prompt not provided"})
                     return {"success": False, "error": "Prompt not provided"}
 
-                response = requests.post(
+                response = llm_http.post(
                     f"{self.ollama_url}/api/generate",
                     json={
                         "model": model,
@@ -643,7 +712,7 @@ class CoreManager:
                     return {"success": False, "error": error}
 
             elif command == "list_models":
-                response = requests.get(f"{self.ollama_url}/api/tags")
+                response = llm_http.get(f"{self.ollama_url}/api/tags")
 
                 if response.status_code == 200:
                     models = response.json().get("models", [])
@@ -662,7 +731,7 @@ class CoreManager:
                                                {"error": "Model name not provided"})
                     return {"success": False, "error": "Model name not provided"}
 
-                response = requests.post(
+                response = llm_http.post(
                     f"{self.ollama_url}/api/pull",
                     json={"name": model}
                 )
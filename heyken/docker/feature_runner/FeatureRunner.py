@@ -10,9 +10,23 @@ import psycopg2
 import subprocess
 import uuid
 import yaml
+from contextlib import nullcontext
 from flask import Flask, request, jsonify
 from typing import Dict, List, Any, Optional
 
+# Współdzielony klient Docker z pulą połączeń i ponowieniami (pakiet evodev)
+try:
+    from evodev.docker_client import get_client as docker_from_env
+except ImportError:
+    docker_from_env = docker.from_env
+
+# Wspólna bramka LLM z pulą połączeń, kolejką priorytetową i wyłącznikiem (pakiet evodev)
+try:
+    from evodev import llm_gateway as llm_http, llm_models, llm_scheduler
+except ImportError:
+    llm_http = requests
+    llm_models = llm_scheduler = None
+
 # Konfiguracja logowania
 logging.basicConfig(
     level=logging.INFO,
@@ -37,7 +51,7 @@ class FeatureRunner:
         self.sandbox_manager_url = os.environ.get("SANDBOX_MANAGER_URL", "http://sandbox_manager:5000")
 
         # Inicjalizacja klientów
-        self.docker_client = docker.from_env()
+        self.docker_client = docker_from_env()
 
         # Baza danych
         self.db_conn = None
@@ -48,6 +62,10 @@ class FeatureRunner:
         self.test_thread = threading.Thread(target=self._process_test_queue, daemon=True)
         self.test_thread.start()
 
+        # Model testów ładowany w tle, zanim przyjdzie pierwsza funkcja do przetestowania
+        if llm_models is not None:
+            llm_models.get_manager().ensure(self.test_ollama_url, "llama3:7b")
+
         logger.info("Feature Runner initialized")
 
     def init_database(self):
@@ -202,7 +220,10 @@ class FeatureRunner:
 
             # Wykonanie testów z wykorzystaniem Ollama
             logger.info(f"Running tests with Ollama for feature: {feature_config['name']}")
-            test_results = self._run_ollama_tests(feature_config, test_file)
+            # Testy to zadanie wsadowe - w kolejce LLM ustępują rozmowom z użytkownikami
+            batch = llm_scheduler.context("batch", tenant=feature_config["name"]) if llm_scheduler else nullcontext()
+            with batch:
+                test_results = self._run_ollama_tests(feature_config, test_file)
 
             # Zapisanie wyników testów
             for test_name, test_result in test_results.items():
@@ -291,7 +312,7 @@ class FeatureRunner:
                 start_time = time.time()
 
                 # Wywołanie Ollama do wykonania testu
-                response = requests.post(
+                response = llm_http.post(
                     f"{self.test_ollama_url}/api/generate",
                     json={
                         "model": "llama3:7b",
@@ -313,7 +334,9 @@ class FeatureRunner:
                         3. Ewentualne problemy i błędy
                         4. Rekomendacje
                         """,
-                        "stream": False
+                        "stream": False,
+                        # Deterministyczna ocena: ponowny test niezmienionej funkcji bierze wynik z cache
+                        "options": {"temperature": 0, "seed": 42}
                     }
                 )
 
@@ -7,6 +7,12 @@ import threading
 import docker
 from flask import Flask, request, jsonify
 
+# Współdzielony klient Docker z pulą połączeń i ponowieniami (pakiet evodev)
+try:
+    from evodev.docker_client import get_client as docker_from_env
+except ImportError:
+    docker_from_env = docker.from_env
+
 # Konfiguracja logowania
 logging.basicConfig(
     level=logging.INFO,
@@ -20,7 +26,7 @@ logger = logging.getLogger("sandbox_manager")
 
 # Inicjalizacja klienta Docker
 try:
-    docker_client = docker.from_env()
+    docker_client = docker_from_env()
     logger.info("Połączono z Docker API")
 except Exception as e:
     logger.error(f"Błąd podczas łączenia z Docker API: {str(e)}")
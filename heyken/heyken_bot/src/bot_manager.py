@@ -10,7 +10,7 @@ from dotenv import load_dotenv
 
 from .rocketchat.bot import RocketChatBot
 from .rocketchat.client import Message
-from .ollama.client import OllamaClient
+from .ollama.client import OllamaClient, llm_priority
 from .project_manager.manager import ProjectManager
 from .project_manager.workflow import ProjectWorkflow
 from .project_manager.project import Project, ProjectStatus
@@ -70,6 +70,9 @@ class BotManager:
     def _register_handlers(self) -> None:
         """
         Rejestruje handlery dla różnych typów wiadomości.
+        
+        Komendy bez wywołań LLM są rejestrowane jako inline - odpowiadają od razu,
+        bez czekania w kolejce pokoju.
         """
         # Handler dla tworzenia projektu
         self.rocketchat_bot.register_handler(
@@ -80,13 +83,15 @@ class BotManager:
         # Handler dla listy projektów
         self.rocketchat_bot.register_handler(
             r"(?i)pokaż projekty|lista projektów",
-            self._handle_list_projects
+            self._handle_list_projects,
+            inline=True
         )
         
         # Handler dla szczegółów projektu
         self.rocketchat_bot.register_handler(
             r"(?i)pokaż projekt\s+(.+)",
-            self._handle_show_project
+            self._handle_show_project,
+            inline=True
         )
         
         # Handler dla uruchomienia workflow projektu
@@ -110,7 +115,8 @@ class BotManager:
         # Handler dla pomocy
         self.rocketchat_bot.register_handler(
             r"(?i)pomoc|help",
-            self._handle_help
+            self._handle_help,
+            inline=True
         )
         
         # Domyślny handler
@@ -294,7 +300,8 @@ class BotManager:
         description = match.group(1).strip()
         
         try:
-            code = self.ollama_client.generate_code(description)
+            with llm_priority("interactive", tenant=message.room_id):
+                code = self.ollama_client.generate_code(description)
             return f"Wygenerowany kod:\n\n```python\n{code}\n```"
         except Exception as e:
             logger.error(f"Błąd podczas generowania kodu: {str(e)}")
@@ -317,7 +324,8 @@ class BotManager:
         description = match.group(1).strip()
         
         try:
-            documentation = self.ollama_client.generate_documentation(description)
+            with llm_priority("interactive", tenant=message.room_id):
+                documentation = self.ollama_client.generate_documentation(description)
             return f"Wygenerowana dokumentacja:\n\n{documentation}"
         except Exception as e:
             logger.error(f"Błąd podczas generowania dokumentacji: {str(e)}")
@@ -398,7 +406,8 @@ class BotManager:
             zasugeruj użycie komendy 'pomoc' w celu uzyskania listy dostępnych komend.
             """
             
-            response = self.ollama_client.generate(prompt)
+            with llm_priority("interactive", tenant=message.room_id):
+                response = self.ollama_client.generate(prompt)
             return response
         except Exception as e:
             logger.error(f"Błąd podczas generowania odpowiedzi: {str(e)}")
@@ -0,0 +1,10 @@
+"""
+Moduł integracji z Ollama.
+
+Ten moduł zawiera klienta Ollama używanego przez bota i workflow projektów
+do generowania dokumentacji, planów, kodu i testów.
+"""
+
+from .client import OllamaClient
+
+__all__ = ["OllamaClient"]
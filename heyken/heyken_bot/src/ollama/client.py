@@ -0,0 +1,255 @@
+"""
+Klient Ollama do generowania dokumentacji, planów, kodu i testów projektów.
+"""
+import os
+import re
+import logging
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Any
+
+import requests
+
+# Wspólna bramka LLM z pulą połączeń, kolejką priorytetową i cache odpowiedzi (pakiet evodev)
+try:
+    from evodev import llm_gateway, llm_models, llm_scheduler
+except ImportError:
+    llm_gateway = llm_models = llm_scheduler = None
+
+logger = logging.getLogger(__name__)
+
+# Ziarno dla kroków projektu - ten sam opis daje tę samą odpowiedź, którą można wziąć z cache
+PROJECT_SEED = int(os.getenv("OLLAMA_PROJECT_SEED", "42"))
+GENERATE_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+
+FILE_HEADER = re.compile(r"^###\s+(.+?)\s+###$")
+
+
+def split_files(text: str) -> Dict[str, str]:
+    """
+    Dzieli odpowiedź modelu na pliki w formacie "### ŚCIEŻKA ###" + blok kodu.
+
+    Args:
+        text: Odpowiedź modelu
+
+    Returns:
+        Dict[str, str]: Ścieżka pliku -> zawartość
+    """
+    files: Dict[str, List[str]] = {}
+    current = None
+    for line in text.split("\n"):
+        header = FILE_HEADER.match(line.strip())
+        if header:
+            current = header.group(1)
+            files[current] = []
+        elif current and not line.strip().startswith("```"):
+            files[current].append(line)
+    return {path: "\n".join(lines).strip() + "\n" for path, lines in files.items() if "".join(lines).strip()}
+
+
+def llm_priority(priority: str, tenant: Optional[str] = None):
+    """
+    Klasa priorytetu wywołań Ollama wykonywanych w bloku with przez bieżący wątek.
+
+    Args:
+        priority: "interactive" (rozmowa), "background" lub "batch" (kroki projektu)
+        tenant: Pokój, użytkownik lub projekt - w ramach klasy kolejka obsługuje je na zmianę
+
+    Returns:
+        Menedżer kontekstu; bez pakietu evodev nic nie robi
+    """
+    if llm_scheduler is None:
+        return nullcontext()
+    return llm_scheduler.context(priority, tenant)
+
+
+class OllamaClient:
+    """
+    Klient do komunikacji z API Ollama.
+
+    Kroki projektu (dokumentacja, plan, kod, testy, Docker) wysyłane są
+    z temperaturą 0 i stałym ziarnem, więc ponowne uruchomienie niezmienionego
+    projektu korzysta z cache odpowiedzi bramki LLM.
+    """
+
+    def __init__(self, base_url: str, model: str, seed: int = PROJECT_SEED):
+        """
+        Inicjalizuje klienta Ollama.
+
+        Args:
+            base_url: Bazowy URL API Ollama
+            model: Nazwa modelu
+            seed: Ziarno dla deterministycznych kroków projektu
+        """
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.seed = seed
+        self.is_connected = False
+        self.check_connection()
+
+    def _post(self, path: str, payload: Dict[str, Any], cache: bool = True) -> requests.Response:
+        url = f"{self.base_url}{path}"
+        if llm_gateway is None:
+            return requests.post(url, json=payload, timeout=GENERATE_TIMEOUT)
+        return llm_gateway.post(url, json=payload, timeout=GENERATE_TIMEOUT, cache=cache)
+
+    def check_connection(self) -> bool:
+        """
+        Sprawdza połączenie z API Ollama i dostępność modelu.
+
+        Returns:
+            bool: True jeśli API odpowiada, False w przeciwnym przypadku
+        """
+        try:
+            get = llm_gateway.get if llm_gateway is not None else requests.get
+            response = get(f"{self.base_url}/api/tags", timeout=5)
+            self.is_connected = response.status_code == 200
+            if self.is_connected:
+                models = [entry.get("name") for entry in response.json().get("models", [])]
+                if self.model not in models:
+                    logger.warning(f"Model {self.model} nie jest dostępny w Ollama (dostępne: {', '.join(models)})")
+                if llm_models is not None:
+                    # Pobranie brakującego modelu i załadowanie go do pamięci w tle
+                    llm_models.get_manager().ensure(self.base_url, self.model)
+            else:
+                logger.error(f"Błąd połączenia z API Ollama: {response.status_code}")
+        except Exception as e:
+            logger.error(f"Wyjątek podczas sprawdzania połączenia z Ollama: {str(e)}")
+            self.is_connected = False
+        return self.is_connected
+
+    def generate(self, prompt: str, system: Optional[str] = None, deterministic: bool = False,
+                 cache: bool = True) -> str:
+        """
+        Generuje tekst za pomocą Ollama.
+
+        Args:
+            prompt: Prompt dla modelu
+            system: Opcjonalny prompt systemowy
+            deterministic: Temperatura 0 i stałe ziarno - odpowiedź może pochodzić z cache
+            cache: False wymusza nowe zapytanie do modelu
+
+        Returns:
+            str: Wygenerowany tekst
+
+        Raises:
+            RuntimeError: Gdy API Ollama zwróci błąd
+        """
+        payload: Dict[str, Any] = {"model": self.model, "prompt": prompt, "stream": False}
+        if system:
+            payload["system"] = system
+        if deterministic:
+            payload["options"] = {"temperature": 0, "seed": self.seed}
+
+        response = self._post("/api/generate", payload, cache=cache)
+        if response.status_code != 200:
+            raise RuntimeError(f"Ollama API error: {response.status_code} - {response.text}")
+        if response.headers.get("X-EvoDev-Cache") == "hit":
+            logger.info(f"Odpowiedź dla promptu {prompt[:50]!r}... pobrana z cache")
+        return response.json().get("response", "").strip()
+
+    def generate_documentation(self, description: str) -> str:
+        """
+        Generuje dokumentację projektu w Markdown.
+
+        Args:
+            description: Opis projektu
+
+        Returns:
+            str: Dokumentacja
+        """
+        prompt = f"""
+        Napisz dokumentację projektu w formacie Markdown: cel, funkcjonalności,
+        architekturę, instalację i przykłady użycia.
+
+        Opis projektu:
+        {description}
+        """
+        return self.generate(prompt, deterministic=True)
+
+    def generate_code(self, description: str, language: str = "python") -> str:
+        """
+        Generuje kod na podstawie opisu.
+
+        Args:
+            description: Opis kodu
+            language: Język programowania
+
+        Returns:
+            str: Kod źródłowy
+        """
+        prompt = f"""
+        Napisz kod w języku {language} realizujący poniższy opis.
+        Zwróć tylko kod, z komentarzami tam, gdzie to potrzebne.
+
+        Opis:
+        {description}
+        """
+        code = self.generate(prompt, deterministic=True)
+        return "\n".join(line for line in code.split("\n") if not line.strip().startswith("```"))
+
+    def analyze_code(self, code: str, language: str = "python") -> str:
+        """
+        Analizuje kod pod kątem błędów logicznych i jakości.
+
+        Args:
+            code: Kod źródłowy
+            language: Język programowania
+
+        Returns:
+            str: Wynik analizy
+        """
+        prompt = f"""
+        Przeanalizuj poniższy kod w języku {language}. Wskaż błędy logiczne,
+        potencjalne problemy i możliwe usprawnienia.
+
+        ```{language}
+        {code}
+        ```
+        """
+        return self.generate(prompt, deterministic=True)
+
+    def generate_test_cases(self, code: str, language: str = "python") -> str:
+        """
+        Generuje testy jednostkowe dla kodu.
+
+        Args:
+            code: Kod źródłowy
+            language: Język programowania
+
+        Returns:
+            str: Kod testów
+        """
+        prompt = f"""
+        Napisz testy jednostkowe w języku {language} dla poniższego kodu.
+        Zwróć tylko kod testów.
+
+        ```{language}
+        {code}
+        ```
+        """
+        tests = self.generate(prompt, deterministic=True)
+        return "\n".join(line for line in tests.split("\n") if not line.strip().startswith("```"))
+
+    def generate_docker_config(self, description: str, language: str = "python") -> Dict[str, str]:
+        """
+        Generuje pliki Dockerfile i docker-compose.yml dla projektu.
+
+        Args:
+            description: Opis projektu i struktury plików
+            language: Język programowania projektu
+
+        Returns:
+            Dict[str, str]: Nazwa pliku -> zawartość
+        """
+        prompt = f"""
+        Przygotuj konfigurację Dockera dla projektu w języku {language}.
+        Podaj pliki Dockerfile i docker-compose.yml w formacie:
+
+        ### Dockerfile ###
+        ```
+        # Zawartość pliku
+        ```
+
+        {description}
+        """
+        return split_files(self.generate(prompt, deterministic=True))
@@ -5,7 +5,7 @@ import os
 import logging
 from typing import Dict, List, Optional, Any, Union, Callable
 from .project import Project, ProjectStatus
-from ..ollama.client import OllamaClient
+from ..ollama.client import OllamaClient, llm_priority
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +54,9 @@ class ProjectWorkflow:
             return False
             
         try:
-            success = handler()
+            # Kroki projektu ustępują w kolejce LLM wiadomościom z czatu
+            with llm_priority("batch", tenant=self.project.name):
+                success = handler()
             if success:
                 logger.info(f"Projekt {self.project.name}: krok {current_status.value} zakończony pomyślnie")
                 return True
@@ -154,7 +156,7 @@ class ProjectWorkflow:
             6. Testy
             """
             
-            plan = self.ollama.generate(prompt)
+            plan = self.ollama.generate(prompt, deterministic=True)
             self.project.plan = plan
             
             # Dodanie planu jako pliku
@@ -203,7 +205,7 @@ class ProjectWorkflow:
             ```
             """
             
-            code_response = self.ollama.generate(prompt)
+            code_response = self.ollama.generate(prompt, deterministic=True)
             self.project.natural_language_code = code_response
             
             # Parsowanie odpowiedzi i dodanie plików
@@ -5,8 +5,7 @@ Ten moduł zawiera klasy i funkcje do komunikacji z serwerem RocketChat,
 umożliwiając odbieranie i wysyłanie wiadomości.
 """
 
-from .client import RocketChatClient
-from .message import Message
+from .client import RocketChatClient, Message
 from .bot import RocketChatBot
 
 __all__ = ["RocketChatClient", "Message", "RocketChatBot"]
@@ -4,9 +4,15 @@ Bot RocketChat do automatycznej obsługi wiadomości.
 import time
 import logging
 import re
-from typing import Callable, Dict, List, Optional, Any, Union
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 from .client import RocketChatClient, Message
 
+# Pula wątków obsługująca pokoje równolegle, a wiadomości jednego pokoju po kolei (pakiet evodev)
+try:
+    from evodev import message_pipeline
+except ImportError:
+    message_pipeline = None
+
 logger = logging.getLogger(__name__)
 
 class RocketChatBot:
@@ -37,8 +43,11 @@ class RocketChatBot:
         self.username = username
         self.poll_interval = poll_interval
         self.handlers: Dict[str, Callable[[Message], Optional[str]]] = {}
+        self.inline_patterns = set()
         self.default_handler: Optional[Callable[[Message], Optional[str]]] = None
         self.running = False
+        # Handlery czekają w kolejkach pokojów, tanie komendy (inline) są obsługiwane od razu
+        self.pipeline = message_pipeline.RoomPipeline(self._run_handler, name="rocketchat-bot") if message_pipeline else None
         
     def start(self) -> None:
         """
@@ -48,19 +57,29 @@ class RocketChatBot:
             logger.error("Nie można uruchomić bota - błąd logowania")
             return
             
+        if self.client.start_realtime():
+            logger.info("Odbiór wiadomości przez API realtime, odpytywanie REST jako zapas")
+            
+        if self.pipeline is not None:
+            self.pipeline.start()
+            
         logger.info(f"Bot {self.username} uruchomiony")
         self.running = True
         
         try:
             while self.running:
                 self._process_messages()
-                time.sleep(self.poll_interval)
+                self.client.wait_for_messages(self.poll_interval)
         except KeyboardInterrupt:
             logger.info("Bot zatrzymany przez użytkownika")
         except Exception as e:
             logger.error(f"Błąd podczas działania bota: {str(e)}")
         finally:
             self.running = False
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                logger.info(f"Kolejka wiadomości: {self.pipeline.snapshot()}")
+            self.client.close()
             
     def stop(self) -> None:
         """
@@ -72,6 +91,9 @@ class RocketChatBot:
     def _process_messages(self) -> None:
         """
         Przetwarza nowe wiadomości i wywołuje odpowiednie handlery.
+        
+        Handlery działają w puli wątków: różne pokoje równolegle, wiadomości
+        jednego pokoju po kolei. Handlery inline są wywoływane od razu.
         """
         messages = self.client.get_new_messages()
         
@@ -93,32 +115,41 @@ class RocketChatBot:
             clean_text = message.text.replace(f"@{self.username}", "").strip()
             
             # Znajdź pasujący handler
-            handler = self._find_handler(clean_text)
-            
-            if handler:
-                try:
-                    response = handler(message)
-                    if response:
-                        self.client.send_message(message.room_id, response)
-                except Exception as e:
-                    logger.error(f"Błąd w handlerze: {str(e)}")
-                    self.client.send_message(
-                        message.room_id,
-                        f"Przepraszam, wystąpił błąd podczas przetwarzania Twojej wiadomości: {str(e)}"
-                    )
-            elif self.default_handler:
-                try:
-                    response = self.default_handler(message)
-                    if response:
-                        self.client.send_message(message.room_id, response)
-                except Exception as e:
-                    logger.error(f"Błąd w domyślnym handlerze: {str(e)}")
-                    self.client.send_message(
-                        message.room_id,
-                        f"Przepraszam, wystąpił błąd podczas przetwarzania Twojej wiadomości: {str(e)}"
-                    )
+            pattern, handler = self._find_handler(clean_text)
+            if handler is None:
+                if not self.default_handler:
+                    continue
+                handler = self.default_handler
+                
+            if self.pipeline is None or pattern in self.inline_patterns:
+                self._run_handler((message, handler))
+            elif not self.pipeline.submit(message.room_id, (message, handler), key=message.id):
+                logger.warning(f"Kolejka pokoju {message.room_id} jest pełna, pomijam wiadomość {message.id}")
+                self.client.send_message(
+                    message.room_id,
+                    "Mam zbyt wiele oczekujących wiadomości w tym pokoju - spróbuj ponownie za chwilę."
+                )
+                
+    def _run_handler(self, job: Tuple[Message, Callable[[Message], Optional[str]]]) -> None:
+        """
+        Wywołuje handler i wysyła jego odpowiedź (w wątku puli albo od razu dla komend inline).
+        
+        Args:
+            job: Para (wiadomość, handler)
+        """
+        message, handler = job
+        try:
+            response = handler(message)
+            if response:
+                self.client.send_message(message.room_id, response)
+        except Exception as e:
+            logger.error(f"Błąd w handlerze: {str(e)}")
+            self.client.send_message(
+                message.room_id,
+                f"Przepraszam, wystąpił błąd podczas przetwarzania Twojej wiadomości: {str(e)}"
+            )
                     
-    def _find_handler(self, text: str) -> Optional[Callable[[Message], Optional[str]]]:
+    def _find_handler(self, text: str) -> Tuple[Optional[str], Optional[Callable[[Message], Optional[str]]]]:
         """
         Znajduje handler pasujący do treści wiadomości.
         
@@ -126,23 +157,26 @@ class RocketChatBot:
             text: Treść wiadomości
             
         Returns:
-            Optional[Callable[[Message], Optional[str]]]: Funkcja obsługująca wiadomość lub None
+            Tuple[Optional[str], Optional[Callable[[Message], Optional[str]]]]: Wzorzec i funkcja obsługująca wiadomość lub (None, None)
         """
         for pattern, handler in self.handlers.items():
             if re.search(pattern, text, re.IGNORECASE):
-                return handler
+                return pattern, handler
                 
-        return None
+        return None, None
         
-    def register_handler(self, pattern: str, handler: Callable[[Message], Optional[str]]) -> None:
+    def register_handler(self, pattern: str, handler: Callable[[Message], Optional[str]], inline: bool = False) -> None:
         """
         Rejestruje handler dla wiadomości pasujących do wzorca.
         
         Args:
             pattern: Wyrażenie regularne do dopasowania wiadomości
             handler: Funkcja obsługująca wiadomość
+            inline: Czy handler jest tani (bez LLM) i ma być wywołany od razu, z pominięciem kolejki pokoju
         """
         self.handlers[pattern] = handler
+        if inline:
+            self.inline_patterns.add(pattern)
         logger.debug(f"Zarejestrowano handler dla wzorca: {pattern}")
         
     def set_default_handler(self, handler: Callable[[Message], Optional[str]]) -> None:
@@ -1,14 +1,58 @@
 """
 Klient RocketChat do komunikacji z serwerem.
 """
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+import os
 import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dataclasses import dataclass
 
+# Odbiór wiadomości przez API realtime (DDP/WebSocket) z odpytywaniem REST jako zapasem (pakiet evodev)
+try:
+    from evodev import rocketchat_realtime
+except ImportError:
+    rocketchat_realtime = None
+
+# Przyrostowa synchronizacja pokojów ze znacznikami zapisywanymi na dysku (pakiet evodev)
+try:
+    from evodev import rocketchat_sync
+except ImportError:
+    rocketchat_sync = None
+
 logger = logging.getLogger(__name__)
 
+# Liczba pokojów pobieranych równolegle i limit czasu pojedynczego zapytania REST
+FETCH_WORKERS = int(os.getenv("ROCKETCHAT_FETCH_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("ROCKETCHAT_TIMEOUT", "30"))
+
+
+def parse_timestamp(ts: Any) -> float:
+    """
+    Zamienia znacznik czasu RocketChat na sekundy od epoki.
+
+    REST zwraca napisy ISO 8601, DDP obiekty {"$date": milisekundy}.
+
+    Args:
+        ts: Znacznik czasu z wiadomości
+
+    Returns:
+        float: Sekundy od epoki; bieżący czas, gdy znacznika brak
+    """
+    if isinstance(ts, dict) and "$date" in ts:
+        return ts["$date"] / 1000
+    if isinstance(ts, str):
+        try:
+            return datetime.fromisoformat(ts.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
 @dataclass
 class Message:
     """Reprezentacja wiadomości w RocketChat."""
@@ -29,7 +73,7 @@ class Message:
             text=data.get("msg", ""),
             sender_id=data.get("u", {}).get("_id", ""),
             sender_username=data.get("u", {}).get("username", ""),
-            timestamp=data.get("ts", {}).get("$date", time.time() * 1000) / 1000,
+            timestamp=parse_timestamp(data.get("ts")),
             is_direct=data.get("t", "") == "d"
         )
 
@@ -57,6 +101,16 @@ class RocketChatClient:
         self.user_id = None
         self.headers = {}
         self.last_message_check = time.time()
+        self.realtime = None
+        self.cursors = rocketchat_sync.open_cursors(self.server_url, username) if rocketchat_sync else None
+        # Jedna sesja HTTP z utrzymywanymi połączeniami - po jednym na każdy wątek pobierający pokoje
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS + 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._fetch_pool = None
+        self._auth_lock = threading.RLock()
+        self._relogging = False
         
     def login(self) -> bool:
         """
@@ -66,9 +120,10 @@ class RocketChatClient:
             bool: True jeśli logowanie się powiodło, False w przeciwnym przypadku
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/api/v1/login",
-                json={"user": self.username, "password": self.password}
+                json={"user": self.username, "password": self.password},
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code == 200 and response.json().get("status") == "success":
@@ -90,6 +145,76 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas logowania: {str(e)}")
             return False
             
+    def _request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Wykonuje zapytanie REST w sesji klienta; po odpowiedzi 401 loguje się ponownie i powtarza je raz.
+
+        Args:
+            method: Metoda HTTP
+            endpoint: Endpoint API, np. "im.list"
+            **kwargs: Dodatkowe argumenty dla requests (params, json)
+
+        Returns:
+            requests.Response: Odpowiedź serwera
+        """
+        headers = self.headers
+        response = self.session.request(method, f"{self.server_url}/api/v1/{endpoint}",
+                                        headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        if response.status_code == 401 and self._relogin(headers):
+            response = self.session.request(method, f"{self.server_url}/api/v1/{endpoint}",
+                                            headers=self.headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        return response
+
+    def _relogin(self, stale_headers: Dict[str, str]) -> bool:
+        """
+        Odnawia wygasły token: jedno logowanie, nawet gdy 401 dostało kilka wątków naraz.
+
+        Args:
+            stale_headers: Nagłówki zapytania, które serwer odrzucił
+
+        Returns:
+            bool: True jeśli można powtórzyć zapytanie z nowym tokenem
+        """
+        with self._auth_lock:
+            if self.headers is not stale_headers:
+                return True
+            if self._relogging:
+                return False
+            logger.warning("Token RocketChat odrzucony (401), ponowne logowanie")
+            self._relogging = True
+            try:
+                return self.login()
+            finally:
+                self._relogging = False
+
+    def _fetch_rooms(self, rooms: List[Tuple[str, str]]) -> List[Message]:
+        """
+        Pobiera nowe wiadomości z wielu pokojów równolegle, w ograniczonej puli wątków.
+
+        Args:
+            rooms: Lista par (ID pokoju, rodzaj pokoju "im"/"channels")
+
+        Returns:
+            List[Message]: Wiadomości ze wszystkich pokojów, w kolejności pokojów
+        """
+        if len(rooms) <= 1 or FETCH_WORKERS <= 1:
+            results = [self._get_room_messages(room_id, room_type) for room_id, room_type in rooms]
+        else:
+            if self._fetch_pool is None:
+                self._fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="rocketchat-fetch")
+            results = list(self._fetch_pool.map(lambda room: self._get_room_messages(*room), rooms))
+        return [message for room_messages in results for message in room_messages]
+
+    def close(self) -> None:
+        """
+        Zamyka połączenie realtime, pulę wątków i sesję HTTP.
+        """
+        self.stop_realtime()
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown(wait=True)
+            self._fetch_pool = None
+        self.session.close()
+
     def send_message(self, room_id: str, text: str) -> bool:
         """
         Wysyła wiadomość do pokoju.
@@ -106,11 +231,7 @@ class RocketChatClient:
             return False
             
         try:
-            response = requests.post(
-                f"{self.server_url}/api/v1/chat.postMessage",
-                headers=self.headers,
-                json={"roomId": room_id, "text": text}
-            )
+            response = self._request("POST", "chat.postMessage", json={"roomId": room_id, "text": text})
             
             if response.status_code == 200 and response.json().get("success"):
                 logger.debug(f"Wysłano wiadomość do pokoju {room_id}")
@@ -123,9 +244,50 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas wysyłania wiadomości: {str(e)}")
             return False
             
+    def start_realtime(self) -> bool:
+        """
+        Uruchamia odbiór wiadomości przez API realtime (stream-room-messages).
+
+        Returns:
+            bool: True jeśli tryb realtime został włączony
+        """
+        if rocketchat_realtime is None or not rocketchat_realtime.ENABLED:
+            return False
+        if self.realtime is None:
+            self.realtime = rocketchat_realtime.RealtimeClient(
+                self.server_url, lambda: (self.user_id, self.auth_token))
+            self.realtime.start()
+        return True
+
+    def stop_realtime(self) -> None:
+        """
+        Zamyka połączenie realtime.
+        """
+        if self.realtime is not None:
+            self.realtime.stop()
+            self.realtime = None
+        if self.cursors is not None:
+            self.cursors.flush()
+
+    def wait_for_messages(self, timeout: float) -> None:
+        """
+        Czeka na nowe wiadomości: w trybie realtime do ich nadejścia, inaczej przez cały interwał.
+
+        Args:
+            timeout: Maksymalny czas oczekiwania w sekundach
+        """
+        if self.realtime is not None and self.realtime.connected:
+            self.realtime.wait(timeout)
+        else:
+            time.sleep(timeout)
+
     def get_new_messages(self, room_id: Optional[str] = None) -> List[Message]:
         """
         Pobiera nowe wiadomości z pokoju lub ze wszystkich pokojów.
+
+        W trybie realtime zwraca wiadomości przysłane przez serwer, a po każdym
+        (ponownym) połączeniu raz odpytuje REST o wiadomości z przerwy. Gdy
+        połączenie realtime jest zerwane, odpytuje REST jak bez niego.
         
         Args:
             room_id: Opcjonalne ID pokoju. Jeśli nie podano, pobiera wiadomości ze wszystkich pokojów.
@@ -136,15 +298,47 @@ class RocketChatClient:
         if not self.auth_token or not self.user_id:
             logger.error("Nie zalogowano do RocketChat")
             return []
-            
+        if self.realtime is None:
+            return self._poll_messages(room_id)
         messages = []
+        if not self.realtime.connected or self.realtime.resync_due():
+            # Wiadomości z przerwy od znaczników pokojów, powtórzenia ze strumienia odrzuca is_new()
+            messages = [message for message in self._poll_messages(room_id) if self.realtime.is_new(message.id)]
+        if not self.realtime.connected:
+            return messages
+
+        for event in self.realtime.get():
+            message = Message.from_api_response(event["message"])
+            message.is_direct = event["room_type"] == "d"
+            if self.cursors is not None:
+                self.cursors.advance(message.room_id, rocketchat_sync.to_millis(event["message"].get("ts")), message.id)
+            if message.sender_id == self.user_id or (room_id and message.room_id != room_id):
+                continue
+            messages.append(message)
+        if self.cursors is not None:
+            self.cursors.synced()
+            self.cursors.save()
+        return messages
+
+    def _poll_messages(self, room_id: Optional[str] = None) -> List[Message]:
+        """
+        Odpytuje REST o nowe wiadomości z pokoju lub ze wszystkich pokojów.
+
+        Ze znacznikami pokojów (pakiet evodev) pomija pokoje, w których ostatnia
+        wiadomość (lm) się nie zmieniła, a z pozostałych pobiera tylko wiadomości
+        nowsze niż znacznik. Pokoje są pobierane równolegle (FETCH_WORKERS).
+        
+        Args:
+            room_id: Opcjonalne ID pokoju
+            
+        Returns:
+            List[Message]: Lista nowych wiadomości
+        """
+        rooms = []
         
         try:
             # Pobierz wiadomości bezpośrednie
-            dm_response = requests.get(
-                f"{self.server_url}/api/v1/im.list",
-                headers=self.headers
-            )
+            dm_response = self._request("GET", "im.list")
             
             if dm_response.status_code == 200 and dm_response.json().get("success"):
                 direct_rooms = dm_response.json().get("ims", [])
@@ -152,15 +346,13 @@ class RocketChatClient:
                 for room in direct_rooms:
                     if room_id and room["_id"] != room_id:
                         continue
+                    if self.cursors is not None and not self.cursors.changed(room):
+                        continue
                         
-                    room_messages = self._get_room_messages(room["_id"], "im.messages")
-                    messages.extend(room_messages)
+                    rooms.append((room["_id"], "im"))
             
             # Pobierz wiadomości z kanałów
-            channels_response = requests.get(
-                f"{self.server_url}/api/v1/channels.list.joined",
-                headers=self.headers
-            )
+            channels_response = self._request("GET", "channels.list.joined")
             
             if channels_response.status_code == 200 and channels_response.json().get("success"):
                 channels = channels_response.json().get("channels", [])
@@ -168,12 +360,19 @@ class RocketChatClient:
                 for channel in channels:
                     if room_id and channel["_id"] != room_id:
                         continue
+                    if self.cursors is not None and not self.cursors.changed(channel):
+                        continue
                         
-                    room_messages = self._get_room_messages(channel["_id"], "channels.messages")
-                    messages.extend(room_messages)
+                    rooms.append((channel["_id"], "channels"))
                     
+            messages = self._fetch_rooms(rooms)
+            
             # Aktualizuj czas ostatniego sprawdzenia
             self.last_message_check = time.time()
+            if self.cursors is not None:
+                if not room_id:
+                    self.cursors.synced()
+                self.cursors.save()
             
             return messages
             
@@ -181,42 +380,66 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas pobierania wiadomości: {str(e)}")
             return []
             
-    def _get_room_messages(self, room_id: str, endpoint: str) -> List[Message]:
+    def _get_room_messages(self, room_id: str, room_type: str) -> List[Message]:
         """
-        Pobiera wiadomości z pokoju.
+        Pobiera nowe wiadomości z pokoju.
         
         Args:
             room_id: ID pokoju
-            endpoint: Endpoint API do pobrania wiadomości
+            room_type: Rodzaj pokoju w API ("im" albo "channels")
             
         Returns:
-            List[Message]: Lista wiadomości z pokoju
+            List[Message]: Lista nowych wiadomości z pokoju, od najstarszej
+        """
+        if self.cursors is not None:
+            messages_data = self.cursors.sync(room_id, lambda params: self._fetch_history(room_id, room_type, params))
+            if messages_data is None:
+                return []
+        else:
+            messages_data = self._fetch_history(room_id, room_type, None)
+            if messages_data is None:
+                return []
+            # Bez znaczników: filtruj wiadomości nowsze niż ostatnie sprawdzenie
+            messages_data = [msg for msg in messages_data if parse_timestamp(msg.get("ts")) > self.last_message_check]
+
+        messages = [
+            Message.from_api_response(msg) for msg in messages_data
+            if msg.get("u", {}).get("_id") != self.user_id
+        ]
+        # Pole "t" wiadomości to jej typ, nie typ pokoju - rozmowę bezpośrednią wskazuje endpoint
+        for message in messages:
+            message.is_direct = room_type == "im"
+        return messages
+
+    def _fetch_history(self, room_id: str, room_type: str, params: Optional[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Wykonuje jedno zapytanie o wiadomości z pokoju.
+
+        Args:
+            room_id: ID pokoju
+            room_type: Rodzaj pokoju w API ("im" albo "channels")
+            params: Parametry oldest/inclusive/count/offset dla {room_type}.history;
+                None - ostatnie 50 wiadomości z {room_type}.messages
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: Wiadomości od najnowszej albo None przy błędzie
         """
         try:
-            response = requests.get(
-                f"{self.server_url}/api/v1/{endpoint}",
-                headers=self.headers,
-                params={"roomId": room_id, "count": 50}
-            )
+            if params is None:
+                endpoint, params = f"{room_type}.messages", {"count": 50}
+            else:
+                endpoint = f"{room_type}.history"
+            response = self._request("GET", endpoint, params=dict(params, roomId=room_id))
             
             if response.status_code == 200 and response.json().get("success"):
-                messages_data = response.json().get("messages", [])
-                
-                # Filtruj wiadomości nowsze niż ostatnie sprawdzenie i nie wysłane przez bota
-                filtered_messages = [
-                    Message.from_api_response(msg) for msg in messages_data
-                    if msg.get("ts", {}).get("$date", 0) / 1000 > self.last_message_check
-                    and msg.get("u", {}).get("_id") != self.user_id
-                ]
-                
-                return filtered_messages
+                return response.json().get("messages", [])
             else:
                 logger.error(f"Błąd pobierania wiadomości z pokoju {room_id}: {response.text}")
-                return []
+                return None
                 
         except Exception as e:
             logger.error(f"Wyjątek podczas pobierania wiadomości z pokoju {room_id}: {str(e)}")
-            return []
+            return None
             
     def get_rooms(self) -> Dict[str, List[Dict[str, Any]]]:
         """
@@ -233,19 +456,13 @@ class RocketChatClient:
         
         try:
             # Pobierz wiadomości bezpośrednie
-            dm_response = requests.get(
-                f"{self.server_url}/api/v1/im.list",
-                headers=self.headers
-            )
+            dm_response = self._request("GET", "im.list")
             
             if dm_response.status_code == 200 and dm_response.json().get("success"):
                 rooms["direct"] = dm_response.json().get("ims", [])
             
             # Pobierz kanały
-            channels_response = requests.get(
-                f"{self.server_url}/api/v1/channels.list.joined",
-                headers=self.headers
-            )
+            channels_response = self._request("GET", "channels.list.joined")
             
             if channels_response.status_code == 200 and channels_response.json().get("success"):
                 rooms["channels"] = channels_response.json().get("channels", [])
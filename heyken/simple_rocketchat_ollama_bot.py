@@ -9,8 +9,54 @@ import time
 import logging
 import requests
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+# Wspólna bramka LLM z pulą połączeń, limitami na model i wyłącznikiem (pakiet evodev)
+try:
+    from evodev import llm_gateway as llm_http
+except ImportError:
+    llm_http = requests
+
+# Menedżer modeli Ollama: pobieranie i rozgrzewanie w tle, stan załadowania (pakiet evodev)
+try:
+    from evodev import llm_models
+except ImportError:
+    llm_models = None
+
+# Kolejka priorytetowa wywołań LLM: odpowiedzi na czacie przed zadaniami wsadowymi (pakiet evodev)
+try:
+    from evodev import llm_scheduler
+except ImportError:
+    llm_scheduler = None
+
+# Odbiór wiadomości przez API realtime (DDP/WebSocket) z odpytywaniem REST jako zapasem (pakiet evodev)
+try:
+    from evodev import rocketchat_realtime
+except ImportError:
+    rocketchat_realtime = None
+
+# Przyrostowa synchronizacja pokojów ze znacznikami zapisywanymi na dysku (pakiet evodev)
+try:
+    from evodev import rocketchat_sync
+except ImportError:
+    rocketchat_sync = None
+
+# Trwały zbiór ID wiadomości, na które już odpowiedziano, o ograniczonym rozmiarze (pakiet evodev)
+try:
+    from evodev import message_dedupe
+except ImportError:
+    message_dedupe = None
+
+# Pula wątków obsługująca pokoje równolegle, a wiadomości jednego pokoju po kolei (pakiet evodev)
+try:
+    from evodev import message_pipeline
+except ImportError:
+    message_pipeline = None
+
 class RocketChatLogHandler(logging.Handler):
     """Custom logging handler that sends logs to RocketChat channels."""
     
@@ -49,7 +95,8 @@ class RocketChatLogHandler(logging.Handler):
             # Login to RocketChat
             response = requests.post(
                 f"{self.server_url}/api/v1/login",
-                json={"user": self.username, "password": self.password}
+                json={"user": self.username, "password": self.password},
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code != 200 or response.json().get("status") != "success":
@@ -68,7 +115,8 @@ class RocketChatLogHandler(logging.Handler):
             # Find all channel IDs
             response = requests.get(
                 f"{self.server_url}/api/v1/channels.list",
-                headers=self.headers
+                headers=self.headers,
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code != 200 or not response.json().get("success"):
@@ -96,7 +144,8 @@ class RocketChatLogHandler(logging.Handler):
                         response = requests.post(
                             f"{self.server_url}/api/v1/channels.create",
                             headers=self.headers,
-                            json={"name": channel_name}
+                            json={"name": channel_name},
+                            timeout=REQUEST_TIMEOUT
                         )
                         if response.status_code == 200 and response.json().get("success"):
                             self.channel_ids[channel_name] = response.json().get("channel", {}).get("_id")
@@ -106,14 +155,16 @@ class RocketChatLogHandler(logging.Handler):
                     except Exception as e:
                         print(f"RocketChatLogHandler: Error creating channel '{channel_name}': {str(e)}")
             
+            # Mark as initialized first, so emit() sends the buffered logs instead of buffering them again
+            self.initialized = True
+            
             # Process any buffered logs
             if self.buffer:
                 print(f"RocketChatLogHandler: Processing {len(self.buffer)} buffered logs")
-                for record in self.buffer:
+                buffered, self.buffer = self.buffer, []
+                for record in buffered:
                     self.emit(record)
-                self.buffer = []
                 
-            self.initialized = True
             return True
             
         except Exception as e:
@@ -123,10 +174,14 @@ class RocketChatLogHandler(logging.Handler):
     def emit(self, record):
         """Send the log record to all configured RocketChat channels."""
         if not self.initialized:
-            # Buffer the log until we're initialized
-            self.buffer.append(record)
-            if not self.initialize():
+            if self.login_attempts >= self.max_login_attempts:
+                # Logging in gave up - drop the record instead of buffering it forever
+                self.buffer = []
                 return
+            # Buffer the log until we're initialized; initialize() sends the buffer
+            self.buffer.append(record)
+            self.initialize()
+            return
                 
         try:
             log_message = self.format(record)
@@ -140,7 +195,8 @@ class RocketChatLogHandler(logging.Handler):
                         json={
                             "channel": f"#{channel_name}",
                             "text": log_message
-                        }
+                        },
+                        timeout=REQUEST_TIMEOUT
                     )
                     
                     if response.status_code != 200 or not response.json().get("success"):
@@ -171,6 +227,10 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Liczba pokojów pobieranych równolegle i limit czasu pojedynczego zapytania REST
+FETCH_WORKERS = int(os.getenv("ROCKETCHAT_FETCH_WORKERS", "8"))
+REQUEST_TIMEOUT = float(os.getenv("ROCKETCHAT_TIMEOUT", "30"))
+
 class RocketChatClient:
     """Klient do komunikacji z RocketChat."""
     
@@ -190,6 +250,16 @@ class RocketChatClient:
         self.user_id = None
         self.headers = None
         self.last_message_check = time.time()
+        self.realtime = None
+        self.cursors = rocketchat_sync.open_cursors(self.server_url, username) if rocketchat_sync else None
+        # Jedna sesja HTTP z utrzymywanymi połączeniami - po jednym na każdy wątek pobierający pokoje
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS + 2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._fetch_pool = None
+        self._auth_lock = threading.RLock()
+        self._relogging = False
         
     def login(self):
         """
@@ -199,9 +269,10 @@ class RocketChatClient:
             bool: True jeśli logowanie się powiodło, False w przeciwnym przypadku
         """
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.server_url}/api/v1/login",
-                json={"user": self.username, "password": self.password}
+                json={"user": self.username, "password": self.password},
+                timeout=REQUEST_TIMEOUT
             )
             
             if response.status_code != 200 or response.json().get("status") != "success":
@@ -229,6 +300,74 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas logowania do RocketChat: {str(e)}")
             return False
             
+    def _request(self, method, endpoint, **kwargs):
+        """
+        Wykonuje zapytanie REST w sesji klienta; po odpowiedzi 401 loguje się ponownie i powtarza je raz.
+        
+        Args:
+            method: Metoda HTTP
+            endpoint: Endpoint API, np. "im.list"
+            **kwargs: Dodatkowe argumenty dla requests (params, json)
+            
+        Returns:
+            requests.Response: Odpowiedź serwera
+        """
+        headers = self.headers
+        response = self.session.request(method, f"{self.server_url}/api/v1/{endpoint}",
+                                        headers=headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        if response.status_code == 401 and self._relogin(headers):
+            response = self.session.request(method, f"{self.server_url}/api/v1/{endpoint}",
+                                            headers=self.headers, timeout=REQUEST_TIMEOUT, **kwargs)
+        return response
+        
+    def _relogin(self, stale_headers):
+        """
+        Odnawia wygasły token: jedno logowanie, nawet gdy 401 dostało kilka wątków naraz.
+        
+        Args:
+            stale_headers: Nagłówki zapytania, które serwer odrzucił
+            
+        Returns:
+            bool: True jeśli można powtórzyć zapytanie z nowym tokenem
+        """
+        with self._auth_lock:
+            if self.headers is not stale_headers:
+                return True
+            if self._relogging:
+                return False
+            logger.warning("Token RocketChat odrzucony (401), ponowne logowanie")
+            self._relogging = True
+            try:
+                return self.login()
+            finally:
+                self._relogging = False
+                
+    def _fetch_rooms(self, rooms):
+        """
+        Pobiera nowe wiadomości z wielu pokojów równolegle, w ograniczonej puli wątków.
+        
+        Args:
+            rooms: Lista par (ID pokoju, rodzaj pokoju "im"/"channels")
+            
+        Returns:
+            list: Wiadomości ze wszystkich pokojów, w kolejności pokojów
+        """
+        if len(rooms) <= 1 or FETCH_WORKERS <= 1:
+            results = [self._get_room_messages(room_id, room_type) for room_id, room_type in rooms]
+        else:
+            if self._fetch_pool is None:
+                self._fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="rocketchat-fetch")
+            results = list(self._fetch_pool.map(lambda room: self._get_room_messages(*room), rooms))
+        return [message for room_messages in results for message in room_messages]
+        
+    def close(self):
+        """Zamyka połączenie realtime, pulę wątków i sesję HTTP."""
+        self.stop_realtime()
+        if self._fetch_pool is not None:
+            self._fetch_pool.shutdown(wait=True)
+            self._fetch_pool = None
+        self.session.close()
+        
     def set_status_online(self):
         """
         Ustawia status użytkownika jako online.
@@ -238,14 +377,10 @@ class RocketChatClient:
         """
         try:
             # Ustaw status jako online bez dodatkowego komunikatu
-            status_response = requests.post(
-                f"{self.server_url}/api/v1/users.setStatus",
-                headers=self.headers,
-                json={
-                    "status": "online",
-                    "message": ""
-                }
-            )
+            status_response = self._request("POST", "users.setStatus", json={
+                "status": "online",
+                "message": ""
+            })
             
             if status_response.status_code != 200 or not status_response.json().get("success"):
                 logger.error(f"Błąd ustawiania statusu: {status_response.text}")
@@ -270,14 +405,10 @@ class RocketChatClient:
         """
         try:
             # Ustaw status jako zajęty
-            status_response = requests.post(
-                f"{self.server_url}/api/v1/users.setStatus",
-                headers=self.headers,
-                json={
-                    "status": "busy",
-                    "message": message
-                }
-            )
+            status_response = self._request("POST", "users.setStatus", json={
+                "status": "busy",
+                "message": message
+            })
             
             if status_response.status_code != 200 or not status_response.json().get("success"):
                 logger.error(f"Błąd ustawiania statusu zajęty: {status_response.text}")
@@ -302,11 +433,7 @@ class RocketChatClient:
             bool: True jeśli wysłanie się powiodło, False w przeciwnym przypadku
         """
         try:
-            response = requests.post(
-                f"{self.server_url}/api/v1/chat.postMessage",
-                headers=self.headers,
-                json={"roomId": room_id, "text": text}
-            )
+            response = self._request("POST", "chat.postMessage", json={"roomId": room_id, "text": text})
             
             if response.status_code != 200 or not response.json().get("success"):
                 logger.error(f"Błąd wysyłania wiadomości: {response.text}")
@@ -319,20 +446,88 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas wysyłania wiadomości: {str(e)}")
             return False
             
+    def start_realtime(self):
+        """
+        Uruchamia odbiór wiadomości przez API realtime (stream-room-messages).
+        
+        Returns:
+            bool: True jeśli tryb realtime został włączony
+        """
+        if rocketchat_realtime is None or not rocketchat_realtime.ENABLED:
+            return False
+        if self.realtime is None:
+            self.realtime = rocketchat_realtime.RealtimeClient(
+                self.server_url, lambda: (self.user_id, self.auth_token))
+            self.realtime.start()
+        return True
+        
+    def stop_realtime(self):
+        """Zamyka połączenie realtime."""
+        if self.realtime is not None:
+            self.realtime.stop()
+            self.realtime = None
+        if self.cursors is not None:
+            self.cursors.flush()
+            
+    def wait_for_messages(self, timeout):
+        """
+        Czeka na nowe wiadomości: w trybie realtime do ich nadejścia, inaczej przez cały interwał.
+        
+        Args:
+            timeout: Maksymalny czas oczekiwania w sekundach
+        """
+        if self.realtime is not None and self.realtime.connected:
+            self.realtime.wait(timeout)
+        else:
+            time.sleep(timeout)
+            
     def get_new_messages(self):
         """
         Pobiera nowe wiadomości ze wszystkich pokojów.
         
+        W trybie realtime zwraca wiadomości przysłane przez serwer, a po każdym
+        (ponownym) połączeniu raz odpytuje REST o wiadomości z przerwy. Gdy
+        połączenie realtime jest zerwane, odpytuje REST jak bez niego.
+        
         Returns:
             list: Lista nowych wiadomości
         """
+        if self.realtime is None:
+            return self._poll_messages()
+        if not self.realtime.connected or self.realtime.resync_due():
+            messages = [message for message in self._poll_messages() if self.realtime.is_new(message["id"])]
+        else:
+            messages = []
+        if not self.realtime.connected:
+            return messages
+            
+        for event in self.realtime.get():
+            message = self._to_message(event["message"], event["room_type"] == "d")
+            if self.cursors is not None:
+                self.cursors.advance(message["room_id"], rocketchat_sync.to_millis(event["message"].get("ts")), message["id"])
+            if message["sender_id"] != self.user_id:
+                logger.info(f"Wiadomość realtime od {message['sender_username']}: {message['text']}")
+                messages.append(message)
+        if self.cursors is not None:
+            self.cursors.synced()
+            self.cursors.save()
+        return messages
+        
+    def _poll_messages(self):
+        """
+        Odpytuje REST o wiadomości ze wszystkich pokojów.
+        
+        Ze znacznikami pokojów (pakiet evodev) pomija pokoje, w których ostatnia
+        wiadomość (lm) się nie zmieniła, a z pozostałych pobiera tylko wiadomości
+        nowsze niż znacznik; bez nich - ostatnie 50 wiadomości z każdego pokoju.
+        
+        Returns:
+            list: Lista wiadomości
+        """
         try:
             # Pobierz wiadomości z DM
             logger.info("Pobieranie wiadomości z DM...")
-            dm_response = requests.get(
-                f"{self.server_url}/api/v1/im.list",
-                headers=self.headers
-            )
+            dm_response = self._request("GET", "im.list")
             
             if dm_response.status_code != 200 or not dm_response.json().get("success"):
                 logger.error(f"Błąd pobierania listy DM: {dm_response.text}")
@@ -343,10 +538,7 @@ class RocketChatClient:
             
             # Pobierz wiadomości z kanałów
             logger.info("Pobieranie wiadomości z kanałów...")
-            channels_response = requests.get(
-                f"{self.server_url}/api/v1/channels.list",
-                headers=self.headers
-            )
+            channels_response = self._request("GET", "channels.list")
             
             if channels_response.status_code != 200 or not channels_response.json().get("success"):
                 logger.error(f"Błąd pobierania listy kanałów: {channels_response.text}")
@@ -355,23 +547,30 @@ class RocketChatClient:
             channels = channels_response.json().get("channels", [])
             logger.info(f"Znaleziono {len(channels)} kanałów")
             
-            # Zbierz wszystkie wiadomości
-            all_messages = []
+            # Zbierz pokoje do pobrania
+            rooms = []
             
             # Pobierz wiadomości z DM
             for room in dm_rooms:
-                room_id = room.get("_id")
-                messages = self._get_room_messages(room_id, "im.messages")
-                all_messages.extend(messages)
+                if self.cursors is not None and not self.cursors.changed(room):
+                    continue
+                rooms.append((room.get("_id"), "im"))
                 
             # Pobierz wiadomości z kanałów
             for channel in channels:
-                channel_id = channel.get("_id")
-                messages = self._get_room_messages(channel_id, "channels.messages")
-                all_messages.extend(messages)
+                if self.cursors is not None and not self.cursors.changed(channel):
+                    continue
+                rooms.append((channel.get("_id"), "channels"))
+                
+            # Pokoje pobierane równolegle (FETCH_WORKERS)
+            all_messages = self._fetch_rooms(rooms)
                 
             # Aktualizuj czas ostatniego sprawdzenia
             self.last_message_check = time.time()
+            if self.cursors is not None:
+                logger.info(f"Znaczniki pokojów: {self.cursors.snapshot()}")
+                self.cursors.synced()
+                self.cursors.save()
             
             return all_messages
             
@@ -379,44 +578,28 @@ class RocketChatClient:
             logger.error(f"Wyjątek podczas pobierania nowych wiadomości: {str(e)}")
             return []
             
-    def _get_room_messages(self, room_id, endpoint):
+    def _get_room_messages(self, room_id, room_type):
         """
-        Pobiera wiadomości z pokoju.
+        Pobiera nowe wiadomości z pokoju.
         
         Args:
             room_id: ID pokoju
-            endpoint: Endpoint API do pobrania wiadomości
+            room_type: Rodzaj pokoju w API ("im" albo "channels")
             
         Returns:
             list: Lista wiadomości z pokoju
         """
         try:
-            response = requests.get(
-                f"{self.server_url}/api/v1/{endpoint}",
-                headers=self.headers,
-                params={"roomId": room_id, "count": 50}
-            )
-            
-            # Sprawdź, czy odpowiedź jest poprawnym JSON
-            try:
-                response_json = response.json()
-                logger.info(f"Otrzymano odpowiedź z API dla pokoju {room_id}, status: {response.status_code}")
-            except json.JSONDecodeError:
-                logger.error(f"Niepoprawna odpowiedź JSON z pokoju {room_id}: {response.text}")
-                return []
+            if self.cursors is not None:
+                messages_data = self.cursors.sync(room_id, lambda params: self._fetch_history(room_id, room_type, params))
+            else:
+                messages_data = self._fetch_history(room_id, room_type, None)
                 
-            if response.status_code == 200 and response_json.get("success"):
-                messages_data = response_json.get("messages", [])
+            if messages_data is not None:
                 logger.info(f"Otrzymano {len(messages_data)} wiadomości z pokoju {room_id}")
                 
-                # Sprawdź, czy messages_data jest listą
-                if not isinstance(messages_data, list):
-                    logger.error(f"Niepoprawny format wiadomości z pokoju {room_id}: {messages_data}")
-                    return []
-                
-                # Filtruj wiadomości nowsze niż ostatnie sprawdzenie i nie wysłane przez bota
+                # Filtruj wiadomości nie wysłane przez bota
                 filtered_messages = []
-                logger.info(f"Filtrowanie wiadomości nowszych niż {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_message_check))}")
                 logger.info(f"ID bota: {self.user_id}")
                 for msg in messages_data:
                     try:
@@ -462,15 +645,8 @@ class RocketChatClient:
                         # Odpowiadaj na wszystkie wiadomości, niezależnie od czasu
                         if user_id != self.user_id:
                             logger.info(f"Znaleziono wiadomość od {username}: {msg.get('msg', '')}")
-                            filtered_messages.append({
-                                "id": msg.get("_id", ""),
-                                "room_id": msg.get("rid", ""),
-                                "text": msg.get("msg", ""),
-                                "sender_id": user_id,
-                                "sender_username": username,
-                                "timestamp": timestamp,
-                                "is_direct": msg.get("t", "") == "d"
-                            })
+                            # Pole "t" wiadomości to jej typ, nie typ pokoju - rozmowę bezpośrednią wskazuje endpoint
+                            filtered_messages.append(self._to_message(msg, room_type == "im", timestamp))
                         else:
                             logger.info(f"Pominięto wiadomość - wysłana przez bota")
                     except Exception as e:
@@ -479,12 +655,75 @@ class RocketChatClient:
                 
                 return filtered_messages
             else:
-                logger.error(f"Błąd pobierania wiadomości z pokoju {room_id}: {response.text}")
                 return []
                 
         except Exception as e:
             logger.error(f"Wyjątek podczas pobierania wiadomości z pokoju {room_id}: {str(e)}")
             return []
+            
+    def _fetch_history(self, room_id, room_type, params):
+        """
+        Wykonuje jedno zapytanie o wiadomości z pokoju.
+        
+        Args:
+            room_id: ID pokoju
+            room_type: Rodzaj pokoju w API ("im" albo "channels")
+            params: Parametry oldest/inclusive/count/offset dla {room_type}.history;
+                None - ostatnie 50 wiadomości z {room_type}.messages
+            
+        Returns:
+            list: Wiadomości od najnowszej albo None przy błędzie
+        """
+        if params is None:
+            endpoint, params = f"{room_type}.messages", {"count": 50}
+        else:
+            endpoint = f"{room_type}.history"
+        response = self._request("GET", endpoint, params=dict(params, roomId=room_id))
+        
+        # Sprawdź, czy odpowiedź jest poprawnym JSON
+        try:
+            response_json = response.json()
+            logger.info(f"Otrzymano odpowiedź z API dla pokoju {room_id}, status: {response.status_code}")
+        except json.JSONDecodeError:
+            logger.error(f"Niepoprawna odpowiedź JSON z pokoju {room_id}: {response.text}")
+            return None
+            
+        if response.status_code != 200 or not response_json.get("success"):
+            logger.error(f"Błąd pobierania wiadomości z pokoju {room_id}: {response.text}")
+            return None
+            
+        messages_data = response_json.get("messages", [])
+        # Sprawdź, czy messages_data jest listą
+        if not isinstance(messages_data, list):
+            logger.error(f"Niepoprawny format wiadomości z pokoju {room_id}: {messages_data}")
+            return None
+        return messages_data
+
+    def _to_message(self, msg, is_direct, timestamp=None):
+        """
+        Zamienia dokument wiadomości RocketChat na słownik używany przez bota.
+        
+        Args:
+            msg: Wiadomość z REST lub ze strumienia realtime
+            is_direct: Czy wiadomość pochodzi z rozmowy bezpośredniej
+            timestamp: Czas wiadomości w sekundach; domyślnie z pola ts ({"$date": ms})
+            
+        Returns:
+            dict: Wiadomość
+        """
+        user = msg.get("u") if isinstance(msg.get("u"), dict) else {}
+        if timestamp is None:
+            ts = msg.get("ts")
+            timestamp = ts["$date"] / 1000 if isinstance(ts, dict) and "$date" in ts else time.time()
+        return {
+            "id": msg.get("_id", ""),
+            "room_id": msg.get("rid", ""),
+            "text": msg.get("msg", ""),
+            "sender_id": user.get("_id", ""),
+            "sender_username": user.get("username", ""),
+            "timestamp": timestamp,
+            "is_direct": is_direct
+        }
 
 
 class OllamaClient:
@@ -510,7 +749,7 @@ class OllamaClient:
         """
         try:
             # Sprawdź dostępność API
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = llm_http.get(f"{self.base_url}/api/tags")
             
             if response.status_code != 200:
                 logger.error(f"Błąd połączenia z API Ollama: {response.status_code}")
@@ -525,6 +764,12 @@ class OllamaClient:
                     model_available = True
                     break
                     
+            if llm_models is not None:
+                # Brakujący model pobierany jest w tle, potem ładowany do pamięci - start bota nie czeka
+                state = llm_models.get_manager().ensure(self.base_url, self.model)
+                logger.info(f"Model {self.model}: {state['state']}")
+                return True
+                    
             if not model_available:
                 logger.warning(f"Model {self.model} nie jest dostępny w Ollama")
                 logger.info("Dostępne modele:")
@@ -533,7 +778,7 @@ class OllamaClient:
                     
                 # Spróbuj pobrać model, jeśli nie jest dostępny
                 logger.info(f"Próba pobrania modelu {self.model}...")
-                pull_response = requests.post(
+                pull_response = llm_http.post(
                     f"{self.base_url}/api/pull",
                     json={"name": self.model}
                 )
@@ -561,9 +806,14 @@ class OllamaClient:
             str: Wygenerowany tekst
         """
         try:
+            if llm_models is not None:
+                state = llm_models.get_manager().state(self.base_url, self.model)
+                if state["state"] == "pulling":
+                    return f"Model {self.model} jest jeszcze pobierany ({state['progress'] or 0:.0f}%). Spróbuj za chwilę."
+                    
             logger.info(f"Generowanie odpowiedzi dla promptu: {prompt[:50]}...")
             
-            response = requests.post(
+            response = llm_http.post(
                 f"{self.base_url}/api/generate",
                 json={
                     "model": self.model,
@@ -616,8 +866,15 @@ class SimpleBot:
         """
         self.rocketchat = RocketChatClient(rocketchat_url, rocketchat_username, rocketchat_password)
         self.ollama = OllamaClient(ollama_url, ollama_model)
-        self.answered_messages = set()  # Zbiór ID wiadomości, na które już odpowiedziano
-        self.processing = False  # Flaga wskazująca, czy bot przetwarza obecnie wiadomość
+        # Zbiór ID wiadomości, na które już odpowiedziano - na dysku, by restart nie powtarzał odpowiedzi
+        store = message_dedupe.open_store(rocketchat_url, rocketchat_username) if message_dedupe else None
+        self.answered_messages = store if store is not None else set()
+        self.processing = 0  # Liczba wiadomości czatu przetwarzanych obecnie
+        self._processing_lock = threading.Lock()
+        # Wiadomości czatu czekają w kolejkach pokojów, komendy są obsługiwane od razu
+        self.pipeline = message_pipeline.RoomPipeline(self._handle_queued, name="simplebot") if message_pipeline else None
+        # Przy kolejce status bota ustawia jeden wątek; zdarzenie wymusza ponowne wysłanie statusu
+        self._status_refresh = threading.Event()
         self.last_message_id = None  # ID ostatniej przetworzonej wiadomości
         
     def start(self, poll_interval=2.0):
@@ -637,9 +894,16 @@ class SimpleBot:
             logger.error("Nie udało się połączyć z Ollama")
             return
             
+        if self.rocketchat.start_realtime():
+            logger.info("Odbiór wiadomości przez API realtime, odpytywanie REST jako zapas")
+            
         logger.info("Bot uruchomiony")
         self.running = True
         
+        if self.pipeline is not None:
+            self.pipeline.start()
+            threading.Thread(target=self._pipeline_status_thread, name="simplebot-status", daemon=True).start()
+        
         # Licznik do odświeżania statusu
         status_refresh_counter = 0
         
@@ -649,12 +913,20 @@ class SimpleBot:
             status_refresh_counter += 1
             if status_refresh_counter >= 30:
                 logger.info("Odświeżanie statusu bota...")
-                self.rocketchat.set_status_online()
+                self._refresh_status()
                 status_refresh_counter = 0
+                if self.pipeline is not None:
+                    logger.info(f"Kolejka wiadomości: {self.pipeline.snapshot()}")
                 
             # Przetwarzaj wiadomości
             self._process_messages()
-            time.sleep(poll_interval)
+            self.rocketchat.wait_for_messages(poll_interval)
+            
+        if self.pipeline is not None:
+            self.pipeline.stop()
+        self.rocketchat.close()
+        if not isinstance(self.answered_messages, set):
+            self.answered_messages.close()
             
     def stop(self):
         """Zatrzymuje bota."""
@@ -673,11 +945,14 @@ class SimpleBot:
                 
                 # Wymuś odświeżenie statusu przy nowych wiadomościach
                 logger.info("Odświeżanie statusu bota po znalezieniu nowych wiadomości...")
-                self.rocketchat.set_status_online()
+                self._refresh_status()
             
             # Sortuj wiadomości według czasu, aby przetwarzać je chronologicznie
             messages.sort(key=lambda x: x.get("timestamp", 0))
             
+            # Ostatnia wiadomość każdego pokoju w tej partii
+            last_in_room = {message.get("room_id"): i for i, message in enumerate(messages)}
+            
             for i, message in enumerate(messages):
                 message_id = message.get("id", "")
                 logger.info(f"Przetwarzanie wiadomości {i+1} z {len(messages)}, ID: {message_id}")
@@ -704,8 +979,8 @@ class SimpleBot:
                     logger.error(f"Brak room_id w wiadomości: {message}")
                     continue
                 
-                # Sprawdź, czy to jest ostatnia wiadomość
-                is_last_message = (i == len(messages) - 1)
+                # Sprawdź, czy to jest ostatnia wiadomość w pokoju
+                is_last_message = (i == last_in_room[message["room_id"]])
                 
                 # Obsługa komend
                 if text.lower() == "pomoc" or text.lower() == "help":
@@ -714,10 +989,20 @@ class SimpleBot:
                 elif text.lower() == "status":
                     logger.info("Obsługa komendy status")
                     self.rocketchat.send_message(message["room_id"], "Bot jest aktywny i działa poprawnie!")
-                    self.rocketchat.set_status_online()
+                    self._refresh_status()
                 elif text.lower() == "ping":
                     logger.info("Obsługa komendy ping")
                     self.rocketchat.send_message(message["room_id"], "Pong! Bot działa poprawnie.")
+                elif self.pipeline is not None:
+                    # Czat czeka w kolejce swojego pokoju; po odpowiedzi trafi do zbioru odpowiedzianych
+                    logger.info("Wiadomość czatu dodana do kolejki pokoju")
+                    if self.pipeline.submit(message["room_id"], (message, text, is_last_message), key=message_id):
+                        continue
+                    logger.warning(f"Kolejka pokoju {message['room_id']} jest pełna, pomijam wiadomość {message_id}")
+                    self.rocketchat.send_message(
+                        message["room_id"],
+                        "Mam zbyt wiele oczekujących pytań w tym pokoju - zadaj to pytanie ponownie za chwilę."
+                    )
                 else:
                     logger.info("Obsługa wiadomości czatu")
                     self._handle_chat(message, text, is_last_message)
@@ -731,6 +1016,54 @@ class SimpleBot:
             import traceback
             logger.error(traceback.format_exc())
             
+    def _refresh_status(self):
+        """Odświeża status online, a przy kolejce wiadomości zleca to wątkowi statusu."""
+        if self.pipeline is None:
+            self.rocketchat.set_status_online()
+        else:
+            self._status_refresh.set()
+            
+    def _pipeline_status_thread(self, interval=5.0):
+        """
+        Wątek ustawiający status bota na podstawie stanu kolejki wiadomości.
+        
+        Jeden wątek dla wszystkich pracowników puli, więc równoległe odpowiedzi
+        nie nadpisują sobie nawzajem tekstu statusu.
+        
+        Args:
+            interval: Odstęp między sprawdzeniami kolejki w sekundach
+        """
+        current = None
+        while self.running:
+            try:
+                snapshot = self.pipeline.snapshot()
+                busy, queued = snapshot["busy"], snapshot["queued"]
+                status = f"Odpowiadam na pytania: {busy}, w kolejce: {queued}" if busy or queued else None
+                # Zmiany statusu i wymuszone odświeżenia, bez powtarzania tego samego tekstu co 5 sekund
+                if status != current or self._status_refresh.is_set():
+                    self._status_refresh.clear()
+                    if status is None:
+                        self.rocketchat.set_status_online()
+                    else:
+                        self.rocketchat.set_status_busy(status)
+                        logger.info(f"Zaktualizowano status: {status}")
+                    current = status
+            except Exception as e:
+                logger.error(f"Błąd w wątku statusu kolejki: {str(e)}")
+            self._status_refresh.wait(interval)
+            
+    def _handle_queued(self, job):
+        """
+        Obsługuje wiadomość czatu z kolejki pokoju (w wątku puli).
+        
+        Args:
+            job: Krotka (wiadomość, treść, czy ostatnia wiadomość w pokoju)
+        """
+        message, text, is_last_message = job
+        self._handle_chat(message, text, is_last_message)
+        self.answered_messages.add(message["id"])
+        self.last_message_id = message["id"]
+        
     def _handle_help(self, message):
         """
         Obsługuje komendę pomocy.
@@ -772,8 +1105,12 @@ class SimpleBot:
             # Pobierz pierwsze 50 znaków tekstu (lub mniej, jeśli tekst jest krótszy)
             task_preview = text[:50] + "..." if len(text) > 50 else text
             
+            # Bez kolejki status zadania ustawia ta metoda, z kolejką - wątek statusu kolejki
+            own_status = self.pipeline is None
+            
             # Ustaw status na zajęty z informacją o zadaniu
-            self.rocketchat.set_status_busy(f"Jeszcze [{estimated_time}]s zajmie mi: {task_preview}")
+            if own_status:
+                self.rocketchat.set_status_busy(f"Jeszcze [{estimated_time}]s zajmie mi: {task_preview}")
             
             # Przygotuj wiadomość z informacją o czasie odpowiedzi
             quoted_text = text.replace('\n', '\n> ')
@@ -789,13 +1126,13 @@ class SimpleBot:
             end_time = start_time + estimated_time
             
             # Uruchom wątek aktualizacji statusu
-            import threading
-            status_thread = threading.Thread(
-                target=self._update_status_thread,
-                args=(task_preview, end_time),
-                daemon=True
-            )
-            status_thread.start()
+            if own_status:
+                status_thread = threading.Thread(
+                    target=self._update_status_thread,
+                    args=(task_preview, end_time),
+                    daemon=True
+                )
+                status_thread.start()
             
             # Generowanie odpowiedzi za pomocą Ollama
             prompt = f"""
@@ -809,13 +1146,19 @@ class SimpleBot:
             logger.info(f"Wysyłam prompt do Ollama: {prompt[:100]}...")
             logger.info(f"URL Ollama: {self.ollama.base_url}, Model: {self.ollama.model}")
             
-            # Ustaw flagę, że przetwarzanie jest w toku
-            self.processing = True
+            # Zwiększ licznik przetwarzanych wiadomości
+            with self._processing_lock:
+                self.processing += 1
             
-            response = self.ollama.generate(prompt)
-            
-            # Ustaw flagę, że przetwarzanie zostało zakończone
-            self.processing = False
+            interactive = (llm_scheduler.context("interactive", tenant=message["room_id"])
+                           if llm_scheduler is not None else nullcontext())
+            try:
+                with interactive:
+                    response = self.ollama.generate(prompt)
+            finally:
+                # Zmniejsz licznik - przetwarzanie tej wiadomości zostało zakończone
+                with self._processing_lock:
+                    self.processing -= 1
             
             # Oblicz rzeczywisty czas przetwarzania
             processing_time = time.time() - start_time
@@ -837,8 +1180,9 @@ class SimpleBot:
             result = self.rocketchat.send_message(message["room_id"], final_response)
             logger.info(f"Wynik wysyłania wiadomości: {result}")
             
-            # Przywróć status na online
-            self.rocketchat.set_status_online()
+            # Przywróć status na online, gdy nie czeka już żadna inna odpowiedź
+            if own_status and not self.processing:
+                self.rocketchat.set_status_online()
             
         except Exception as e:
             logger.error(f"Błąd podczas generowania odpowiedzi: {str(e)}")
@@ -850,8 +1194,8 @@ class SimpleBot:
                     "Przepraszam, wystąpił błąd podczas przetwarzania Twojej wiadomości."
                 )
                 # Przywróć status na online w przypadku błędu
-                self.processing = False
-                self.rocketchat.set_status_online()
+                if self.pipeline is None and not self.processing:
+                    self.rocketchat.set_status_online()
             except Exception as e2:
                 logger.error(f"Błąd podczas wysyłania wiadomości o błędzie: {str(e2)}")
                 logger.error(traceback.format_exc())
@@ -904,7 +1248,8 @@ class SimpleBot:
         # Sprawdź obciążenie systemu
         try:
             import psutil
-            cpu_usage = psutil.cpu_percent(interval=0.1)
+            # Bez interwału: użycie CPU od poprzedniego wywołania, bez blokowania wątku
+            cpu_usage = psutil.cpu_percent(interval=None)
             memory_usage = psutil.virtual_memory().percent
             
             # Dodatkowy czas w zależności od obciążenia CPU i pamięci
@@ -22,6 +22,12 @@ import requests
 import logging
 from typing import Dict, Any
 
+# Wspólna bramka LLM z pulą połączeń, limitami na model i wyłącznikiem (pakiet evodev)
+try:
+    from evodev import llm_gateway as llm_http
+except ImportError:
+    llm_http = requests
+
 # Konfiguracja logowania
 logger = logging.getLogger(__name__)
 
@@ -55,7 +61,7 @@ class OllamaClient:
             headers = {"Content-Type": "application/json"}
             payload = {"prompt": prompt, "model": model}
 
-            response = requests.post(
+            response = llm_http.post(
                 f"{self.ollama_url}/api/generate",
                 json=payload,
                 headers=headers,
@@ -109,7 +115,7 @@ class OllamaClient:
         logger.debug(f"Checking Ollama status at {self.ollama_url}...")
 
         try:
-            response = requests.get(f"{self.ollama_url}/api/health", timeout=5)
+            response = llm_http.get(f"{self.ollama_url}/api/health", timeout=5)
 
             if response.status_code == 200:
                 logger.info("Ollama server is available")
@@ -3,14 +3,20 @@ import os
 import sys
 import time
 import json
+import re
 import logging
-import sqlite3
 import datetime
 import threading
-import subprocess
-import signal
-import psutil
 import requests
+import db_pool
+import event_writer
+import retention
+import log_reader
+import log_stream
+import docker_containers
+import system_sampler
+import server
+import llm_stream
 from flask import Flask, render_template, jsonify, request, send_from_directory, Response, redirect, url_for
 try:
     import email_utils
@@ -18,6 +24,20 @@ except ImportError:
     print("Warning: email_utils module not found. Email functionality will be limited.")
     email_utils = None
 
+# Wspólna bramka LLM (pakiet evodev): pula połączeń, limity na model, łączenie identycznych zapytań
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from evodev import llm_gateway, llm_models
+except ImportError:
+    llm_gateway = llm_models = None
+ollama_http = llm_gateway if llm_gateway is not None else requests
+
+def ollama_chat_post(url, **kwargs):
+    """POST generacji dla czatu panelu - w kolejce bramki LLM jako zapytanie interaktywne"""
+    if llm_gateway is None:
+        return requests.post(url, **kwargs)
+    return llm_gateway.post(url, priority="interactive", tenant="monitor", **kwargs)
+
 try:
     import docker_monitor
     has_docker_monitor = True
@@ -40,6 +60,11 @@ LLM_PROVIDER = os.environ.get('LLM_PROVIDER', '')
 LLM_TOKEN = os.environ.get('LLM_TOKEN', '')
 LLM_URL = os.environ.get('LLM_URL', '')
 LLM_MODEL = os.environ.get('LLM_MODEL', '')
+# Limity czasu wywołań LLM (sekundy) - wolny dostawca nie blokuje wątku serwera bez końca
+LLM_TIMEOUT = float(os.environ.get('MONITOR_LLM_TIMEOUT', 120))
+OLLAMA_STATUS_TIMEOUT = float(os.environ.get('MONITOR_OLLAMA_STATUS_TIMEOUT', 5))
+# Lokalny serwer Ollama używany przez czat Ollama i sprawdzanie statusu
+OLLAMA_URL = os.environ.get('MONITOR_OLLAMA_URL', 'http://localhost:11434').rstrip('/')
 
 # Konfiguracja loggera
 logging.basicConfig(
@@ -65,61 +90,65 @@ logging.basicConfig(
 )
 logger = logging.getLogger('evodev-monitor')
 
-# Inicjalizacja monitorowania requestów Docker
-if has_docker_monitor:
-    try:
-        docker_monitor.start_request_monitoring()
-        logger.info("Docker request monitoring started")
-    except Exception as e:
-        logger.error(f"Failed to start Docker request monitoring: {str(e)}")
+# Wspólna pula połączeń do bazy danych
+db = db_pool.get_pool(DB_PATH)
+# Zdarzenia zapisywane są w tle, paczkami w jednej transakcji
+writer = event_writer.get_writer(DB_PATH)
+
+# Zapytania wykonywane cyklicznie - trafiają do cache przygotowanych zapytań połączenia
+INSERT_EVENT_SQL = "INSERT INTO system_events (event_type, component, message, details) VALUES (?, ?, ?, ?)"
+INSERT_STATUS_SQL = "INSERT INTO system_status (cpu_percent, memory_percent, disk_usage, docker_status) VALUES (?, ?, ?, ?)"
+SELECT_LATEST_STATUS_SQL = "SELECT * FROM system_status ORDER BY timestamp DESC LIMIT 1"
+SELECT_EVENTS_SQL = "SELECT * FROM system_events ORDER BY timestamp DESC LIMIT ?"
 
 # Inicjalizacja bazy danych
 def init_db():
     """Inicjalizacja bazy danych"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        # Tabela dla zdarzeń systemowych
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS system_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            event_type TEXT,
-            component TEXT,
-            message TEXT,
-            details TEXT
-        )
-        ''')
-        
-        # Tabela dla statusu systemu
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS system_status (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            cpu_percent REAL,
-            memory_percent REAL,
-            disk_usage REAL,
-            docker_status TEXT
-        )
-        ''')
+        with db.transaction() as conn:
+            cursor = conn.cursor()
+            
+            # Tabela dla zdarzeń systemowych
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS system_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                event_type TEXT,
+                component TEXT,
+                message TEXT,
+                details TEXT
+            )
+            ''')
+            
+            # Tabela dla statusu systemu
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS system_status (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                cpu_percent REAL,
+                memory_percent REAL,
+                disk_usage REAL,
+                docker_status TEXT
+            )
+            ''')
+            
+            # Tabela dla zadań TODO
+            cursor.execute('''
+            CREATE TABLE IF NOT EXISTS todos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT NOT NULL,
+                description TEXT,
+                priority TEXT,
+                category TEXT,
+                status TEXT DEFAULT 'pending',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            ''')
         
-        # Tabela dla zadań TODO
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            priority TEXT,
-            category TEXT,
-            status TEXT DEFAULT 'pending',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        # Indeksy i tabele agregatów dla danych czasowych
+        retention.init_schema(db)
         
-        conn.commit()
-        conn.close()
         logger.info(f"Baza danych zainicjowana: {DB_PATH}")
     except Exception as e:
         logger.error(f"Błąd podczas inicjalizacji bazy danych: {str(e)}")
@@ -127,70 +156,16 @@ def init_db():
 def log_event(event_type, component, message, details=None):
     """Zapisz zdarzenie do bazy danych"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
         details_json = json.dumps(details) if details else None
-        cursor.execute(
-            "INSERT INTO system_events (event_type, component, message, details) VALUES (?, ?, ?, ?)",
-            (event_type, component, message, details_json)
-        )
-        conn.commit()
-        conn.close()
+        if not writer.submit(INSERT_EVENT_SQL, (event_type, component, message, details_json)):
+            logger.warning(f"Kolejka zapisu pełna, pominięto zdarzenie: {message}")
     except Exception as e:
         logger.error(f"Błąd podczas zapisywania zdarzenia: {str(e)}")
 
-def get_docker_containers():
-    """Pobierz szczegółowe informacje o kontenerach Docker"""
+def get_docker_containers(with_logs=True):
+    """Pobierz szczegółowe informacje o kontenerach Docker (z pamięci podręcznej)"""
     try:
-        result = subprocess.run(
-            ["docker", "ps", "-a", "--format", "{{.ID}}|{{.Names}}|{{.Status}}|{{.Image}}|{{.Ports}}"],
-            capture_output=True, text=True, timeout=5
-        )
-        containers = []
-        
-        if result.returncode == 0:
-            lines = result.stdout.strip().split('\n')
-            for line in lines:
-                if not line:
-                    continue
-                    
-                parts = line.split('|')
-                if len(parts) >= 5:
-                    container_id, name, status, image, ports = parts[:5]
-                    
-                    # Określ status kontenera
-                    status_type = "running"
-                    if "Exited" in status:
-                        status_type = "stopped"
-                    elif "Created" in status:
-                        status_type = "created"
-                    elif "Restarting" in status:
-                        status_type = "restarting"
-                    elif "Paused" in status:
-                        status_type = "paused"
-                    
-                    # Pobierz logi dla kontenera (tylko kilka ostatnich linii)
-                    logs = ""
-                    try:
-                        log_result = subprocess.run(
-                            ["docker", "logs", "--tail", "3", container_id],
-                            capture_output=True, text=True, timeout=2
-                        )
-                        if log_result.returncode == 0:
-                            logs = log_result.stdout
-                    except:
-                        pass
-                    
-                    containers.append({
-                        "id": container_id,
-                        "name": name,
-                        "status": status,
-                        "status_type": status_type,
-                        "image": image,
-                        "ports": ports,
-                        "logs": logs
-                    })
-        return containers
+        return docker_containers.get_lister().list(with_logs=with_logs)
     except Exception as e:
         logger.error(f"Błąd podczas pobierania kontenerów Docker: {str(e)}")
         return []
@@ -198,7 +173,8 @@ def get_docker_containers():
 def check_docker_status():
     """Sprawdź status usług Docker"""
     try:
-        containers = get_docker_containers()
+        # Podsumowanie potrzebuje tylko stanów, bez logów kontenerów
+        containers = get_docker_containers(with_logs=False)
         
         # Przygotuj podsumowanie w formie tekstowej dla istniejącego kodu
         status_text = ""
@@ -212,19 +188,17 @@ def check_docker_status():
 def monitor_system():
     """Monitoruj ogólny stan systemu i zapisz do bazy"""
     try:
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory_percent = psutil.virtual_memory().percent
-        disk_usage = psutil.disk_usage('/').percent
+        # Ostatnia próbka z wątku próbkującego - bez blokowania na pomiarze CPU
+        sample = system_sampler.latest()
+        if sample is None:
+            logger.warning("Brak próbki statystyk systemowych, pomijam zapis statusu")
+            return
+        cpu_percent = sample['cpu']['percent']
+        memory_percent = sample['memory']['percent']
+        disk_usage = sample['disk']['percent']
         docker_status = check_docker_status()
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO system_status (cpu_percent, memory_percent, disk_usage, docker_status) VALUES (?, ?, ?, ?)",
-            (cpu_percent, memory_percent, disk_usage, docker_status)
-        )
-        conn.commit()
-        conn.close()
+        db.execute(INSERT_STATUS_SQL, (cpu_percent, memory_percent, disk_usage, docker_status))
         
         logger.debug(f"Zapisano status: CPU: {cpu_percent}%, RAM: {memory_percent}%, DISK: {disk_usage}%")
     except Exception as e:
@@ -233,20 +207,12 @@ def monitor_system():
 def get_stats():
     """Pobierz najnowsze statystyki z bazy danych"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Pobierz najnowszy status systemu
-        cursor.execute("SELECT * FROM system_status ORDER BY timestamp DESC LIMIT 1")
-        system_row = cursor.fetchone()
-        system = dict(system_row) if system_row else {}
-        
-        # Pobierz ostatnie 10 zdarzeń
-        cursor.execute("SELECT * FROM system_events ORDER BY timestamp DESC LIMIT 10")
-        events = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
+        with db.connection():
+            # Pobierz najnowszy status systemu
+            system = db.fetchone(SELECT_LATEST_STATUS_SQL) or {}
+            
+            # Pobierz ostatnie 10 zdarzeń
+            events = db.fetchall(SELECT_EVENTS_SQL, (10,))
         
         return {
             "system": system,
@@ -258,12 +224,23 @@ def get_stats():
 
 def monitoring_thread():
     """Wątek monitorujący"""
+    last_retention = 0
     while True:
         try:
             monitor_system()
         except Exception as e:
             logger.error(f"Błąd w wątku monitorującym: {str(e)}")
             log_event("ERROR", "monitor", f"Błąd monitorowania", {"error": str(e)})
+        
+        # Agregacja i usuwanie starych danych
+        if time.time() - last_retention >= retention.RETENTION_INTERVAL:
+            try:
+                retention.run_retention(db)
+                if has_docker_monitor:
+                    docker_monitor.prune_request_stats()
+            except Exception as e:
+                logger.error(f"Błąd podczas agregacji danych: {str(e)}")
+            last_retention = time.time()
         time.sleep(5)  # Monitoruj co 5 sekund
 
 @app.route('/')
@@ -278,8 +255,22 @@ def logs_view():
 
 @app.route('/api/status')
 def api_status():
-    """Endpoint API zwracający aktualny status"""
-    return jsonify(get_stats())
+    """Endpoint API zwracający aktualny status lub historię dla zakresu czasu"""
+    if not any(arg in request.args for arg in ('from', 'to', 'resolution')):
+        return jsonify(get_stats())
+    
+    try:
+        return jsonify(retention.query_status(
+            db,
+            start=request.args.get('from'),
+            end=request.args.get('to'),
+            resolution=request.args.get('resolution', 'auto')
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Błąd podczas pobierania historii statusu: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
 @app.route('/api/events')
 def api_events():
@@ -287,14 +278,7 @@ def api_events():
     try:
         limit = request.args.get('limit', 20, type=int)
         
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM system_events ORDER BY timestamp DESC LIMIT ?", (limit,))
-        events = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
+        events = db.fetchall(SELECT_EVENTS_SQL, (limit,))
         return jsonify(events)
     except Exception as e:
         logger.error(f"Błąd podczas pobierania zdarzeń: {str(e)}")
@@ -312,30 +296,14 @@ def api_logs():
         if not os.path.exists(log_file):
             return jsonify({"error": f"Plik log {log_file} nie istnieje"}), 404
             
-        # Odczytaj ostatnie linie z pliku
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        if before is not None and after is not None:
+            return jsonify({"error": "Parametry before i after wykluczają się"}), 400
+        
+        # Odczytaj stronę logów od końca pliku lub od wskazanego offsetu
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                # Odczytaj ostatnie N linii
-                all_lines = f.readlines()
-                last_lines = all_lines[-max_lines:] if len(all_lines) > max_lines else all_lines
-                
-                # Analizuj logi jako JSON jeśli to możliwe
-                parsed_logs = []
-                for line in last_lines:
-                    try:
-                        # Próbuj parsować jako JSON
-                        log_entry = json.loads(line)
-                        parsed_logs.append(log_entry)
-                    except:
-                        # Jeśli nie jest w formacie JSON, użyj jako tekst
-                        parsed_logs.append({"raw": line.strip()})
-                
-                return jsonify({
-                    "filename": log_file,
-                    "total_lines": len(all_lines),
-                    "displayed_lines": len(last_lines),
-                    "logs": parsed_logs
-                })
+            return jsonify(log_reader.read_page(log_file, max_lines, before=before, after=after))
         except Exception as e:
             logger.error(f"Błąd podczas odczytu pliku log: {str(e)}")
             return jsonify({"error": str(e)}), 500
@@ -343,6 +311,48 @@ def api_logs():
         logger.error(f"Błąd podczas pobierania logów: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Strumienie SSE zajmują wątek serwera do rozłączenia klienta, więc ich liczba jest ograniczona
+streams = server.StreamLimiter()
+
+def _limited_stream(body):
+    """Odpowiedź SSE zajmująca jeden z limitowanych slotów strumieni lub 503, gdy ich brak"""
+    if not streams.acquire():
+        return jsonify({"error": f"Zbyt wiele otwartych strumieni (limit {streams.limit})"}), 503
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+    response = Response(body(), mimetype='text/event-stream', headers=headers)
+    # Wywoływane przy zamknięciu odpowiedzi, także gdy klient rozłączy się przed pierwszym zdarzeniem
+    response.call_on_close(streams.release)
+    return response
+
+def _sse_response(key, factory):
+    """Buduje odpowiedź Server-Sent Events dla źródła logów z filtrami klienta"""
+    try:
+        subscription = log_stream.Subscription(
+            level=request.args.get('level'),
+            pattern=request.args.get('pattern'),
+            rate=request.args.get('rate', log_stream.DEFAULT_RATE, type=float)
+        )
+    except (ValueError, re.error) as e:
+        return jsonify({"error": str(e)}), 400
+    return _limited_stream(lambda: log_stream.event_stream(key, factory, subscription))
+
+@app.route('/api/logs/stream')
+def api_logs_stream():
+    """Strumieniuje nowe linie pliku logu (SSE) z filtrowaniem po stronie serwera"""
+    log_file = request.args.get('file', APP_LOG_FILE)
+    if not os.path.exists(log_file):
+        return jsonify({"error": f"Plik log {log_file} nie istnieje"}), 404
+    key, factory = log_stream.file_source(log_file)
+    return _sse_response(key, factory)
+
+@app.route('/api/logs/streams')
+def api_logs_streams():
+    """Zwraca aktywne strumienie logów i liczbę podłączonych klientów"""
+    return jsonify(log_stream.active_followers())
+
 @app.route('/api/available_logs')
 def api_available_logs():
     """Zwraca listę dostępnych plików logów"""
@@ -393,6 +403,21 @@ def health():
     """Endpoint sprawdzający zdrowie aplikacji"""
     return jsonify({"status": "ok", "timestamp": datetime.datetime.now().isoformat()})
 
+@app.route('/api/monitor/writer')
+def api_monitor_writer():
+    """Endpoint API zwracający liczniki zapisu zdarzeń w tle"""
+    stats = {"events": writer.stats()}
+    if has_docker_monitor:
+        stats["docker_requests"] = docker_monitor.writer.stats()
+    return jsonify(stats)
+
+@app.route('/api/docker/client-stats')
+def api_docker_client_stats():
+    """Endpoint API zwracający liczniki wywołań współdzielonego klienta Docker"""
+    if docker_containers.docker_client is None:
+        return jsonify({"error": "Współdzielony klient Docker jest niedostępny"}), 503
+    return jsonify(docker_containers.docker_client.stats.snapshot())
+
 @app.route('/api/view/index')
 def api_view_index():
     """Endpoint API zwracający HTML dla widoku głównego"""
@@ -542,8 +567,11 @@ def api_docker_recent_requests():
 def api_docker_request_stats():
     """Zwraca statystyki requestów Docker"""
     try:
-        stats = docker_monitor.get_request_stats()
-        return jsonify({"success": True, "stats": stats})
+        minutes = request.args.get('minutes', type=int)
+        stats = docker_monitor.get_request_stats(minutes=minutes)
+        return jsonify({"success": True, "stats": stats, "window_minutes": minutes})
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
         logger.error(f"Error getting Docker request stats: {str(e)}")
         return jsonify({"success": False, "error": str(e)})
@@ -569,6 +597,14 @@ def api_docker_container_logs(container_id):
         logger.error(f"Error getting container logs: {str(e)}")
         return jsonify({"success": False, "error": str(e)})
 
+@app.route('/api/docker/container-logs/<container_id>/stream')
+def api_docker_container_logs_stream(container_id):
+    """Strumieniuje nowe logi kontenera Docker (SSE)"""
+    if log_stream.docker is None:
+        return jsonify({"success": False, "error": "Docker module not available"}), 503
+    key, factory = log_stream.container_source(container_id)
+    return _sse_response(key, factory)
+
 @app.route('/api/docker/container-action/<container_id>', methods=['POST'])
 def api_docker_container_action(container_id):
     """Wykonuje akcję na kontenerze Docker (start, stop, restart)"""
@@ -781,6 +817,20 @@ def api_chat_message():
                            "Wybierz jednego z dostępnych dostawców w zakładce konfiguracji."
             })
         
+        # Wariant strumieniowy: tokeny przesyłane są jako SSE w miarę generowania
+        if data.get('stream'):
+            def log_chat(text):
+                log_event("INFO", "chat", f"Nowa wiadomość od użytkownika", 
+                         {"provider": LLM_PROVIDER, "message": user_message, "response": text, "stream": True})
+            
+            if LLM_PROVIDER == 'openai' and LLM_TOKEN:
+                return stream_chat_response('openai', lambda relay: stream_openai_api(relay, user_message), log_chat)
+            if LLM_PROVIDER == 'anthropic' and LLM_TOKEN:
+                return stream_chat_response('anthropic', lambda relay: stream_anthropic_api(relay, user_message), log_chat)
+            if LLM_PROVIDER == 'ollama' and LLM_URL:
+                payload = ollama_payload(LLM_MODEL or "llama2", user_message)
+                return stream_chat_response('ollama', lambda relay: stream_ollama_api(relay, LLM_URL, payload), log_chat)
+        
         # Generuj odpowiedź w zależności od dostawcy
         response = ""
         if LLM_PROVIDER == 'openai' and LLM_TOKEN:
@@ -826,7 +876,7 @@ def api_chat_ollama():
     """Obsługuje zapytania do API Ollama"""
     try:
         data = request.json
-        model = data.get('model', 'llama2')
+        model = data.get('model') or default_ollama_model()
         message = data.get('message', '')
         
         if not message:
@@ -834,22 +884,21 @@ def api_chat_ollama():
         
         # Sprawdź status Ollama
         try:
-            ollama_status = requests.get("http://localhost:11434/api/tags")
+            ollama_status = ollama_http.get(f"{OLLAMA_URL}/api/tags", timeout=OLLAMA_STATUS_TIMEOUT)
             if ollama_status.status_code != 200:
                 return jsonify({"success": False, "message": f"Błąd podczas sprawdzania statusu Ollama: kod {ollama_status.status_code}"})
         except Exception as e:
             return jsonify({"success": False, "message": f"Błąd podczas sprawdzania statusu Ollama: {str(e)}"})
         
+        payload = ollama_payload(model, message)
+        if data.get('stream'):
+            return stream_chat_response('ollama', lambda relay: stream_ollama_api(relay, OLLAMA_URL, payload))
+        
         # Wywołaj API Ollama
         try:
-            url = "http://localhost:11434/api/generate"
-            payload = {
-                "model": model,
-                "prompt": f"Jesteś asystentem EvoDev, który pomaga użytkownikom w zadaniach programistycznych i administracyjnych. Oto zapytanie użytkownika: {message}",
-                "stream": False
-            }
+            url = f"{OLLAMA_URL}/api/generate"
             
-            response = requests.post(url, json=payload)
+            response = ollama_chat_post(url, json=payload, timeout=LLM_TIMEOUT)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -867,19 +916,43 @@ def api_chat_ollama():
         logger.error(error_message)
         return jsonify({"success": False, "message": error_message})
 
+@app.route('/api/chat/stream-stats', methods=['GET'])
+def api_chat_stream_stats():
+    """Zwraca liczniki strumieni czatu z czasem do pierwszego tokenu (TTFT)"""
+    return jsonify(llm_stream.stats.snapshot())
+
+@app.route('/api/llm/gateway-stats', methods=['GET'])
+def api_llm_gateway_stats():
+    """Zwraca liczniki bramki LLM: wywołania, połączone zapytania, stan wyłączników i zajęte sloty modeli"""
+    if llm_gateway is None:
+        return jsonify({"error": "Bramka LLM jest niedostępna"}), 503
+    return jsonify(llm_gateway.get_gateway().snapshot())
+
+@app.route('/api/llm/models', methods=['GET'])
+def api_llm_models():
+    """Zwraca stan modeli Ollama: pobieranie z postępem, załadowanie do pamięci i bieżące keep_alive"""
+    if llm_models is None:
+        return jsonify({"error": "Menedżer modeli jest niedostępny"}), 503
+    return jsonify(llm_models.get_manager().snapshot())
+
 @app.route('/api/ollama/status', methods=['GET'])
 def api_ollama_status():
     """Sprawdza status serwera Ollama i dostępne modele"""
     try:
         # Sprawdź status Ollama
         try:
-            response = requests.get("http://localhost:11434/api/tags")
+            response = ollama_http.get(f"{OLLAMA_URL}/api/tags", timeout=OLLAMA_STATUS_TIMEOUT)
             if response.status_code == 200:
                 models_data = response.json()
+                models = models_data.get("models", [])
+                if llm_models is not None:
+                    # Stan załadowania: "loaded" - model w pamięci odpowie bez czekania na wczytanie
+                    for model in models:
+                        model["load_state"] = llm_models.get_manager().state(OLLAMA_URL, model.get("name"))["state"]
                 return jsonify({
                     "success": True, 
                     "status": "online",
-                    "models": models_data.get("models", [])
+                    "models": models
                 })
             else:
                 return jsonify({
@@ -953,20 +1026,11 @@ def api_events_recent():
     try:
         limit = request.args.get('limit', 10, type=int)
         
-        # Połączenie z bazą danych
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Pobranie ostatnich zdarzeń
-        cursor.execute(
+        events = db.fetchall(
             "SELECT id, timestamp, event_type, description FROM events ORDER BY timestamp DESC LIMIT ?",
             (limit,)
         )
-        events = [dict(row) for row in cursor.fetchall()]
-        
-        # Zamknięcie połączenia
-        conn.close()
         
         return jsonify({"success": True, "events": events})
     except Exception as e:
@@ -998,20 +1062,17 @@ def api_events_recent():
 def api_system_stats():
     """Pobiera statystyki systemowe"""
     try:
-        # Pobranie statystyk systemowych
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # Ostatnia próbka statystyk systemowych
+        sample = system_sampler.latest()
         
         # Pobranie informacji o kontenerach Docker
         try:
-            import docker
-            client = docker.from_env()
-            containers = client.containers.list(all=True)
+            containers = get_docker_containers(with_logs=False)
+            running = len([c for c in containers if c['status_type'] == 'running'])
             container_stats = {
                 "total": len(containers),
-                "running": len([c for c in containers if c.status == 'running']),
-                "stopped": len([c for c in containers if c.status != 'running'])
+                "running": running,
+                "stopped": len(containers) - running
             }
         except Exception as e:
             logger.error(f"Błąd podczas pobierania statystyk kontenerów: {str(e)}")
@@ -1025,18 +1086,18 @@ def api_system_stats():
         # Przygotowanie odpowiedzi
         stats = {
             "cpu": {
-                "percent": cpu_percent
+                "percent": sample['cpu']['percent']
             },
             "memory": {
-                "total": memory.total,
-                "available": memory.available,
-                "percent": memory.percent
+                "total": sample['memory']['total'],
+                "available": sample['memory']['available'],
+                "percent": sample['memory']['percent']
             },
             "disk": {
-                "total": disk.total,
-                "used": disk.used,
-                "free": disk.free,
-                "percent": disk.percent
+                "total": sample['disk']['total'],
+                "used": sample['disk']['used'],
+                "free": sample['disk']['free'],
+                "percent": sample['disk']['percent']
             },
             "containers": container_stats,
             "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -1070,6 +1131,20 @@ def api_system_stats():
         }
         return jsonify({"success": True, "stats": sample_stats, "note": "Dane przykładowe - wystąpił błąd podczas pobierania rzeczywistych danych"})
 
+@app.route('/api/system/history', methods=['GET'])
+def api_system_history():
+    """Zwraca próbki z bufora cyklicznego (opcjonalnie nowsze niż `since`, unix time)"""
+    try:
+        sampler = system_sampler.get_sampler()
+        samples = sampler.history(
+            since=request.args.get('since', type=float),
+            limit=request.args.get('limit', type=int)
+        )
+        return jsonify({"success": True, "interval": sampler.interval, "samples": samples})
+    except Exception as e:
+        logger.error(f"Błąd podczas pobierania historii statystyk systemowych: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
 @app.route('/todos')
 def todos_view():
     """Strona z listą zadań TODO"""
@@ -1079,12 +1154,8 @@ def todos_view():
 def api_get_todos():
     """Endpoint API zwracający listę zadań TODO"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
         # Sprawdź czy tabela istnieje, jeśli nie - utwórz ją
-        cursor.execute('''
+        db.execute('''
         CREATE TABLE IF NOT EXISTS todos (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             title TEXT NOT NULL,
@@ -1096,13 +1167,9 @@ def api_get_todos():
             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
         ''')
-        conn.commit()
         
         # Pobierz wszystkie zadania
-        cursor.execute("SELECT * FROM todos ORDER BY priority, created_at DESC")
-        todos = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
+        todos = db.fetchall("SELECT * FROM todos ORDER BY priority, created_at DESC")
         return jsonify({"success": True, "todos": todos})
     except Exception as e:
         logger.error(f"Błąd podczas pobierania zadań TODO: {str(e)}")
@@ -1121,17 +1188,12 @@ def api_add_todo():
         priority = data.get('priority', 'medium')
         category = data.get('category', 'general')
         
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute(
+        cursor = db.execute(
             "INSERT INTO todos (title, description, priority, category) VALUES (?, ?, ?, ?)",
             (title, description, priority, category)
         )
         
         todo_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         log_event("INFO", "todos", f"Dodano nowe zadanie: {title}")
         return jsonify({"success": True, "id": todo_id})
@@ -1147,15 +1209,10 @@ def api_update_todo(todo_id):
         if not data:
             return jsonify({"success": False, "error": "Brak danych do aktualizacji"}), 400
             
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
         # Sprawdź czy zadanie istnieje
-        cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,))
-        todo = cursor.fetchone()
+        todo = db.fetchone("SELECT * FROM todos WHERE id = ?", (todo_id,))
         
         if not todo:
-            conn.close()
             return jsonify({"success": False, "error": f"Zadanie o ID {todo_id} nie istnieje"}), 404
         
         # Przygotuj dane do aktualizacji
@@ -1188,9 +1245,7 @@ def api_update_todo(todo_id):
         query = f"UPDATE todos SET {', '.join(updates)} WHERE id = ?"
         params.append(todo_id)
         
-        cursor.execute(query, params)
-        conn.commit()
-        conn.close()
+        db.execute(query, params)
         
         log_event("INFO", "todos", f"Zaktualizowano zadanie o ID {todo_id}")
         return jsonify({"success": True})
@@ -1202,21 +1257,14 @@ def api_update_todo(todo_id):
 def api_delete_todo(todo_id):
     """Endpoint API usuwający zadanie TODO"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
         # Sprawdź czy zadanie istnieje
-        cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,))
-        todo = cursor.fetchone()
+        todo = db.fetchone("SELECT * FROM todos WHERE id = ?", (todo_id,))
         
         if not todo:
-            conn.close()
             return jsonify({"success": False, "error": f"Zadanie o ID {todo_id} nie istnieje"}), 404
         
         # Usuń zadanie
-        cursor.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
-        conn.commit()
-        conn.close()
+        db.execute("DELETE FROM todos WHERE id = ?", (todo_id,))
         
         log_event("INFO", "todos", f"Usunięto zadanie o ID {todo_id}")
         return jsonify({"success": True})
@@ -1224,8 +1272,8 @@ def api_delete_todo(todo_id):
         logger.error(f"Błąd podczas usuwania zadania TODO: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-def call_openai_api(message):
-    """Wywołuje API OpenAI i zwraca odpowiedź"""
+def openai_request(message):
+    """Przygotuj adres, nagłówki i treść zapytania do API OpenAI (z funkcjami email)"""
     url = "https://api.openai.com/v1/chat/completions"
     
     # Przygotuj kontekst systemowy
@@ -1364,8 +1412,37 @@ def call_openai_api(message):
         "tools": functions,
         "temperature": 0.7
     }
+    return url, headers, payload
+
+def openai_tool_messages(payload, message_content, function_calls):
+    """Wykonaj funkcje wywołane przez model i zwróć wiadomości do drugiego zapytania"""
+    results = []
+    
+    for call in function_calls:
+        function_name = call["function"]["name"]
+        function_args = json.loads(call["function"]["arguments"])
+        
+        # Wywołaj odpowiednią funkcję
+        result = handle_function_call(function_name, function_args)
+        results.append(result)
+    
+    # Utwórz nowe zapytanie z wynikami funkcji
+    messages = payload["messages"][:2] + [message_content]
+    
+    # Dodaj wyniki funkcji
+    for i, result in enumerate(results):
+        messages.append({
+            "role": "tool",
+            "tool_call_id": function_calls[i]["id"],
+            "content": json.dumps(result)
+        })
+    return messages
+
+def call_openai_api(message):
+    """Wywołuje API OpenAI i zwraca odpowiedź"""
+    url, headers, payload = openai_request(message)
     
-    response = requests.post(url, headers=headers, json=payload)
+    response = requests.post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
     
     if response.status_code == 200:
         response_data = response.json()
@@ -1376,34 +1453,10 @@ def call_openai_api(message):
         if "tool_calls" in message_content:
             # Model chce wywołać funkcję
             function_calls = message_content["tool_calls"]
-            results = []
-            
-            for call in function_calls:
-                function_name = call["function"]["name"]
-                function_args = json.loads(call["function"]["arguments"])
-                
-                # Wywołaj odpowiednią funkcję
-                result = handle_function_call(function_name, function_args)
-                results.append(result)
-            
-            # Utwórz nowe zapytanie z wynikami funkcji
-            messages = [
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": message},
-                message_content,
-            ]
-            
-            # Dodaj wyniki funkcji
-            for i, result in enumerate(results):
-                messages.append({
-                    "role": "tool",
-                    "tool_call_id": function_calls[i]["id"],
-                    "content": json.dumps(result)
-                })
             
             # Wyślij drugie zapytanie z wynikami funkcji
-            payload["messages"] = messages
-            response = requests.post(url, headers=headers, json=payload)
+            payload["messages"] = openai_tool_messages(payload, message_content, function_calls)
+            response = requests.post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
             
             if response.status_code == 200:
                 response_data = response.json()
@@ -1470,8 +1523,8 @@ def handle_function_call(function_name, args):
         logger.error(f"Błąd podczas wykonywania funkcji {function_name}: {str(e)}")
         return {"success": False, "message": f"Błąd: {str(e)}"}
 
-def call_anthropic_api(message):
-    """Wywołuje API Anthropic i zwraca odpowiedź"""
+def anthropic_request(message):
+    """Przygotuj adres, nagłówki i treść zapytania do API Anthropic"""
     url = "https://api.anthropic.com/v1/messages"
     
     headers = {
@@ -1491,8 +1544,13 @@ def call_anthropic_api(message):
         ],
         "system": "Jesteś asystentem EvoDev, który pomaga użytkownikom w zadaniach programistycznych i administracyjnych."
     }
+    return url, headers, payload
+
+def call_anthropic_api(message):
+    """Wywołuje API Anthropic i zwraca odpowiedź"""
+    url, headers, payload = anthropic_request(message)
     
-    response = requests.post(url, headers=headers, json=payload)
+    response = requests.post(url, headers=headers, json=payload, timeout=LLM_TIMEOUT)
     
     if response.status_code == 200:
         response_data = response.json()
@@ -1502,17 +1560,34 @@ def call_anthropic_api(message):
         logger.error(error_message)
         raise Exception(error_message)
 
-def call_ollama_api(message):
-    """Wywołuje API Ollama i zwraca odpowiedź"""
-    url = f"{LLM_URL}/api/generate"
-    
-    payload = {
-        "model": LLM_MODEL or "llama2",
+def warm_models():
+    """Modele rozgrzewane przy starcie: EVODEV_LLM_WARM_MODELS albo model czatu LLM_MODEL"""
+    default_url = LLM_URL if LLM_PROVIDER == 'ollama' and LLM_URL else OLLAMA_URL
+    return llm_models.configured_models(default_url, llm_models.WARM_MODELS or LLM_MODEL)
+
+def default_ollama_model():
+    """Model czatu Ollama, gdy zapytanie go nie podaje - najlepiej już załadowany do pamięci"""
+    if llm_models is not None:
+        candidates = [model for url, model in warm_models() if url == OLLAMA_URL]
+        model = llm_models.get_manager().pick(OLLAMA_URL, candidates) if candidates else None
+        if model:
+            return model
+    return 'llama2'
+
+def ollama_payload(model, message):
+    """Treść zapytania /api/generate Ollama z kontekstem asystenta EvoDev"""
+    return {
+        "model": model,
         "prompt": f"Jesteś asystentem EvoDev, który pomaga użytkownikom w zadaniach programistycznych i administracyjnych. Oto zapytanie użytkownika: {message}",
         "stream": False
     }
+
+def call_ollama_api(message):
+    """Wywołuje API Ollama i zwraca odpowiedź"""
+    url = f"{LLM_URL}/api/generate"
+    payload = ollama_payload(LLM_MODEL or "llama2", message)
     
-    response = requests.post(url, json=payload)
+    response = ollama_chat_post(url, json=payload, timeout=LLM_TIMEOUT)
     
     if response.status_code == 200:
         response_data = response.json()
@@ -1522,13 +1597,65 @@ def call_ollama_api(message):
         logger.error(error_message)
         raise Exception(error_message)
 
+def stream_openai_api(relay, message):
+    """Strumieniuje odpowiedź API OpenAI; wywołane funkcje wykonywane są między dwoma strumieniami"""
+    url, headers, payload = openai_request(message)
+    payload["stream"] = True
+    function_calls = []
+    response = llm_stream.post_stream(relay, url, LLM_TIMEOUT, headers=headers, json=payload)
+    yield from llm_stream.openai_tokens(response, function_calls)
+    
+    if function_calls:
+        message_content = {"role": "assistant", "content": None, "tool_calls": function_calls}
+        payload["messages"] = openai_tool_messages(payload, message_content, function_calls)
+        response = llm_stream.post_stream(relay, url, LLM_TIMEOUT, headers=headers, json=payload)
+        yield from llm_stream.openai_tokens(response)
+
+def stream_anthropic_api(relay, message):
+    """Strumieniuje odpowiedź API Anthropic"""
+    url, headers, payload = anthropic_request(message)
+    payload["stream"] = True
+    response = llm_stream.post_stream(relay, url, LLM_TIMEOUT, headers=headers, json=payload)
+    yield from llm_stream.anthropic_tokens(response)
+
+def stream_ollama_api(relay, base_url, payload):
+    """Strumieniuje odpowiedź Ollama (NDJSON z /api/generate)"""
+    payload = dict(payload, stream=True)
+    response = llm_stream.post_stream(relay, f"{base_url}/api/generate", LLM_TIMEOUT, post=ollama_chat_post, json=payload)
+    yield from llm_stream.ollama_tokens(response)
+
+def stream_chat_response(provider, produce, on_complete=None):
+    """Odpowiedź SSE z tokenami modelu; rozłączenie klienta przerywa generowanie"""
+    relay = llm_stream.TokenRelay(provider, produce, on_complete)
+    return _limited_stream(relay.events)
+
 def start_monitoring():
-    """Uruchom wątek monitorujący w tle"""
+    """Uruchom wątek monitorujący i monitorowanie requestów Docker w tle"""
+    if has_docker_monitor:
+        try:
+            docker_monitor.start_request_monitoring()
+            logger.info("Docker request monitoring started")
+        except Exception as e:
+            logger.error(f"Failed to start Docker request monitoring: {str(e)}")
+    
+    system_sampler.get_sampler()
+    if llm_models is not None:
+        # Pobranie i załadowanie modeli w tle - pierwsze pytanie nie czeka na wczytanie modelu
+        llm_models.get_manager().start(warm_models())
     thread = threading.Thread(target=monitoring_thread)
     thread.daemon = True
     thread.start()
     logger.info("Uruchomiono wątek monitorujący")
 
+def release_resources():
+    """Zamknij połączenia z bazą i wątek zapisu przed utworzeniem procesów roboczych
+
+    Obiekty zostają zarejestrowane - w procesie roboczym połączenia i wątek
+    zapisu tworzone są ponownie przy pierwszym użyciu.
+    """
+    writer.close()
+    db.close()
+
 def main():
     """Główna funkcja uruchamiająca aplikację"""
     init_db()
@@ -1537,12 +1664,14 @@ def main():
     log_event("INFO", "monitor", "Monitor EvoDev uruchomiony", 
              {"pid": os.getpid(), "python": sys.version})
     
-    # Uruchom monitoring w tle
-    start_monitoring()
-    
-    # Uruchom aplikację Flask
+    # Uruchom aplikację; monitoring w tle startuje w dokładnie jednym procesie serwera,
+    # a SIGTERM kończy przyjmowanie połączeń i czeka na trwające żądania
     logger.info(f"Uruchamianie serwera na porcie {PORT}")
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    try:
+        server.serve(app, '0.0.0.0', PORT, on_start=start_monitoring, before_fork=release_resources)
+    finally:
+        event_writer.close_all()
+        db_pool.close_all()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Offline replay of recorded traffic through the request monitoring pipeline.
+
+Feeds a pcap file or saved `tcpdump -nn` text output (hex or -A dumps)
+through the same capture engine, writer and request statistics as the live
+monitor, without Docker, tcpdump or root. Usage:
+
+    python monitor/capture_replay.py capture.pcap [--speed 1|10|max] [--db replay.db] [--json] [--min-rps N]
+"""
+import os
+import io
+import sys
+import json
+import time
+import tempfile
+import argparse
+import logging
+from datetime import datetime
+
+import db_pool
+import event_writer
+import http_capture
+
+logger = logging.getLogger('evodev-monitor')
+
+
+def open_capture(stream, date=None):
+    """Packets from a binary stream holding either pcap or tcpdump text"""
+    if not hasattr(stream, 'peek'):
+        stream = io.BufferedReader(stream)
+    if stream.peek(4)[:4] in http_capture.PCAP_MAGIC:
+        return http_capture.read_pcap(stream)
+    return http_capture.read_tcpdump_text(stream, date=date)
+
+
+def paced(packets, speed):
+    """Yield packets no faster than `speed` times their capture rate (0 = as fast as possible)"""
+    if not speed:
+        yield from packets
+        return
+    started = first = None
+    for packet in packets:
+        if started is None:
+            started, first = time.monotonic(), packet[0]
+        else:
+            delay = started + (packet[0] - first) / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield packet
+
+
+def replay(packets, on_request, writer=None, speed=0, resolve=None, flush_timeout=300.0):
+    """Run packets through a CaptureEngine and report parse and write throughput
+
+    on_request receives every parsed request (docker_monitor.save_request in
+    the CLI); when writer is given its queue is flushed before the DB
+    figures are taken, so they cover every stored row.
+    """
+    engine = http_capture.CaptureEngine(on_request, resolve=resolve)
+    before = writer.stats() if writer is not None else None
+    started = time.perf_counter()
+    engine.run(paced(packets, speed))
+    parsed = time.perf_counter()
+    if writer is not None:
+        writer.flush(timeout=flush_timeout)
+    stored = time.perf_counter()
+
+    stats = engine.stats
+    attempts = stats["requests"] + stats["parse_errors"]
+    report = {
+        "speed": speed or "max",
+        "packets": stats["packets"],
+        "requests": stats["requests"],
+        "parse_errors": stats["parse_errors"],
+        "unmatched": stats["unmatched"],
+        "gaps": stats["gaps"],
+        "parse_seconds": round(parsed - started, 3),
+        "requests_per_second": round(stats["requests"] / (parsed - started), 1) if parsed > started else 0.0,
+        "parse_error_rate": round(stats["parse_errors"] / attempts, 6) if attempts else 0.0,
+    }
+    if writer is not None:
+        after = writer.stats()
+        written = after["written"] - before["written"]
+        report.update({
+            "rows_written": written,
+            "rows_dropped": after["dropped"] - before["dropped"],
+            "rows_failed": after["failed"] - before["failed"],
+            "write_batches": after["batches"] - before["batches"],
+            "total_seconds": round(stored - started, 3),
+            "rows_written_per_second": round(written / (stored - started), 1) if stored > started else 0.0,
+        })
+    return report
+
+
+def _speed(value):
+    if value in ('max', 'fast', '0'):
+        return 0.0
+    speed = float(value.rstrip('x'))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture', help="pcap file or saved tcpdump text ('-' for stdin)")
+    parser.add_argument('--speed', type=_speed, default=0.0,
+                        help="replay speed: 1 = real time, 10 = ten times faster, max = no pacing (default)")
+    parser.add_argument('--db', help="database for replayed requests (default: temporary, removed afterwards)")
+    parser.add_argument('--names', help="JSON file mapping IP addresses to container names")
+    parser.add_argument('--date', help="date (YYYY-MM-DD) for time-of-day timestamps in text captures")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    parser.add_argument('--min-rps', type=float, default=0.0,
+                        help="exit with status 1 when fewer requests per second are parsed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    tmpdir = None
+    if args.db is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmpdir.name, 'replay.db')
+    # docker_monitor opens its database from the environment on import
+    os.environ['MONITOR_DB'] = args.db
+    import docker_monitor
+
+    names = None
+    if args.names:
+        with open(args.names) as f:
+            names = http_capture.ContainerNames(static=json.load(f)).resolve
+    date = datetime.strptime(args.date, '%Y-%m-%d').date() if args.date else None
+
+    try:
+        stream = sys.stdin.buffer if args.capture == '-' else open(args.capture, 'rb')
+        with stream:
+            report = replay(open_capture(stream, date=date), docker_monitor.save_request,
+                            writer=docker_monitor.writer, speed=args.speed, resolve=names)
+        report["database"] = None if tmpdir is not None else args.db
+    finally:
+        event_writer.close_all()
+        db_pool.close_all()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key + ':':<26}{value}")
+    return 1 if report["requests_per_second"] < args.min_rps else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import os
+import queue
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger('evodev-monitor')
+
+# Pragmas applied to every pooled connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+    "PRAGMA busy_timeout=5000",
+)
+
+POOL_SIZE = int(os.environ.get('MONITOR_DB_POOL_SIZE', 8))
+POOL_TIMEOUT = float(os.environ.get('MONITOR_DB_POOL_TIMEOUT', 10))
+# Size of the per-connection prepared statement cache
+CACHED_STATEMENTS = int(os.environ.get('MONITOR_DB_CACHED_STATEMENTS', 256))
+
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections leased to one thread at a time"""
+
+    def __init__(self, db_path, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 cached_statements=CACHED_STATEMENTS):
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _connect(self):
+        """Open a new connection and apply the tuned pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _acquire(self):
+        """Take an idle connection, opening a new one while below the pool size"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = self._connect()
+                self._all.append(conn)
+                return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No free database connection for {self.db_path}")
+
+    @contextmanager
+    def connection(self):
+        """Lease a connection; nested calls on the same thread reuse it"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
+        self._local.depth = 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._local.depth = 0
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in a single write transaction"""
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    def execute(self, sql, params=()):
+        """Execute a single write statement and return its cursor"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        """Execute a statement for every parameter set in one transaction"""
+        with self.transaction() as conn:
+            return conn.executemany(sql, seq_of_params)
+
+    def fetchall(self, sql, params=()):
+        """Run a query and return all rows as dicts"""
+        with self.connection() as conn:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+    def fetchone(self, sql, params=()):
+        """Run a query and return the first row as a dict or None"""
+        with self.connection() as conn:
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row else None
+
+    def close(self):
+        """Close every connection owned by the pool"""
+        with self._lock:
+            connections, self._all = self._all, []
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Error closing database connection: {str(e)}")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path):
+    """Return the shared pool for a database file"""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+def close_all():
+    """Close every shared pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Try to import optional dependencies
+try:
+    import docker
+except ImportError:
+    docker = None
+
+# Shared event-driven container state from the evodev package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from evodev import container_state, docker_client
+except ImportError:
+    container_state = docker_client = None
+
+logger = logging.getLogger('evodev-monitor')
+
+# Container list cache configuration
+CACHE_TTL = float(os.environ.get('MONITOR_DOCKER_CACHE_TTL', 2.0))
+LOG_WORKERS = int(os.environ.get('MONITOR_DOCKER_LOG_WORKERS', 8))
+LOG_TAIL = int(os.environ.get('MONITOR_DOCKER_LOG_TAIL', 3))
+LOG_TIMEOUT = float(os.environ.get('MONITOR_DOCKER_LOG_TIMEOUT', 2.0))
+INSPECT_WORKERS = int(os.environ.get('MONITOR_DOCKER_INSPECT_WORKERS', 8))
+
+COMPOSE_PROJECT_LABEL = 'com.docker.compose.project'
+
+STATUS_TYPES = {
+    'running': 'running',
+    'exited': 'stopped',
+    'dead': 'stopped',
+    'created': 'created',
+    'restarting': 'restarting',
+    'paused': 'paused',
+}
+
+
+def format_ports(ports):
+    """Format the Ports field of the list API the way `docker ps` prints it"""
+    formatted = []
+    for port in ports or []:
+        if port.get('PublicPort'):
+            formatted.append(f"{port.get('IP', '0.0.0.0')}:{port['PublicPort']}->{port['PrivatePort']}/{port['Type']}")
+        else:
+            formatted.append(f"{port['PrivatePort']}/{port['Type']}")
+    return ", ".join(formatted)
+
+
+class ContainerLister:
+    """Cached container list on one long-lived Docker client
+
+    The list is refreshed at most once per TTL and is invalidated early by
+    change notifications from events_source (a ContainerStateCache). Log tails
+    are fetched concurrently on a bounded pool.
+    """
+
+    def __init__(self, client_factory=None, ttl=CACHE_TTL, log_workers=LOG_WORKERS, log_tail=LOG_TAIL,
+                 events_source=None):
+        self.client_factory = client_factory or get_client
+        self.ttl = ttl
+        self.log_tail = log_tail
+        self._executor = ThreadPoolExecutor(max_workers=log_workers, thread_name_prefix='docker-logs')
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._cache = {}
+        self.refreshes = 0
+        self.invalidations = 0
+        self._unsubscribe = events_source.subscribe(lambda *change: self.invalidate()) if events_source else None
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def _reset_client(self):
+        with self._client_lock:
+            self._client = None
+
+    def invalidate(self):
+        """Drop cached lists so the next call reads the Docker API again"""
+        self._cache = {}
+        self.invalidations += 1
+
+    def _tail(self, container):
+        try:
+            return container.logs(tail=self.log_tail).decode('utf-8', errors='replace')
+        except Exception:
+            return ""
+
+    def _fetch(self, with_logs):
+        containers = self.client.containers.list(all=True, sparse=True)
+        tails = {}
+        if with_logs and containers:
+            futures = {c.id: self._executor.submit(self._tail, c) for c in containers}
+            deadline = time.monotonic() + LOG_TIMEOUT
+            for container_id, future in futures.items():
+                try:
+                    tails[container_id] = future.result(timeout=max(0, deadline - time.monotonic()))
+                except Exception:
+                    tails[container_id] = ""
+
+        result = []
+        for container in containers:
+            attrs = container.attrs
+            names = attrs.get('Names') or [attrs.get('Name', '')]
+            state = attrs.get('State', '')
+            result.append({
+                "id": container.id[:12],
+                "name": names[0].lstrip('/'),
+                "status": attrs.get('Status', state),
+                "status_type": STATUS_TYPES.get(state, 'running'),
+                "image": attrs.get('Image', ''),
+                "ports": format_ports(attrs.get('Ports')),
+                "logs": tails.get(container.id, "")
+            })
+        return result
+
+    def list(self, with_logs=True):
+        """Return containers in the format used by /api/docker, from cache when fresh"""
+        entry = self._cache.get(with_logs)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        # Only one thread refreshes; concurrent callers reuse its result
+        with self._refresh_lock:
+            entry = self._cache.get(with_logs)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            generation = self.invalidations
+            try:
+                started = time.monotonic()
+                containers = self._fetch(with_logs)
+            except Exception:
+                self._reset_client()
+                raise
+            self.refreshes += 1
+            # An event that arrived during the fetch may not be reflected in it
+            if generation == self.invalidations:
+                self._cache[with_logs] = (started, containers)
+                if with_logs:
+                    # A list with logs also answers callers that only need states
+                    self._cache[False] = (started, containers)
+            return containers
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+        self._executor.shutdown(wait=False)
+
+
+class ProjectIndex:
+    """Inspected containers of compose projects, keyed by the project label
+
+    Each project is read with a label-filtered list, so containers of other
+    projects are never inspected, and its containers are inspected
+    concurrently. Project names match case-insensitively. Entries live for the TTL and are dropped early when
+    events_source reports a change to a container of that project.
+    """
+
+    def __init__(self, client_factory=None, ttl=CACHE_TTL, workers=INSPECT_WORKERS, events_source=None):
+        self.client_factory = client_factory or get_client
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='docker-inspect')
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._refresh_locks = {}
+        self._index_lock = threading.Lock()
+        self._index = {}
+        self._generations = {}
+        self.refreshes = 0
+        self.invalidations = 0
+        self._unsubscribe = events_source.subscribe(self._changed) if events_source else None
+
+    @property
+    def client(self):
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            return self._client
+
+    def _reset_client(self):
+        with self._client_lock:
+            self._client = None
+
+    def _changed(self, action, record, previous):
+        projects = {(r.get('labels') or {}).get(COMPOSE_PROJECT_LABEL) for r in (record, previous) if r}
+        for project in projects:
+            if project:
+                self.invalidate(project)
+
+    def invalidate(self, project=None):
+        """Drop one project (or every project) so the next read lists it again"""
+        project = project.lower() if project is not None else None
+        with self._index_lock:
+            index = {} if project is None else {k: v for k, v in self._index.items() if k != project}
+            self._index = index
+            self._generations[project] = self._generations.get(project, 0) + 1
+            self.invalidations += 1
+
+    def _generation(self, project):
+        return self._generations.get(project, 0), self._generations.get(None, 0)
+
+    def _inspect(self, container_id):
+        try:
+            return self.client.api.inspect_container(container_id)
+        except Exception as e:
+            logger.error(f"Error inspecting container {container_id[:12]}: {str(e)}")
+            return None
+
+    def _fetch(self, project):
+        # The label filter matches values exactly, so list every compose container
+        # (the list is cheap) and compare project names in lower case before inspecting
+        containers = self.client.api.containers(all=True, filters={'label': COMPOSE_PROJECT_LABEL})
+        ids = [c['Id'] for c in containers
+               if (c.get('Labels') or {}).get(COMPOSE_PROJECT_LABEL, '').lower() == project]
+        inspected = self._executor.map(self._inspect, ids)
+        return [info for info in inspected if info is not None]
+
+    def get(self, project):
+        """Return inspect results for the containers of a compose project, from cache when fresh"""
+        project = project.lower()
+        entry = self._index.get(project)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        lock = self._refresh_locks.setdefault(project, threading.Lock())
+        with lock:
+            entry = self._index.get(project)
+            if entry and time.monotonic() - entry[0] < self.ttl:
+                return entry[1]
+            generation = self._generation(project)
+            try:
+                started = time.monotonic()
+                containers = self._fetch(project)
+            except Exception:
+                self._reset_client()
+                raise
+            self.refreshes += 1
+            # An event that arrived during the fetch may not be reflected in it
+            with self._index_lock:
+                if generation == self._generation(project):
+                    index = dict(self._index)
+                    index[project] = (started, containers)
+                    self._index = index
+            return containers
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+        self._executor.shutdown(wait=False)
+
+
+_client = None
+_lister = None
+_project_index = None
+_lister_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide Docker client (the shared evodev client when available)"""
+    global _client
+    if docker_client is not None:
+        return docker_client.get_client()
+    with _lister_lock:
+        if _client is None:
+            if docker is None:
+                raise RuntimeError("docker module not available")
+            _client = docker.from_env()
+        return _client
+
+
+def get_state_cache():
+    """Return the shared container state cache, or None when it cannot be started"""
+    if container_state is None:
+        return None
+    try:
+        return container_state.get_cache(get_client())
+    except Exception as e:
+        logger.error(f"Container state cache unavailable: {str(e)}")
+        return None
+
+
+def get_lister():
+    """Return the process-wide container lister"""
+    global _lister
+    client = get_client()
+    events_source = get_state_cache()
+    with _lister_lock:
+        if _lister is None:
+            _lister = ContainerLister(client_factory=lambda: client, events_source=events_source)
+        return _lister
+
+
+def get_project_index():
+    """Return the process-wide compose project index"""
+    global _project_index
+    client = get_client()
+    events_source = get_state_cache()
+    with _lister_lock:
+        if _project_index is None:
+            _project_index = ProjectIndex(client_factory=lambda: client, events_source=events_source)
+        return _project_index
@@ -1,27 +1,44 @@
 #!/usr/bin/env python3
 import os
 import json
-import time
-import sqlite3
 import logging
 import threading
 import subprocess
 import docker
-from datetime import datetime
 import re
+import db_pool
+import event_writer
+import docker_containers
+import request_stats
+import http_capture
 
 logger = logging.getLogger('evodev-monitor')
 
 # Database configuration
 DB_PATH = os.environ.get('MONITOR_DB', 'monitor.db')
+db = db_pool.get_pool(DB_PATH)
+writer = event_writer.get_writer(DB_PATH)
+
+# Capture configuration
+NETWORK = os.environ.get('MONITOR_NETWORK', 'evodev_default')
+CAPTURE_INTERFACE = os.environ.get('MONITOR_CAPTURE_INTERFACE')
+
+# Web interface discovery
+COMPOSE_PROJECT = os.environ.get('MONITOR_COMPOSE_PROJECT', 'evodev')
+WEB_PORTS = ('80', '8080', '3000', '443', '4000', '5000', '8000', '8888', '9000')
+WEB_APP_NAMES = ('web', 'ui', 'app', 'frontend', 'dashboard', 'chat', 'rocket')
+
+INSERT_REQUEST_SQL = '''
+INSERT INTO docker_requests 
+(timestamp, source_container, destination_container, request_type, 
+request_path, status_code, response_time, request_size, response_size)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
 
 def init_db():
     """Initialize the database for Docker request monitoring"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
     # Create table for Docker requests
-    cursor.execute('''
+    db.execute('''
     CREATE TABLE IF NOT EXISTS docker_requests (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT,
@@ -36,8 +53,9 @@ def init_db():
     )
     ''')
     
-    conn.commit()
-    conn.close()
+    # Aggregates are updated in the same transaction as each batch of inserts
+    request_stats.init_schema(db)
+    writer.add_hook(INSERT_REQUEST_SQL, request_stats.apply)
 
 def start_request_monitoring():
     """Start monitoring Docker container network requests"""
@@ -57,119 +75,73 @@ def start_request_monitoring():
         return False
 
 def _monitor_network_traffic():
-    """Monitor network traffic between Docker containers using tcpdump"""
+    """Capture HTTP traffic between Docker containers with tcpdump and record each request"""
     try:
-        client = docker.from_env()
-        network = client.networks.list(names=['evodev_default'])[0]
+        client = docker_containers.get_client()
         
-        # Get container IPs
-        container_ips = {}
-        for container in client.containers.list():
-            try:
-                container_info = client.api.inspect_container(container.id)
-                if 'evodev_default' in container_info['NetworkSettings']['Networks']:
-                    ip = container_info['NetworkSettings']['Networks']['evodev_default']['IPAddress']
-                    container_ips[ip] = container.name
-            except Exception as e:
-                logger.error(f"Error getting container IP: {str(e)}")
+        # Container names follow Docker events through the shared state cache
+        state = docker_containers.get_state_cache()
+        if state is not None and state.wait_ready(timeout=10):
+            names = http_capture.ContainerNames(state, NETWORK)
+        else:
+            names = http_capture.ContainerNames(static=_container_ips(client))
         
-        # Start tcpdump to capture HTTP traffic
+        # pcap output keeps packet boundaries and payload bytes intact
         cmd = [
-            "tcpdump", 
-            "-i", "docker0", 
-            "-nn", 
-            "-A",
-            "tcp port 80 or tcp port 8080 or tcp port 3000 or tcp port 443",
-            "-l"
+            "tcpdump",
+            "-i", _capture_interface(client),
+            "-nn",
+            "-s", "0",
+            "-U",
+            "-w", "-",
+            http_capture.CAPTURE_FILTER
         ]
         
         process = subprocess.Popen(
-            cmd, 
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE,
-            universal_newlines=True
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
         )
         
-        # Process tcpdump output
-        current_request = {}
-        for line in process.stdout:
-            try:
-                # Parse tcpdump output to extract request information
-                if "HTTP/" in line:
-                    # Extract source and destination IPs
-                    parts = line.split()
-                    if len(parts) >= 5:
-                        src_ip = parts[2].split('.')[0:4]
-                        src_ip = '.'.join(src_ip)
-                        dst_ip = parts[4].split('.')[0:4]
-                        dst_ip = '.'.join(dst_ip)
-                        
-                        # Map IPs to container names
-                        src_container = container_ips.get(src_ip, src_ip)
-                        dst_container = container_ips.get(dst_ip, dst_ip)
-                        
-                        # Extract request type and path
-                        if "GET" in line:
-                            req_type = "GET"
-                            path = line.split("GET ")[1].split(" HTTP")[0]
-                        elif "POST" in line:
-                            req_type = "POST"
-                            path = line.split("POST ")[1].split(" HTTP")[0]
-                        elif "PUT" in line:
-                            req_type = "PUT"
-                            path = line.split("PUT ")[1].split(" HTTP")[0]
-                        elif "DELETE" in line:
-                            req_type = "DELETE"
-                            path = line.split("DELETE ")[1].split(" HTTP")[0]
-                        else:
-                            # Response
-                            if "HTTP/" in line and "200" in line:
-                                status_code = 200
-                            elif "HTTP/" in line and "404" in line:
-                                status_code = 404
-                            elif "HTTP/" in line and "500" in line:
-                                status_code = 500
-                            else:
-                                status_code = 0
-                            
-                            if current_request:
-                                current_request["status_code"] = status_code
-                                current_request["timestamp"] = datetime.now().isoformat()
-                                current_request["response_time"] = time.time() - current_request.get("start_time", time.time())
-                                
-                                # Save to database
-                                save_request(current_request)
-                                current_request = {}
-                            continue
-                        
-                        # Create new request
-                        current_request = {
-                            "source_container": src_container,
-                            "destination_container": dst_container,
-                            "request_type": req_type,
-                            "request_path": path,
-                            "start_time": time.time(),
-                            "request_size": len(line),
-                            "response_size": 0
-                        }
-            except Exception as e:
-                logger.error(f"Error processing network traffic: {str(e)}")
+        engine = http_capture.CaptureEngine(save_request, resolve=names.resolve)
+        try:
+            engine.run(http_capture.read_pcap(process.stdout))
+        finally:
+            names.close()
+            process.kill()
+        logger.warning(f"Network capture ended: {engine.stats}")
     
     except Exception as e:
         logger.error(f"Error in network traffic monitoring: {str(e)}")
 
+def _container_ips(client):
+    """One-off IP -> name map, used when the container state cache is unavailable"""
+    container_ips = {}
+    for container in client.containers.list():
+        try:
+            networks = container.attrs['NetworkSettings']['Networks']
+            if NETWORK in networks:
+                container_ips[networks[NETWORK]['IPAddress']] = container.name
+        except Exception as e:
+            logger.error(f"Error getting container IP: {str(e)}")
+    return container_ips
+
+def _capture_interface(client):
+    """Bridge interface of the monitored network (compose networks use br-<id>, not docker0)"""
+    if CAPTURE_INTERFACE:
+        return CAPTURE_INTERFACE
+    try:
+        network = client.networks.get(NETWORK)
+        options = network.attrs.get('Options') or {}
+        return options.get('com.docker.network.bridge.name') or f"br-{network.id[:12]}"
+    except Exception as e:
+        logger.error(f"Error resolving capture interface for {NETWORK}: {str(e)}")
+        return "docker0"
+
 def save_request(request_data):
-    """Save request information to the database"""
+    """Queue request information for the background database writer"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-        INSERT INTO docker_requests 
-        (timestamp, source_container, destination_container, request_type, 
-        request_path, status_code, response_time, request_size, response_size)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        queued = writer.submit(INSERT_REQUEST_SQL, (
             request_data.get("timestamp"),
             request_data.get("source_container"),
             request_data.get("destination_container"),
@@ -180,84 +152,35 @@ def save_request(request_data):
             request_data.get("request_size", 0),
             request_data.get("response_size", 0)
         ))
-        
-        conn.commit()
-        conn.close()
+        if not queued:
+            logger.debug("Request writer queue full, request dropped")
     except Exception as e:
         logger.error(f"Error saving request to database: {str(e)}")
 
 def get_recent_requests(limit=100):
     """Get recent Docker container requests"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        requests = db.fetchall('''
         SELECT * FROM docker_requests
         ORDER BY timestamp DESC
         LIMIT ?
         ''', (limit,))
         
-        rows = cursor.fetchall()
-        requests = [dict(row) for row in rows]
-        
-        conn.close()
         return requests
     except Exception as e:
         logger.error(f"Error getting recent requests: {str(e)}")
         return []
 
-def get_request_stats():
-    """Get statistics about Docker container requests"""
+def get_request_stats(minutes=None):
+    """Get statistics about Docker container requests from the aggregate tables
+
+    With minutes set only the last N minute buckets are summed; otherwise the
+    all-time totals are returned. Raises ValueError for an invalid window.
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
-        # Get container interaction counts
-        cursor.execute('''
-        SELECT 
-            source_container, 
-            destination_container, 
-            COUNT(*) as request_count,
-            AVG(response_time) as avg_response_time
-        FROM docker_requests
-        GROUP BY source_container, destination_container
-        ORDER BY request_count DESC
-        ''')
-        
-        interactions = [dict(row) for row in cursor.fetchall()]
-        
-        # Get request types distribution
-        cursor.execute('''
-        SELECT 
-            request_type, 
-            COUNT(*) as count
-        FROM docker_requests
-        GROUP BY request_type
-        ''')
-        
-        request_types = [dict(row) for row in cursor.fetchall()]
-        
-        # Get status code distribution
-        cursor.execute('''
-        SELECT 
-            status_code, 
-            COUNT(*) as count
-        FROM docker_requests
-        GROUP BY status_code
-        ''')
-        
-        status_codes = [dict(row) for row in cursor.fetchall()]
-        
-        conn.close()
-        
-        return {
-            "interactions": interactions,
-            "request_types": request_types,
-            "status_codes": status_codes
-        }
+        return request_stats.query(db, minutes=minutes)
+    except ValueError:
+        raise
     except Exception as e:
         logger.error(f"Error getting request stats: {str(e)}")
         return {
@@ -266,30 +189,31 @@ def get_request_stats():
             "status_codes": []
         }
 
+def prune_request_stats():
+    """Remove minute buckets of request statistics outside the retention window"""
+    return request_stats.prune(db)
+
+def _image_name(container_info, state):
+    """Image tag from the container state cache, without a per-container image lookup"""
+    image_id = container_info.get('Image', '')
+    tags = state.image_tags(image_id) if state is not None and state.ready else []
+    if tags:
+        return tags[0]
+    return (container_info.get('Config') or {}).get('Image') or image_id
+
 def get_container_web_interfaces():
     """Get information about web interfaces for Docker containers"""
     try:
-        client = docker.from_env()
-        containers = client.containers.list(all=True)  # Pobierz wszystkie kontenery, nie tylko uruchomione
+        # Tylko kontenery projektu EvoDev: lista filtrowana etykietą, inspect równolegle, wynik w cache
+        containers = docker_containers.get_project_index().get(COMPOSE_PROJECT)
+        state = docker_containers.get_state_cache()
         
         web_interfaces = []
         
-        for container in containers:
+        for container_info in containers:
+            container_name = container_info.get('Name', '').lstrip('/')
             try:
-                container_info = client.api.inspect_container(container.id)
-                
-                # Sprawdź, czy kontener należy do projektu EvoDev
-                labels = container_info['Config']['Labels']
-                is_evodev = False
-                
-                if labels and ('com.docker.compose.project' in labels):
-                    project = labels['com.docker.compose.project']
-                    if project.lower() == 'evodev':
-                        is_evodev = True
-                
-                # Jeśli nie jest częścią projektu EvoDev, pomijamy
-                if not is_evodev:
-                    continue
+                labels = container_info['Config']['Labels'] or {}
                 
                 # Pobierz informacje o portach
                 ports = container_info['NetworkSettings']['Ports']
@@ -301,7 +225,7 @@ def get_container_web_interfaces():
                         if bindings:
                             port_number = port.split('/')[0]
                             # Sprawdź, czy to potencjalnie port webowy (80, 8080, 3000, 443, etc.)
-                            if port_number in ['80', '8080', '3000', '443', '4000', '5000', '8000', '8888', '9000']:
+                            if port_number in WEB_PORTS:
                                 host_port = bindings[0]['HostPort']
                                 protocol = 'https' if port_number == '443' else 'http'
                                 web_ports.append({
@@ -314,36 +238,34 @@ def get_container_web_interfaces():
                 is_web_app = False
                 app_type = None
                 
-                if labels:
-                    if 'com.docker.compose.service' in labels:
-                        service_name = labels['com.docker.compose.service']
-                        if any(web_app in service_name.lower() for web_app in ['web', 'ui', 'app', 'frontend', 'dashboard', 'chat', 'rocket']):
-                            is_web_app = True
-                            app_type = service_name
+                if 'com.docker.compose.service' in labels:
+                    service_name = labels['com.docker.compose.service']
+                    if any(web_app in service_name.lower() for web_app in WEB_APP_NAMES):
+                        is_web_app = True
+                        app_type = service_name
                 
                 # Sprawdź nazwę kontenera, czy wskazuje na aplikację webową
-                container_name = container.name.lower()
-                if any(web_app in container_name for web_app in ['web', 'ui', 'app', 'frontend', 'dashboard', 'chat', 'rocket']):
+                if any(web_app in container_name.lower() for web_app in WEB_APP_NAMES):
                     is_web_app = True
-                    app_type = app_type or re.sub(r'[^a-zA-Z0-9]', '', container_name)
+                    app_type = app_type or re.sub(r'[^a-zA-Z0-9]', '', container_name.lower())
                 
                 # Dodaj wszystkie kontenery EvoDev, niezależnie od tego, czy mają interfejs webowy
                 web_interfaces.append({
-                    'id': container.id,
-                    'name': container.name,
-                    'status': container.status,
+                    'id': container_info['Id'],
+                    'name': container_name,
+                    'status': container_info['State'].get('Status', 'unknown'),
                     'web_ports': web_ports,
                     'is_web_app': is_web_app or len(web_ports) > 0,
-                    'app_type': app_type or (labels.get('com.docker.compose.service') if labels else None),
-                    'image': container.image.tags[0] if container.image.tags else str(container.image.id),
-                    'restart_count': container_info['RestartCount'] if 'RestartCount' in container_info else 0,
-                    'created': container_info['Created'],
+                    'app_type': app_type or labels.get('com.docker.compose.service'),
+                    'image': _image_name(container_info, state),
+                    'restart_count': container_info.get('RestartCount', 0),
+                    'created': container_info.get('Created', ''),
                     'started_at': container_info['State'].get('StartedAt', ''),
                     'is_evodev': True
                 })
             
             except Exception as e:
-                logger.error(f"Error getting web interface info for container {container.name}: {str(e)}")
+                logger.error(f"Error getting web interface info for container {container_name}: {str(e)}")
         
         return web_interfaces
     
@@ -354,7 +276,7 @@ def get_container_web_interfaces():
 def get_container_logs(container_id, lines=100):
     """Get logs for a specific Docker container"""
     try:
-        client = docker.from_env()
+        client = docker_containers.get_client()
         container = client.containers.get(container_id)
         
         # Pobierz informacje o kontenerze
@@ -395,7 +317,7 @@ def get_container_logs(container_id, lines=100):
 def container_action(container_id, action):
     """Perform action on a Docker container (start, stop, restart)"""
     try:
-        client = docker.from_env()
+        client = docker_containers.get_client()
         
         try:
             container = client.containers.get(container_id)
@@ -8,7 +8,7 @@ import email.mime.multipart
 import subprocess
 import logging
 import json
-import docker
+import docker_containers
 from pathlib import Path
 
 logger = logging.getLogger('evodev-monitor')
@@ -59,12 +59,9 @@ def install_email_dependencies():
 def check_email_docker():
     """Check if email docker container is running"""
     try:
-        client = docker.from_env()
-        containers = client.containers.list()
-        for container in containers:
-            if 'mailserver' in container.name and container.status == 'running':
-                return True
-        return False
+        client = docker_containers.get_client()
+        # Filtr po stronie demona zamiast pobierania pełnej listy kontenerów
+        return bool(client.api.containers(filters={'name': 'mailserver', 'status': 'running'}))
     except Exception as e:
         logger.error(f"Error checking docker containers: {str(e)}")
         return False
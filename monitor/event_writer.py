@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+import db_pool
+
+logger = logging.getLogger('evodev-monitor')
+
+# Writer configuration
+QUEUE_SIZE = int(os.environ.get('MONITOR_WRITER_QUEUE_SIZE', 10000))
+BATCH_SIZE = int(os.environ.get('MONITOR_WRITER_BATCH_SIZE', 500))
+FLUSH_INTERVAL_MS = int(os.environ.get('MONITOR_WRITER_FLUSH_MS', 250))
+# How long a producer waits for queue space before the row is dropped
+PUT_TIMEOUT_MS = int(os.environ.get('MONITOR_WRITER_PUT_TIMEOUT_MS', 50))
+
+
+class BatchWriter:
+    """Background writer that commits queued INSERTs in one transaction per batch"""
+
+    def __init__(self, pool, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval_ms=FLUSH_INTERVAL_MS, put_timeout_ms=PUT_TIMEOUT_MS):
+        self.pool = pool
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._hooks = {}
+        self._stats = {
+            "queued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "batches": 0
+        }
+
+    def start(self):
+        """Start the writer thread if it is not running yet"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='monitor-batch-writer')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def add_hook(self, sql, hook):
+        """Call hook(conn, rows) inside the batch transaction after the rows of sql are inserted
+
+        A failing hook rolls back the whole batch, so derived tables never
+        diverge from the rows they are computed from.
+        """
+        with self._lock:
+            hooks = self._hooks.setdefault(sql, [])
+            if hook not in hooks:
+                hooks.append(hook)
+
+    def submit(self, sql, params=()):
+        """Queue a write; returns False when the row was dropped because the queue is full"""
+        self.start()
+        try:
+            if self.put_timeout > 0:
+                self._queue.put((sql, params), timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait((sql, params))
+        except queue.Full:
+            self._count("dropped")
+            return False
+        self._count("queued")
+        return True
+
+    def flush(self, timeout=5.0):
+        """Wait until every queued row has been written"""
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=5.0):
+        """Flush pending rows and stop the writer thread"""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def stats(self):
+        """Return writer counters and the current queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pending"] = self._queue.qsize()
+        return stats
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _run(self):
+        """Writer loop: drain the queue in batches until stopped and empty"""
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+
+    def _next_batch(self):
+        """Collect up to batch_size rows, waiting at most flush_interval for the batch to fill"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if self._stop.is_set():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """Write a batch in a single transaction, grouping consecutive rows by statement"""
+        try:
+            with self.pool.transaction() as conn:
+                start = 0
+                while start < len(batch):
+                    sql = batch[start][0]
+                    end = start
+                    while end < len(batch) and batch[end][0] == sql:
+                        end += 1
+                    rows = [params for _, params in batch[start:end]]
+                    conn.executemany(sql, rows)
+                    for hook in self._hooks.get(sql, ()):
+                        hook(conn, rows)
+                    start = end
+            self._count("written", len(batch))
+            self._count("batches")
+        except Exception as e:
+            self._count("failed", len(batch))
+            logger.error(f"Error writing batch of {len(batch)} rows: {str(e)}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(db_path):
+    """Return the shared batch writer for a database file"""
+    key = os.path.abspath(db_path)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = BatchWriter(db_pool.get_pool(db_path))
+            _writers[key] = writer
+        return writer
+
+
+def close_all(timeout=5.0):
+    """Flush and stop every shared writer"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close(timeout)
+
+
+atexit.register(close_all)
@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+import os
+import re
+import socket
+import struct
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+
+logger = logging.getLogger('evodev-monitor')
+
+# Capture configuration
+CAPTURE_FILTER = os.environ.get('MONITOR_CAPTURE_FILTER', 'tcp port 80 or tcp port 8080 or tcp port 3000')
+MAX_FLOWS = int(os.environ.get('MONITOR_CAPTURE_MAX_FLOWS', 10000))
+# Flows without packets for this long are closed (seconds of capture time)
+FLOW_TIMEOUT = float(os.environ.get('MONITOR_CAPTURE_FLOW_TIMEOUT', 120))
+# Out-of-order bytes buffered per direction before the missing data is given up on
+MAX_REORDER_BYTES = int(os.environ.get('MONITOR_CAPTURE_REORDER_BYTES', 256 * 1024))
+# Requests a client may pipeline before the oldest is considered unanswered
+MAX_PIPELINE = 64
+MAX_HEAD_BYTES = 64 * 1024
+EXPIRE_EVERY = 4096
+
+# Ports treated as the server side when a flow is picked up without its SYN
+SERVER_PORTS = frozenset([80, 3000, 4000, 5000, 8000, 8080, 8888, 9000])
+
+METHODS = frozenset([b'GET', b'POST', b'PUT', b'DELETE', b'HEAD', b'OPTIONS', b'PATCH', b'CONNECT', b'TRACE'])
+
+# pcap magic -> (byte order, timestamp fraction unit)
+PCAP_MAGIC = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+}
+
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+
+TCP_FIN, TCP_SYN, TCP_RST, TCP_ACK = 0x01, 0x02, 0x04, 0x10
+
+# Parser states of one direction of a connection
+HEAD, BODY, CHUNK_SIZE, CHUNK_DATA, TRAILER, UNTIL_CLOSE, LOST, OPAQUE = range(8)
+
+_u16 = struct.Struct('!H')
+_tcp = struct.Struct('!HHIIH')
+
+# Saved `tcpdump -nn` text: a summary line per packet followed by a hex (-x/-xx/-X) or ASCII (-A) dump
+TEXT_PACKET = re.compile(
+    r'^(?P<time>\S+(?: \d\d:\d\d:\d\d\.\d+)?) .*?\bIP6? (?P<src>[0-9a-fA-F.:]+)\.(?P<sport>\d+) > '
+    r'(?P<dst>[0-9a-fA-F.:]+)\.(?P<dport>\d+): Flags \[(?P<flags>[^\]]*)\](?P<rest>.*)$'
+)
+TEXT_HEX = re.compile(r'^\s+0x[0-9a-f]+:\s+(.*)$')
+TEXT_SEQ = re.compile(r'\bseq (\d+)')
+TEXT_LENGTH = re.compile(r'\blength (\d+)')
+TEXT_START_LINE = re.compile(rb'(?:GET|POST|PUT|DELETE|HEAD|OPTIONS|PATCH|CONNECT|TRACE) \S+ HTTP/1\.\d|HTTP/1\.\d \d{3}')
+TEXT_FLAGS = {'F': TCP_FIN, 'S': TCP_SYN, 'R': TCP_RST, '.': TCP_ACK}
+
+
+def read_pcap(stream):
+    """Yield (timestamp, linktype, frame) from a pcap byte stream (`tcpdump -w -` or a file)"""
+    header = _read_exact(stream, 24)
+    if header is None:
+        return
+    if header[:4] not in PCAP_MAGIC:
+        raise ValueError("Not a pcap stream (pcapng captures must be converted with `tcpdump -r in -w out`)")
+    order, unit = PCAP_MAGIC[header[:4]]
+    linktype = struct.unpack(order + 'I', header[20:24])[0] & 0x0fffffff
+    record = struct.Struct(order + 'IIII')
+    while True:
+        head = _read_exact(stream, 16)
+        if head is None:
+            return
+        seconds, fraction, caplen, _ = record.unpack(head)
+        frame = _read_exact(stream, caplen)
+        if frame is None:
+            return
+        yield seconds + fraction * unit, linktype, frame
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    while data is not None and 0 < len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    if not data or len(data) < size:
+        return None
+    return data
+
+
+def read_tcpdump_text(lines, date=None):
+    """Yield (timestamp, linktype, frame) from saved `tcpdump -nn` text output
+
+    Hex dumps (-x, -xx, -X) are decoded exactly. ASCII dumps (-A) are lossy:
+    tcpdump prints non-printable bytes as '.' and CR LF as a line break, so
+    the payload is rebuilt from the HTTP start line with CR LF endings and
+    padded to the reported length. Handshakes are skipped for -A input
+    because the sequence numbers after them are relative. Time-of-day
+    timestamps are placed on `date` (default today).
+    """
+    date = date or datetime.now().date()
+    header, hex_parts, text = None, [], []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('latin-1')
+        line = line.rstrip('\r\n')
+        match = TEXT_PACKET.match(line)
+        if match is None:
+            if header is not None:
+                hex_line = TEXT_HEX.match(line)
+                if hex_line and not text:
+                    # -X appends an ASCII column after two spaces
+                    hex_parts.append(hex_line.group(1).split('  ')[0].replace(' ', ''))
+                else:
+                    text.append(line)
+            continue
+        if header is not None:
+            packet = _text_packet(header, hex_parts, text, date)
+            if packet is not None:
+                yield packet
+        header, hex_parts, text = match, [], []
+    if header is not None:
+        packet = _text_packet(header, hex_parts, text, date)
+        if packet is not None:
+            yield packet
+
+
+def _text_time(value, date):
+    if ':' not in value:
+        return float(value)
+    if ' ' in value:
+        return datetime.strptime(value, '%Y-%m-%d %H:%M:%S.%f').timestamp()
+    return datetime.combine(date, datetime.strptime(value, '%H:%M:%S.%f').time()).timestamp()
+
+
+def _text_packet(header, hex_parts, text, date):
+    try:
+        ts = _text_time(header.group('time'), date)
+    except ValueError:
+        return None
+    if hex_parts:
+        frame = bytes.fromhex(''.join(hex_parts))
+        # -x starts at the IP header, -xx at the link-layer header
+        is_ip = frame and (0x45 <= frame[0] <= 0x4f or frame[0] >> 4 == 6)
+        return ts, LINKTYPE_RAW if is_ip else LINKTYPE_ETHERNET, frame
+
+    rest = header.group('rest')
+    flags = 0
+    for flag in header.group('flags'):
+        flags |= TEXT_FLAGS.get(flag, 0)
+    length = TEXT_LENGTH.search(rest)
+    length = int(length.group(1)) if length else 0
+    seq = TEXT_SEQ.search(rest)
+    if flags & TCP_SYN or seq is None or not (length or flags & (TCP_FIN | TCP_RST)):
+        return None
+
+    payload = b''
+    if length:
+        data = '\n'.join(text).encode('latin-1').replace(b'\n', b'\r\n')
+        start = TEXT_START_LINE.search(data)
+        data = data[start.start():] if start else data[-length:]
+        payload = data[:length].ljust(length, b'.')
+    frame = _ip_frame(header.group('src'), int(header.group('sport')), header.group('dst'),
+                      int(header.group('dport')), int(seq.group(1)), flags, payload)
+    return ts, LINKTYPE_RAW, frame
+
+
+def _ip_frame(src, sport, dst, dport, seq, flags, payload):
+    """Raw IPv4/IPv6 + TCP packet (checksums left at zero) for a packet known only from text"""
+    tcp = struct.pack('!HHIIBBHHH', sport, dport, seq & 0xffffffff, 0, 5 << 4, flags, 65535, 0, 0)
+    if ':' in src:
+        return struct.pack('!IHBB16s16s', 6 << 28, len(tcp) + len(payload), socket.IPPROTO_TCP, 64,
+                           socket.inet_pton(socket.AF_INET6, src), socket.inet_pton(socket.AF_INET6, dst)) + tcp + payload
+    return struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp) + len(payload), 0, 0, 64, socket.IPPROTO_TCP, 0,
+                       socket.inet_aton(src), socket.inet_aton(dst)) + tcp + payload
+
+
+def decode_tcp(linktype, frame):
+    """Return (src, sport, dst, dport, seq, flags, payload) for a TCP/IP frame, else None
+
+    Addresses are returned as packed bytes; fragments and non-TCP packets are skipped.
+    """
+    if linktype == LINKTYPE_ETHERNET:
+        ethertype = _u16.unpack_from(frame, 12)[0]
+        offset = 14
+        while ethertype in ETHERTYPE_VLAN:
+            ethertype = _u16.unpack_from(frame, offset + 2)[0]
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        ethertype, offset = _u16.unpack_from(frame, 14)[0], 16
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        ethertype, offset = _u16.unpack_from(frame, 0)[0], 20
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        ethertype = ETHERTYPE_IPV6 if frame[0] >> 4 == 6 else ETHERTYPE_IPV4
+        offset = 0
+    elif linktype == LINKTYPE_NULL:
+        ethertype = ETHERTYPE_IPV6 if frame[4] >> 4 == 6 else ETHERTYPE_IPV4
+        offset = 4
+    else:
+        return None
+
+    if ethertype == ETHERTYPE_IPV4:
+        if frame[offset + 9] != socket.IPPROTO_TCP:
+            return None
+        # More-fragments flag or a fragment offset
+        if _u16.unpack_from(frame, offset + 6)[0] & 0x3fff:
+            return None
+        end = offset + _u16.unpack_from(frame, offset + 2)[0]
+        src, dst = frame[offset + 12:offset + 16], frame[offset + 16:offset + 20]
+        tcp = offset + (frame[offset] & 0x0f) * 4
+    elif ethertype == ETHERTYPE_IPV6:
+        # Extension headers are not followed; TCP must be the next header
+        if frame[offset + 6] != socket.IPPROTO_TCP:
+            return None
+        end = offset + 40 + _u16.unpack_from(frame, offset + 4)[0]
+        src, dst = frame[offset + 8:offset + 24], frame[offset + 24:offset + 40]
+        tcp = offset + 40
+    else:
+        return None
+
+    sport, dport, seq, _, offset_flags = _tcp.unpack_from(frame, tcp)
+    payload = frame[tcp + (offset_flags >> 12) * 4:end]
+    return src, sport, dst, dport, seq, offset_flags & 0x3f, payload
+
+
+def _address(packed):
+    return socket.inet_ntop(socket.AF_INET if len(packed) == 4 else socket.AF_INET6, packed)
+
+
+class HttpMessage:
+    """A request or response being parsed; size counts head and body bytes"""
+
+    __slots__ = ('started', 'finished', 'size', 'method', 'path', 'status')
+
+    def __init__(self, started):
+        self.started = started
+        self.finished = started
+        self.size = 0
+        self.method = None
+        self.path = None
+        self.status = None
+
+
+class HttpStream:
+    """One direction of a TCP connection: in-order reassembly and HTTP/1.x framing
+
+    Segments are delivered in sequence order; out-of-order data is held until
+    the gap is filled or MAX_REORDER_BYTES is exceeded, after which the stream
+    skips ahead and waits for the next message start line. Bodies are counted,
+    never buffered.
+    """
+
+    __slots__ = ('flow', 'is_request', 'next_seq', 'pending', 'pending_bytes', 'buffer',
+                 'state', 'remaining', 'message', 'finished')
+
+    def __init__(self, flow, is_request):
+        self.flow = flow
+        self.is_request = is_request
+        self.next_seq = None
+        self.pending = {}
+        self.pending_bytes = 0
+        self.buffer = b''
+        self.state = LOST
+        self.remaining = 0
+        self.message = None
+        self.finished = False
+
+    # Reassembly
+
+    def segment(self, seq, flags, payload, ts):
+        if self.finished:
+            return
+        if self.next_seq is None:
+            if flags & TCP_SYN:
+                self.next_seq = (seq + 1) & 0xffffffff
+                self.state = HEAD
+                return
+            self.next_seq = seq
+        elif flags & TCP_SYN:
+            return
+
+        fin = flags & TCP_FIN
+        if not payload and not fin:
+            return
+        diff = (seq - self.next_seq) & 0xffffffff
+        if diff >= 0x80000000:
+            # Retransmission: keep only bytes past what was already delivered
+            overlap = 0x100000000 - diff
+            if overlap >= len(payload) and not fin:
+                return
+            payload = payload[overlap:]
+            diff = 0
+        if diff:
+            if self._hold(seq, payload, fin):
+                self._drain(ts)
+            return
+
+        self._deliver(payload, fin, ts)
+        self._drain(ts)
+
+    def _drain(self, ts):
+        """Deliver held segments that have become contiguous"""
+        while self.pending and not self.finished:
+            entry = self.pending.pop(self.next_seq, None)
+            if entry is None:
+                entry = self._overlapping()
+                if entry is None:
+                    break
+            payload, fin = entry
+            self.pending_bytes -= len(payload)
+            self._deliver(payload, fin, ts)
+
+    def _deliver(self, payload, fin, ts):
+        if payload:
+            self.next_seq = (self.next_seq + len(payload)) & 0xffffffff
+            self.feed(payload, ts)
+        if fin:
+            self.close(ts)
+
+    def _hold(self, seq, payload, fin):
+        """Buffer an out-of-order segment; True when the stream skipped ahead over a gap"""
+        held = self.pending.get(seq)
+        if held is not None and len(held[0]) >= len(payload):
+            return False
+        if held is not None:
+            self.pending_bytes -= len(held[0])
+        self.pending[seq] = (payload, fin)
+        self.pending_bytes += len(payload)
+        if self.pending_bytes > MAX_REORDER_BYTES:
+            # The missing bytes are not coming back: resume at the earliest held segment
+            self.flow.engine.stats["gaps"] += 1
+            self.next_seq = min(self.pending, key=lambda s: (s - self.next_seq) & 0xffffffff)
+            self.lose()
+            return True
+        return False
+
+    def _overlapping(self):
+        """Pop a held segment that starts before next_seq, trimmed to the undelivered bytes"""
+        for seq in list(self.pending):
+            diff = (self.next_seq - seq) & 0xffffffff
+            if diff < 0x80000000:
+                payload, fin = self.pending.pop(seq)
+                if diff < len(payload) or fin:
+                    self.pending_bytes -= diff if diff < len(payload) else len(payload)
+                    return payload[diff:], fin
+                self.pending_bytes -= len(payload)
+        return None
+
+    # HTTP framing
+
+    def lose(self):
+        """Drop the current message and wait for the next start line"""
+        if self.message is not None:
+            self.flow.engine.stats["parse_errors"] += 1
+        self.message = None
+        self.buffer = b''
+        self.state = LOST
+        if not self.is_request:
+            self.flow.unmatched(len(self.flow.requests))
+
+    def feed(self, data, ts):
+        state = self.state
+        if state == OPAQUE:
+            return
+        if state == LOST:
+            if not self._starts_message(data):
+                return
+            self.state = HEAD
+        if self.buffer:
+            data = self.buffer + data
+            self.buffer = b''
+
+        pos, size = 0, len(data)
+        while pos < size:
+            state = self.state
+            if state == BODY or state == CHUNK_DATA:
+                take = min(self.remaining, size - pos)
+                self.remaining -= take
+                self.message.size += take
+                pos += take
+                if not self.remaining:
+                    if state == BODY:
+                        self._complete(ts)
+                    else:
+                        self.state = CHUNK_SIZE
+            elif state == HEAD:
+                if self.message is None:
+                    self.message = HttpMessage(ts)
+                end = data.find(b'\r\n\r\n', pos)
+                if end < 0:
+                    self._keep(data, pos)
+                    return
+                self.message.size += end + 4 - pos
+                if not self._head(data[pos:end], ts):
+                    self.lose()
+                    return
+                pos = end + 4
+            elif state == CHUNK_SIZE or state == TRAILER:
+                end = data.find(b'\r\n', pos)
+                if end < 0:
+                    self._keep(data, pos)
+                    return
+                line = data[pos:end]
+                self.message.size += end + 2 - pos
+                pos = end + 2
+                if state == TRAILER:
+                    if not line:
+                        self._complete(ts)
+                    continue
+                try:
+                    chunk = int(line.split(b';', 1)[0].strip(), 16)
+                except ValueError:
+                    self.lose()
+                    return
+                if chunk:
+                    self.remaining = chunk + 2
+                    self.state = CHUNK_DATA
+                else:
+                    self.state = TRAILER
+            elif state == UNTIL_CLOSE:
+                self.message.size += size - pos
+                self.message.finished = ts
+                return
+            else:
+                # LOST after an error, or OPAQUE after a protocol switch
+                return
+
+    def _keep(self, data, pos):
+        if len(data) - pos > MAX_HEAD_BYTES:
+            self.lose()
+        else:
+            self.buffer = data[pos:]
+
+    def _starts_message(self, data):
+        if self.is_request:
+            space = data.find(b' ', 0, 8)
+            return space > 0 and data[:space] in METHODS
+        return data.startswith(b'HTTP/1.')
+
+    def _head(self, head, ts):
+        """Parse a request or status line plus framing headers; False on malformed input"""
+        lines = head.split(b'\r\n')
+        start = lines[0].split(b' ', 2)
+        message = self.message
+        if self.is_request:
+            if len(start) != 3 or start[0] not in METHODS or not start[2].startswith(b'HTTP/1.'):
+                return False
+            message.method = start[0].decode('ascii')
+            message.path = start[1].decode('latin-1')
+        else:
+            if len(start) < 2 or not start[0].startswith(b'HTTP/1.') or len(start[1]) != 3 or not start[1].isdigit():
+                return False
+            message.status = int(start[1])
+
+        length = None
+        chunked = False
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            name = name.strip().lower()
+            if name == b'content-length':
+                try:
+                    length = int(value.strip())
+                except ValueError:
+                    return False
+            elif name == b'transfer-encoding':
+                chunked = value.strip().lower().endswith(b'chunked')
+
+        if self.is_request:
+            self.flow.request_started(message)
+            if chunked:
+                self.state = CHUNK_SIZE
+            elif length:
+                self.state, self.remaining = BODY, length
+            else:
+                self._complete(ts)
+            return True
+
+        status = message.status
+        request = self.flow.response_started(message)
+        if status < 200 and status != 101:
+            # Interim response: the final one follows on the same stream
+            self.message = None
+            return True
+        if status == 101 or (request is not None and request.method == 'CONNECT' and status < 300):
+            self._complete(ts)
+            self.flow.opaque()
+        elif status in (204, 304) or (request is not None and request.method == 'HEAD'):
+            self._complete(ts)
+        elif chunked:
+            self.state = CHUNK_SIZE
+        elif length is not None:
+            if length:
+                self.state, self.remaining = BODY, length
+            else:
+                self._complete(ts)
+        else:
+            self.state = UNTIL_CLOSE
+        return True
+
+    def _complete(self, ts):
+        message = self.message
+        message.finished = ts
+        self.message = None
+        self.state = HEAD
+        if not self.is_request:
+            self.flow.response_finished(message)
+
+    def close(self, ts):
+        """End of this direction (FIN, RST or expiry)"""
+        if self.state == UNTIL_CLOSE and self.message is not None:
+            self._complete(ts)
+        self.finished = True
+
+
+class Flow:
+    """One TCP connection: the request and response streams and the requests awaiting answers"""
+
+    __slots__ = ('engine', 'key', 'client', 'server', 'client_port', 'server_port', 'request', 'response',
+                 'requests', 'last_seen')
+
+    def __init__(self, engine, client, client_port, server, server_port, ts):
+        self.engine = engine
+        self.key = (client, client_port, server, server_port)
+        self.client, self.client_port = client, client_port
+        self.server, self.server_port = server, server_port
+        self.request = HttpStream(self, True)
+        self.response = HttpStream(self, False)
+        self.requests = deque()
+        self.last_seen = ts
+
+    def request_started(self, message):
+        if len(self.requests) >= MAX_PIPELINE:
+            self.unmatched(1)
+        self.requests.append(message)
+
+    def response_started(self, message):
+        """Return the request a response answers, or None when it was not seen"""
+        if self.requests:
+            return self.requests[0]
+        if message.status >= 200 or message.status == 101:
+            self.engine.stats["unmatched"] += 1
+        return None
+
+    def response_finished(self, response):
+        if not self.requests:
+            return
+        request = self.requests.popleft()
+        self.engine.emit(self, request, response)
+
+    def unmatched(self, count):
+        self.engine.stats["unmatched"] += count
+        for _ in range(count):
+            self.requests.popleft()
+
+    def opaque(self):
+        self.request.state = self.response.state = OPAQUE
+
+
+class CaptureEngine:
+    """Turn captured TCP packets into HTTP request records
+
+    Flows are keyed by their 4-tuple, so concurrent and pipelined connections
+    are paired independently. resolve(ip) maps addresses to container names
+    at the time a request completes; on_request(record) receives dicts in the
+    shape docker_monitor.save_request() expects.
+    """
+
+    def __init__(self, on_request, resolve=None, max_flows=MAX_FLOWS, flow_timeout=FLOW_TIMEOUT):
+        self.on_request = on_request
+        self.resolve = resolve or (lambda ip: ip)
+        self.max_flows = max_flows
+        self.flow_timeout = flow_timeout
+        self.flows = OrderedDict()
+        self._addresses = {}
+        self._until_expire = EXPIRE_EVERY
+        self.stats = {
+            "packets": 0,
+            "tcp_packets": 0,
+            "requests": 0,
+            "parse_errors": 0,
+            "unmatched": 0,
+            "gaps": 0,
+            "errors": 0,
+            "flows": 0,
+            "evicted": 0,
+        }
+
+    def run(self, packets):
+        """Process (timestamp, linktype, frame) tuples until the source ends"""
+        for ts, linktype, frame in packets:
+            self.feed(ts, linktype, frame)
+        self.close()
+        return self.stats
+
+    def feed(self, ts, linktype, frame):
+        self.stats["packets"] += 1
+        try:
+            packet = decode_tcp(linktype, frame)
+        except (struct.error, IndexError):
+            packet = None
+        if packet is None:
+            return
+        self.stats["tcp_packets"] += 1
+        src, sport, dst, dport, seq, flags, payload = packet
+
+        try:
+            flows = self.flows
+            key = (src, sport, dst, dport)
+            flow = flows.get(key)
+            if flow is not None:
+                stream = flow.request
+            else:
+                flow = flows.get((dst, dport, src, sport))
+                if flow is not None:
+                    stream = flow.response
+                else:
+                    if not payload and not flags & TCP_SYN:
+                        return
+                    flow, stream = self._open(src, sport, dst, dport, flags, ts)
+            flows.move_to_end(flow.key)
+            flow.last_seen = ts
+
+            if flags & TCP_RST:
+                self._close(flow, ts)
+            else:
+                stream.segment(seq, flags, payload, ts)
+                if flow.request.finished and flow.response.finished:
+                    self._close(flow, ts)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.debug(f"Error processing captured packet: {str(e)}")
+
+        self._until_expire -= 1
+        if not self._until_expire:
+            self._until_expire = EXPIRE_EVERY
+            self.expire(ts)
+
+    def _open(self, src, sport, dst, dport, flags, ts):
+        # The SYN sender is the client; flows picked up mid-stream fall back to well-known ports
+        if flags & TCP_SYN:
+            is_client = not flags & TCP_ACK
+        elif dport in SERVER_PORTS or sport in SERVER_PORTS:
+            is_client = dport in SERVER_PORTS
+        else:
+            is_client = dport < sport
+        if is_client:
+            flow = Flow(self, src, sport, dst, dport, ts)
+        else:
+            flow = Flow(self, dst, dport, src, sport, ts)
+        self.flows[flow.key] = flow
+        self.stats["flows"] += 1
+        if len(self.flows) > self.max_flows:
+            _, oldest = self.flows.popitem(last=False)
+            self.stats["evicted"] += 1
+            self._finish(oldest, ts)
+        return flow, flow.request if is_client else flow.response
+
+    def _close(self, flow, ts):
+        self.flows.pop(flow.key, None)
+        self._finish(flow, ts)
+
+    def _finish(self, flow, ts):
+        flow.request.close(ts)
+        flow.response.close(flow.last_seen)
+
+    def expire(self, now):
+        """Close flows idle for longer than flow_timeout"""
+        flows = self.flows
+        while flows:
+            key = next(iter(flows))
+            flow = flows[key]
+            if now - flow.last_seen < self.flow_timeout:
+                break
+            del flows[key]
+            self._finish(flow, now)
+
+    def close(self):
+        """Close every open flow, completing responses delimited by connection close"""
+        for flow in list(self.flows.values()):
+            self._finish(flow, flow.last_seen)
+        self.flows.clear()
+
+    def address(self, packed):
+        name = self._addresses.get(packed)
+        if name is None:
+            if len(self._addresses) > 65536:
+                self._addresses.clear()
+            name = self._addresses[packed] = _address(packed)
+        return name
+
+    def emit(self, flow, request, response):
+        self.stats["requests"] += 1
+        record = {
+            "timestamp": datetime.fromtimestamp(request.started).isoformat(),
+            "source_container": self.resolve(self.address(flow.client)),
+            "destination_container": self.resolve(self.address(flow.server)),
+            "request_type": request.method,
+            "request_path": request.path,
+            "status_code": response.status,
+            "response_time": max(0.0, response.finished - request.started),
+            "request_size": request.size,
+            "response_size": response.size,
+        }
+        try:
+            self.on_request(record)
+        except Exception as e:
+            logger.error(f"Error handling captured request: {str(e)}")
+
+
+class ContainerNames:
+    """IP -> container name map rebuilt whenever the container state cache reports a network change"""
+
+    def __init__(self, state=None, network=None, static=None):
+        self.state = state
+        self.network = network
+        self._ips = dict(static or {})
+        self._unsubscribe = None
+        if state is not None:
+            self._unsubscribe = state.subscribe(self._changed)
+            self.refresh()
+
+    def refresh(self):
+        self._ips = self.state.ip_map(self.network)
+
+    def _changed(self, action, record, previous):
+        if record is None or previous is None or record["networks"] != previous["networks"]:
+            self.refresh()
+
+    def resolve(self, ip):
+        return self._ips.get(ip, ip)
+
+    def close(self):
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
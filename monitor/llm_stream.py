@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Streaming LLM answers relayed to the browser as server-sent events.
+
+Provider streams (Ollama NDJSON, OpenAI and Anthropic SSE) are read in a
+background thread and relayed token by token. While no token arrives the
+relay sends SSE comments, so a client that went away is noticed within a
+heartbeat; the upstream request is then closed, which makes the model stop
+generating. Time to first token is recorded per provider.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+import requests
+
+# Percentiles shared with the evodev package, with a local copy when it is not installed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+try:
+    from evodev.metrics import percentile
+except ImportError:
+    def percentile(values, p, scale=1.0):
+        values = sorted(values)
+        if not values:
+            return None
+        return round(values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * scale, 1)
+
+logger = logging.getLogger('evodev-monitor')
+
+# Seconds between keep-alive comments while waiting for tokens
+HEARTBEAT_SECONDS = float(os.environ.get('MONITOR_STREAM_HEARTBEAT', 2.0))
+CONNECT_TIMEOUT = float(os.environ.get('MONITOR_STREAM_CONNECT_TIMEOUT', 10))
+# Recent streams kept for the time-to-first-token percentiles
+STATS_WINDOW = int(os.environ.get('MONITOR_STREAM_STATS_WINDOW', 1000))
+
+
+class StreamCancelled(Exception):
+    """The client disconnected before the answer was complete"""
+
+
+class StreamStats:
+    """Per-provider stream counts with time-to-first-token and duration percentiles (ms)"""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def _entry(self, provider):
+        entry = self._providers.get(provider)
+        if entry is None:
+            entry = self._providers[provider] = {
+                "streams": 0, "completed": 0, "cancelled": 0, "errors": 0, "tokens": 0,
+                "ttft": deque(maxlen=self.window), "duration": deque(maxlen=self.window),
+            }
+        return entry
+
+    def record(self, provider, outcome, ttft_ms=None, duration_ms=None, tokens=0):
+        with self._lock:
+            entry = self._entry(provider)
+            entry["streams"] += 1
+            entry[outcome] += 1
+            entry["tokens"] += tokens
+            if ttft_ms is not None:
+                entry["ttft"].append(ttft_ms)
+            if duration_ms is not None and outcome == "completed":
+                entry["duration"].append(duration_ms)
+
+    def snapshot(self):
+        with self._lock:
+            providers = {name: dict(entry, ttft=list(entry["ttft"]), duration=list(entry["duration"]))
+                         for name, entry in self._providers.items()}
+        result = {}
+        for name, entry in sorted(providers.items()):
+            ttft, duration = entry.pop("ttft"), entry.pop("duration")
+            entry.update({
+                "ttft_p50_ms": percentile(ttft, 50),
+                "ttft_p95_ms": percentile(ttft, 95),
+                "duration_p50_ms": percentile(duration, 50),
+                "duration_p95_ms": percentile(duration, 95),
+            })
+            result[name] = entry
+        return result
+
+
+stats = StreamStats()
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class TokenRelay:
+    """Relay the tokens of one provider stream as SSE events
+
+    produce(relay) is a generator of text tokens; it must register every
+    upstream response with relay.track() so that cancel() can close it.
+    """
+
+    def __init__(self, provider, produce, on_complete=None, heartbeat=HEARTBEAT_SECONDS):
+        self.provider = provider
+        self.produce = produce
+        self.on_complete = on_complete
+        self.heartbeat = heartbeat
+        self.cancelled = threading.Event()
+        self._queue = queue.Queue()
+        self._responses = []
+        self._lock = threading.Lock()
+
+    def track(self, response):
+        """Register an upstream response; it is closed at once if the stream was already cancelled"""
+        with self._lock:
+            self._responses.append(response)
+        if self.cancelled.is_set():
+            response.close()
+            raise StreamCancelled()
+        return response
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            responses, self._responses = self._responses, []
+        for response in responses:
+            try:
+                response.close()
+            except Exception:
+                pass
+
+    def _read(self):
+        try:
+            for token in self.produce(self):
+                if self.cancelled.is_set():
+                    raise StreamCancelled()
+                if token:
+                    self._queue.put(("token", token))
+            self._queue.put(("done", None))
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self._queue.put(("error", str(e)))
+        finally:
+            self.cancel()
+
+    def events(self):
+        """SSE body: data events with tokens, then a `done` event with timings or an `error` event"""
+        started = time.perf_counter()
+        ttft_ms = None
+        parts = []
+        outcome = "cancelled"
+        threading.Thread(target=self._read, name=f'llm-stream-{self.provider}', daemon=True).start()
+        try:
+            while True:
+                try:
+                    kind, value = self._queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    # A write to a closed connection ends the response and closes this generator
+                    yield ": ping\n\n"
+                    continue
+                if kind == "token":
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    parts.append(value)
+                    yield _sse({"token": value})
+                elif kind == "error":
+                    outcome = "errors"
+                    logger.error(f"{self.provider} stream failed: {value}")
+                    yield _sse({"message": value}, event="error")
+                    return
+                else:
+                    outcome = "completed"
+                    duration_ms = (time.perf_counter() - started) * 1000
+                    yield _sse({
+                        "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                        "duration_ms": round(duration_ms, 1),
+                        "tokens": len(parts),
+                    }, event="done")
+                    if self.on_complete is not None:
+                        try:
+                            self.on_complete("".join(parts))
+                        except Exception as e:
+                            logger.error(f"Error completing {self.provider} stream: {str(e)}")
+                    return
+        finally:
+            if outcome == "cancelled":
+                self.cancel()
+                logger.info(f"Client left the {self.provider} stream after {len(parts)} tokens")
+            stats.record(self.provider, outcome, ttft_ms=ttft_ms,
+                         duration_ms=(time.perf_counter() - started) * 1000, tokens=len(parts))
+
+
+def post_stream(relay, url, timeout, post=None, **kwargs):
+    """POST with a streamed response; timeout bounds the wait for each chunk, not the whole answer
+
+    post replaces requests.post, e.g. with the LLM gateway.
+    """
+    post = post or requests.post
+    response = relay.track(post(url, stream=True, timeout=(CONNECT_TIMEOUT, timeout), **kwargs))
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}: {response.text[:500]}")
+    return response
+
+
+def _sse_data(response):
+    """Payloads of the `data:` lines of an SSE response"""
+    for line in response.iter_lines(decode_unicode=True):
+        if line and line.startswith("data:"):
+            yield line[5:].strip()
+
+
+def ollama_tokens(response):
+    """Tokens of an Ollama /api/generate or /api/chat NDJSON stream"""
+    for line in response.iter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise Exception(chunk["error"])
+        yield chunk.get("response") or (chunk.get("message") or {}).get("content", "")
+        if chunk.get("done"):
+            return
+
+
+def openai_tokens(response, tool_calls=None):
+    """Content tokens of an OpenAI chat completion stream
+
+    Streamed tool calls are assembled into tool_calls (the shape of a
+    non-streamed message["tool_calls"]) when a list is given.
+    """
+    for data in _sse_data(response):
+        if data == "[DONE]":
+            return
+        chunk = json.loads(data)
+        if chunk.get("error"):
+            raise Exception(chunk["error"].get("message", chunk["error"]))
+        for choice in chunk.get("choices", []):
+            delta = choice.get("delta") or {}
+            for call in delta.get("tool_calls") or []:
+                if tool_calls is None:
+                    continue
+                while len(tool_calls) <= call.get("index", 0):
+                    tool_calls.append({"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+                target = tool_calls[call.get("index", 0)]
+                target["id"] = call.get("id") or target["id"]
+                function = call.get("function") or {}
+                target["function"]["name"] += function.get("name") or ""
+                target["function"]["arguments"] += function.get("arguments") or ""
+            if delta.get("content"):
+                yield delta["content"]
+
+
+def anthropic_tokens(response):
+    """Text tokens of an Anthropic Messages API stream"""
+    for data in _sse_data(response):
+        event = json.loads(data)
+        kind = event.get("type")
+        if kind == "content_block_delta" and event["delta"].get("type") == "text_delta":
+            yield event["delta"]["text"]
+        elif kind == "error":
+            raise Exception(event["error"].get("message", event["error"]))
+        elif kind == "message_stop":
+            return
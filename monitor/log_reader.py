@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger('evodev-monitor')
+
+# Block size used when seeking backwards from the end of a file
+BLOCK_SIZE = 64 * 1024
+# Distance between checkpoints of the sparse line index
+INDEX_STRIDE = 1024 * 1024
+# Number of files whose line index is kept in memory
+MAX_CACHED_INDEXES = 32
+
+
+class LineIndex:
+    """Sparse newline index of a log file, extended incrementally as the file grows"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, identity):
+        self.identity = identity
+        self.size = 0
+        self.newlines = 0
+        self.last_byte = b''
+        # checkpoints[i] is the number of newlines before byte offset i * INDEX_STRIDE
+        self.checkpoints = [0]
+
+    def refresh(self):
+        """Index bytes appended since the last call; rebuild when the file was rotated or truncated"""
+        with self.lock:
+            st = os.stat(self.path)
+            identity = (st.st_dev, st.st_ino)
+            if identity != self.identity or st.st_size < self.size:
+                self._reset(identity)
+            if st.st_size == self.size:
+                return
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.size)
+                remaining = st.st_size - self.size
+                while remaining > 0:
+                    # Read up to the next checkpoint boundary so every checkpoint is exact
+                    boundary = (self.size // INDEX_STRIDE + 1) * INDEX_STRIDE
+                    block = f.read(min(boundary - self.size, remaining))
+                    if not block:
+                        break
+                    self.newlines += block.count(b'\n')
+                    self.size += len(block)
+                    self.last_byte = block[-1:]
+                    remaining -= len(block)
+                    if self.size == boundary:
+                        self.checkpoints.append(self.newlines)
+
+    @property
+    def total_lines(self):
+        """Line count as readlines() would report it"""
+        if self.size and self.last_byte != b'\n':
+            return self.newlines + 1
+        return self.newlines
+
+    def line_number(self, f, offset):
+        """Return the 0-based number of the line starting at offset"""
+        offset = min(offset, self.size)
+        slot = min(offset // INDEX_STRIDE, len(self.checkpoints) - 1)
+        start = slot * INDEX_STRIDE
+        f.seek(start)
+        return self.checkpoints[slot] + f.read(offset - start).count(b'\n')
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(path):
+    """Return the cached, refreshed line index for a file"""
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        index = _indexes.pop(key, None) or LineIndex(key)
+        _indexes[key] = index
+        while len(_indexes) > MAX_CACHED_INDEXES:
+            _indexes.popitem(last=False)
+    index.refresh()
+    return index
+
+
+def _lines_before(f, end, count):
+    """Read backwards in blocks and return (offset, bytes) for up to count lines ending at end"""
+    if end <= 0 or count <= 0:
+        return []
+    pos = end
+    buf = b''
+    # One extra newline is needed to know where the oldest wanted line starts
+    while pos > 0 and buf.count(b'\n') <= count:
+        step = min(BLOCK_SIZE, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+
+    if buf.endswith(b'\n'):
+        buf = buf[:-1]
+    parts = buf.split(b'\n')
+    offsets = []
+    offset = pos
+    for part in parts:
+        offsets.append(offset)
+        offset += len(part) + 1
+    lines = list(zip(offsets, parts))
+    if pos > 0:
+        # The first part may start mid-line
+        lines = lines[1:]
+    return lines[-count:]
+
+
+def _lines_after(f, start, count):
+    """Return (offset, bytes) for up to count lines starting at start"""
+    f.seek(start)
+    lines = []
+    offset = start
+    while len(lines) < count:
+        line = f.readline()
+        if not line:
+            break
+        lines.append((offset, line.rstrip(b'\n')))
+        offset += len(line)
+    return lines
+
+
+def parse_line(text):
+    """Parse a JSON log line, falling back to the raw text"""
+    if text.lstrip().startswith('{'):
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return {"raw": text.strip()}
+
+
+def read_page(path, lines=100, before=None, after=None, parse=True):
+    """Read one page of a log file without loading the whole file
+
+    Without a cursor the last `lines` lines are returned. `before` returns the
+    lines that end at that byte offset and `after` the lines starting at it.
+    """
+    index = get_index(path)
+    size = index.size
+    lines = max(0, lines)
+
+    with open(path, 'rb') as f:
+        if after is not None:
+            start = min(max(0, after), size)
+            page = _lines_after(f, start, lines)
+        else:
+            end = size if before is None else min(max(0, before), size)
+            page = _lines_before(f, end, lines)
+
+        if page:
+            first_offset = page[0][0]
+            end_offset = min(page[-1][0] + len(page[-1][1]) + 1, os.fstat(f.fileno()).st_size)
+            first_line = index.line_number(f, first_offset) + 1
+        else:
+            first_offset = end_offset = start if after is not None else end
+            first_line = None
+
+    texts = (raw.decode('utf-8', errors='replace') for _, raw in page)
+    entries = [parse_line(text) if parse else {"raw": text} for text in texts]
+
+    return {
+        "filename": path,
+        "total_lines": index.total_lines,
+        "displayed_lines": len(entries),
+        "first_line": first_line,
+        "cursor": {
+            "before": first_offset if first_offset > 0 else None,
+            "after": end_offset,
+            "size": size
+        },
+        "logs": entries
+    }
@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+import os
+import re
+import abc
+import json
+import time
+import queue
+import logging
+import threading
+
+# Try to import optional dependencies
+try:
+    import docker
+except ImportError:
+    docker = None
+
+import docker_containers
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:
+    INotify = None
+
+logger = logging.getLogger('evodev-monitor')
+
+# Streaming configuration
+POLL_INTERVAL = float(os.environ.get('MONITOR_STREAM_POLL_INTERVAL', 0.5))
+HEARTBEAT_INTERVAL = float(os.environ.get('MONITOR_STREAM_HEARTBEAT', 15))
+DEFAULT_RATE = float(os.environ.get('MONITOR_STREAM_RATE', 50))
+MAX_RATE = float(os.environ.get('MONITOR_STREAM_MAX_RATE', 500))
+CLIENT_QUEUE_SIZE = int(os.environ.get('MONITOR_STREAM_QUEUE_SIZE', 1000))
+MAX_PATTERN_LENGTH = int(os.environ.get('MONITOR_STREAM_MAX_PATTERN', 200))
+
+LEVELS = {
+    'DEBUG': 10,
+    'INFO': 20,
+    'WARN': 30,
+    'WARNING': 30,
+    'ERROR': 40,
+    'CRITICAL': 50,
+    'FATAL': 50,
+}
+LEVEL_RE = re.compile(r'\b(DEBUG|INFO|WARNING|WARN|ERROR|CRITICAL|FATAL)\b')
+
+
+def line_level(text):
+    """Return the numeric log level found in a line, or None"""
+    if text.lstrip().startswith('{'):
+        try:
+            entry = json.loads(text)
+            level = entry.get('level') or entry.get('levelname') if isinstance(entry, dict) else None
+            if level:
+                return LEVELS.get(str(level).upper())
+        except ValueError:
+            pass
+    match = LEVEL_RE.search(text)
+    return LEVELS[match.group(1)] if match else None
+
+
+class Subscription:
+    """One client of a follower with its own filter, rate limit and bounded queue
+
+    The follower thread only applies the level filter and queues lines with
+    their arrival time; the client's regex and rate limit run in get() on the
+    client's request thread, so an expensive pattern slows only its own stream.
+    """
+
+    def __init__(self, level=None, pattern=None, rate=DEFAULT_RATE, queue_size=CLIENT_QUEUE_SIZE):
+        self.min_level = LEVELS.get(level.upper()) if level else None
+        if level and self.min_level is None:
+            raise ValueError(f"Unknown log level: {level}")
+        if pattern and len(pattern) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Pattern longer than {MAX_PATTERN_LENGTH} characters")
+        self.pattern = re.compile(pattern) if pattern else None
+        self.rate = min(max(rate, 1.0), MAX_RATE)
+        self.ended = False
+        self.error = None
+        self._overflow = 0
+        self._limited = 0
+        self._tokens = self.rate
+        self._last_refill = time.monotonic()
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    @property
+    def dropped(self):
+        """Lines lost to a full queue or the rate limit"""
+        return self._overflow + self._limited
+
+    def offer(self, text):
+        """Queue a line for the client unless it is below its level (follower thread)"""
+        if self.min_level is not None:
+            level = line_level(text)
+            if level is not None and level < self.min_level:
+                return
+        try:
+            self._queue.put_nowait((time.monotonic(), text))
+        except queue.Full:
+            self._overflow += 1
+
+    def end(self, error=None):
+        """Mark the source as finished so the client's stream can close"""
+        self.error = error
+        self.ended = True
+        try:
+            # Wakes a client blocked in get(); with a full queue it finds out after draining it
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def finished(self):
+        """Check whether the source has ended and every queued line was read"""
+        return self.ended and self._queue.empty()
+
+    def get(self, timeout):
+        """Return the next line passing the regex and rate limit, or None after timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return None
+            if item is None:
+                return None
+            arrived, text = item
+            if self.pattern is not None and not self.pattern.search(text):
+                continue
+            # The bucket refills by arrival time, so a slow reader is not charged for its own delay
+            self._tokens = min(self.rate, self._tokens + max(0.0, arrived - self._last_refill) * self.rate)
+            self._last_refill = max(self._last_refill, arrived)
+            if self._tokens < 1:
+                self._limited += 1
+                continue
+            self._tokens -= 1
+            return text
+
+
+class Follower(abc.ABC):
+    """Single reader of a log source that fans new lines out to all subscribers"""
+
+    def __init__(self, key):
+        self.key = key
+        self.subscribers = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f'log-follower-{self.key}')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def publish(self, text):
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.offer(text)
+
+    def _run(self):
+        error = None
+        try:
+            self.follow()
+        except Exception as e:
+            logger.error(f"Log follower {self.key} failed: {str(e)}")
+            error = f"log stream interrupted: {str(e)}"
+        finally:
+            # The source is gone (container stopped, file unreadable): the next
+            # client starts a new follower and the current ones close their streams
+            with _followers_lock:
+                if _followers.get(self.key) is self:
+                    del _followers[self.key]
+                with self._lock:
+                    subscribers = list(self.subscribers)
+            for subscription in subscribers:
+                subscription.end(error)
+
+    @abc.abstractmethod
+    def follow(self):
+        """Read the source and publish() each new line until stop() is called"""
+
+
+class FileFollower(Follower):
+    """Follows a log file from its current end, handling rotation and truncation"""
+
+    def __init__(self, key, path):
+        super().__init__(key)
+        self.path = path
+        self._inotify = None
+
+    def _wait(self):
+        """Wait for the file to change, using inotify when it is available"""
+        if self._inotify is not None:
+            self._inotify.read(timeout=int(POLL_INTERVAL * 1000))
+        else:
+            self._stop.wait(POLL_INTERVAL)
+
+    def _watch(self):
+        if INotify is None:
+            return
+        try:
+            if self._inotify is None:
+                self._inotify = INotify()
+            self._inotify.add_watch(self.path, inotify_flags.MODIFY | inotify_flags.MOVE_SELF |
+                                    inotify_flags.DELETE_SELF | inotify_flags.ATTRIB)
+        except OSError as e:
+            logger.debug(f"inotify unavailable for {self.path}, polling instead: {str(e)}")
+            self._inotify = None
+
+    def follow(self):
+        f = open(self.path, 'rb')
+        f.seek(0, os.SEEK_END)
+        identity = os.fstat(f.fileno()).st_ino
+        self._watch()
+        partial = b''
+        try:
+            while not self._stop.is_set():
+                chunk = f.read(64 * 1024)
+                if chunk:
+                    lines = (partial + chunk).split(b'\n')
+                    partial = lines.pop()
+                    for line in lines:
+                        self.publish(line.decode('utf-8', errors='replace'))
+                    continue
+
+                # No new data: check for rotation or truncation before waiting
+                try:
+                    st = os.stat(self.path)
+                except FileNotFoundError:
+                    st = None
+                if st is not None and (st.st_ino != identity or st.st_size < f.tell()):
+                    f.close()
+                    f = open(self.path, 'rb')
+                    identity = os.fstat(f.fileno()).st_ino
+                    partial = b''
+                    self._watch()
+                    continue
+                self._wait()
+        finally:
+            f.close()
+            if self._inotify is not None:
+                self._inotify.close()
+
+
+class ContainerFollower(Follower):
+    """Follows a container's output through a single Docker log stream"""
+
+    def __init__(self, key, container_id):
+        super().__init__(key)
+        self.container_id = container_id
+        self._stream = None
+
+    def stop(self):
+        super().stop()
+        # Closing the stream unblocks the reader thread
+        stream = self._stream
+        if stream is not None and hasattr(stream, 'close'):
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def follow(self):
+        if docker is None:
+            raise RuntimeError("docker module not available")
+        client = docker_containers.get_client()
+        container = client.containers.get(self.container_id)
+        self._stream = container.logs(stream=True, follow=True, tail=0)
+        partial = b''
+        for chunk in self._stream:
+            if self._stop.is_set():
+                break
+            lines = (partial + chunk).split(b'\n')
+            partial = lines.pop()
+            for line in lines:
+                self.publish(line.decode('utf-8', errors='replace'))
+
+
+_followers = {}
+_followers_lock = threading.Lock()
+
+
+def subscribe(key, factory, subscription):
+    """Attach a subscription to the shared follower for key, starting it if needed"""
+    with _followers_lock:
+        follower = _followers.get(key)
+        if follower is None:
+            follower = factory()
+            _followers[key] = follower
+            follower.start()
+        with follower._lock:
+            follower.subscribers.add(subscription)
+    return follower
+
+
+def unsubscribe(follower, subscription):
+    """Detach a subscription and stop the follower when it has no clients left"""
+    with _followers_lock:
+        with follower._lock:
+            follower.subscribers.discard(subscription)
+            idle = not follower.subscribers
+        if idle:
+            if _followers.get(follower.key) is follower:
+                del _followers[follower.key]
+            follower.stop()
+
+
+def active_followers():
+    """Return the number of clients attached to each running follower"""
+    with _followers_lock:
+        return {key: len(follower.subscribers) for key, follower in _followers.items()}
+
+
+def file_source(path):
+    """Return the (key, factory) pair for following a log file"""
+    path = os.path.abspath(path)
+    key = f"file:{path}"
+    return key, lambda: FileFollower(key, path)
+
+
+def container_source(container_id):
+    """Return the (key, factory) pair for following a container's logs"""
+    key = f"container:{container_id}"
+    return key, lambda: ContainerFollower(key, container_id)
+
+
+def event_stream(key, factory, subscription):
+    """Generate Server-Sent Events for new lines until the client disconnects or the source ends"""
+    follower = subscribe(key, factory, subscription)
+    reported_drops = 0
+    last_sent = time.monotonic()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            text = subscription.get(timeout=1.0)
+            if text is not None:
+                data = json.dumps({"line": text, "level": line_level(text)})
+                yield f"data: {data}\n\n"
+                last_sent = time.monotonic()
+                continue
+            if subscription.finished():
+                # Named "end" rather than "error", which EventSource reserves for connection errors
+                data = json.dumps({"error": subscription.error} if subscription.error else {})
+                yield f"event: end\ndata: {data}\n\n"
+                return
+            if subscription.dropped != reported_drops:
+                reported_drops = subscription.dropped
+                yield f"event: dropped\ndata: {json.dumps({'dropped': reported_drops})}\n\n"
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= HEARTBEAT_INTERVAL:
+                # Comment line keeps proxies from closing the connection and detects disconnects
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+    finally:
+        unsubscribe(follower, subscription)
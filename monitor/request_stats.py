@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+import os
+import json
+import math
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+logger = logging.getLogger('evodev-monitor')
+
+# Raw docker_requests rows are only needed for the recent-requests list
+RAW_RETENTION_HOURS = int(os.environ.get('MONITOR_REQUESTS_RETENTION_HOURS', 168))
+# How long minute and hour buckets are kept; all-time totals are kept forever
+MINUTE_RETENTION_HOURS = int(os.environ.get('MONITOR_REQUEST_STATS_MINUTE_HOURS', 6))
+HOUR_RETENTION_HOURS = int(os.environ.get('MONITOR_REQUEST_STATS_HOUR_HOURS', 720))
+# Relative accuracy of the latency sketch (1% -> every percentile is within 1% of a real sample)
+SKETCH_ACCURACY = float(os.environ.get('MONITOR_REQUEST_STATS_ACCURACY', 0.01))
+PERCENTILES = (50, 95, 99)
+
+# Bucket formats per resolution; the all-time total uses a single empty bucket
+RESOLUTIONS = {
+    '1m': '%Y-%m-%d %H:%M:00',
+    '1h': '%Y-%m-%d %H:00:00',
+}
+TOTAL = 'all'
+# Sketch bin for zero and negative latencies
+ZERO_BIN = -(1 << 30)
+
+GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Column positions in docker_monitor.INSERT_REQUEST_SQL parameters
+TIMESTAMP, SOURCE, DESTINATION, METHOD, PATH, STATUS, RESPONSE_TIME = range(7)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS docker_request_agg (
+    dimension TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    key1 TEXT NOT NULL,
+    key2 TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    total_time REAL NOT NULL,
+    sketch TEXT NOT NULL,
+    PRIMARY KEY (dimension, resolution, bucket, key1, key2)
+) WITHOUT ROWID
+'''
+
+SELECT_AGG_SQL = '''
+SELECT count, total_time, sketch FROM docker_request_agg
+WHERE dimension = ? AND resolution = ? AND bucket = ? AND key1 = ? AND key2 = ?
+'''
+
+UPSERT_AGG_SQL = '''
+INSERT OR REPLACE INTO docker_request_agg
+(dimension, resolution, bucket, key1, key2, count, total_time, sketch)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def sketch_bin(value):
+    """Log-scale histogram bin of a latency (DDSketch-style relative-error binning)"""
+    if value is None or value <= 0:
+        return ZERO_BIN
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+
+def bin_value(index):
+    """Representative latency of a bin, within SKETCH_ACCURACY of every value in it"""
+    if index == ZERO_BIN:
+        return 0.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+def percentiles(bins, qs=PERCENTILES):
+    """Compute percentiles from {bin: count}"""
+    total = sum(bins.values())
+    if not total:
+        return {f"p{q}": None for q in qs}
+    ordered = sorted(bins.items())
+    result = {}
+    for q in qs:
+        rank = max(1, math.ceil(total * q / 100.0))
+        seen = 0
+        for index, count in ordered:
+            seen += count
+            if seen >= rank:
+                result[f"p{q}"] = bin_value(index)
+                break
+    return result
+
+
+def _request_time(timestamp):
+    """Parse a request timestamp (ISO text), falling back to now"""
+    try:
+        return datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+    except (TypeError, ValueError):
+        return datetime.now()
+
+
+def _keys(row):
+    """Dimension keys a request row contributes to"""
+    status = row[STATUS]
+    return (
+        ('pair', row[SOURCE] or '', row[DESTINATION] or ''),
+        ('method', row[METHOD] or '', ''),
+        ('status', str(status if status is not None else 0), ''),
+    )
+
+
+def _load_sketch(text):
+    return {int(index): count for index, count in json.loads(text).items()}
+
+
+def apply(conn, rows):
+    """Fold inserted docker_requests rows into the aggregate table
+
+    Registered as a BatchWriter hook, so it runs inside the batch transaction:
+    aggregates and raw rows are committed or rolled back together. Rows are
+    summed in memory first, so each batch reads and writes every touched
+    (dimension, bucket, key) once.
+    """
+    # First pass per minute: request timestamps in a batch share few distinct minutes
+    minutes = defaultdict(lambda: [0, 0.0, defaultdict(int)])
+    for row in rows:
+        response_time = row[RESPONSE_TIME] or 0.0
+        index = sketch_bin(response_time)
+        minute = (row[TIMESTAMP] or '')[:16]
+        for dimension, key1, key2 in _keys(row):
+            delta = minutes[(dimension, key1, key2, minute)]
+            delta[0] += 1
+            delta[1] += response_time
+            delta[2][index] += 1
+
+    buckets = {}
+    deltas = defaultdict(lambda: [0, 0.0, defaultdict(int)])
+    for (dimension, key1, key2, minute), (count, total_time, bins) in minutes.items():
+        if minute not in buckets:
+            when = _request_time(minute)
+            buckets[minute] = [(resolution, when.strftime(fmt)) for resolution, fmt in RESOLUTIONS.items()]
+            buckets[minute].append((TOTAL, ''))
+        for resolution, bucket in buckets[minute]:
+            delta = deltas[(dimension, resolution, bucket, key1, key2)]
+            delta[0] += count
+            delta[1] += total_time
+            for index, n in bins.items():
+                delta[2][index] += n
+
+    updates = []
+    for key, (count, total_time, bins) in deltas.items():
+        current = conn.execute(SELECT_AGG_SQL, key).fetchone()
+        if current is not None:
+            count += current[0]
+            total_time += current[1]
+            for index, n in _load_sketch(current[2]).items():
+                bins[index] += n
+        updates.append(key + (count, total_time, json.dumps(bins, separators=(',', ':'))))
+    conn.executemany(UPSERT_AGG_SQL, updates)
+
+
+def init_schema(pool):
+    """Create the aggregate table and backfill it from existing requests"""
+    with pool.transaction() as conn:
+        conn.execute(SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_docker_requests_timestamp ON docker_requests (timestamp)")
+        has_aggregates = conn.execute("SELECT 1 FROM docker_request_agg LIMIT 1").fetchone()
+        has_requests = conn.execute("SELECT 1 FROM docker_requests LIMIT 1").fetchone()
+        if has_requests and not has_aggregates:
+            logger.info("Backfilling request statistics from docker_requests")
+            _backfill(conn)
+
+
+def _backfill(conn, chunk=5000):
+    cursor = conn.execute(
+        "SELECT timestamp, source_container, destination_container, request_type, "
+        "request_path, status_code, response_time FROM docker_requests"
+    )
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            break
+        apply(conn, [tuple(row) for row in rows])
+
+
+def rebuild(pool):
+    """Recompute every aggregate from docker_requests"""
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM docker_request_agg")
+        _backfill(conn)
+
+
+def prune(pool, now=None):
+    """Delete raw requests, minute and hour buckets older than their retention; returns deleted rows"""
+    now = now or datetime.now()
+    deleted = 0
+    with pool.transaction() as conn:
+        deleted += conn.execute(
+            "DELETE FROM docker_requests WHERE timestamp < ?",
+            ((now - timedelta(hours=RAW_RETENTION_HOURS)).isoformat(),)
+        ).rowcount
+        for resolution, hours in (('1m', MINUTE_RETENTION_HOURS), ('1h', HOUR_RETENTION_HOURS)):
+            cutoff = (now - timedelta(hours=hours)).strftime(RESOLUTIONS[resolution])
+            deleted += conn.execute(
+                "DELETE FROM docker_request_agg WHERE resolution = ? AND bucket < ?", (resolution, cutoff)
+            ).rowcount
+    return deleted
+
+
+def query(pool, minutes=None, now=None):
+    """Return interaction, method and status statistics, all-time or for the last `minutes`
+
+    Windows that fit in the minute retention are summed from minute buckets;
+    longer windows are rounded up to whole hours and read from hour buckets.
+    """
+    if minutes is not None:
+        if minutes <= 0 or minutes > HOUR_RETENTION_HOURS * 60:
+            raise ValueError(f"minutes must be between 1 and {HOUR_RETENTION_HOURS * 60}")
+        now = now or datetime.now()
+        if minutes <= MINUTE_RETENTION_HOURS * 60:
+            resolution, start = '1m', now - timedelta(minutes=minutes - 1)
+        else:
+            resolution, start = '1h', now - timedelta(hours=math.ceil(minutes / 60.0) - 1)
+        where, params = "resolution = ? AND bucket >= ?", (resolution, start.strftime(RESOLUTIONS[resolution]))
+    else:
+        where, params = "resolution = ?", (TOTAL,)
+
+    rows = pool.fetchall(
+        f"SELECT dimension, key1, key2, count, total_time, sketch FROM docker_request_agg WHERE {where}",
+        params
+    )
+
+    merged = {}
+    for row in rows:
+        key = (row['dimension'], row['key1'], row['key2'])
+        entry = merged.setdefault(key, [0, 0.0, defaultdict(int)])
+        entry[0] += row['count']
+        entry[1] += row['total_time']
+        for index, n in _load_sketch(row['sketch']).items():
+            entry[2][index] += n
+
+    stats = {"interactions": [], "request_types": [], "status_codes": []}
+    for (dimension, key1, key2), (count, total_time, bins) in merged.items():
+        latency = percentiles(bins)
+        latency["avg_response_time"] = total_time / count if count else None
+        if dimension == 'pair':
+            entry = {"source_container": key1, "destination_container": key2, "request_count": count}
+            stats["interactions"].append(dict(entry, **latency))
+        elif dimension == 'method':
+            stats["request_types"].append(dict({"request_type": key1, "count": count}, **latency))
+        elif dimension == 'status':
+            stats["status_codes"].append(dict({"status_code": int(key1), "count": count}, **latency))
+
+    stats["interactions"].sort(key=lambda entry: entry["request_count"], reverse=True)
+    return stats
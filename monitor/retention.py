@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger('evodev-monitor')
+
+# Retention windows (hours) for raw samples, 1-minute and 1-hour rollups
+RAW_RETENTION_HOURS = float(os.environ.get('MONITOR_RAW_RETENTION_HOURS', 24))
+MINUTE_RETENTION_HOURS = float(os.environ.get('MONITOR_MINUTE_RETENTION_HOURS', 24 * 30))
+HOUR_RETENTION_HOURS = float(os.environ.get('MONITOR_HOUR_RETENTION_HOURS', 24 * 365))
+EVENTS_RETENTION_HOURS = float(os.environ.get('MONITOR_EVENTS_RETENTION_HOURS', 24 * 30))
+# How often the retention job runs (seconds)
+RETENTION_INTERVAL = int(os.environ.get('MONITOR_RETENTION_INTERVAL', 60))
+# Upper bound on points returned by an automatic range query
+MAX_POINTS = int(os.environ.get('MONITOR_MAX_POINTS', 1000))
+# Nominal spacing of raw samples, matches the monitoring thread interval
+RAW_SAMPLE_SECONDS = 5
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+RESOLUTIONS = {
+    # resolution: (table, bucket seconds, retention hours)
+    'raw': ('system_status', RAW_SAMPLE_SECONDS, RAW_RETENTION_HOURS),
+    '1m': ('system_status_1m', 60, MINUTE_RETENTION_HOURS),
+    '1h': ('system_status_1h', 3600, HOUR_RETENTION_HOURS),
+}
+
+ROLLUP_COLUMNS = '''
+    bucket TEXT PRIMARY KEY,
+    samples INTEGER,
+    cpu_min REAL, cpu_avg REAL, cpu_max REAL,
+    memory_min REAL, memory_avg REAL, memory_max REAL,
+    disk_min REAL, disk_avg REAL, disk_max REAL
+'''
+
+ROLLUP_MINUTE_SQL = '''
+INSERT OR REPLACE INTO system_status_1m
+SELECT strftime('%Y-%m-%d %H:%M:00', timestamp) AS bucket,
+       COUNT(*),
+       MIN(cpu_percent), AVG(cpu_percent), MAX(cpu_percent),
+       MIN(memory_percent), AVG(memory_percent), MAX(memory_percent),
+       MIN(disk_usage), AVG(disk_usage), MAX(disk_usage)
+FROM system_status
+WHERE timestamp >= ? AND timestamp < ?
+GROUP BY bucket
+'''
+
+ROLLUP_HOUR_SQL = '''
+INSERT OR REPLACE INTO system_status_1h
+SELECT strftime('%Y-%m-%d %H:00:00', bucket) AS hour,
+       SUM(samples),
+       MIN(cpu_min), SUM(cpu_avg * samples) / SUM(samples), MAX(cpu_max),
+       MIN(memory_min), SUM(memory_avg * samples) / SUM(samples), MAX(memory_max),
+       MIN(disk_min), SUM(disk_avg * samples) / SUM(samples), MAX(disk_max)
+FROM system_status_1m
+WHERE bucket >= ? AND bucket < ?
+GROUP BY hour
+'''
+
+
+def init_schema(pool):
+    """Create rollup tables and the timestamp indexes used by range and latest-row queries"""
+    with pool.transaction() as conn:
+        conn.execute(f"CREATE TABLE IF NOT EXISTS system_status_1m ({ROLLUP_COLUMNS})")
+        conn.execute(f"CREATE TABLE IF NOT EXISTS system_status_1h ({ROLLUP_COLUMNS})")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_system_status_timestamp ON system_status (timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_system_events_timestamp ON system_events (timestamp)")
+
+
+def parse_time(value):
+    """Parse epoch seconds or an ISO 8601 string into a naive UTC datetime"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        try:
+            return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            dt = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _fmt(dt):
+    return dt.strftime(TIME_FORMAT)
+
+
+def run_retention(pool, now=None):
+    """Roll completed minutes and hours into the aggregate tables and expire old rows"""
+    now = now or _utcnow()
+    current_minute = now.replace(second=0, microsecond=0)
+    current_hour = current_minute.replace(minute=0)
+    raw_cutoff = now - timedelta(hours=RAW_RETENTION_HOURS)
+
+    with pool.transaction() as conn:
+        # Re-roll from the newest existing bucket so a partially rolled minute is completed
+        last_minute = conn.execute("SELECT MAX(bucket) FROM system_status_1m").fetchone()[0]
+        conn.execute(ROLLUP_MINUTE_SQL, (last_minute or '', _fmt(current_minute)))
+
+        last_hour = conn.execute("SELECT MAX(bucket) FROM system_status_1h").fetchone()[0]
+        conn.execute(ROLLUP_HOUR_SQL, (last_hour or '', _fmt(current_hour)))
+
+        deleted = {
+            'raw': conn.execute("DELETE FROM system_status WHERE timestamp < ?",
+                                (_fmt(raw_cutoff),)).rowcount,
+            '1m': conn.execute("DELETE FROM system_status_1m WHERE bucket < ?",
+                               (_fmt(now - timedelta(hours=MINUTE_RETENTION_HOURS)),)).rowcount,
+            '1h': conn.execute("DELETE FROM system_status_1h WHERE bucket < ?",
+                               (_fmt(now - timedelta(hours=HOUR_RETENTION_HOURS)),)).rowcount,
+            'events': conn.execute("DELETE FROM system_events WHERE timestamp < ?",
+                                   (_fmt(now - timedelta(hours=EVENTS_RETENTION_HOURS)),)).rowcount,
+        }
+
+    if any(deleted.values()):
+        logger.debug(f"Retention removed rows: {deleted}")
+    return deleted
+
+
+def choose_resolution(start, end, now=None):
+    """Pick the cheapest table that still covers the range with at most MAX_POINTS points"""
+    now = now or _utcnow()
+    span = max((end - start).total_seconds(), 0)
+    for name in ('raw', '1m', '1h'):
+        _, bucket_seconds, retention_hours = RESOLUTIONS[name]
+        covers_range = start >= now - timedelta(hours=retention_hours)
+        if covers_range and span / bucket_seconds <= MAX_POINTS:
+            return name
+    return '1h'
+
+
+def query_status(pool, start=None, end=None, resolution='auto'):
+    """Return system status samples between start and end at the requested resolution"""
+    end = parse_time(end) if end is not None else _utcnow()
+    start = parse_time(start) if start is not None else end - timedelta(hours=1)
+    if start > end:
+        raise ValueError("'from' must not be later than 'to'")
+    if resolution in (None, '', 'auto'):
+        resolution = choose_resolution(start, end)
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+
+    table = RESOLUTIONS[resolution][0]
+    if resolution == 'raw':
+        points = pool.fetchall(
+            f"SELECT timestamp, cpu_percent, memory_percent, disk_usage FROM {table} "
+            "WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp",
+            (_fmt(start), _fmt(end))
+        )
+    else:
+        points = pool.fetchall(
+            f"SELECT bucket AS timestamp, samples, cpu_min, cpu_avg, cpu_max, "
+            f"memory_min, memory_avg, memory_max, disk_min, disk_avg, disk_max FROM {table} "
+            "WHERE bucket >= ? AND bucket <= ? ORDER BY bucket",
+            (_fmt(start), _fmt(end))
+        )
+
+    return {
+        "from": _fmt(start),
+        "to": _fmt(end),
+        "resolution": resolution,
+        "points": points
+    }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Production serving for the monitor Flask app.
+
+MONITOR_SERVER selects the server:
+  gunicorn - gthread workers (MONITOR_WORKERS processes x MONITOR_THREADS threads)
+  threaded - bounded thread pool on the Werkzeug WSGI server, no extra dependency
+  dev      - Flask development server
+  auto     - gunicorn when installed, threaded otherwise (default)
+
+SIGTERM stops accepting connections and waits up to MONITOR_GRACEFUL_TIMEOUT
+seconds for in-flight requests before exiting.
+
+Streaming responses (SSE log tails and chat answers) hold a serving thread
+for as long as the client stays connected. Each process allows at most
+MONITOR_MAX_STREAMS of them at once (half of MONITOR_THREADS by default) and
+answers further ones with 503, so the other threads stay free for short
+requests.
+"""
+import os
+import sys
+import fcntl
+import signal
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+# Try to import optional dependencies
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:
+    BaseApplication = None
+
+logger = logging.getLogger('evodev-monitor')
+
+SERVER = os.environ.get('MONITOR_SERVER', 'auto')
+WORKERS = int(os.environ.get('MONITOR_WORKERS', 1))
+THREADS = int(os.environ.get('MONITOR_THREADS', 32))
+# Worker heartbeat timeout: a gunicorn worker silent for longer is killed and replaced
+REQUEST_TIMEOUT = int(os.environ.get('MONITOR_REQUEST_TIMEOUT', 180))
+GRACEFUL_TIMEOUT = int(os.environ.get('MONITOR_GRACEFUL_TIMEOUT', 30))
+KEEPALIVE = int(os.environ.get('MONITOR_KEEPALIVE', 5))
+# Socket timeout for reading a request from a slow client (threaded server)
+READ_TIMEOUT = float(os.environ.get('MONITOR_READ_TIMEOUT', 30))
+MAX_STREAMS = int(os.environ.get('MONITOR_MAX_STREAMS', max(1, THREADS // 2)))
+
+
+def _primary(lock_path):
+    """True in the one process holding lock_path; the lock is released when that process exits"""
+    handle = open(lock_path, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _primary.handle = handle
+    return True
+
+
+class StreamLimiter:
+    """Counts open streaming responses of this process and refuses new ones past the limit"""
+
+    def __init__(self, limit=MAX_STREAMS):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a stream slot; False when all slots are in use"""
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    timeout = READ_TIMEOUT
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server handing connections to a fixed pool of threads"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=THREADS):
+        super().__init__(host, port, app, handler=_RequestHandler)
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='monitor-http')
+        self._pending = set()
+        self._pending_lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        future = self._executor.submit(self._handle, request, client_address)
+        with self._pending_lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._pending_lock:
+            self._pending.discard(future)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def drain(self, timeout=GRACEFUL_TIMEOUT):
+        """Wait for in-flight requests; returns the number still running at the deadline"""
+        with self._pending_lock:
+            pending = set(self._pending)
+        _, not_done = wait(pending, timeout=timeout)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return len(not_done)
+
+
+def serve_threaded(app, host, port, threads=THREADS, graceful_timeout=GRACEFUL_TIMEOUT):
+    server = PooledWSGIServer(host, port, app, threads=threads)
+
+    def stop(signum, frame):
+        logger.info("SIGTERM: stopping the listener and draining requests")
+        # shutdown() waits for serve_forever, which runs in this (main) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info(f"Serving on {host}:{port} with {threads} threads")
+    try:
+        server.serve_forever()
+    finally:
+        left = server.drain(graceful_timeout)
+        if left:
+            logger.warning(f"{left} requests still running after {graceful_timeout} s, exiting anyway")
+
+
+if BaseApplication is not None:
+
+    class GunicornServer(BaseApplication):
+        """Gunicorn arbiter serving an already imported WSGI app"""
+
+        def __init__(self, application, options):
+            self.application = application
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+
+def serve_gunicorn(app, host, port, on_start=None, before_fork=None, workers=WORKERS, threads=THREADS,
+                   timeout=REQUEST_TIMEOUT, graceful_timeout=GRACEFUL_TIMEOUT, lock_path=None):
+    lock_path = lock_path or os.path.join(tempfile.gettempdir(), f'evodev-monitor-{port}.lock')
+
+    def post_worker_init(worker):
+        # Background jobs run in a single worker; a replacement worker takes them over
+        if on_start is not None and _primary(lock_path):
+            logger.info(f"Worker {os.getpid()} runs the background monitoring")
+            on_start()
+
+    if before_fork is not None:
+        before_fork()
+    options = {
+        'bind': f'{host}:{port}',
+        'workers': workers,
+        'worker_class': 'gthread',
+        'threads': threads,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'keepalive': KEEPALIVE,
+        'post_worker_init': post_worker_init,
+        'accesslog': None,
+    }
+    logger.info(f"Serving on {host}:{port} with gunicorn ({workers} workers x {threads} threads)")
+    GunicornServer(app, options).run()
+
+
+def serve(app, host, port, on_start=None, before_fork=None, server=SERVER):
+    """Run app until SIGTERM; on_start starts the background jobs in exactly one serving process
+
+    before_fork releases resources (database connections, writer threads)
+    that must not be shared with forked gunicorn workers.
+    """
+    if server == 'auto':
+        server = 'gunicorn' if BaseApplication is not None else 'threaded'
+    if server == 'gunicorn':
+        if BaseApplication is None:
+            raise RuntimeError("gunicorn is not installed (pip install gunicorn) - use MONITOR_SERVER=threaded")
+        return serve_gunicorn(app, host, port, on_start=on_start, before_fork=before_fork)
+
+    if on_start is not None:
+        on_start()
+    if server == 'threaded':
+        return serve_threaded(app, host, port)
+    if server == 'dev':
+        # SIGTERM exits through SystemExit so queued events are still written
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        return app.run(host=host, port=port, debug=False, threaded=True)
+    raise ValueError(f"Unknown MONITOR_SERVER: {server}")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import os
+import time
+import logging
+import threading
+from collections import deque
+
+import psutil
+
+logger = logging.getLogger('evodev-monitor')
+
+# Sampling resolution (seconds) and number of samples kept in the ring buffer
+SAMPLE_INTERVAL = float(os.environ.get('MONITOR_SAMPLE_INTERVAL', 1.0))
+SAMPLE_HISTORY = int(os.environ.get('MONITOR_SAMPLE_HISTORY', 600))
+# Busiest processes recorded per sample (0 disables per-process metrics)
+TOP_PROCESSES = int(os.environ.get('MONITOR_SAMPLE_PROCESSES', 5))
+DISK_PATH = os.environ.get('MONITOR_DISK_PATH', '/')
+# CPU measurement window of the first sample, taken synchronously by start()
+PRIME_INTERVAL = 0.1
+
+
+def _rate(current, previous, elapsed):
+    if previous is None or elapsed <= 0:
+        return 0.0
+    # Counters restart from zero when an interface or disk is reset
+    return round(max(0, current - previous) / elapsed, 1)
+
+
+class SystemSampler:
+    """Background thread keeping a ring buffer of system metrics
+
+    cpu_percent() is measured between consecutive samples, so no caller
+    ever blocks on a measurement interval; readers get the latest sample.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL, history=SAMPLE_HISTORY, top_processes=TOP_PROCESSES,
+                 disk_path=DISK_PATH):
+        self.interval = interval
+        self.top_processes = top_processes
+        self.disk_path = disk_path
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous = None
+
+    def start(self):
+        """Take a first sample and start the sampling thread
+
+        The first sample measures CPU over PRIME_INTERVAL, so latest() has a
+        meaningful value as soon as start() returns.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._samples.append(self.sample(cpu_interval=PRIME_INTERVAL))
+            self._thread = threading.Thread(target=self._run, name='system-sampler', daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def latest(self):
+        """The most recent sample, or None before the first one"""
+        try:
+            return self._samples[-1]
+        except IndexError:
+            return None
+
+    def history(self, since=None, limit=None):
+        """Samples in the ring buffer, oldest first, optionally newer than `since` (unix time)"""
+        with self._lock:
+            samples = list(self._samples)
+        if since is not None:
+            samples = [s for s in samples if s['timestamp'] > since]
+        if limit:
+            samples = samples[-limit:]
+        return samples
+
+    def wait_ready(self, timeout=None):
+        """Block until the first sample is available (for startup and tests)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.latest() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _run(self):
+        # The first sample waits one interval so that its CPU figures cover a full period
+        next_at = time.monotonic() + self.interval
+        while not self._stop.wait(max(0, next_at - time.monotonic())):
+            try:
+                sample = self.sample()
+                with self._lock:
+                    self._samples.append(sample)
+            except Exception as e:
+                logger.error(f"Error sampling system metrics: {str(e)}")
+            # Fixed cadence regardless of how long the sample took
+            next_at = max(next_at + self.interval, time.monotonic())
+
+    def sample(self, cpu_interval=None):
+        """Take one sample; CPU figures cover the time since the previous call or cpu_interval"""
+        now = time.monotonic()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        net = psutil.net_io_counters()
+        try:
+            disk_io = psutil.disk_io_counters()
+        except Exception:
+            disk_io = None
+
+        previous = self._previous
+        elapsed = now - previous['time'] if previous else 0
+        counters = {
+            'time': now,
+            'net_sent': net.bytes_sent if net else 0,
+            'net_recv': net.bytes_recv if net else 0,
+            'disk_read': disk_io.read_bytes if disk_io else 0,
+            'disk_write': disk_io.write_bytes if disk_io else 0,
+        }
+        self._previous = counters
+
+        def rate(key):
+            return _rate(counters[key], previous[key] if previous else None, elapsed)
+
+        return {
+            'timestamp': round(time.time(), 3),
+            'cpu': {
+                'percent': psutil.cpu_percent(interval=cpu_interval),
+                'load': list(os.getloadavg()) if hasattr(os, 'getloadavg') else None,
+            },
+            'memory': {
+                'total': memory.total,
+                'available': memory.available,
+                'percent': memory.percent,
+            },
+            'disk': {
+                'total': disk.total,
+                'used': disk.used,
+                'free': disk.free,
+                'percent': disk.percent,
+                'read_bytes_per_s': rate('disk_read'),
+                'write_bytes_per_s': rate('disk_write'),
+            },
+            'network': {
+                'bytes_sent_per_s': rate('net_sent'),
+                'bytes_recv_per_s': rate('net_recv'),
+            },
+            'processes': self._processes(),
+        }
+
+    def _processes(self):
+        """Busiest processes by CPU; process_iter() reuses Process objects, so the
+        per-process CPU figure covers the time since the previous sample"""
+        if self.top_processes <= 0:
+            return []
+        processes = []
+        for proc in psutil.process_iter(['pid', 'name', 'memory_info']):
+            try:
+                cpu = proc.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            memory_info = proc.info['memory_info']
+            processes.append({
+                'pid': proc.info['pid'],
+                'name': proc.info['name'],
+                'cpu_percent': cpu,
+                'memory_rss': memory_info.rss if memory_info else None,
+            })
+        processes.sort(key=lambda p: p['cpu_percent'], reverse=True)
+        return processes[:self.top_processes]
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler():
+    """Return the process-wide sampler, starting it on first use"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemSampler()
+            _sampler.start()
+        return _sampler
+
+
+def latest():
+    """Latest sample of the shared sampler, or None when sampling failed at startup"""
+    sampler = get_sampler()
+    sample = sampler.latest()
+    if sample is None:
+        sampler.wait_ready(timeout=sampler.interval + 1)
+        sample = sampler.latest()
+    return sample
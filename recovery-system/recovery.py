@@ -12,6 +12,12 @@ import datetime
 import json
 from typing import Dict, List, Any
 
+# Współdzielony cache stanu kontenerów (pakiet evodev); bez niego stan jest odpytywany
+try:
+    from evodev.container_state import ContainerStateCache
+except ImportError:
+    ContainerStateCache = None
+
 # Konfiguracja logowania
 logging.basicConfig(
     level=logging.INFO,
@@ -26,12 +32,18 @@ logger = logging.getLogger(__name__)
 class RecoverySystem:
     """System przywracania dla infrastruktury autonomicznej"""
 
+    # Usługi krytyczne dla integralności systemu
+    CRITICAL_SERVICES = ["gitlab", "ollama", "autonomous-system", "recovery-system"]
+
     def __init__(self):
         self.gitlab_url = os.environ.get("GITLAB_URL", "http://gitlab:80")
         self.gitlab_token = os.environ.get("GITLAB_API_TOKEN", "")
         self.backup_dir = os.environ.get("BACKUP_DIR", "/backups")
         self.backup_interval = int(os.environ.get("BACKUP_INTERVAL", "3600"))
+        self.event_interval = float(os.environ.get("RECOVERY_EVENT_INTERVAL", "30"))
         self.docker_client = docker.from_env()
+        self.container_state = None
+        self._state_changed = threading.Event()
 
         # Utworzenie katalogu kopii zapasowych
         os.makedirs(self.backup_dir, exist_ok=True)
@@ -40,9 +52,33 @@ class RecoverySystem:
         self.monitor_thread = threading.Thread(target=self._monitor_system, daemon=True)
         self.monitor_thread.start()
 
+    def _start_container_state(self):
+        """Uruchomienie cache stanu kontenerów zasilanego zdarzeniami Dockera"""
+        if ContainerStateCache is None:
+            return
+        try:
+            self.container_state = ContainerStateCache(self.docker_client).start()
+            self.container_state.subscribe(self._on_container_change)
+            self.container_state.wait_ready(timeout=10)
+        except Exception as e:
+            logger.error(f"Cache stanu kontenerów niedostępny, używam odpytywania: {str(e)}")
+            self.container_state = None
+
+    def _on_container_change(self, action, record, previous):
+        """Wcześniejsze sprawdzenie systemu, gdy zmieni się stan usługi krytycznej"""
+        name = (record or previous or {}).get("name")
+        if name not in self.CRITICAL_SERVICES:
+            return
+        before = (previous or {}).get("status"), (previous or {}).get("health")
+        after = (record or {}).get("status"), (record or {}).get("health")
+        if before != after:
+            self._state_changed.set()
+
     def _monitor_system(self):
         """Ciągłe monitorowanie stanu systemu"""
+        self._start_container_state()
         while True:
+            started = time.monotonic()
             try:
                 # Sprawdzenie stanu usług
                 services_status = self._check_services_status()
@@ -58,13 +94,30 @@ class RecoverySystem:
             except Exception as e:
                 logger.error(f"Błąd w monitorowaniu systemu: {str(e)}")
 
-            # Pauza przed kolejnym sprawdzeniem
-            time.sleep(60)  # Sprawdzanie co minutę
+            # Pauza przed kolejnym sprawdzeniem (co minutę lub po zmianie stanu usługi krytycznej)
+            if self._state_changed.wait(60):
+                # Własne naprawy (start/restart) też generują zdarzenia, więc sprawdzenia
+                # wywołane zdarzeniami dzieli co najmniej event_interval sekund
+                remaining = started + self.event_interval - time.monotonic()
+                if remaining > 0:
+                    time.sleep(remaining)
+            self._state_changed.clear()
 
     def _check_services_status(self) -> Dict[str, Dict]:
         """Sprawdzenie stanu wszystkich usług"""
         services_status = {}
 
+        # Odczyt z migawki utrzymywanej przez zdarzenia Dockera, bez zapytań do API
+        if self.container_state is not None and self.container_state.ready:
+            for record in self.container_state.containers():
+                services_status[record["name"]] = {
+                    "status": record["status"],
+                    "image": record["image"] or "unknown",
+                    "created": record["created"],
+                    "health": record["health"]
+                }
+            return services_status
+
         try:
             containers = self.docker_client.containers.list(all=True)
 
@@ -99,9 +152,7 @@ class RecoverySystem:
     def _verify_system_integrity(self, services_status: Dict[str, Dict]) -> bool:
         """Weryfikacja integralności systemu"""
         # Sprawdzenie krytycznych usług
-        critical_services = ["gitlab", "ollama", "autonomous-system", "recovery-system"]
-
-        for service in critical_services:
+        for service in self.CRITICAL_SERVICES:
             if service not in services_status:
                 logger.error(f"Krytyczna usługa {service} nie istnieje!")
                 return False
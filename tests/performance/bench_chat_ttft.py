@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Time to first token of the monitor chat endpoints, streamed vs. buffered.
+
+Starts monitor/app.py against a fake Ollama that produces --tokens tokens
+--token-ms apart, then compares when the browser sees the first text with
+"stream": true (SSE) and without it. Finally opens a stream, disconnects
+after the first token and checks that the fake model stops generating. Usage:
+
+    python tests/performance/bench_chat_ttft.py [--server threaded] [--tokens 100] [--token-ms 50] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_health_latency import free_port, start_monitor  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+
+def buffered(base):
+    started = time.perf_counter()
+    response = requests.post(f"{base}/api/chat/message", json={"message": "status"}, timeout=300)
+    response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    return elapsed, elapsed
+
+
+def streamed(base):
+    started = time.perf_counter()
+    first = None
+    with requests.post(f"{base}/api/chat/message", json={"message": "status", "stream": True},
+                       stream=True, timeout=300) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if first is None and line.startswith(b"data: {\"token\""):
+                first = time.perf_counter() - started
+            if line.startswith(b"event: done"):
+                break
+    return first, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='threaded', help="MONITOR_SERVER for the monitor process")
+    parser.add_argument('--latency-ms', type=float, default=200, help="fake model time before the first token")
+    parser.add_argument('--tokens', type=int, default=100)
+    parser.add_argument('--token-ms', type=float, default=50)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeOllama(latency=args.latency_ms / 1000, token_delay=args.token_ms / 1000, tokens=args.tokens) as ollama:
+        process = start_monitor(args.server, port, ollama.url, tmp, threads=8)
+        try:
+            results = {}
+            for name, run in (("buffered", buffered), ("streamed", streamed)):
+                runs = [run(base) for _ in range(args.runs)]
+                results[name] = (statistics.median(r[0] for r in runs), statistics.median(r[1] for r in runs))
+
+            # Disconnect after the first token: the model request must be closed too
+            with requests.post(f"{base}/api/chat/message", json={"message": "status", "stream": True},
+                               stream=True, timeout=300) as response:
+                for line in response.iter_lines():
+                    if line.startswith(b"data: {\"token\""):
+                        break
+            deadline = time.monotonic() + 10
+            while ollama.state.in_flight and time.monotonic() < deadline:
+                time.sleep(0.05)
+            stopped = ollama.state.in_flight == 0 and ollama.state.cancelled == 1
+            stats = requests.get(f"{base}/api/chat/stream-stats", timeout=5).json().get("ollama", {})
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+    print(f"fake model:   {args.latency_ms:.0f} ms to first token, {args.tokens} tokens x {args.token_ms:.0f} ms")
+    for name, (first, total) in results.items():
+        print(f"{name + ':':<13} first text {first * 1000:8.1f} ms   complete {total * 1000:8.1f} ms")
+    print(f"server stats: ttft p50 {stats.get('ttft_p50_ms')} ms, completed {stats.get('completed')}, "
+          f"cancelled {stats.get('cancelled')}")
+    print(f"cancel:       model generation stopped after disconnect: {'yes' if stopped else 'NO'}")
+    return 0 if stopped and results["streamed"][0] < results["buffered"][0] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark of get_docker_containers() against a fake Docker API.
+
+Compares the previous `docker ps` + one `docker logs` process per container
+with monitor/docker_containers.py (one SDK client, concurrent log tails,
+TTL cache). The legacy path runs a stand-in `docker` CLI that talks to the
+same fake API, so both sides pay the same per-call latency. Usage:
+
+    python tests/performance/bench_docker_containers.py [--counts 10 50 200] [--latency-ms 2]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import docker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "monitor"))
+
+import docker_containers  # noqa: E402
+from fake_docker import FakeDocker  # noqa: E402
+
+FAKE_CLI = '''#!{python}
+import http.client, json, socket, struct, sys
+
+class Conn(http.client.HTTPConnection):
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX)
+        self.sock.connect({sock!r})
+
+def get(path):
+    conn = Conn("localhost")
+    conn.request("GET", path)
+    return conn.getresponse().read()
+
+if sys.argv[1] == "ps":
+    for c in json.loads(get("/containers/json?all=1")):
+        ports = ", ".join(f"{{p['IP']}}:{{p['PublicPort']}}->{{p['PrivatePort']}}/{{p['Type']}}" for p in c["Ports"])
+        print("|".join([c["Id"][:12], c["Names"][0][1:], c["Status"], c["Image"], ports]))
+elif sys.argv[1] == "logs":
+    get("/containers/%s/json" % sys.argv[-1])
+    data = get("/containers/%s/logs?stdout=1&stderr=1&tail=%s" % (sys.argv[-1], sys.argv[3]))
+    while data:
+        size = struct.unpack(">xxxxL", data[:8])[0]
+        sys.stdout.write(data[8:8 + size].decode())
+        data = data[8 + size:]
+'''
+
+
+def legacy_get_docker_containers():
+    """The subprocess implementation previously used by monitor/app.py"""
+    result = subprocess.run(
+        ["docker", "ps", "-a", "--format", "{{.ID}}|{{.Names}}|{{.Status}}|{{.Image}}|{{.Ports}}"],
+        capture_output=True, text=True, timeout=5
+    )
+    containers = []
+    for line in result.stdout.strip().split('\n'):
+        if not line:
+            continue
+        container_id, name, status, image, ports = line.split('|')[:5]
+        logs = ""
+        log_result = subprocess.run(
+            ["docker", "logs", "--tail", "3", container_id],
+            capture_output=True, text=True, timeout=2
+        )
+        if log_result.returncode == 0:
+            logs = log_result.stdout
+        containers.append({"id": container_id, "name": name, "status": status,
+                           "image": image, "ports": ports, "logs": logs})
+    return containers
+
+
+def measure(func, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_docker_containers benchmark")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--latency-ms", type=float, default=2.0,
+                        help="simulated daemon latency per API call")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'containers':>10} {'legacy CLI':>12} {'SDK cold':>12} {'SDK cached':>12}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory(prefix="evodev-dockerbench-") as tmpdir:
+            with FakeDocker(tmpdir, count=count, latency_ms=args.latency_ms) as fake:
+                cli = os.path.join(tmpdir, "docker")
+                with open(cli, "w") as f:
+                    f.write(FAKE_CLI.format(python=sys.executable, sock=fake.path))
+                os.chmod(cli, 0o755)
+                os.environ["PATH"] = tmpdir + os.pathsep + os.environ["PATH"]
+
+                legacy_ms, legacy = measure(legacy_get_docker_containers, args.repeat)
+
+                lister = docker_containers.ContainerLister(
+                    client_factory=lambda: docker.DockerClient(base_url=fake.base_url, version="1.43"))
+                cold_ms, current = measure(lambda: (lister.invalidate(), lister.list())[1], args.repeat)
+                cached_ms, _ = measure(lister.list, args.repeat)
+                lister.close()
+
+                os.environ["PATH"] = os.environ["PATH"].split(os.pathsep, 1)[1]
+                assert len(legacy) == len(current) == count
+                assert [c["logs"] for c in legacy] == [c["logs"] for c in current]
+                print(f"{count:>10} {legacy_ms:>10.1f}ms {cold_ms:>10.1f}ms {cached_ms:>10.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Load test of the monitor server: /health latency while chat requests are in flight.
+
+Starts monitor/app.py against a fake Ollama whose answers take --chat-seconds,
+keeps --chats /api/chat/message requests running, and measures /health
+latency for --seconds. It then sends SIGTERM while chats are running and
+checks that they complete before the server exits (graceful drain). Usage:
+
+    python tests/performance/bench_health_latency.py [--server gunicorn|threaded|dev] [--chats 10] [--seconds 10]
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_ollama import FakeOllama  # noqa: E402
+
+MONITOR_APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "monitor", "app.py")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def start_monitor(server, port, ollama_url, tmp, threads):
+    env = dict(os.environ,
+               MONITOR_SERVER=server, MONITOR_PORT=str(port), MONITOR_THREADS=str(threads),
+               MONITOR_DB=os.path.join(tmp, "monitor.db"), APP_LOG_FILE=os.path.join(tmp, "monitor.log"),
+               LOG_LEVEL="WARNING", LLM_PROVIDER="ollama", LLM_URL=ollama_url, LLM_MODEL="llama2")
+    process = subprocess.Popen([sys.executable, MONITOR_APP], env=env, cwd=tmp,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return process
+        except requests.RequestException:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("monitor did not start")
+
+
+def chat_loop(base, stop, results):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{base}/api/chat/message", json={"message": "status"}, timeout=120)
+            results.append((time.perf_counter() - started, response.ok and "response" in response.json()))
+        except requests.RequestException:
+            results.append((time.perf_counter() - started, False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', default='auto', help="MONITOR_SERVER for the monitor process")
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--chats', type=int, default=10, help="chat requests kept in flight")
+    parser.add_argument('--chat-seconds', type=float, default=2.0, help="fake Ollama answer time")
+    parser.add_argument('--seconds', type=float, default=10.0, help="duration of the /health measurement")
+    parser.add_argument('--max-p99-ms', type=float, default=50.0)
+    args = parser.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp, FakeOllama(latency=args.chat_seconds) as ollama:
+        process = start_monitor(args.server, port, ollama.url, tmp, args.threads)
+        try:
+            stop = threading.Event()
+            chats = []
+            workers = [threading.Thread(target=chat_loop, args=(base, stop, chats), daemon=True)
+                       for _ in range(args.chats)]
+            for worker in workers:
+                worker.start()
+            while ollama.state.in_flight < args.chats and not chats:
+                time.sleep(0.05)
+
+            health = []
+            errors = 0
+            session = requests.Session()
+            deadline = time.monotonic() + args.seconds
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    session.get(f"{base}/health", timeout=10).raise_for_status()
+                except requests.RequestException:
+                    errors += 1
+                health.append(time.perf_counter() - started)
+                time.sleep(0.005)
+            in_flight = ollama.state.in_flight
+
+            # Graceful drain: chats running at SIGTERM must still get their answers
+            stop.set()
+            completed = len(chats)
+            draining = ollama.state.in_flight
+            time.sleep(min(0.2, args.chat_seconds / 4))
+            process.send_signal(signal.SIGTERM)
+            for worker in workers:
+                worker.join(args.chat_seconds * 3)
+            drained = chats[completed:]
+            exit_code = process.wait(timeout=60)
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+    p99 = percentile(health, 99) * 1000
+    print(f"server:        {args.server}, {args.chats} chats in flight ({args.chat_seconds:.1f} s each)")
+    print(f"/health:       {len(health)} requests, {errors} errors, concurrent chats {in_flight}")
+    print(f"latency:       p50 {percentile(health, 50) * 1000:.2f} ms  p99 {p99:.2f} ms  "
+          f"max {max(health) * 1000:.2f} ms (target p99 < {args.max_p99_ms:.0f} ms)")
+    print(f"chats:         {completed} completed during the measurement")
+    answered = sum(ok for _, ok in drained)
+    print(f"drain:         {answered}/{draining} in-flight chats answered after SIGTERM, exit code {exit_code}")
+    return 0 if p99 < args.max_p99_ms and errors == 0 and answered >= draining else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
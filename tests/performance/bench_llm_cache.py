@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Re-running an unchanged project workflow with the LLM response cache.
+
+Runs heyken_bot's ProjectWorkflow for one project description against a fake
+Ollama that needs --latency-ms per answer, three times: with an empty cache,
+again in the same process (memory hits) and with a new gateway on the same
+cache directory, as after a restart (disk hits). Usage:
+
+    python tests/performance/bench_llm_cache.py [--latency-ms 2000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "heyken", "heyken_bot"))
+
+from evodev import llm_cache, llm_gateway  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from src.ollama.client import OllamaClient  # noqa: E402
+from src.project_manager.project import Project, ProjectStatus  # noqa: E402
+from src.project_manager.workflow import ProjectWorkflow  # noqa: E402
+
+
+def run_workflow(ollama_url):
+    project = Project("Aplikacja Todo", "Prosta aplikacja do zarządzania zadaniami z REST API")
+    started = time.perf_counter()
+    ProjectWorkflow(project, OllamaClient(ollama_url, "llama2")).run_to_completion()
+    return time.perf_counter() - started, project.status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--latency-ms', type=float, default=2000, help="fake model time per answer")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory, FakeOllama(latency=args.latency_ms / 1000) as ollama:
+        for name, fresh_gateway in (("cold cache", True), ("re-run", False), ("after restart", True)):
+            if fresh_gateway:
+                llm_gateway.close()
+                llm_gateway._shared = llm_gateway.LLMGateway(cache=llm_cache.ResponseCache(directory))
+            calls = ollama.state.calls.get("generate", 0)
+            seconds, status = run_workflow(ollama.url)
+            results.append((name, seconds, status, ollama.state.calls.get("generate", 0) - calls))
+        cache = llm_gateway.get_gateway().snapshot()["cache"]
+        llm_gateway.close()
+
+    print(f"fake model: {args.latency_ms:.0f} ms per answer")
+    for name, seconds, status, calls in results:
+        print(f"{name + ':':<15} {seconds * 1000:9.1f} ms   {calls} model calls   status {status.value}")
+    print(f"cache:          memory hits {cache['memory_hits']}, disk hits {cache['disk_hits']}, "
+          f"misses {cache['misses']}, {cache['disk_bytes']} bytes on disk")
+    completed = all(status == ProjectStatus.COMPLETED for _, _, status, _ in results)
+    return 0 if completed and results[1][3] == results[2][3] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
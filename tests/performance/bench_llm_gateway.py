@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Throughput of Ollama calls made with bare requests.post vs. through the LLM gateway.
+
+Runs --requests generate calls from --clients threads against a fake Ollama
+that serves --parallel generations at once (like OLLAMA_NUM_PARALLEL). The
+prompts are drawn from --distinct different texts, so concurrent callers
+often ask for the same thing (retested features, re-run workflows, several
+users asking one question). Compared modes:
+
+    bare      requests.post per call: a new TCP connection each time
+    pooled    gateway with coalescing off: keep-alive pool and model limit
+    gateway   gateway with identical in-flight prompts coalesced
+
+Finally the fake is stopped and the time until calls fail fast on the open
+circuit is measured. Usage:
+
+    python tests/performance/bench_llm_gateway.py [--requests 400] [--clients 32] [--distinct 40] [--latency-ms 20]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev import llm_gateway  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+
+def run(post, url, prompts, clients):
+    def call(prompt):
+        response = post(f"{url}/api/generate", json={"model": "llama2", "prompt": prompt, "stream": False},
+                        timeout=60)
+        response.raise_for_status()
+        return response.json()["response"]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        answers = list(pool.map(call, prompts))
+    return time.perf_counter() - started, len(answers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--distinct', type=int, default=40, help="different prompts among the requests")
+    parser.add_argument('--parallel', type=int, default=4, help="generations the fake model runs at once")
+    parser.add_argument('--latency-ms', type=float, default=20, help="fake generation time")
+    args = parser.parse_args()
+
+    random.seed(1)
+    prompts = [f"Przetestuj komponent {random.randrange(args.distinct)}" for _ in range(args.requests)]
+    results = {}
+    with FakeOllama(latency=args.latency_ms / 1000, parallel=args.parallel) as ollama:
+        modes = (
+            ("bare", lambda gateway: requests.post),
+            ("pooled", lambda gateway: lambda url, **kw: gateway.post(url, coalesce=False, **kw)),
+            ("gateway", lambda gateway: gateway.post),
+        )
+        for name, mode in modes:
+            gateway = llm_gateway.LLMGateway(model_concurrency=args.parallel)
+            post = mode(gateway)
+            calls, connections = ollama.state.calls.get("generate", 0), ollama.state.connections
+            seconds, count = run(post, ollama.url, prompts, args.clients)
+            results[name] = (seconds, count, ollama.state.calls["generate"] - calls,
+                             ollama.state.connections - connections)
+            if name == "gateway":
+                snapshot = gateway.snapshot()["calls"]["POST /api/generate llama2"]
+            gateway.close()
+
+    # Backend gone: after the breaker opens, calls fail at once instead of waiting on connects
+    logging.getLogger("evodev.llm_gateway").setLevel(logging.ERROR)
+    fast = llm_gateway.LLMGateway(breaker_failures=3, breaker_cooldown=60)
+    failures = []
+    for _ in range(10):
+        started = time.perf_counter()
+        try:
+            fast.get(f"{ollama.url}/api/tags")
+        except requests.ConnectionError as e:
+            failures.append((time.perf_counter() - started, type(e).__name__))
+    fast.close()
+
+    print(f"workload:  {args.requests} calls, {args.clients} clients, {args.distinct} distinct prompts, "
+          f"fake model {args.latency_ms:.0f} ms x {args.parallel} parallel")
+    for name, (seconds, count, upstream, connections) in results.items():
+        print(f"{name + ':':<10} {count / seconds:8.1f} calls/s   {seconds * 1000:8.1f} ms total   "
+              f"{upstream:4d} upstream calls   {connections:4d} connections")
+    print(f"gateway:   coalesced {snapshot['coalesced']}, avg slot wait {snapshot['avg_wait_ms']} ms")
+    rejected = [seconds for seconds, kind in failures if kind == "CircuitOpenError"]
+    print(f"breaker:   {len(failures) - len(rejected)} failed connects, then {len(rejected)} calls rejected "
+          f"in {max(rejected) * 1000 if rejected else 0:.2f} ms max")
+    gain = results["bare"][0] / results["gateway"][0]
+    print(f"speedup:   gateway {gain:.1f}x over bare requests")
+    return 0 if gain > 1 and rejected else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Throughput and failover of a pool of Ollama backends behind the LLM gateway.
+
+Starts --backends fake Ollama servers, each running one generation at a time
+for --gen-ms. --clients threads send --calls generations each to:
+
+    single     the first backend only (one OLLAMA_URL)
+    pool       a pool of all backends, least-outstanding routing
+    failover   the same pool, with one backend failing (HTTP 500) halfway through
+
+Usage:
+
+    python tests/performance/bench_llm_pool.py [--backends 3] [--gen-ms 200] [--clients 6] [--calls 10]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev import llm_gateway  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+POOL = "http://ollama:11434"
+
+
+def run(backends, members, args, break_one=False):
+    gateway = llm_gateway.LLMGateway(pools={POOL: [backend.url for backend in members]})
+    errors = []
+    done = []
+
+    def client(worker):
+        for n in range(args.calls):
+            try:
+                response = gateway.post(f"{POOL}/api/generate",
+                                        json={"model": "llama2", "prompt": f"{worker} {n}", "stream": False})
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+            except requests.exceptions.RequestException as e:
+                errors.append(e)
+            done.append(1)
+            if break_one and len(done) == args.clients * args.calls // 2:
+                backends[0].state.failing = True
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    gateway.close()
+    return len(done) / elapsed, len(errors), [backend.state.calls.get("generate", 0) for backend in backends]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', type=int, default=3, help="fake Ollama servers")
+    parser.add_argument('--gen-ms', type=float, default=200, help="fake generation time")
+    parser.add_argument('--clients', type=int, default=6, help="concurrent clients")
+    parser.add_argument('--calls', type=int, default=10, help="generations per client")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("single", "pool", "failover"):
+        with ExitStack() as stack:
+            backends = [stack.enter_context(FakeOllama(latency=args.gen_ms / 1000, parallel=1))
+                        for _ in range(args.backends)]
+            members = backends[:1] if mode == "single" else backends
+            results[mode] = run(backends, members, args, break_one=mode == "failover")
+
+    print(f"{args.backends} fake backends x 1 parallel x {args.gen_ms:.0f} ms, "
+          f"{args.clients} clients x {args.calls} calls")
+    for mode, (rate, errors, spread) in results.items():
+        print(f"{mode + ':':<9} {rate:6.2f} calls/s   errors {errors}   calls per backend {spread}")
+    ok = results["pool"][0] > results["single"][0] and results["failover"][1] == 0
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
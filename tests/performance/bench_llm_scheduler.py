@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Chat latency under batch load with the LLM priority scheduler.
+
+A fake Ollama runs --parallel generations at a time, each taking --gen-ms.
+--batch workers keep it busy with project-style generations while a user
+sends --chats messages one after another. Compares:
+
+    fifo        every call in one class and tenant: a chat message queues behind
+                all batch work already waiting
+    priority    batch calls in the batch class, chat messages interactive, one
+                backend slot reserved for interactive calls
+
+Usage:
+
+    python tests/performance/bench_llm_scheduler.py [--gen-ms 500] [--parallel 2] [--batch 8] [--chats 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev import llm_gateway, llm_scheduler  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+
+def run(ollama, args, batch_priority, chat_priority, reserve, fair):
+    gateway = llm_gateway.LLMGateway(backend_concurrency=args.parallel, interactive_reserve=reserve)
+    stop = threading.Event()
+    batch_done = []
+
+    def batch_worker(worker):
+        n = 0
+        with llm_scheduler.context(batch_priority, tenant=f"project-{worker % 2}" if fair else None):
+            while not stop.is_set():
+                gateway.post(f"{ollama.url}/api/generate",
+                             json={"model": "llama2", "prompt": f"batch {worker} {n}", "stream": False})
+                batch_done.append(1)
+                n += 1
+
+    workers = [threading.Thread(target=batch_worker, args=(worker,), daemon=True) for worker in range(args.batch)]
+    for worker in workers:
+        worker.start()
+    time.sleep(args.gen_ms / 1000)
+
+    latencies = []
+    started_chats = time.perf_counter()
+    with llm_scheduler.context(chat_priority, tenant="room" if fair else None):
+        for n in range(args.chats):
+            started = time.perf_counter()
+            gateway.post(f"{ollama.url}/api/generate",
+                         json={"model": "llama2", "prompt": f"chat {n}", "stream": False})
+            latencies.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - started_chats
+    stop.set()
+    for worker in workers:
+        worker.join()
+    gateway.close()
+    return latencies, len(batch_done) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gen-ms', type=float, default=500, help="fake generation time")
+    parser.add_argument('--parallel', type=int, default=2, help="generations the fake Ollama runs at once")
+    parser.add_argument('--batch', type=int, default=8, help="concurrent batch workers")
+    parser.add_argument('--chats', type=int, default=5, help="chat messages sent one after another")
+    args = parser.parse_args()
+
+    modes = {
+        "fifo": ("background", "background", 0, False),
+        "priority": ("batch", "interactive", 1, True),
+    }
+    results = {}
+    for name, (batch_priority, chat_priority, reserve, fair) in modes.items():
+        with FakeOllama(latency=args.gen_ms / 1000, parallel=args.parallel) as ollama:
+            results[name] = run(ollama, args, batch_priority, chat_priority, reserve, fair)
+
+    print(f"fake Ollama: {args.parallel} parallel x {args.gen_ms:.0f} ms, {args.batch} batch workers, "
+          f"{args.chats} chat messages")
+    for name, (latencies, batch_rate) in results.items():
+        print(f"{name + ':':<10} chat median {statistics.median(latencies) * 1000:8.1f} ms   "
+              f"max {max(latencies) * 1000:8.1f} ms   batch {batch_rate:5.2f} calls/s")
+    return 0 if statistics.median(results["priority"][0]) < statistics.median(results["fifo"][0]) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark of /api/logs reading strategies on a large synthetic log file.
+
+Compares the old readlines() implementation with monitor/log_reader.py.
+Usage:
+
+    python tests/performance/bench_log_reader.py [--size-mb 2048] [--lines 100]
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "monitor"))
+
+import log_reader  # noqa: E402
+
+
+def generate(path, size_mb):
+    """Write a log of roughly size_mb megabytes mixing JSON and plain lines"""
+    target = size_mb * 1024 * 1024
+    chunk_lines = []
+    for i in range(10000):
+        if i % 3:
+            chunk_lines.append(json.dumps({
+                "timestamp": "2025-05-10T12:00:00",
+                "level": "INFO",
+                "component": "evodev-monitor",
+                "message": f"request {i} handled"
+            }))
+        else:
+            chunk_lines.append(f"2025-05-10 12:00:00 - evodev-monitor - INFO - plain line {i}")
+    chunk = ("\n".join(chunk_lines) + "\n").encode()
+    written = 0
+    with open(path, "wb") as f:
+        while written < target:
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def legacy_read(path, max_lines):
+    """The readlines() implementation previously used by /api/logs"""
+    with open(path, "r", encoding="utf-8") as f:
+        all_lines = f.readlines()
+        last_lines = all_lines[-max_lines:] if len(all_lines) > max_lines else all_lines
+        parsed = []
+        for line in last_lines:
+            try:
+                parsed.append(json.loads(line))
+            except Exception:
+                parsed.append({"raw": line.strip()})
+        return {"total_lines": len(all_lines), "logs": parsed}
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<45} {elapsed * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/logs reader benchmark")
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--lines", type=int, default=100)
+    parser.add_argument("--skip-legacy", action="store_true",
+                        help="skip readlines(), which needs several times the file size in RAM")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="evodev-logbench-") as tmpdir:
+        path = os.path.join(tmpdir, "evodev-monitor.log")
+        size = generate(path, args.size_mb)
+        print(f"Synthetic log: {size / 1024 / 1024:.0f} MB")
+
+        page = timed("log_reader first call (builds line index)",
+                     lambda: log_reader.read_page(path, args.lines))
+        timed("log_reader tail (cached index)", lambda: log_reader.read_page(path, args.lines))
+        timed("log_reader page before cursor",
+              lambda: log_reader.read_page(path, args.lines, before=page["cursor"]["before"]))
+        timed("log_reader page after offset 0", lambda: log_reader.read_page(path, args.lines, after=0))
+        with open(path, "a") as f:
+            f.write("appended line\n" * 1000)
+        timed("log_reader tail after append (incremental)", lambda: log_reader.read_page(path, args.lines))
+        print(f"Peak RSS so far: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+        if not args.skip_legacy:
+            timed("legacy readlines()", lambda: legacy_read(path, args.lines))
+            print(f"Peak RSS after legacy: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
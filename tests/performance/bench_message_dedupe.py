@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Memory and speed of the answered-message store with --ids message ids.
+
+Adds --ids RocketChat-style ids (17 characters) to:
+
+    set         the unbounded set SimpleBot used before
+    store       evodev.message_dedupe.SeenMessages (memory LRU + SQLite)
+
+and reports Python heap growth (tracemalloc), add and lookup rates, the
+store's file size and how long reopening it takes. Lookups mix recent ids,
+old ids and unknown ids. The store must keep a flat memory profile while the
+set grows with every id.
+
+Usage:
+
+    python tests/performance/bench_message_dedupe.py [--ids 1000000] [--lookups 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev.message_dedupe import SeenMessages  # noqa: E402
+
+
+def message_id(n):
+    return f"{n:017x}"
+
+
+def fill(container, args):
+    """Add ids, sampling heap growth; returns (seconds, [(ids, bytes)])"""
+    samples = []
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    for n in range(args.ids):
+        container.add(message_id(n))
+        if (n + 1) % (args.ids // 4) == 0:
+            samples.append((n + 1, tracemalloc.get_traced_memory()[0] - base))
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    return elapsed, samples
+
+
+def lookups(container, args):
+    rng = random.Random(1)
+    keys = [message_id(rng.choice((rng.randrange(args.ids - 1000, args.ids), rng.randrange(args.ids),
+                                   args.ids + rng.randrange(args.ids)))) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    hits = sum(1 for key in keys if key in container)
+    return time.perf_counter() - started, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ids', type=int, default=1000000, help="message ids added")
+    parser.add_argument('--lookups', type=int, default=100000, help="membership checks")
+    args = parser.parse_args()
+
+    answered = set()
+    set_add, set_samples = fill(answered, args)
+    set_lookup, set_hits = lookups(answered, args)
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        path = os.path.join(state_dir, "answered.db")
+        store = SeenMessages(path)
+        store_add, store_samples = fill(store, args)
+        store_lookup, store_hits = lookups(store, args)
+        store.close()
+        size = sum(os.path.getsize(os.path.join(state_dir, name)) for name in os.listdir(state_dir))
+        started = time.perf_counter()
+        reopened = SeenMessages(path)
+        reopen = time.perf_counter() - started
+        restart_ok = message_id(0) in reopened and message_id(args.ids - 1) in reopened
+        reopened.close()
+
+    print(f"{args.ids} ids, {args.lookups} lookups")
+    for name, samples in (("set", set_samples), ("store", store_samples)):
+        growth = "  ".join(f"{ids // 1000}k:{size / 2 ** 20:7.1f} MB" for ids, size in samples)
+        print(f"{name + ':':<7} heap {growth}")
+    print(f"set:    {args.ids / set_add:10.0f} adds/s   {args.lookups / set_lookup:10.0f} lookups/s")
+    print(f"store:  {args.ids / store_add:10.0f} adds/s   {args.lookups / store_lookup:10.0f} lookups/s   "
+          f"disk {size / 2 ** 20:.1f} MB   reopen {reopen * 1000:.0f} ms   restart keeps ids: {restart_ok}")
+    flat = store_samples[-1][1] < 2 * store_samples[0][1] + 2 ** 20
+    ok = flat and restart_ok and store_hits == set_hits
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
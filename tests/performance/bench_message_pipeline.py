@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Latency of chat messages handled one by one vs through the room pipeline.
+
+Each of --rooms rooms receives --messages chat messages that take --llm-ms
+to answer (a stand-in for the LLM call), followed by a cheap command. The
+same burst is handled by:
+
+    sequential  one message after another, as the bots did before
+    pipeline    evodev.message_pipeline.RoomPipeline with --workers workers,
+                cheap commands answered inline
+
+and the script reports the total time, chat reply latency (p50/p95) and
+command latency, and checks that every room got its replies in order.
+
+Usage:
+
+    python tests/performance/bench_message_pipeline.py [--rooms 8] [--messages 3] [--llm-ms 100] [--workers 4]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev.message_pipeline import RoomPipeline  # noqa: E402
+
+
+def burst(args):
+    """Messages as (room, n, is_command), interleaved across rooms as they arrive"""
+    messages = [(f"room{r}", n, False) for n in range(args.messages) for r in range(args.rooms)]
+    return messages + [(f"room{r}", args.messages, True) for r in range(args.rooms)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))] * 1000
+
+
+def run(args, pipelined):
+    lock = threading.Lock()
+    replies = {}
+    chat, commands = [], []
+
+    def answer(message):
+        room, n, is_command = message
+        if not is_command:
+            time.sleep(args.llm_ms / 1000.0)
+        with lock:
+            replies.setdefault(room, []).append(n)
+            (commands if is_command else chat).append(time.perf_counter() - started)
+
+    pipeline = RoomPipeline(answer, workers=args.workers, room_depth=args.messages + 1, name="bench")
+    if pipelined:
+        pipeline.start()
+    started = time.perf_counter()
+    for message in burst(args):
+        if not pipelined or message[2]:
+            answer(message)
+        else:
+            pipeline.submit(message[0], message)
+    pipeline.stop()
+    total = time.perf_counter() - started
+    ordered = all([n for n in replies[f"room{r}"] if n < args.messages] == list(range(args.messages))
+                  for r in range(args.rooms))
+    return total, chat, commands, ordered, pipeline.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=8, help="rooms sending messages")
+    parser.add_argument('--messages', type=int, default=3, help="chat messages per room")
+    parser.add_argument('--llm-ms', type=float, default=100, help="time to answer one chat message")
+    parser.add_argument('--workers', type=int, default=4, help="pipeline workers")
+    args = parser.parse_args()
+
+    print(f"{args.rooms} rooms x {args.messages} chat messages of {args.llm_ms:.0f} ms + 1 command, "
+          f"{args.workers} workers")
+    results = {}
+    for name, pipelined in (("sequential", False), ("pipeline", True)):
+        total, chat, commands, ordered, snapshot = run(args, pipelined)
+        results[name] = (total, ordered)
+        print(f"{name + ':':<12} total {total * 1000:7.0f} ms   chat p50 {percentile(chat, 50):6.0f} ms "
+              f"p95 {percentile(chat, 95):6.0f} ms   command max {max(commands) * 1000:6.0f} ms   "
+              f"in order: {ordered}")
+        if pipelined:
+            print(f"{'':<12} queue wait p95 {snapshot['queue_wait']['p95_ms']} ms   "
+                  f"handler p95 {snapshot['handler']['p95_ms']} ms")
+    ok = all(ordered for _, ordered in results.values()) and results["pipeline"][0] < results["sequential"][0]
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bot start and first-answer latency with the Ollama model manager.
+
+Against a fake Ollama where the model is not yet pulled (--pull-ms per
+progress step, 5 steps) and loading it takes --load-ms, compares:
+
+    inline    the old check_connection(): blocking /api/pull, then the first
+              question pays the model load
+    manager   ensure() at start: pull and warm-up run in the background and
+              the first question finds the model in memory
+
+Usage:
+
+    python tests/performance/bench_model_warmup.py [--pull-ms 400] [--load-ms 3000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+from evodev import llm_gateway, llm_models  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+MODEL = "llama3"
+PAYLOAD = {"model": MODEL, "prompt": "Cześć", "stream": False}
+
+
+def inline(ollama, question_after):
+    started = time.perf_counter()
+    requests.post(f"{ollama.url}/api/pull", json={"name": MODEL, "stream": False}).raise_for_status()
+    ready = time.perf_counter() - started
+    time.sleep(question_after)
+    asked = time.perf_counter()
+    requests.post(f"{ollama.url}/api/generate", json=PAYLOAD).raise_for_status()
+    return ready, time.perf_counter() - asked
+
+
+def managed(ollama, question_after):
+    gateway = llm_gateway.LLMGateway()
+    gateway.models = manager = llm_models.ModelManager(gateway)
+    started = time.perf_counter()
+    manager.ensure(ollama.url, MODEL)
+    ready = time.perf_counter() - started
+    time.sleep(question_after)
+    manager.wait(ollama.url, MODEL, timeout=60)
+    asked = time.perf_counter()
+    gateway.post(f"{ollama.url}/api/generate", json=PAYLOAD).raise_for_status()
+    answered = time.perf_counter() - asked
+    gateway.close()
+    return ready, answered
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pull-ms', type=float, default=400, help="fake pull time per progress step")
+    parser.add_argument('--load-ms', type=float, default=3000, help="fake model load time")
+    parser.add_argument('--question-after-ms', type=float, default=5000,
+                        help="time between bot start and the first question")
+    args = parser.parse_args()
+
+    results = {}
+    for name, run in (("inline", inline), ("manager", managed)):
+        with FakeOllama(models=(), registry=(MODEL,), pull_delay=args.pull_ms / 1000,
+                        load_delay=args.load_ms / 1000) as ollama:
+            results[name] = run(ollama, args.question_after_ms / 1000)
+
+    print(f"fake model: pull {args.pull_ms * 5:.0f} ms, load {args.load_ms:.0f} ms, "
+          f"first question {args.question_after_ms:.0f} ms after start")
+    for name, (ready, answered) in results.items():
+        print(f"{name + ':':<9} start blocked {ready * 1000:8.1f} ms   first answer {answered * 1000:8.1f} ms")
+    return 0 if results["manager"][0] < results["inline"][0] and results["manager"][1] < results["inline"][1] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the monitor /api/status and /api/events endpoints.
+
+Compares the old connect-per-call access pattern with the pooled connections
+from monitor/db_pool.py. Usage:
+
+    python tests/performance/bench_monitor_db.py [--seconds 3] [--threads 4]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+MONITOR_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "monitor")
+TMP_DIR = tempfile.mkdtemp(prefix="evodev-bench-")
+os.environ["MONITOR_DB"] = os.path.join(TMP_DIR, "monitor.db")
+os.environ["APP_LOG_FILE"] = os.path.join(TMP_DIR, "monitor.log")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+sys.path.insert(0, MONITOR_DIR)
+
+import app as monitor_app  # noqa: E402
+
+
+class ConnectPerCallDB:
+    """Stand-in for the pool that reproduces the old connect/close per call"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def connection(self):
+        yield None
+
+    def execute(self, sql, params=()):
+        conn = self._connect()
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+        return cursor
+
+    def fetchall(self, sql, params=()):
+        conn = self._connect()
+        rows = [dict(row) for row in conn.execute(sql, params).fetchall()]
+        conn.close()
+        return rows
+
+    def fetchone(self, sql, params=()):
+        conn = self._connect()
+        row = conn.execute(sql, params).fetchone()
+        conn.close()
+        return dict(row) if row else None
+
+
+def seed(rows):
+    """Fill the database with status samples and events"""
+    monitor_app.init_db()
+    with monitor_app.db.transaction() as conn:
+        conn.executemany(
+            monitor_app.INSERT_STATUS_SQL,
+            [(10.0, 20.0, 30.0, "evodev: Up") for _ in range(rows)]
+        )
+        conn.executemany(
+            monitor_app.INSERT_EVENT_SQL,
+            [("INFO", "bench", f"event {i}", json.dumps({"i": i})) for i in range(rows)]
+        )
+
+
+def run(label, func, seconds, threads):
+    """Call func from several threads for a fixed time and print requests/s"""
+    counts = [0] * threads
+    stop = time.perf_counter() + seconds
+
+    def worker(idx):
+        while time.perf_counter() < stop:
+            func()
+            counts[idx] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    total = sum(counts)
+    print(f"{label:<40} {total / seconds:>10.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monitor DB access benchmark")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    client = monitor_app.app.test_client()
+
+    pooled = monitor_app.db
+    for label, backend in (("before (connect per call)", ConnectPerCallDB(monitor_app.DB_PATH)),
+                           ("after  (pooled)", pooled)):
+        monitor_app.db = backend
+        run(f"/api/status  {label}", lambda: client.get("/api/status"), args.seconds, args.threads)
+        run(f"/api/events  {label}", lambda: client.get("/api/events?limit=20"), args.seconds, args.threads)
+    monitor_app.db = pooled
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Message latency and HTTP load of RocketChat ingestion: REST polling vs realtime.
+
+Runs heyken_bot's RocketChatClient loop (get_new_messages + wait_for_messages
+with --poll-interval) against a fake RocketChat with --rooms rooms, posts
+--messages messages spread over --seconds and reports:
+
+    latency     time from a message being posted to get_new_messages() returning it
+    REST calls  requests made by the client while mostly idle
+
+Usage:
+
+    python tests/performance/bench_rocketchat_ingest.py [--rooms 20] [--messages 10] [--seconds 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "heyken", "heyken_bot"))
+
+from fake_rocketchat import FakeRocketChat  # noqa: E402
+from src.rocketchat.client import RocketChatClient  # noqa: E402
+
+
+def rest_calls(rocketchat):
+    with rocketchat.state.lock:
+        return sum(count for name, count in rocketchat.state.calls.items()
+                   if name != "websocket" and not name.startswith("sub:"))
+
+
+def run(args, realtime):
+    with FakeRocketChat(direct_rooms=args.rooms // 2, channels=args.rooms - args.rooms // 2) as rocketchat:
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        client.login()
+        if realtime:
+            client.start_realtime()
+            client.realtime.wait_connected(5)
+        received = {}
+        stop = threading.Event()
+
+        def loop():
+            while not stop.is_set():
+                for message in client.get_new_messages():
+                    received[message.text] = time.perf_counter()
+                client.wait_for_messages(args.poll_interval)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        time.sleep(0.5)
+        before = rest_calls(rocketchat)
+        posted = {}
+        rooms = list(rocketchat.state.rooms)
+        for n in range(args.messages):
+            time.sleep(args.seconds / args.messages)
+            text = f"message {n}"
+            posted[text] = time.perf_counter()
+            rocketchat.post(rooms[n % len(rooms)], text)
+        time.sleep(args.poll_interval + 0.5)
+        stop.set()
+        thread.join()
+        calls = rest_calls(rocketchat) - before
+        client.stop_realtime()
+    latencies = [received[text] - posted[text] for text in posted if text in received]
+    return latencies, len(posted) - len(latencies), calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=20, help="rooms the bot is in")
+    parser.add_argument('--messages', type=int, default=10, help="messages posted during the run")
+    parser.add_argument('--seconds', type=float, default=10, help="run length")
+    parser.add_argument('--poll-interval', type=float, default=2.0, help="bot poll interval")
+    args = parser.parse_args()
+
+    results = {"polling": run(args, realtime=False), "realtime": run(args, realtime=True)}
+    print(f"{args.rooms} rooms, {args.messages} messages over {args.seconds:.0f} s, poll interval {args.poll_interval} s")
+    for name, (latencies, lost, calls) in results.items():
+        print(f"{name + ':':<10} latency median {statistics.median(latencies) * 1000:8.1f} ms   "
+              f"max {max(latencies) * 1000:8.1f} ms   lost {lost}   REST calls {calls}")
+    polling, realtime = results["polling"], results["realtime"]
+    ok = realtime[1] == 0 and statistics.median(realtime[0]) < statistics.median(polling[0]) and realtime[2] < polling[2]
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Poll-cycle latency of heyken_bot's RocketChatClient at 5, 50 and 500 rooms.
+
+Every room of a fake RocketChat (each REST GET taking --latency-ms) gets one
+new message before each of --polls polls, so every room has to be read.
+Modes:
+
+    baseline     rooms one after another, a new TCP connection per request
+    keepalive    rooms one after another over the keep-alive session
+    concurrent   keep-alive session, rooms read by ROCKETCHAT_FETCH_WORKERS threads
+
+Usage:
+
+    python tests/performance/bench_rocketchat_poll.py [--rooms 5 50 500] [--latency-ms 2] [--polls 5] [--workers 8]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_sync  # noqa: E402
+from fake_rocketchat import FakeRocketChat  # noqa: E402
+from src.rocketchat import client as rocketchat_client  # noqa: E402
+
+
+def run(rooms, mode, args):
+    rocketchat_client.FETCH_WORKERS = args.workers if mode == "concurrent" else 1
+    with FakeRocketChat(direct_rooms=rooms // 2, channels=rooms - rooms // 2,
+                        latency=args.latency_ms / 1000) as rocketchat, tempfile.TemporaryDirectory() as state_dir:
+        client = rocketchat_client.RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        client.cursors = rocketchat_sync.RoomCursors(os.path.join(state_dir, "cursors.json"))
+        if mode == "baseline":
+            # The clients' previous requests.get()/post(): a throwaway session and connection per request
+            client.session.request = requests.request
+        client.login()
+        client.get_new_messages()
+        room_ids = list(rocketchat.state.rooms)
+        connections = rocketchat.state.connections
+        cycles = []
+        for poll in range(args.polls):
+            time.sleep(0.005)
+            for room_id in room_ids:
+                rocketchat.post(room_id, f"nowa {poll}")
+            started = time.perf_counter()
+            received = len(client.get_new_messages())
+            cycles.append(time.perf_counter() - started)
+            assert received == rooms, (mode, received, rooms)
+        connections = rocketchat.state.connections - connections
+        client.close()
+    return statistics.median(cycles), connections / args.polls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, nargs="+", default=[5, 50, 500], help="room counts")
+    parser.add_argument('--latency-ms', type=float, default=2, help="fake server time per GET")
+    parser.add_argument('--polls', type=int, default=5, help="polls measured per room count")
+    parser.add_argument('--workers', type=int, default=8, help="fetch threads in concurrent mode")
+    args = parser.parse_args()
+
+    print(f"every room has a new message per poll, {args.latency_ms:.0f} ms per GET, median of {args.polls} polls")
+    ok = True
+    for rooms in args.rooms:
+        results = {mode: run(rooms, mode, args) for mode in ("baseline", "keepalive", "concurrent")}
+        line = "   ".join(f"{mode} {cycle * 1000:8.1f} ms ({connections:5.1f} conn)"
+                          for mode, (cycle, connections) in results.items())
+        print(f"{rooms:4d} rooms:  {line}")
+        ok = ok and results["concurrent"][0] < results["baseline"][0]
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
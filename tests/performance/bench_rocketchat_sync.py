@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Cost of a REST poll of all rooms: last 50 messages per room vs per-room cursors.
+
+Fills --rooms rooms of a fake RocketChat with --history messages each, then
+runs --polls polls of heyken_bot's RocketChatClient with --new new messages
+posted before each, and reports per poll:
+
+    requests    HTTP requests made
+    messages    message documents transferred
+    time        wall time of get_new_messages()
+
+    legacy      im/channels.messages?count=50 for every room (no cursors)
+    cursors     only rooms whose lm moved, im/channels.history from the mark
+
+Usage:
+
+    python tests/performance/bench_rocketchat_sync.py [--rooms 200] [--history 50] [--new 5] [--polls 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.join(HERE, "..", ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_sync  # noqa: E402
+from fake_rocketchat import FakeRocketChat  # noqa: E402
+from src.rocketchat.client import RocketChatClient  # noqa: E402
+
+
+def run(args, cursors):
+    with FakeRocketChat(direct_rooms=args.rooms // 2, channels=args.rooms - args.rooms // 2) as rocketchat, \
+            tempfile.TemporaryDirectory() as state_dir:
+        rooms = list(rocketchat.state.rooms)
+        for room_id in rooms:
+            for n in range(args.history):
+                rocketchat.post(room_id, f"historia {n}")
+        time.sleep(0.005)
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        client.cursors = rocketchat_sync.RoomCursors(os.path.join(state_dir, "cursors.json")) if cursors else None
+        client.login()
+        client.get_new_messages()
+
+        transferred = 0
+        original_request = client.session.request
+
+        def counting_request(*request_args, **kwargs):
+            nonlocal transferred
+            response = original_request(*request_args, **kwargs)
+            transferred += len(response.json().get("messages", ()))
+            return response
+
+        calls_before = sum(rocketchat.state.calls.values())
+        elapsed, returned = 0.0, 0
+        client.session.request = counting_request
+        try:
+            for poll in range(args.polls):
+                # Timestamps are whole milliseconds: keep new messages clear of the previous poll
+                time.sleep(0.005)
+                for n in range(args.new):
+                    rocketchat.post(rooms[(poll * args.new + n) % len(rooms)], f"nowa {poll}.{n}")
+                started = time.perf_counter()
+                returned += len(client.get_new_messages())
+                elapsed += time.perf_counter() - started
+        finally:
+            client.session.request = original_request
+        calls = sum(rocketchat.state.calls.values()) - calls_before
+        client.close()
+    return calls / args.polls, transferred / args.polls, elapsed / args.polls, returned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rooms', type=int, default=200, help="rooms the bot is in")
+    parser.add_argument('--history', type=int, default=50, help="messages already in every room")
+    parser.add_argument('--new', type=int, default=5, help="new messages before every poll")
+    parser.add_argument('--polls', type=int, default=10, help="polls measured")
+    args = parser.parse_args()
+
+    results = {"legacy": run(args, cursors=False), "cursors": run(args, cursors=True)}
+    print(f"{args.rooms} rooms x {args.history} messages, {args.new} new messages per poll, {args.polls} polls")
+    for name, (calls, transferred, elapsed, returned) in results.items():
+        print(f"{name + ':':<9} {calls:7.1f} requests/poll   {transferred:8.1f} messages/poll   "
+              f"{elapsed * 1000:8.1f} ms/poll   returned {returned}")
+    legacy, incremental = results["legacy"], results["cursors"]
+    ok = incremental[3] == args.new * args.polls and incremental[0] < legacy[0] and incremental[2] < legacy[2]
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
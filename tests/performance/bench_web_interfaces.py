@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark of get_container_web_interfaces() against a fake Docker API.
+
+A handful of EvoDev containers run among hundreds of unrelated ones. The
+previous implementation (new client, list everything, inspect every
+container serially) is compared with the compose project index (label
+filtered list, concurrent inspects, cache invalidated by events). Usage:
+
+    python tests/performance/bench_web_interfaces.py [--unrelated 300] [--evodev 12] [--latency-ms 2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import docker
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "monitor"))
+
+from fake_docker import FakeDocker  # noqa: E402
+
+
+def legacy_web_interfaces(base_url):
+    """The previous hot path: every container listed and inspected one after another"""
+    client = docker.DockerClient(base_url=base_url)
+    result = []
+    for container in client.containers.list(all=True):
+        info = client.api.inspect_container(container.id)
+        labels = info['Config']['Labels'] or {}
+        if labels.get('com.docker.compose.project', '').lower() != 'evodev':
+            continue
+        result.append({'id': container.id, 'name': container.name, 'ports': info['NetworkSettings']['Ports']})
+    client.close()
+    return result
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--unrelated', type=int, default=300)
+    parser.add_argument('--evodev', type=int, default=12)
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeDocker(tmp, count=args.unrelated + args.evodev, latency_ms=args.latency_ms) as fake:
+        for container in fake.state.containers[:args.evodev]:
+            container["Labels"] = {"com.docker.compose.project": "evodev", "com.docker.compose.service": "web"}
+        os.environ["DOCKER_HOST"] = fake.base_url
+        os.environ["MONITOR_DB"] = os.path.join(tmp, "monitor.db")
+        import docker_containers
+        import docker_monitor
+
+        legacy_ms, legacy = timed(lambda: legacy_web_interfaces(fake.base_url), args.repeat)
+        index = docker_containers.get_project_index()
+
+        def cold():
+            index.invalidate()
+            return docker_monitor.get_container_web_interfaces()
+
+        cold_ms, new = timed(cold, args.repeat)
+        cached_ms, _ = timed(docker_monitor.get_container_web_interfaces, args.repeat * 100)
+        assert len(new) == len(legacy) == args.evodev, (len(new), len(legacy))
+
+        print(f"{args.evodev} EvoDev among {args.unrelated} unrelated containers, {args.latency_ms} ms per API call")
+        print(f"legacy (list + serial inspects): {legacy_ms:9.2f} ms")
+        print(f"index, cache miss:               {cold_ms:9.2f} ms")
+        print(f"index, cached:                   {cached_ms:9.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
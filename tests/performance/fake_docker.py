@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Docker Engine API served on a Unix socket.
+
+Implements just enough of the API for the monitor's Docker code paths:
+/version, /containers/json, /containers/<id>/json, /containers/<id>/logs,
+/images/json and a streaming /events endpoint fed from Python. Error
+responses can be injected with FakeDockerState.failures.
+"""
+import json
+import os
+import queue
+import socketserver
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+
+def make_container(i):
+    container_id = f"{i:04x}" * 16
+    return {
+        "Id": container_id,
+        "Names": [f"/app-{i}"],
+        "Image": f"evodev/app:{i % 5}",
+        "State": "running" if i % 4 else "exited",
+        "Status": "Up 3 minutes" if i % 4 else "Exited (0) 1 minute ago",
+        "Ports": [{"IP": "0.0.0.0", "PrivatePort": 80, "PublicPort": 8000 + i, "Type": "tcp"}],
+        "Labels": {"com.docker.compose.project": f"project-{i % 3}"},
+        "NetworkSettings": {"Networks": {"bridge": {"IPAddress": f"172.17.{i // 250}.{i % 250 + 2}"}}},
+    }
+
+
+class FakeDockerState:
+    def __init__(self, count=10, latency_ms=0.0):
+        self.containers = [make_container(i) for i in range(count)]
+        self.latency = latency_ms / 1000.0
+        self.events = []
+        self.event_queues = []
+        self.calls = {}
+        # Status codes returned, in order, by the next requests instead of a real answer
+        self.failures = []
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def next_failure(self):
+        with self.lock:
+            return self.failures.pop(0) if self.failures else None
+
+    def emit(self, event):
+        """Send an event to every open /events stream"""
+        for q in list(self.event_queues):
+            q.put(event)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def address_string(self):
+        return "fake-docker"
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _find(self, container_id):
+        for container in self.server.state.containers:
+            if container["Id"].startswith(container_id) or container["Names"][0] == "/" + container_id:
+                return container
+        return None
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        # Strip the /v1.xx prefix
+        if parts and parts[0].startswith("v1."):
+            parts = parts[1:]
+        query = parse_qs(url.query)
+        failure = state.next_failure()
+        if failure is not None:
+            return self._json({"message": "injected failure"}, failure)
+
+        if parts == ["version"]:
+            return self._json({"ApiVersion": "1.43", "Version": "24.0.0"})
+        if parts == ["_ping"]:
+            return self._json("OK")
+        if parts == ["images", "json"]:
+            return self._json([])
+        if parts == ["events"]:
+            return self._events(state)
+        if parts == ["containers", "json"]:
+            state.count("list")
+            time.sleep(state.latency)
+            containers = state.containers
+            filters = json.loads(query.get("filters", ["{}"])[0])
+            for label in filters.get("label", []):
+                key, _, value = label.partition("=")
+                containers = [c for c in containers if key in c["Labels"] and (not value or c["Labels"][key] == value)]
+            return self._json(containers)
+        if len(parts) == 3 and parts[0] == "containers":
+            container = self._find(parts[1])
+            if container is None:
+                return self._json({"message": "No such container"}, 404)
+            time.sleep(state.latency)
+            if parts[2] == "json":
+                state.count("inspect")
+                return self._json({
+                    "Id": container["Id"],
+                    "Name": container["Names"][0],
+                    "Config": {"Tty": False, "Image": container["Image"], "Labels": container["Labels"]},
+                    "Created": "2025-05-10T11:00:00Z",
+                    "State": {"Status": container["State"], "Running": container["State"] == "running",
+                              "StartedAt": "2025-05-10T12:00:00Z"},
+                    "RestartCount": 0,
+                    "NetworkSettings": {"Ports": {"80/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(container["Ports"][0]["PublicPort"])}]},
+                                        "Networks": container["NetworkSettings"]["Networks"]},
+                })
+            if parts[2] == "logs":
+                state.count("logs")
+                tail = int(query.get("tail", ["3"])[0]) if query.get("tail", ["all"])[0] != "all" else 3
+                body = b""
+                for n in range(tail):
+                    line = f"{container['Names'][0][1:]} log line {n}\n".encode()
+                    body += struct.pack(">BxxxL", 1, len(line)) + line
+                self.send_response(200)
+                self.send_header("Content-Type", "application/vnd.docker.raw-stream")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+        self._json({"message": f"not implemented: {self.path}"}, 404)
+
+    def _events(self, state):
+        q = queue.Queue()
+        state.event_queues.append(q)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            while not self.server.stopping:
+                try:
+                    event = q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                data = (json.dumps(event) + "\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            state.event_queues.remove(q)
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    stopping = False
+
+
+class FakeDocker:
+    """Context manager running the fake API; `base_url` is passed to docker.DockerClient"""
+
+    def __init__(self, directory, count=10, latency_ms=0.0):
+        self.path = os.path.join(directory, "docker.sock")
+        self.state = FakeDockerState(count, latency_ms)
+        self.base_url = f"unix://{self.path}"
+
+    def __enter__(self):
+        self.server = Server(self.path, Handler)
+        self.server.state = self.state
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.stopping = True
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the Ollama HTTP API on localhost.
+
+Serves /api/tags, /api/generate and /api/chat with a fixed latency before the
+first token and a delay between tokens; with "stream": true the tokens are
+sent as newline-delimited JSON like the real server. With `parallel` set,
+only that many generations run at once and the rest wait, like
+OLLAMA_NUM_PARALLEL.
+
+Models are listed with their tag like the real server ("llama2:latest") and
+requests may name them without it. Models are "loaded" by their first request, which waits `load_delay`, and
+stay loaded for the request's keep_alive (default 5 minutes); a request
+without prompt or messages only loads the model. /api/ps lists loaded
+models and /api/pull streams progress while adding a model of `registry`.
+Setting `state.failing` makes every endpoint answer 500, like a backend
+whose runner crashed.
+"""
+import datetime
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def tagged(model):
+    """Name as Ollama lists it; requests without a tag mean :latest"""
+    if model and ":" not in model.rsplit("/", 1)[-1]:
+        return f"{model}:latest"
+    return model
+
+
+class FakeOllamaState:
+    def __init__(self, latency=0.0, token_delay=0.0, tokens=20, models=("llama2",), parallel=None,
+                 load_delay=0.0, registry=(), pull_delay=0.0):
+        self.latency = latency
+        self.load_delay = load_delay
+        self.registry = [tagged(name) for name in registry]
+        self.pull_delay = pull_delay
+        # Model -> time.time() until which it stays loaded, and the last keep_alive it was sent
+        self.loaded = {}
+        self.keep_alive = {}
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.models = [tagged(name) for name in models]
+        # Model digests reported by /api/tags; change one to simulate a re-pulled model
+        self.digests = {name: hashlib.sha256(name.encode()).hexdigest() for name in self.models}
+        self.calls = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.cancelled = 0
+        self.connections = 0
+        self.failing = False
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(parallel) if parallel else None
+
+    def count(self, name, delta=0):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.in_flight += delta
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def done(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+def keep_alive_seconds(value):
+    """Seconds of an Ollama keep_alive: a number or a duration like "90s", "5m", "1h"; negative is forever"""
+    if value is None:
+        return 300
+    if isinstance(value, str):
+        units = {"s": 1, "m": 60, "h": 3600}
+        if value[-1:] in units:
+            return float(value[:-1]) * units[value[-1]] if float(value[:-1]) >= 0 else 1e9
+        value = float(value)
+    return value if value >= 0 else 1e9
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; without this keep-alive clients hit delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.server.state.failing:
+            return self._json({"error": "llama runner process has terminated"}, 500)
+        if self.path == "/api/tags":
+            self.server.state.count("tags")
+            state = self.server.state
+            return self._json({"models": [{"name": name, "digest": state.digests.get(name)} for name in state.models]})
+        if self.path == "/api/ps":
+            state = self.server.state
+            state.count("ps")
+            now = time.time()
+            with state.lock:
+                loaded = {name: expires for name, expires in state.loaded.items() if expires > now}
+            return self._json({"models": [{
+                "name": name,
+                "expires_at": datetime.datetime.fromtimestamp(min(expires, 4e9), datetime.timezone.utc).isoformat(),
+            } for name, expires in loaded.items()]})
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if state.failing:
+            state.count("failed")
+            return self._json({"error": "llama runner process has terminated"}, 500)
+        if self.path == "/api/pull":
+            return self._pull(tagged(request.get("model") or request.get("name")), request.get("stream", True))
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self._json({"error": "not found"}, 404)
+        if tagged(request.get("model")) not in state.models:
+            return self._json({"error": f"model '{request.get('model')}' not found"}, 404)
+
+        name = self.path.rsplit("/", 1)[1]
+        if not request.get("prompt") and not request.get("messages"):
+            self._load(request)
+            state.count("load")
+            return self._json({"model": request["model"], "response": "", "done": True, "done_reason": "load"})
+        state.count(name, 1)
+        if state.slots:
+            state.slots.acquire()
+        try:
+            self._load(request)
+            time.sleep(state.latency)
+            tokens = [f"token{n} " for n in range(state.tokens)]
+            if request.get("stream", True):
+                return self._stream(name, request, tokens)
+            time.sleep(state.token_delay * len(tokens))
+            self._json(self._chunk(name, request, "".join(tokens), True))
+        finally:
+            if state.slots:
+                state.slots.release()
+            state.done()
+
+    def _load(self, request):
+        state = self.server.state
+        model = tagged(request["model"])
+        with state.lock:
+            warm = state.loaded.get(model, 0) > time.time()
+        if not warm:
+            time.sleep(state.load_delay)
+        with state.lock:
+            state.keep_alive[model] = request.get("keep_alive")
+            state.loaded[model] = time.time() + keep_alive_seconds(request.get("keep_alive"))
+
+    def _pull(self, model, stream):
+        state = self.server.state
+        state.count("pull")
+        if model not in state.registry and model not in state.models:
+            return self._json({"error": "pull model manifest: file does not exist"}, 500)
+        progress = [{"status": "pulling manifest"}]
+        progress += [{"status": "downloading", "total": 500, "completed": step * 100} for step in range(1, 6)]
+        progress.append({"status": "success"})
+        if not stream:
+            time.sleep(state.pull_delay * 5)
+            self._add_model(model)
+            return self._json(progress[-1])
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in progress:
+            if chunk["status"] == "success":
+                self._add_model(model)
+            elif chunk.get("completed"):
+                time.sleep(state.pull_delay)
+            self._write_chunk(chunk)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _add_model(self, model):
+        state = self.server.state
+        with state.lock:
+            if model not in state.models:
+                state.models.append(model)
+                state.digests[model] = hashlib.sha256(model.encode()).hexdigest()
+
+    def _chunk(self, name, request, text, done):
+        chunk = {"model": request["model"], "done": done}
+        if name == "chat":
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        if done:
+            chunk["eval_count"] = self.server.state.tokens
+        return chunk
+
+    def _stream(self, name, request, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for n, token in enumerate(tokens):
+                if n:
+                    time.sleep(self.server.state.token_delay)
+                self._write_chunk(self._chunk(name, request, token, False))
+            self._write_chunk(self._chunk(name, request, "", True))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            with self.server.state.lock:
+                self.server.state.cancelled += 1
+
+    def _write_chunk(self, payload):
+        data = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections or cancelled streams are expected
+        pass
+
+
+class FakeOllama:
+    """Context manager running the fake API on a free port; `url` is its base URL"""
+
+    def __init__(self, latency=0.0, token_delay=0.0, tokens=20, models=("llama2",), port=0, parallel=None,
+                 load_delay=0.0, registry=(), pull_delay=0.0):
+        self.state = FakeOllamaState(latency, token_delay, tokens, models, parallel, load_delay, registry, pull_delay)
+        self.port = port
+
+    def __enter__(self):
+        self.server = Server(("127.0.0.1", self.port), Handler)
+        self.server.state = self.state
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the RocketChat REST and realtime API on localhost.
+
+REST: login, im.list, channels.list(.joined) with the rooms' last message
+time (lm), im/channels.messages and im/channels.history with oldest/latest/
+inclusive/count/offset (newest first, ISO timestamps), chat.postMessage and
+users.setStatus. Realtime: /websocket speaks enough DDP for the bots -
+connect, login with a resume token, subscriptions to
+stream-room-messages/__my_messages__ and stream-notify-user, ping/pong -
+and pushes every new message to subscribed connections. post() adds a
+message as another user; drop_realtime() cuts the WebSocket connections,
+`state.realtime = False` refuses new ones and `state.answer_pings = False`
+leaves client pings unanswered. `latency` delays every REST GET,
+`state.expire_token()` makes the bot's token answer 401 until it logs in
+again and `state.connections` counts accepted TCP connections.
+"""
+import base64
+import datetime
+import hashlib
+import json
+import socket
+import struct
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+BOT_ID, BOT_TOKEN = "bot-id", "bot-token"
+
+
+def iso(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat(timespec="milliseconds")[:-6] + "Z"
+
+
+def parse_iso(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+class FakeRocketChatState:
+    def __init__(self, direct_rooms=1, channels=1, username="heyken_bot", latency=0.0):
+        self.username = username
+        self.latency = latency
+        self.token = BOT_TOKEN
+        self.connections = 0
+        self.realtime = True
+        self.answer_pings = True
+        self.rooms = {}
+        self.messages = {}
+        for n in range(direct_rooms):
+            self.add_room(f"dm{n}", "d")
+        for n in range(channels):
+            self.add_room(f"ch{n}", "c")
+        self.calls = {}
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def add_room(self, room_id, kind):
+        self.rooms[room_id] = {"_id": room_id, "t": kind, "name": room_id}
+        self.messages[room_id] = []
+
+    def expire_token(self):
+        """Invalidate the bot's token; the next login issues a new one"""
+        self.token = uuid.uuid4().hex
+
+    def count(self, name):
+        with self.lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def post(self, room_id, text, username="alice", user_id=None):
+        """Add a message to a room and push it to realtime subscribers; returns the message"""
+        now = time.time()
+        message = {"_id": uuid.uuid4().hex[:17], "rid": room_id, "msg": text, "ts": iso(now),
+                   "u": {"_id": user_id or f"{username}-id", "username": username}, "_updatedAt": iso(now)}
+        with self.lock:
+            self.messages[room_id].append(message)
+            self.rooms[room_id]["lm"] = message["ts"]
+            sessions = list(self.sessions)
+        event = {"msg": "changed", "collection": "stream-room-messages", "id": "id", "fields": {
+            "eventName": "__my_messages__",
+            "args": [dict(message, ts={"$date": int(now * 1000)}),
+                     {"roomType": self.rooms[room_id]["t"], "roomName": room_id}]}}
+        for session in sessions:
+            if session.subscribed:
+                session.send(event)
+        return message
+
+
+class RealtimeSession:
+    """One WebSocket connection on the server side"""
+
+    def __init__(self, handler):
+        self.sock = handler.connection
+        self.rfile = handler.rfile
+        self.subscribed = False
+        self.lock = threading.Lock()
+
+    def send(self, payload):
+        data = json.dumps(payload).encode()
+        if len(data) < 126:
+            header = struct.pack("!BB", 0x81, len(data))
+        elif len(data) < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, len(data))
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, len(data))
+        try:
+            with self.lock:
+                self.sock.sendall(header + data)
+        except OSError:
+            pass
+
+    def recv(self):
+        """Next (opcode, payload) from the client, None when the connection ended"""
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None
+        length = head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.rfile.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b"\0\0\0\0"
+        payload = bytes(byte ^ mask[n % 4] for n, byte in enumerate(self.rfile.read(length)))
+        return head[0] & 0x0F, payload
+
+    def drop(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        if self.headers.get("X-Auth-Token") == self.server.state.token and self.headers.get("X-User-Id") == BOT_ID:
+            return True
+        self._json({"status": "error", "message": "You must be logged in to do this."}, 401)
+        return False
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlsplit(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/websocket":
+            return self._websocket()
+        name = url.path.rsplit("/", 1)[1]
+        state.count(name)
+        if state.latency:
+            time.sleep(state.latency)
+        if not self._authorized():
+            return
+        if name == "im.list":
+            return self._json({"ims": self._rooms("d"), "success": True})
+        if name in ("channels.list", "channels.list.joined"):
+            return self._json({"channels": self._rooms("c"), "success": True})
+        if name in ("im.messages", "channels.messages"):
+            with state.lock:
+                messages = list(state.messages.get(params.get("roomId"), ()))
+            messages = messages[::-1][:int(params.get("count", 50))]
+            return self._json({"messages": messages, "count": len(messages), "success": True})
+        if name in ("im.history", "channels.history"):
+            return self._json({"messages": self._history(params), "success": True})
+        self._json({"success": False, "error": "not found"}, 404)
+
+    def _history(self, params):
+        """Messages between oldest and latest (exclusive unless inclusive=true), newest first"""
+        with self.server.state.lock:
+            messages = list(self.server.state.messages.get(params.get("roomId"), ()))
+        inclusive = params.get("inclusive") == "true"
+        oldest, latest = parse_iso(params.get("oldest")), parse_iso(params.get("latest"))
+        selected, skip = [], int(params.get("offset", 0))
+        for message in reversed(messages):
+            ts = parse_iso(message["ts"])
+            if latest is not None and (ts > latest or ts == latest and not inclusive):
+                continue
+            if oldest is not None and (ts < oldest or ts == oldest and not inclusive):
+                break
+            if skip:
+                skip -= 1
+                continue
+            selected.append(message)
+            if len(selected) == int(params.get("count", 20)):
+                break
+        return selected
+
+    def _rooms(self, kind):
+        with self.server.state.lock:
+            return [dict(room) for room in self.server.state.rooms.values() if room["t"] == kind]
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        name = urlsplit(self.path).path.rsplit("/", 1)[1]
+        state.count(name)
+        if name == "login":
+            return self._json({"status": "success", "data": {"authToken": state.token, "userId": BOT_ID}})
+        if not self._authorized():
+            return
+        if name == "chat.postMessage":
+            # Rooms are named after their ids, so "#ch0" addresses room ch0
+            room_id = request.get("roomId") or request["channel"].lstrip("#")
+            message = state.post(room_id, request["text"], state.username, BOT_ID)
+            return self._json({"message": message, "success": True})
+        if name == "users.setStatus":
+            return self._json({"success": True})
+        self._json({"success": False, "error": "not found"}, 404)
+
+    def _websocket(self):
+        state = self.server.state
+        state.count("websocket")
+        key = self.headers.get("Sec-WebSocket-Key")
+        if not state.realtime or self.headers.get("Upgrade", "").lower() != "websocket" or not key:
+            return self._json({"error": "not found"}, 404)
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept",
+                         base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode())
+        self.end_headers()
+        self.wfile.flush()
+        session = RealtimeSession(self)
+        with state.lock:
+            state.sessions.append(session)
+        try:
+            self._ddp(session)
+        finally:
+            with state.lock:
+                state.sessions.remove(session)
+            self.close_connection = True
+
+    def _ddp(self, session):
+        state = self.server.state
+        while True:
+            frame = session.recv()
+            if frame is None or frame[0] == 0x8:
+                return
+            if frame[0] == 0x9:
+                continue
+            message = json.loads(frame[1])
+            kind = message.get("msg")
+            if kind == "connect":
+                session.send({"msg": "connected", "session": uuid.uuid4().hex})
+            elif kind == "ping" and state.answer_pings:
+                session.send({"msg": "pong"})
+            elif kind == "method" and message.get("method") == "login":
+                if message["params"][0].get("resume") == state.token:
+                    session.send({"msg": "result", "id": message["id"], "result": {"id": BOT_ID, "token": state.token}})
+                else:
+                    session.send({"msg": "result", "id": message["id"],
+                                  "error": {"error": 403, "reason": "You've been logged out by the server."}})
+            elif kind == "sub":
+                state.count(f"sub:{message['name']}")
+                session.send({"msg": "ready", "subs": [message["id"]]})
+                if message["name"] == "stream-room-messages":
+                    session.subscribed = True
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (ConnectionResetError, BrokenPipeError, OSError):
+            self.close_connection = True
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class FakeRocketChat:
+    """Context manager running the fake API on a free port; `url` is its base URL"""
+
+    def __init__(self, direct_rooms=1, channels=1, port=0, latency=0.0):
+        self.state = FakeRocketChatState(direct_rooms, channels, latency=latency)
+        self.port = port
+
+    def post(self, room_id, text, username="alice"):
+        return self.state.post(room_id, text, username)
+
+    def drop_realtime(self):
+        with self.state.lock:
+            sessions = list(self.state.sessions)
+        for session in sessions:
+            session.drop()
+
+    def __enter__(self):
+        self.server = Server(("127.0.0.1", self.port), Handler)
+        self.server.state = self.state
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.drop_realtime()
+        self.server.shutdown()
+        self.server.server_close()
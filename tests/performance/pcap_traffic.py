@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Synthetic HTTP captures in pcap format for the capture engine tests and benchmarks.
+
+Builds Ethernet/IPv4/TCP frames for keep-alive connections between container
+addresses, with requests split across segments, chunked and Content-Length
+responses, and optional out-of-order delivery and retransmissions.
+"""
+import random
+import socket
+import struct
+
+FIN, SYN, RST, PSH, ACK = 0x01, 0x02, 0x04, 0x08, 0x10
+
+
+def pcap_header(linktype=1, snaplen=262144):
+    return struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, snaplen, linktype)
+
+
+def pcap_record(ts, frame):
+    seconds = int(ts)
+    return struct.pack('<IIII', seconds, int(round((ts - seconds) * 1e6)), len(frame), len(frame)) + frame
+
+
+def tcp_frame(src, sport, dst, dport, seq, ack, flags, payload=b''):
+    """Ethernet + IPv4 + TCP frame (checksums are left at zero; the engine ignores them)"""
+    tcp = struct.pack('!HHIIBBHHH', sport, dport, seq & 0xffffffff, ack & 0xffffffff, 5 << 4, flags, 65535, 0, 0)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(tcp) + len(payload), 0, 0x4000, 64, socket.IPPROTO_TCP, 0,
+                     socket.inet_aton(src), socket.inet_aton(dst))
+    return b'\x02\x42\xac\x12\x00\x02\x02\x42\xac\x12\x00\x03\x08\x00' + ip + tcp + payload
+
+
+def write_pcap(stream, packets, linktype=1):
+    stream.write(pcap_header(linktype))
+    for ts, frame in packets:
+        stream.write(pcap_record(ts, frame))
+
+
+def request_bytes(method, path, body=b''):
+    head = f"{method} {path} HTTP/1.1\r\nHost: service\r\nUser-Agent: bench\r\n"
+    if body:
+        head += f"Content-Length: {len(body)}\r\n"
+    return (head + "\r\n").encode() + body
+
+
+def response_bytes(status, body=b'', chunked=False):
+    head = f"HTTP/1.1 {status} X\r\nServer: bench\r\n"
+    if chunked:
+        chunks = b''.join(b'%x\r\n%s\r\n' % (len(part), part) for part in (body[:len(body) // 2], body[len(body) // 2:]) if part)
+        return (head + "Transfer-Encoding: chunked\r\n\r\n").encode() + chunks + b'0\r\n\r\n'
+    return (head + f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+class Connection:
+    """One TCP connection; each method returns the (ts, frame) packets it produces"""
+
+    def __init__(self, client, server, sport, dport=80, mss=1460):
+        self.client, self.server, self.sport, self.dport = client, server, sport, dport
+        self.mss = mss
+        self.client_seq = random.randrange(1 << 32)
+        self.server_seq = random.randrange(1 << 32)
+
+    def _send(self, ts, from_client, data, flags=PSH | ACK):
+        packets = []
+        for start in range(0, len(data), self.mss):
+            chunk = data[start:start + self.mss]
+            if from_client:
+                frame = tcp_frame(self.client, self.sport, self.server, self.dport,
+                                  self.client_seq, self.server_seq, flags, chunk)
+                self.client_seq += len(chunk)
+            else:
+                frame = tcp_frame(self.server, self.dport, self.client, self.sport,
+                                  self.server_seq, self.client_seq, flags, chunk)
+                self.server_seq += len(chunk)
+            packets.append((ts, frame))
+        return packets
+
+    def open(self, ts):
+        syn = tcp_frame(self.client, self.sport, self.server, self.dport, self.client_seq, 0, SYN)
+        self.client_seq += 1
+        syn_ack = tcp_frame(self.server, self.dport, self.client, self.sport, self.server_seq, self.client_seq, SYN | ACK)
+        self.server_seq += 1
+        return [(ts, syn), (ts, syn_ack)]
+
+    def request(self, ts, data):
+        return self._send(ts, True, data)
+
+    def response(self, ts, data):
+        return self._send(ts, False, data)
+
+    def close(self, ts):
+        fin = tcp_frame(self.client, self.sport, self.server, self.dport, self.client_seq, self.server_seq, FIN | ACK)
+        fin_ack = tcp_frame(self.server, self.dport, self.client, self.sport, self.server_seq, self.client_seq + 1, FIN | ACK)
+        return [(ts, fin), (ts, fin_ack)]
+
+
+def synthetic_capture(requests, connections=50, containers=20, seed=1, start=1715342400.0,
+                      rate=5000.0, reorder=0.01):
+    """Packets for `requests` exchanges spread over concurrent keep-alive connections
+
+    Returns (packets, expected) where expected lists (method, path, status) in
+    completion order per connection. A `reorder` fraction of multi-segment
+    messages is delivered out of order with one duplicate segment.
+    """
+    random.seed(seed)
+    ips = [f"172.18.0.{n + 2}" for n in range(containers)]
+    open_conns = {}
+    packets = []
+    expected = []
+    ts = start
+    step = 1.0 / rate
+    bodies = [b'x' * size for size in (0, 120, 900, 4000)]
+    for n in range(requests):
+        slot = n % connections
+        conn = open_conns.get(slot)
+        if conn is None:
+            conn = Connection(random.choice(ips), random.choice(ips), 30000 + n % 30000, random.choice((80, 8080, 3000)))
+            packets.extend(conn.open(ts))
+            open_conns[slot] = conn
+        method = random.choice(('GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE'))
+        path = f"/api/items/{n}"
+        status = random.choice((200, 200, 200, 201, 404, 500))
+        body = random.choice(bodies)
+        request = conn.request(ts, request_bytes(method, path, body if method in ('POST', 'PUT') else b''))
+        response = conn.response(ts + 0.002, response_bytes(status, body, chunked=random.random() < 0.2))
+        for segments in (request, response):
+            if len(segments) > 1 and random.random() < reorder:
+                segments.reverse()
+                segments.append(segments[0])
+        packets.extend(request)
+        packets.extend(response)
+        expected.append((method, path, status))
+        ts += step
+        if random.random() < 0.05:
+            packets.extend(conn.close(ts))
+            del open_conns[slot]
+    for conn in open_conns.values():
+        packets.extend(conn.close(ts))
+    return packets, expected
+
+
+def _ascii(data):
+    """tcpdump's ascii_print: CR LF becomes a line break, other non-printables '.'"""
+    out = []
+    for i, byte in enumerate(data):
+        if byte == 13:
+            if i + 1 == len(data) or data[i + 1] != 10:
+                out.append('.')
+        elif 33 <= byte <= 126 or byte in (9, 10, 32):
+            out.append(chr(byte))
+        else:
+            out.append('.')
+    return ''.join(out)
+
+
+def tcpdump_text(packets, mode='A'):
+    """Render Ethernet/IPv4 packets like `tcpdump -nn -tt -A` (mode 'A') or `-X` (mode 'X')"""
+    lines = []
+    isn = {}
+    for ts, frame in packets:
+        ip = frame[14:]
+        ihl = (ip[0] & 0x0f) * 4
+        src, dst = socket.inet_ntoa(ip[12:16]), socket.inet_ntoa(ip[16:20])
+        sport, dport, seq, ack, offset, flags = struct.unpack('!HHIIBB', ip[ihl:ihl + 14])
+        payload = ip[ihl + (offset >> 4) * 4:]
+        direction = (src, sport, dst, dport)
+        names = ''.join(name for bit, name in ((SYN, 'S'), (FIN, 'F'), (RST, 'R'), (PSH, 'P'), (ACK, '.')) if flags & bit)
+        if flags & SYN:
+            isn[direction] = seq
+            seq_text = f", seq {seq}"
+        else:
+            base = isn.get(direction, 0)
+            rel = (seq - base) & 0xffffffff
+            seq_text = f", seq {rel}:{rel + len(payload)}" if payload else (f", seq {rel}" if flags & (FIN | RST) else "")
+        lines.append(f"{ts:.6f} IP {src}.{sport} > {dst}.{dport}: Flags [{names}]{seq_text}, "
+                     f"ack 1, win 65535, length {len(payload)}")
+        if mode == 'A':
+            lines.extend(_ascii(ip).split('\n'))
+        else:
+            for start in range(0, len(ip), 16):
+                chunk = ip[start:start + 16]
+                hex_groups = ' '.join(chunk[i:i + 2].hex() for i in range(0, len(chunk), 2))
+                lines.append(f"\t0x{start:04x}:  {hex_groups:<39}  {_ascii(chunk).replace(chr(10), '.')}")
+    return '\n'.join(lines) + '\n'
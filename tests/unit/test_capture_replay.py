@@ -0,0 +1,92 @@
+# test_capture_replay.py
+
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+import capture_replay
+import db_pool
+import event_writer
+import request_stats
+from pcap_traffic import synthetic_capture, tcpdump_text, write_pcap
+
+CREATE_REQUESTS_SQL = '''
+CREATE TABLE docker_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, source_container TEXT,
+    destination_container TEXT, request_type TEXT, request_path TEXT, status_code INTEGER,
+    response_time REAL, request_size INTEGER, response_size INTEGER
+)
+'''
+INSERT_REQUEST_SQL = '''
+INSERT INTO docker_requests
+(timestamp, source_container, destination_container, request_type,
+request_path, status_code, response_time, request_size, response_size)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def request_row(record):
+    return tuple(record[key] for key in (
+        "timestamp", "source_container", "destination_container", "request_type", "request_path",
+        "status_code", "response_time", "request_size", "response_size"))
+
+
+class TestCaptureReplay(unittest.TestCase):
+    """Unit tests for offline replay of recorded captures"""
+
+    def setUp(self):
+        """Create a requests database with the statistics hook and a synthetic capture"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = db_pool.ConnectionPool(os.path.join(self.tmpdir.name, "replay.db"))
+        self.pool.execute(CREATE_REQUESTS_SQL)
+        request_stats.init_schema(self.pool)
+        self.writer = event_writer.BatchWriter(self.pool, batch_size=100)
+        self.writer.add_hook(INSERT_REQUEST_SQL, request_stats.apply)
+        self.packets, self.expected = synthetic_capture(500, connections=10, rate=1000.0)
+
+    def tearDown(self):
+        """Stop the writer and remove the database"""
+        self.writer.close()
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def _replay(self, stream, speed=0):
+        return capture_replay.replay(
+            capture_replay.open_capture(stream),
+            lambda record: self.writer.submit(INSERT_REQUEST_SQL, request_row(record)),
+            writer=self.writer, speed=speed)
+
+    def test_pcap_replay_is_stored(self):
+        """Test that every replayed request reaches the table and the statistics"""
+        stream = io.BytesIO()
+        write_pcap(stream, self.packets)
+        stream.seek(0)
+        report = self._replay(stream)
+
+        self.assertEqual(report["requests"], 500)
+        self.assertEqual(report["rows_written"], 500)
+        self.assertEqual(report["parse_error_rate"], 0.0)
+        self.assertGreater(report["requests_per_second"], 0)
+        self.assertEqual(self.pool.fetchone("SELECT COUNT(*) AS n FROM docker_requests")["n"], 500)
+        self.assertEqual(sum(e["count"] for e in request_stats.query(self.pool)["request_types"]), 500)
+
+    def test_text_replay_is_paced(self):
+        """Test that a text capture is detected and replayed at the requested speed"""
+        stream = io.BytesIO(tcpdump_text(self.packets, "A").encode("latin-1"))
+        span = self.packets[-1][0] - self.packets[0][0]
+        started = time.monotonic()
+        report = self._replay(stream, speed=10)
+
+        self.assertGreaterEqual(time.monotonic() - started, span / 10 * 0.9)
+        self.assertEqual(report["requests"], 500)
+        self.assertEqual(report["speed"], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+# test_container_state.py
+
+import queue
+import time
+import unittest
+from types import SimpleNamespace
+
+import docker
+
+from evodev.container_state import ContainerStateCache
+
+
+def inspect_payload(container_id, name, status="running", restarts=0, health=None, image="sha256:app"):
+    state = {"Status": status, "StartedAt": "2025-05-10T12:00:00Z"}
+    if health:
+        state["Health"] = {"Status": health}
+    return {
+        "Id": container_id,
+        "Name": "/" + name,
+        "Image": image,
+        "Created": "2025-05-10T11:00:00Z",
+        "RestartCount": restarts,
+        "State": state,
+        "Config": {"Image": "evodev/app", "Labels": {"com.docker.compose.project": "evodev"}},
+        "NetworkSettings": {"Networks": {"evodev_default": {"IPAddress": f"172.18.0.{ord(container_id[0])}"}}, "Ports": {}},
+    }
+
+
+class FakeDockerAPI:
+    """Stand-in for the Docker API with an event stream fed by the test"""
+
+    def __init__(self):
+        self.state = {
+            "a" * 64: inspect_payload("a" * 64, "gitlab", health="healthy"),
+            "b" * 64: inspect_payload("b" * 64, "ollama", status="exited", restarts=2),
+        }
+        self.tags = {"sha256:app": ["evodev/app:1"]}
+        self.calls = 0
+        self.streams = queue.Queue()
+        self.api = SimpleNamespace(containers=self._containers, inspect_container=self._inspect,
+                                   inspect_image=self._inspect_image)
+        self.images = SimpleNamespace(list=self._images)
+
+    def _containers(self, all=False):
+        self.calls += 1
+        return [{"Id": container_id} for container_id in self.state]
+
+    def _inspect(self, container_id):
+        self.calls += 1
+        if container_id not in self.state:
+            raise docker.errors.NotFound("No such container")
+        return self.state[container_id]
+
+    def _inspect_image(self, image_ref):
+        self.calls += 1
+        if image_ref not in self.tags:
+            raise docker.errors.NotFound("No such image")
+        return {"Id": image_ref, "RepoTags": self.tags[image_ref]}
+
+    def _images(self):
+        self.calls += 1
+        return [SimpleNamespace(id=image_id, tags=tags) for image_id, tags in self.tags.items()]
+
+    def events(self, decode=False, since=None, filters=None):
+        events = queue.Queue()
+        self.streams.put(events)
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield event
+
+
+class TestContainerStateCache(unittest.TestCase):
+    """Unit tests for the event-driven container state cache"""
+
+    def setUp(self):
+        """Start the cache against the stand-in event stream"""
+        self.api = FakeDockerAPI()
+        self.cache = ContainerStateCache(self.api, reconnect_delay=0.01).start()
+        self.assertTrue(self.cache.wait_ready(2))
+        self.stream = self.api.streams.get(timeout=2)
+        self.changes = []
+        self.cache.subscribe(lambda action, record, previous: self.changes.append((action, record, previous)))
+
+    def tearDown(self):
+        """Stop the events thread"""
+        self.cache.stop()
+        self.stream.put(None)
+
+    def _send(self, event):
+        applied = self.cache.stats["events"]
+        self.stream.put(event)
+        deadline = time.monotonic() + 2
+        while self.cache.stats["events"] == applied and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def test_snapshot_after_sync(self):
+        """Test that the initial sync captures status, image tags, health and restarts"""
+        gitlab = self.cache.get("gitlab")
+        self.assertEqual(gitlab["status"], "running")
+        self.assertEqual(gitlab["image"], "evodev/app:1")
+        self.assertEqual(gitlab["health"], "healthy")
+        self.assertIs(self.cache.get("b" * 12), self.cache.get("ollama"))
+        self.assertEqual(self.cache.get("ollama")["restart_count"], 2)
+        self.assertEqual([r["name"] for r in self.cache.containers(all=False)], ["gitlab"])
+        self.assertEqual(self.cache.ip_map("evodev_default")["172.18.0.97"], "gitlab")
+
+    def test_reads_do_not_call_api(self):
+        """Test that snapshot reads never reach the Docker API"""
+        calls = self.api.calls
+        for _ in range(1000):
+            self.cache.get("gitlab")
+            self.cache.containers()
+        self.assertEqual(self.api.calls, calls)
+
+    def test_container_event_reinspects_one_container(self):
+        """Test that a lifecycle event refreshes only the affected container"""
+        self.api.state["b" * 64] = inspect_payload("b" * 64, "ollama", restarts=3)
+        calls = self.api.calls
+        self._send({"Type": "container", "Action": "exec_start: sh", "Actor": {"ID": "b" * 64}})
+        self._send({"Type": "container", "Action": "start", "Actor": {"ID": "b" * 64}})
+
+        self.assertEqual(self.api.calls, calls + 1)
+        self.assertEqual(self.cache.get("ollama")["status"], "running")
+        self.assertEqual(self.cache.get("ollama")["restart_count"], 3)
+        action, record, previous = self.changes[0]
+        self.assertEqual((action, previous["status"], record["status"]), ("start", "exited", "running"))
+
+    def test_health_and_destroy_events(self):
+        """Test health updates without inspection and removal on destroy"""
+        calls = self.api.calls
+        self._send({"Type": "container", "Action": "health_status: unhealthy", "Actor": {"ID": "a" * 64}})
+        self.assertEqual(self.cache.get("gitlab")["health"], "unhealthy")
+        self.assertEqual(self.api.calls, calls)
+
+        self._send({"Type": "container", "Action": "destroy", "Actor": {"ID": "a" * 64}})
+        self.assertIsNone(self.cache.get("gitlab"))
+        self.assertIsNone(self.changes[1][1])
+
+    def test_image_tag_event(self):
+        """Test that retagging an image updates the containers using it"""
+        self.api.tags["sha256:app"] = ["evodev/app:2"]
+        self._send({"Type": "image", "Action": "tag", "Actor": {"ID": "sha256:app"}})
+        self.assertEqual(self.cache.get("gitlab")["image"], "evodev/app:2")
+        self.assertEqual(self.cache.image_tags("sha256:app"), ["evodev/app:2"])
+
+    def test_network_connect_updates_ip_map(self):
+        """Test that a network connect event refreshes the container's addresses"""
+        payload = inspect_payload("b" * 64, "ollama")
+        payload["NetworkSettings"]["Networks"]["evodev_default"]["IPAddress"] = "172.18.0.50"
+        self.api.state["b" * 64] = payload
+        self._send({"Type": "network", "Action": "connect",
+                    "Actor": {"ID": "net1", "Attributes": {"container": "b" * 64, "name": "evodev_default"}}})
+        self.assertEqual(self.cache.ip_map("evodev_default")["172.18.0.50"], "ollama")
+        self.assertEqual(self.changes[-1][0], "network_connect")
+
+    def test_resync_after_stream_ends(self):
+        """Test that a dropped event stream reconnects and resynchronises"""
+        self.api.state.pop("b" * 64)
+        self.stream.put(None)
+        self.stream = self.api.streams.get(timeout=2)
+
+        self.assertEqual(self.cache.stats["syncs"], 2)
+        self.assertIsNone(self.cache.get("ollama"))
+        self.assertEqual(self.changes[0][0], "sync")
+
+    def test_unsubscribe(self):
+        """Test that an unsubscribed callback is no longer notified"""
+        seen = []
+        unsubscribe = self.cache.subscribe(lambda *change: seen.append(change))
+        unsubscribe()
+        self._send({"Type": "container", "Action": "die", "Actor": {"ID": "a" * 64}})
+        self.assertEqual(seen, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
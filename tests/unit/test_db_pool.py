@@ -0,0 +1,89 @@
+# test_db_pool.py
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import db_pool
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Unit tests for the monitor SQLite connection pool"""
+
+    def setUp(self):
+        """Set up a pool on a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, "monitor.db")
+        self.pool = db_pool.ConnectionPool(self.db_path, size=2, timeout=1)
+        self.pool.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+
+    def tearDown(self):
+        """Close the pool and remove the database"""
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def test_wal_mode_enabled(self):
+        """Test that pooled connections use WAL journaling"""
+        row = self.pool.fetchone("PRAGMA journal_mode")
+        self.assertEqual(row["journal_mode"], "wal")
+
+    def test_connection_reused(self):
+        """Test that sequential calls reuse the same connection"""
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_nested_calls_share_connection(self):
+        """Test that nested calls on one thread share the leased connection"""
+        with self.pool.connection() as outer:
+            with self.pool.connection() as inner:
+                self.assertIs(outer, inner)
+
+    def test_transaction_rollback(self):
+        """Test that a failed transaction leaves no rows behind"""
+        with self.assertRaises(ValueError):
+            with self.pool.transaction() as conn:
+                conn.execute("INSERT INTO items (name) VALUES (?)", ("a",))
+                raise ValueError("boom")
+        self.assertEqual(self.pool.fetchall("SELECT * FROM items"), [])
+
+    def test_execute_returns_lastrowid(self):
+        """Test that execute exposes the inserted row id"""
+        cursor = self.pool.execute("INSERT INTO items (name) VALUES (?)", ("a",))
+        self.assertEqual(cursor.lastrowid, 1)
+        self.assertEqual(self.pool.fetchone("SELECT name FROM items WHERE id = ?", (1,)), {"name": "a"})
+
+    def test_pool_size_bounded(self):
+        """Test that concurrent threads never open more connections than the pool size"""
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            for i in range(20):
+                self.pool.execute("INSERT INTO items (name) VALUES (?)", (str(i),))
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLessEqual(len(self.pool._all), 2)
+        self.assertEqual(self.pool.fetchone("SELECT COUNT(*) AS n FROM items")["n"], 80)
+
+    def test_get_pool_shared(self):
+        """Test that get_pool returns one pool per database file"""
+        try:
+            self.assertIs(db_pool.get_pool(self.db_path), db_pool.get_pool(self.db_path))
+        finally:
+            db_pool.close_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
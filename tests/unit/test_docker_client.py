@@ -0,0 +1,105 @@
+# test_docker_client.py
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import docker
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import docker_client
+from fake_docker import FakeDocker
+
+
+class TestDockerClient(unittest.TestCase):
+    """Unit tests for the shared, instrumented Docker client"""
+
+    def setUp(self):
+        """Start a fake daemon and an instrumented client without backoff delays"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fake = FakeDocker(self.tmp.name, count=3).__enter__()
+        self.client = docker_client.create_client(environment={"DOCKER_HOST": self.fake.base_url}, version="1.43")
+        docker_client.stats.reset()
+        patcher = mock.patch.object(docker_client, "RETRY_BACKOFF", 0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.client.close()
+        self.fake.__exit__(None, None, None)
+        self.tmp.cleanup()
+
+    def test_endpoint_normalization(self):
+        """Test that versions and object ids are folded into one counter key"""
+        self.assertEqual(docker_client.endpoint("GET", "http+docker://localhost/v1.43/containers/abc123/json"),
+                         "GET /containers/{id}/json")
+        self.assertEqual(docker_client.endpoint("GET", "http+docker://localhost/v1.43/containers/json?all=1"),
+                         "GET /containers/json")
+        self.assertEqual(docker_client.endpoint("POST", "http+docker://localhost/v1.43/containers/abc/start"),
+                         "POST /containers/{id}/start")
+        self.assertEqual(docker_client.endpoint("GET", "http+docker://localhost/version"), "GET /version")
+
+    def test_pool_size_and_timeout(self):
+        """Test that the connection pool and default timeout are configured"""
+        client = docker_client.create_client(pool_size=4, timeout=7,
+                                             environment={"DOCKER_HOST": self.fake.base_url}, version="1.43")
+        self.assertEqual(client.api.timeout, 7)
+        self.assertEqual(client.api._custom_adapter.max_pool_size, 4)
+        client.close()
+
+    def test_gateway_errors_are_retried_for_reads(self):
+        """Test that a GET is retried on 503 and succeeds on a later attempt"""
+        self.fake.state.failures = [503, 502]
+        containers = self.client.api.containers(all=True)
+
+        self.assertEqual(len(containers), 3)
+        counters = docker_client.stats.snapshot()["GET /containers/json"]
+        self.assertEqual((counters["calls"], counters["errors"], counters["retries"]), (3, 2, 2))
+
+    def test_retries_are_bounded(self):
+        """Test that the last error is returned once the retries are used up"""
+        self.client.api.retries = 1
+        self.fake.state.failures = [503, 503, 503]
+        with self.assertRaises(docker.errors.APIError):
+            self.client.api.containers()
+        self.assertEqual(docker_client.stats.snapshot()["GET /containers/json"]["calls"], 2)
+
+    def test_writes_retried_only_when_not_sent(self):
+        """Test that a POST is resent after a refused connection but not after a read timeout"""
+        refused = requests.exceptions.ConnectionError(ConnectionRefusedError(111, "Connection refused"))
+        with mock.patch.object(requests.Session, "request", side_effect=[refused, mock.Mock(status_code=204)]) as send:
+            self.client.api.request("POST", "http+docker://localhost/v1.43/containers/abc/start")
+        self.assertEqual(send.call_count, 2)
+
+        timeout = requests.exceptions.ReadTimeout("read timed out")
+        with mock.patch.object(requests.Session, "request", side_effect=[timeout, mock.Mock(status_code=204)]) as send:
+            with self.assertRaises(requests.exceptions.ReadTimeout):
+                self.client.api.request("POST", "http+docker://localhost/v1.43/containers/abc/stop")
+        self.assertEqual(send.call_count, 1)
+
+    def test_call_timeout_override(self):
+        """Test that call_timeout applies to bounded calls only"""
+        with mock.patch.object(requests.Session, "request", return_value=mock.Mock(status_code=200)) as send:
+            with docker_client.call_timeout(2):
+                self.client.api.request("GET", "http+docker://localhost/v1.43/version", timeout=60)
+                self.client.api.request("GET", "http+docker://localhost/v1.43/events", timeout=None)
+            self.client.api.request("GET", "http+docker://localhost/v1.43/version", timeout=60)
+        self.assertEqual([call.kwargs["timeout"] for call in send.call_args_list], [2, None, 60])
+
+    def test_shared_client_is_reused(self):
+        """Test that get_client returns one client until close()"""
+        with mock.patch.object(docker_client, "create_client", side_effect=lambda: mock.Mock()) as create:
+            first = docker_client.get_client()
+            self.assertIs(docker_client.get_client(), first)
+            docker_client.close()
+            self.assertIsNot(docker_client.get_client(), first)
+            docker_client.close()
+        self.assertEqual(create.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+# test_docker_containers.py
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import docker_containers
+
+
+class FakeContainer:
+    def __init__(self, i, state="running"):
+        self.id = f"{i:012x}" + "0" * 52
+        self.attrs = {
+            "Names": [f"/app-{i}"],
+            "Image": "evodev/app",
+            "State": state,
+            "Status": "Up 1 minute" if state == "running" else "Exited (1) 2 minutes ago",
+            "Ports": [{"IP": "0.0.0.0", "PrivatePort": 80, "PublicPort": 8000 + i, "Type": "tcp"},
+                      {"PrivatePort": 443, "Type": "tcp"}],
+        }
+        self.log_calls = 0
+
+    def logs(self, tail):
+        self.log_calls += 1
+        time.sleep(0.05)
+        return f"last {tail} lines of app\n".encode()
+
+
+class FakeClient:
+    def __init__(self, containers):
+        self.list_calls = 0
+        self.items = containers
+        self.containers = SimpleNamespace(list=self._list)
+
+    def _list(self, all=False, sparse=False):
+        self.list_calls += 1
+        return list(self.items)
+
+
+class FakeEventsSource:
+    def __init__(self):
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def emit(self, action):
+        for callback in list(self.callbacks):
+            callback(action, {"name": "app-1"}, None)
+
+
+class TestContainerLister(unittest.TestCase):
+    """Unit tests for the cached, concurrent container list"""
+
+    def setUp(self):
+        """Create a lister on a fake client with slow log calls"""
+        self.containers = [FakeContainer(i, "exited" if i == 0 else "running") for i in range(8)]
+        self.client = FakeClient(self.containers)
+        self.events = FakeEventsSource()
+        self.lister = docker_containers.ContainerLister(client_factory=lambda: self.client, ttl=60, log_workers=8,
+                                                        events_source=self.events)
+
+    def tearDown(self):
+        """Stop the lister"""
+        self.lister.close()
+        self.assertEqual(self.events.callbacks, [])
+
+    def test_format_matches_docker_ps(self):
+        """Test that entries keep the fields of the old `docker ps` parser"""
+        first = self.lister.list()[0]
+        self.assertEqual(first["id"], self.containers[0].id[:12])
+        self.assertEqual(first["name"], "app-0")
+        self.assertEqual(first["status_type"], "stopped")
+        self.assertEqual(first["ports"], "0.0.0.0:8000->80/tcp, 443/tcp")
+        self.assertEqual(first["logs"], "last 3 lines of app\n")
+
+    def test_log_tails_fetched_concurrently(self):
+        """Test that eight 50 ms log calls finish well under their serial time"""
+        start = time.monotonic()
+        self.lister.list()
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(sum(c.log_calls for c in self.containers), 8)
+
+    def test_cache_and_event_invalidation(self):
+        """Test that the list is cached until the state cache reports a change"""
+        self.lister.list()
+        self.lister.list(with_logs=False)
+        self.assertEqual(self.client.list_calls, 1)
+
+        self.events.emit("die")
+        self.assertEqual(self.lister.invalidations, 1)
+
+        self.lister.list()
+        self.assertEqual(self.client.list_calls, 2)
+
+    def test_concurrent_callers_share_one_refresh(self):
+        """Test that simultaneous cache misses trigger a single API list"""
+        threads = [threading.Thread(target=self.lister.list) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.client.list_calls, 1)
+
+
+class FakeProjectAPI:
+    """Docker API stand-in with compose labels and slow inspects"""
+
+    def __init__(self, projects):
+        self.containers = {}
+        for i, project in enumerate(projects):
+            container_id = f"{i:012x}" + "0" * 52
+            self.containers[container_id] = {"Id": container_id, "Name": f"/{project}-{i}",
+                                             "Config": {"Labels": {"com.docker.compose.project": project}}}
+        self.list_filters = []
+        self.inspected = []
+        self.api = SimpleNamespace(containers=self._containers, inspect_container=self._inspect)
+
+    def _containers(self, all=False, filters=None):
+        self.list_filters.append(filters)
+        key, _, value = filters["label"].partition("=")
+        return [{"Id": c["Id"], "Labels": c["Config"]["Labels"]} for c in self.containers.values()
+                if key in c["Config"]["Labels"] and (not value or c["Config"]["Labels"][key] == value)]
+
+    def _inspect(self, container_id):
+        self.inspected.append(container_id)
+        time.sleep(0.05)
+        return self.containers[container_id]
+
+
+class TestProjectIndex(unittest.TestCase):
+    """Unit tests for the compose project index"""
+
+    def setUp(self):
+        """Create an index over one EvoDev project among unrelated containers"""
+        self.api = FakeProjectAPI(["evodev"] * 7 + ["EvoDev"] + ["other"] * 50)
+        self.events = FakeEventsSource()
+        self.index = docker_containers.ProjectIndex(client_factory=lambda: self.api, ttl=60, workers=8,
+                                                    events_source=self.events)
+
+    def tearDown(self):
+        """Stop the index"""
+        self.index.close()
+
+    def test_only_project_containers_are_inspected_concurrently(self):
+        """Test that the label-filtered list skips other projects and inspects run in parallel"""
+        start = time.monotonic()
+        containers = self.index.get("evodev")
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual([c["Name"] for c in containers], [f"/evodev-{i}" for i in range(7)] + ["/EvoDev-7"])
+        self.assertEqual(len(self.api.inspected), 8)
+        self.assertEqual(self.api.list_filters, [{"label": "com.docker.compose.project"}])
+        self.assertIs(self.index.get("EVODEV"), containers)
+
+    def test_events_invalidate_only_their_project(self):
+        """Test that a change in another project keeps the cached entry"""
+        self.index.get("evodev")
+        self.index.get("evodev")
+        self.assertEqual(self.index.refreshes, 1)
+
+        for callback in self.events.callbacks:
+            callback("die", {"labels": {"com.docker.compose.project": "other"}}, None)
+        self.index.get("evodev")
+        self.assertEqual(self.index.refreshes, 1)
+
+        for callback in self.events.callbacks:
+            callback("destroy", None, {"labels": {"com.docker.compose.project": "evodev"}})
+        self.index.get("evodev")
+        self.assertEqual(self.index.refreshes, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+# test_event_writer.py
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import db_pool
+import event_writer
+
+INSERT_SQL = "INSERT INTO events (message) VALUES (?)"
+
+
+class TestBatchWriter(unittest.TestCase):
+    """Unit tests for the monitor background batch writer"""
+
+    def setUp(self):
+        """Set up a pool and an events table on a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = db_pool.ConnectionPool(os.path.join(self.tmpdir.name, "monitor.db"))
+        self.pool.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, message TEXT)")
+
+    def tearDown(self):
+        """Close the pool and remove the database"""
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def _count(self):
+        return self.pool.fetchone("SELECT COUNT(*) AS n FROM events")["n"]
+
+    def test_burst_written_in_few_batches(self):
+        """Test that a burst of 10k rows is committed in batches, not row by row"""
+        writer = event_writer.BatchWriter(self.pool, queue_size=20000, batch_size=500)
+        for i in range(10000):
+            self.assertTrue(writer.submit(INSERT_SQL, (f"event {i}",)))
+        self.assertTrue(writer.flush())
+        writer.close()
+
+        stats = writer.stats()
+        self.assertEqual(self._count(), 10000)
+        self.assertEqual(stats["written"], 10000)
+        self.assertLessEqual(stats["batches"], 100)
+
+    def test_full_queue_drops_rows(self):
+        """Test that rows are dropped and counted when the queue is full"""
+        writer = event_writer.BatchWriter(self.pool, queue_size=5, put_timeout_ms=0)
+        with patch.object(writer, "start"):
+            results = [writer.submit(INSERT_SQL, (str(i),)) for i in range(8)]
+
+        self.assertEqual(results.count(False), 3)
+        self.assertEqual(writer.stats()["dropped"], 3)
+        self.assertEqual(writer.stats()["pending"], 5)
+
+    def test_close_flushes_pending_rows(self):
+        """Test that closing the writer writes everything still queued"""
+        writer = event_writer.BatchWriter(self.pool, flush_interval_ms=1000)
+        for i in range(50):
+            writer.submit(INSERT_SQL, (str(i),))
+        writer.close()
+        self.assertEqual(self._count(), 50)
+
+    def test_failed_batch_counted(self):
+        """Test that a failing batch is counted and does not stop the writer"""
+        writer = event_writer.BatchWriter(self.pool)
+        writer.submit("INSERT INTO missing (message) VALUES (?)", ("x",))
+        writer.flush()
+        writer.submit(INSERT_SQL, ("ok",))
+        writer.flush()
+        writer.close()
+
+        self.assertEqual(writer.stats()["failed"], 1)
+        self.assertEqual(self._count(), 1)
+
+    def test_hook_runs_in_batch_transaction(self):
+        """Test that hooks see each batch and a failing hook rolls the batch back"""
+        self.pool.execute("CREATE TABLE totals (n INTEGER)")
+        writer = event_writer.BatchWriter(self.pool)
+        writer.add_hook(INSERT_SQL, lambda conn, rows: conn.execute("INSERT INTO totals VALUES (?)", (len(rows),)))
+        for i in range(10):
+            writer.submit(INSERT_SQL, (str(i),))
+        writer.flush()
+
+        def failing(conn, rows):
+            raise RuntimeError("hook failed")
+
+        writer.add_hook(INSERT_SQL, failing)
+        writer.submit(INSERT_SQL, ("rolled back",))
+        writer.flush()
+        writer.close()
+
+        self.assertEqual(self._count(), 10)
+        self.assertEqual(self.pool.fetchone("SELECT SUM(n) AS n FROM totals")["n"], 10)
+        self.assertEqual(writer.stats()["failed"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
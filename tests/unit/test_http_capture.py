@@ -0,0 +1,147 @@
+# test_http_capture.py
+
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+import http_capture
+from pcap_traffic import (Connection, request_bytes, response_bytes, synthetic_capture, tcp_frame, tcpdump_text,
+                          write_pcap, ACK, PSH)
+
+
+class FakeStateCache:
+    """Stand-in for ContainerStateCache notifications"""
+
+    def __init__(self, ips):
+        self.ips = ips
+        self.callbacks = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def ip_map(self, network=None):
+        return dict(self.ips)
+
+
+class TestHttpCapture(unittest.TestCase):
+    """Unit tests for TCP reassembly and HTTP parsing of captured traffic"""
+
+    def setUp(self):
+        """Create an engine collecting request records"""
+        self.records = []
+        self.engine = http_capture.CaptureEngine(self.records.append)
+
+    def _feed(self, packets):
+        for ts, frame in packets:
+            self.engine.feed(ts, http_capture.LINKTYPE_ETHERNET, frame)
+
+    def test_concurrent_flows_are_paired_independently(self):
+        """Test that interleaved connections do not mix up requests and responses"""
+        web = Connection("172.18.0.2", "172.18.0.3", 40000)
+        api = Connection("172.18.0.4", "172.18.0.3", 40001)
+        self._feed(web.open(1.0) + api.open(1.0))
+        self._feed(web.request(1.0, request_bytes("GET", "/slow")))
+        self._feed(api.request(1.1, request_bytes("POST", "/fast", b"{}")))
+        self._feed(api.response(1.2, response_bytes(201, b"ok")))
+        self._feed(web.response(1.5, response_bytes(404)))
+
+        by_path = {r["request_path"]: r for r in self.records}
+        self.assertEqual(by_path["/fast"]["status_code"], 201)
+        self.assertEqual(by_path["/fast"]["source_container"], "172.18.0.4")
+        self.assertEqual(by_path["/slow"]["status_code"], 404)
+        self.assertAlmostEqual(by_path["/slow"]["response_time"], 0.5)
+        self.assertEqual(by_path["/fast"]["request_size"], len(request_bytes("POST", "/fast", b"{}")))
+
+    def test_out_of_order_retransmitted_and_chunked(self):
+        """Test reassembly of reordered and duplicated segments and chunked byte counts"""
+        conn = Connection("172.18.0.2", "172.18.0.3", 40000, mss=100)
+        body = bytes(range(256)) * 10
+        response = response_bytes(200, body, chunked=True)
+        self._feed(conn.open(1.0) + conn.request(1.0, request_bytes("GET", "/big")))
+        segments = conn.response(2.0, response)
+        self._feed(segments[3:] + segments[:3] + segments[1:2])
+
+        self.assertEqual(len(self.records), 1)
+        self.assertEqual(self.records[0]["response_size"], len(response))
+        self.assertEqual(self.engine.stats["parse_errors"], 0)
+
+    def test_pipelined_head_and_close_delimited(self):
+        """Test pipelined requests, HEAD responses without body and bodies ending at FIN"""
+        conn = Connection("172.18.0.2", "172.18.0.3", 40000)
+        self._feed(conn.open(1.0))
+        self._feed(conn.request(1.0, request_bytes("HEAD", "/a") + request_bytes("GET", "/b")))
+        self._feed(conn.response(1.1, b"HTTP/1.1 200 OK\r\nContent-Length: 50\r\n\r\n"))
+        self._feed(conn.response(1.2, b"HTTP/1.0 200 OK\r\n\r\nstreamed until close"))
+        self.assertEqual([r["request_path"] for r in self.records], ["/a"])
+        self._feed(conn.close(1.3))
+
+        self.assertEqual([r["request_path"] for r in self.records], ["/a", "/b"])
+        self.assertEqual(self.records[1]["response_size"], len(b"HTTP/1.0 200 OK\r\n\r\nstreamed until close"))
+
+    def test_resync_mid_stream(self):
+        """Test that a flow joined mid-message resumes at the next start line"""
+        conn = Connection("172.18.0.2", "172.18.0.3", 40000)
+        # Tail of a response whose head was never captured, then a complete exchange
+        self._feed(conn.response(1.0, b"...body of an earlier response"))
+        self._feed(conn.request(1.1, request_bytes("GET", "/next")))
+        self._feed(conn.response(1.2, response_bytes(500, b"err")))
+        self.assertEqual([(r["request_path"], r["status_code"]) for r in self.records], [("/next", 500)])
+        self.assertEqual(self.engine.stats["unmatched"], 0)
+
+        # A corrupt response head is counted and the stream recovers on the next exchange
+        self._feed(conn.request(1.3, request_bytes("GET", "/broken")))
+        self._feed([(1.4, tcp_frame(conn.server, conn.dport, conn.client, conn.sport,
+                                    conn.server_seq, conn.client_seq, PSH | ACK, b"GARBAGE\r\n\r\n"))])
+        conn.server_seq += len(b"GARBAGE\r\n\r\n")
+        self._feed(conn.request(1.5, request_bytes("GET", "/after")))
+        self._feed(conn.response(1.6, response_bytes(200)))
+        self.assertEqual([r["request_path"] for r in self.records], ["/next", "/after"])
+        self.assertEqual(self.engine.stats["parse_errors"], 1)
+
+    def test_replay_pcap(self):
+        """Test that every exchange of a synthetic pcap is recovered"""
+        packets, expected = synthetic_capture(2000, connections=20, reorder=0.2)
+        stream = io.BytesIO()
+        write_pcap(stream, packets)
+        stream.seek(0)
+        stats = self.engine.run(http_capture.read_pcap(stream))
+
+        self.assertEqual(stats["requests"], 2000)
+        self.assertEqual(stats["parse_errors"], 0)
+        self.assertEqual(sorted((r["request_type"], r["request_path"], r["status_code"]) for r in self.records),
+                         sorted(expected))
+
+    def test_tcpdump_text(self):
+        """Test that hex and ASCII tcpdump dumps yield the same requests as the pcap"""
+        packets, expected = synthetic_capture(300, connections=10, reorder=0)
+        for mode in ("X", "A"):
+            records = []
+            engine = http_capture.CaptureEngine(records.append)
+            engine.run(http_capture.read_tcpdump_text(io.StringIO(tcpdump_text(packets, mode))))
+            self.assertEqual(engine.stats["parse_errors"], 0, mode)
+            self.assertEqual(sorted((r["request_type"], r["request_path"], r["status_code"]) for r in records),
+                             sorted(expected), mode)
+
+    def test_container_names_follow_state_changes(self):
+        """Test that the IP map is rebuilt when a container's networks change"""
+        state = FakeStateCache({"172.18.0.2": "web"})
+        names = http_capture.ContainerNames(state, "evodev_default")
+        self.assertEqual(names.resolve("172.18.0.2"), "web")
+
+        state.ips = {"172.18.0.9": "web"}
+        record = {"networks": {"evodev_default": "172.18.0.9"}}
+        for callback in state.callbacks:
+            callback("start", record, {"networks": {"evodev_default": "172.18.0.2"}})
+        self.assertEqual(names.resolve("172.18.0.9"), "web")
+        self.assertEqual(names.resolve("172.18.0.2"), "172.18.0.2")
+        names.close()
+        self.assertEqual(state.callbacks, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
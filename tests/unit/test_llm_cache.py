@@ -0,0 +1,125 @@
+# test_llm_cache.py
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import llm_cache, llm_gateway
+from fake_ollama import FakeOllama
+
+
+class TestResponseCache(unittest.TestCase):
+    """Unit tests for the LRU + SQLite response cache"""
+
+    def setUp(self):
+        """Use a temporary cache directory"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_key_ignores_transient_fields(self):
+        """Test that stream/keep_alive do not change the key but the digest and options do"""
+        payload = {"model": "llama2", "prompt": "hi", "options": {"temperature": 0}}
+        key = llm_cache.cache_key("/api/generate", "llama2", "d1", payload)
+        self.assertEqual(key, llm_cache.cache_key("/api/generate", "llama2", "d1",
+                                                  dict(payload, stream=False, keep_alive="5m")))
+        self.assertNotEqual(key, llm_cache.cache_key("/api/generate", "llama2", "d2", payload))
+        self.assertNotEqual(key, llm_cache.cache_key("/api/generate", "llama2", "d1",
+                                                     dict(payload, options={"temperature": 0, "seed": 1})))
+        self.assertTrue(llm_cache.deterministic(payload))
+        self.assertFalse(llm_cache.deterministic({"options": {"temperature": 0.7}}))
+
+    def test_memory_and_disk_eviction_by_size(self):
+        """Test that both tiers stay under their size, dropping least recently used entries"""
+        cache = llm_cache.ResponseCache(self.directory, memory_bytes=250, disk_bytes=350)
+        for n in range(3):
+            cache.put(f"k{n}", "llama2", bytes([n]) * 100)
+        self.assertEqual(cache.get("k0"), bytes([0]) * 100)  # from disk, now most recently used
+        cache.put("k3", "llama2", b"3" * 100)
+
+        self.assertIsNone(cache.get("k1"))
+        snapshot = cache.snapshot()
+        self.assertLessEqual(snapshot["memory_bytes"], 250)
+        self.assertLessEqual(snapshot["disk_bytes"], 350)
+        self.assertEqual(snapshot["evictions"], 1)
+        self.assertEqual((snapshot["disk_hits"], snapshot["misses"]), (1, 1))
+        cache.close()
+
+    def test_entries_survive_restart(self):
+        """Test that a new cache on the same directory serves stored answers from disk"""
+        cache = llm_cache.ResponseCache(self.directory)
+        cache.put("key", "llama2", b'{"response": "ok"}')
+        cache.close()
+
+        cache = llm_cache.ResponseCache(self.directory)
+        self.assertEqual(cache.get("key"), b'{"response": "ok"}')
+        self.assertEqual(cache.get("key"), b'{"response": "ok"}')
+        snapshot = cache.snapshot()
+        self.assertEqual((snapshot["disk_hits"], snapshot["memory_hits"]), (1, 1))
+        self.assertEqual(snapshot["disk_bytes"], len(b'{"response": "ok"}'))
+        cache.close()
+
+
+class TestGatewayCache(unittest.TestCase):
+    """Unit tests for cached calls through the LLM gateway"""
+
+    def setUp(self):
+        """Create a gateway with a cache in a temporary directory"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.gateway = llm_gateway.LLMGateway(cache=llm_cache.ResponseCache(directory))
+        self.addCleanup(self.gateway.close)
+
+    def _generate(self, ollama, options, **kwargs):
+        payload = {"model": "llama2", "prompt": "Przetestuj komponent", "stream": False, "options": options}
+        response = self.gateway.post(f"{ollama.url}/api/generate", json=payload, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_deterministic_calls_cached(self):
+        """Test that a repeated temperature-0 call is answered without reaching Ollama"""
+        with FakeOllama(tokens=3) as ollama:
+            first = self._generate(ollama, {"temperature": 0})
+            second = self._generate(ollama, {"temperature": 0})
+            self.assertEqual(ollama.state.calls["generate"], 1)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second.headers["X-EvoDev-Cache"], "hit")
+        self.assertEqual(self.gateway.snapshot()["calls"]["POST /api/generate llama2"]["cached"], 1)
+
+    def test_sampled_calls_and_opt_out_not_cached(self):
+        """Test that calls with sampling or cache=False always reach Ollama"""
+        with FakeOllama() as ollama:
+            for _ in range(2):
+                self._generate(ollama, {"temperature": 0.7})
+                self._generate(ollama, {"seed": 7}, cache=False)
+            self.assertEqual(ollama.state.calls["generate"], 4)
+        self.assertEqual(self.gateway.cache.snapshot()["stores"], 0)
+
+    def test_untagged_model_name(self):
+        """Test that a model requested without a tag finds the digest Ollama lists as name:latest"""
+        self.assertEqual(llm_gateway.model_name("llama2"), "llama2:latest")
+        self.assertEqual(llm_gateway.model_name("llama2:7b"), "llama2:7b")
+        self.assertEqual(llm_gateway.model_name("registry:5000/llama2"), "registry:5000/llama2:latest")
+        with FakeOllama() as ollama:
+            digest = ollama.state.digests["llama2:latest"]
+            self.assertEqual(self.gateway.model_digest(ollama.url, "llama2"), digest)
+            self.assertEqual(self.gateway.model_digest(ollama.url, "llama2:latest"), digest)
+            self._generate(ollama, {"temperature": 0})
+            self._generate(ollama, {"temperature": 0})
+            self.assertEqual(ollama.state.calls["generate"], 1)
+
+    def test_new_model_digest_misses(self):
+        """Test that a re-pulled model (new digest) is asked again"""
+        with FakeOllama() as ollama:
+            self._generate(ollama, {"seed": 1})
+            ollama.state.digests["llama2:latest"] = "0" * 64
+            self.gateway._digests.clear()
+            self._generate(ollama, {"seed": 1})
+            self.assertEqual(ollama.state.calls["generate"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
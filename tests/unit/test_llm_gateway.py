@@ -0,0 +1,117 @@
+# test_llm_gateway.py
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import llm_gateway
+from fake_ollama import FakeOllama
+
+
+def closed_port_url():
+    """URL of a local port nobody listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestLLMGateway(unittest.TestCase):
+    """Unit tests for the shared LLM gateway"""
+
+    def setUp(self):
+        """Create a gateway with small limits"""
+        self.gateway = llm_gateway.LLMGateway(model_concurrency=2, breaker_failures=2, breaker_cooldown=0.2)
+        self.addCleanup(self.gateway.close)
+
+    def _generate(self, ollama, prompt="hi", results=None, **kwargs):
+        response = self.gateway.post(f"{ollama.url}/api/generate",
+                                     json={"model": "llama2", "prompt": prompt, "stream": False}, **kwargs)
+        if results is not None:
+            results.append(response.json()["response"])
+        return response
+
+    def _parallel(self, count, target):
+        threads = [threading.Thread(target=target, args=(n,)) for n in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+    def test_identical_prompts_coalesced(self):
+        """Test that identical concurrent prompts reach Ollama once and share the answer"""
+        results = []
+        with FakeOllama(latency=0.2, tokens=3) as ollama:
+            self._parallel(8, lambda n: self._generate(ollama, results=results))
+            self.assertEqual(ollama.state.calls["generate"], 1)
+        self.assertEqual(results, ["token0 token1 token2 "] * 8)
+        calls = self.gateway.snapshot()["calls"]["POST /api/generate llama2"]
+        self.assertEqual((calls["calls"], calls["coalesced"]), (1, 7))
+
+    def test_coalesce_opt_out(self):
+        """Test that coalesce=False sends every request"""
+        with FakeOllama(latency=0.1) as ollama:
+            self._parallel(4, lambda n: self._generate(ollama, coalesce=False))
+            self.assertEqual(ollama.state.calls["generate"], 4)
+
+    def test_model_concurrency_limit(self):
+        """Test that no more than the model limit is in flight, on reused connections"""
+        with FakeOllama(latency=0.1) as ollama:
+            self._parallel(8, lambda n: self._generate(ollama, prompt=f"prompt {n}"))
+            for n in range(4):
+                self._generate(ollama, prompt=f"again {n}")
+            self.assertEqual(ollama.state.calls["generate"], 12)
+            self.assertEqual(ollama.state.peak_in_flight, 2)
+            self.assertLessEqual(ollama.state.connections, 2)
+        self.assertEqual(self.gateway.snapshot()["models"][f"{ollama.url} llama2"], {"in_use": 0, "limit": 2})
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        """Test that a streamed call keeps its model slot until the response is closed"""
+        gateway = llm_gateway.LLMGateway(model_concurrency=1, queue_timeout=0.2)
+        with FakeOllama(token_delay=0.01, tokens=5) as ollama:
+            payload = {"model": "llama2", "prompt": "hi"}
+            response = gateway.post(f"{ollama.url}/api/generate", json=payload, stream=True)
+            with self.assertRaises(llm_gateway.ModelBusyError):
+                gateway.post(f"{ollama.url}/api/generate", json=payload, stream=True)
+            self.assertEqual(len(list(response.iter_lines())), 6)
+            response.close()
+            gateway.post(f"{ollama.url}/api/generate", json=payload, stream=True).close()
+        gateway.close()
+
+    def test_circuit_opens_and_recovers(self):
+        """Test that repeated connection failures open the circuit and a probe closes it again"""
+        url = closed_port_url()
+        for _ in range(2):
+            with self.assertRaises(requests.ConnectionError):
+                self.gateway.get(f"{url}/api/tags")
+        with self.assertRaises(llm_gateway.CircuitOpenError):
+            self.gateway.get(f"{url}/api/tags")
+        self.assertEqual(self.gateway.snapshot()["backends"][url]["state"], "open")
+
+        time.sleep(0.25)
+        port = int(url.rsplit(":", 1)[1])
+        with FakeOllama(port=port):
+            self.assertEqual(self.gateway.get(f"{url}/api/tags").status_code, 200)
+        self.assertEqual(self.gateway.snapshot()["backends"][url],
+                         {"state": "closed", "consecutive_failures": 0, "opened": 1})
+        self.assertEqual(self.gateway.snapshot()["calls"]["GET /api/tags"]["rejected"], 1)
+
+    def test_client_errors_do_not_open_circuit(self):
+        """Test that 4xx answers (e.g. an unknown model) leave the circuit closed"""
+        with FakeOllama() as ollama:
+            for _ in range(3):
+                response = self.gateway.post(f"{ollama.url}/api/generate",
+                                             json={"model": "missing", "prompt": "hi"})
+                self.assertEqual(response.status_code, 404)
+            self.assertEqual(self.gateway.snapshot()["backends"][ollama.url]["state"], "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# test_llm_models.py
+
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import llm_gateway, llm_models
+from fake_ollama import FakeOllama
+
+
+class TestModelManager(unittest.TestCase):
+    """Unit tests for pulling, warming and keep_alive of Ollama models"""
+
+    def setUp(self):
+        """Create a gateway with its own model manager"""
+        self.gateway = llm_gateway.LLMGateway()
+        self.manager = self.gateway.models = llm_models.ModelManager(self.gateway)
+        self.addCleanup(self.gateway.close)
+
+    def _generate(self, ollama, model="llama2"):
+        response = self.gateway.post(f"{ollama.url}/api/generate",
+                                     json={"model": model, "prompt": "hi", "stream": False})
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_model_pulled_in_background(self):
+        """Test that ensure() returns at once while the model is pulled, then loaded"""
+        with FakeOllama(models=(), registry=("llama3",), pull_delay=0.1, load_delay=0.1) as ollama:
+            started = time.perf_counter()
+            self.manager.ensure(ollama.url, "llama3")
+            self.assertLess(time.perf_counter() - started, 0.3)
+            time.sleep(0.2)
+            state = self.manager.state(ollama.url, "llama3")
+            self.assertEqual(state["state"], "pulling")
+            self.assertGreater(state["progress"], 0)
+
+            state = self.manager.wait(ollama.url, "llama3", timeout=5)
+            self.assertEqual((state["state"], state["progress"]), ("loaded", 100.0))
+            self.assertGreaterEqual(state["load_ms"], 100)
+            self.assertEqual((ollama.state.calls["pull"], ollama.state.calls["load"]), (1, 1))
+            self.assertIn("llama3:latest", ollama.state.loaded)
+
+    def test_pull_error_reported(self):
+        """Test that a model the registry does not know ends in the error state"""
+        with FakeOllama() as ollama:
+            self.manager.ensure(ollama.url, "unknown-model")
+            state = self.manager.wait(ollama.url, "unknown-model", timeout=5)
+        self.assertEqual(state["state"], "error")
+        self.assertIn("file does not exist", state["error"])
+
+    def test_warm_model_answers_without_load_time(self):
+        """Test that after warm-up the first generation does not pay the load delay"""
+        with FakeOllama(load_delay=0.5) as ollama:
+            self.assertEqual(self.manager.state(ollama.url, "llama2")["state"], "available")
+            self.manager.ensure(ollama.url, "llama2")
+            self.manager.wait(ollama.url, "llama2", timeout=5)
+            self.assertTrue(self.manager.is_warm(ollama.url, "llama2"))
+            started = time.perf_counter()
+            self._generate(ollama)
+            self.assertLess(time.perf_counter() - started, 0.3)
+
+    def test_untagged_name_of_installed_model(self):
+        """Test that "llama2" is the "llama2:latest" Ollama lists: not pulled again, warm once loaded"""
+        with FakeOllama() as ollama:
+            self.manager.ensure(ollama.url, "llama2")
+            state = self.manager.wait(ollama.url, "llama2", timeout=5)
+            self.assertEqual(state["state"], "loaded")
+            self.assertNotIn("pull", ollama.state.calls)
+            self.manager.refresh(ollama.url, force=True)
+            self.assertTrue(self.manager.is_warm(ollama.url, "llama2"))
+            self.assertTrue(self.manager.is_warm(ollama.url, "llama2:latest"))
+
+    def test_keep_alive_follows_traffic(self):
+        """Test that keep_alive grows with the gap between requests, within the bounds"""
+        with FakeOllama() as ollama:
+            with patch.object(llm_models.time, "monotonic", side_effect=[0, 600, 1200]):
+                for _ in range(3):
+                    self.manager.observe(ollama.url, "llama2")
+            self.assertEqual(self.manager.keep_alive(ollama.url, "llama2"), "1800s")
+            self.assertEqual(self.manager.keep_alive(ollama.url, "mistral"), f"{int(llm_models.KEEP_ALIVE_MIN)}s")
+
+            self._generate(ollama)
+            self.assertEqual(ollama.state.keep_alive["llama2:latest"], "1800s")
+            self.assertEqual(self.manager.state(ollama.url, "llama2")["state"], "loaded")
+
+    def test_pick_prefers_loaded_model(self):
+        """Test that callers are routed to a model that is already in memory"""
+        with FakeOllama(models=("llama2", "mistral")) as ollama:
+            self.assertEqual(self.manager.pick(ollama.url, ["llama2", "mistral"]), "llama2")
+            self._generate(ollama, "mistral")
+            self.manager.refresh(ollama.url, force=True)
+            self.assertEqual(self.manager.pick(ollama.url, ["llama2", "mistral"]), "mistral")
+            self.assertIsNone(self.manager.pick(ollama.url, ["missing"]))
+
+    def test_configured_models(self):
+        """Test parsing of EVODEV_LLM_WARM_MODELS"""
+        self.assertEqual(llm_models.configured_models("http://ollama:11434", "llama3:7b, http://gpu:11434=mistral"),
+                         [("http://ollama:11434", "llama3:7b"), ("http://gpu:11434", "mistral")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# test_llm_pool.py
+
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import llm_gateway, llm_pool
+from fake_ollama import FakeOllama
+
+POOL = "http://ollama:11434"
+
+
+def closed_port_url():
+    """URL of a local port nobody listens on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+class TestBackendPool(unittest.TestCase):
+    """Unit tests for routing and failover over several Ollama backends"""
+
+    def _gateway(self, *members, probe_interval=None):
+        gateway = llm_gateway.LLMGateway(breaker_failures=100, pools={POOL: [member.url if hasattr(member, "url")
+                                                                           else member for member in members]})
+        if probe_interval is not None:
+            gateway.pools[POOL].probe_interval = probe_interval
+        self.addCleanup(gateway.close)
+        return gateway
+
+    def _generate(self, gateway, model="llama2", prompt="hi"):
+        response = gateway.post(f"{POOL}/api/generate", json={"model": model, "prompt": prompt, "stream": False})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_least_outstanding_routing(self):
+        """Test that concurrent calls are spread evenly over the members"""
+        with FakeOllama(latency=0.2) as first, FakeOllama(latency=0.2) as second, FakeOllama(latency=0.2) as third:
+            gateway = self._gateway(first, second, third)
+            threads = [threading.Thread(target=self._generate, args=(gateway, "llama2", f"q{n}")) for n in range(6)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+            self.assertEqual([ollama.state.calls["generate"] for ollama in (first, second, third)], [2, 2, 2])
+            self.assertEqual({entry["outstanding"] for entry in gateway.snapshot()["pools"][POOL].values()}, {0})
+
+    def test_model_aware_routing(self):
+        """Test that calls only go to members listing the model in /api/tags"""
+        with FakeOllama(models=("llama2",)) as first, FakeOllama(models=("llama2", "mistral")) as second:
+            gateway = self._gateway(first, second)
+            for n in range(4):
+                self._generate(gateway, "mistral", f"q{n}")
+            self.assertNotIn("generate", first.state.calls)
+            self.assertEqual(second.state.calls["generate"], 4)
+            self.assertEqual(gateway.snapshot()["pools"][POOL][first.url]["models"], ["llama2:latest"])
+
+    def test_failover_from_unreachable_backend(self):
+        """Test that a backend refusing connections is skipped and marked down"""
+        dead = closed_port_url()
+        with FakeOllama() as alive:
+            gateway = self._gateway(dead, alive)
+            # The backend went away after its last good probe
+            with patch.object(gateway.pools[POOL], "probe"):
+                for n in range(3):
+                    self._generate(gateway, prompt=f"q{n}")
+            self.assertEqual(alive.state.calls["generate"], 3)
+            pool = gateway.snapshot()["pools"][POOL]
+            self.assertFalse(pool[dead]["healthy"])
+            self.assertEqual(pool[dead]["failures"], 1)
+
+    def test_failover_on_server_error(self):
+        """Test that a 5xx answer is retried on the next member"""
+        with FakeOllama() as broken, FakeOllama() as alive:
+            gateway = self._gateway(broken, alive)
+            self._generate(gateway, prompt="warm-up")
+            broken.state.failing = True
+            for n in range(2):
+                self.assertEqual(self._generate(gateway, prompt=f"q{n}").json()["done"], True)
+            self.assertEqual((broken.state.calls["failed"], alive.state.calls["generate"]), (1, 2))
+            self.assertFalse(gateway.snapshot()["pools"][POOL][broken.url]["healthy"])
+
+            alive.state.failing = True
+            response = gateway.post(f"{POOL}/api/generate", json={"model": "llama2", "prompt": "q", "stream": False})
+            self.assertEqual(response.status_code, 500)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self._gateway(closed_port_url(), closed_port_url()).post(
+                f"{POOL}/api/generate", json={"model": "llama2", "prompt": "hi", "stream": False})
+
+    def test_probe_brings_backend_back(self):
+        """Test that a member marked down receives calls again after a good probe"""
+        with FakeOllama() as first, FakeOllama() as second:
+            gateway = self._gateway(first, second, probe_interval=0.1)
+            first.state.failing = True
+            self._generate(gateway)
+            time.sleep(0.2)
+            self.assertFalse(gateway.snapshot()["pools"][POOL][first.url]["healthy"])
+            first.state.failing = False
+            time.sleep(0.3)
+            self.assertTrue(gateway.snapshot()["pools"][POOL][first.url]["healthy"])
+            for n in range(4):
+                self._generate(gateway, prompt=f"q{n}")
+            self.assertEqual(first.state.calls["generate"], 2)
+
+    def test_parse_pools(self):
+        """Test parsing of EVODEV_LLM_BACKENDS"""
+        self.assertEqual(llm_pool.parse_pools("http://ollama:11434=http://a:11434, http://b:11434/;"
+                                              " http://test_ollama:11434=http://c:11434;broken"),
+                         {"http://ollama:11434": ["http://a:11434", "http://b:11434"],
+                          "http://test_ollama:11434": ["http://c:11434"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
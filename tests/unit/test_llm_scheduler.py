@@ -0,0 +1,145 @@
+# test_llm_scheduler.py
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+from evodev import llm_gateway, llm_scheduler
+from fake_ollama import FakeOllama
+
+
+class TestBackendScheduler(unittest.TestCase):
+    """Unit tests for priority classes, fair queuing and limits of the LLM scheduler"""
+
+    def setUp(self):
+        """Create a scheduler with one slot and an order log"""
+        self.scheduler = llm_scheduler.BackendScheduler(limit=1, reserve=0)
+        self.order = []
+        self.threads = []
+
+    def _queue(self, name, priority, tenant=None, model="llama2", scheduler=None):
+        """Start a thread waiting for a slot; returns once it is queued"""
+        scheduler = scheduler or self.scheduler
+        queued = sum(entry["queued"] for entry in scheduler.snapshot()["classes"].values())
+
+        def run():
+            release = scheduler.acquire(model, priority, tenant, timeout=5)
+            self.order.append(name)
+            release()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        self.threads.append(thread)
+        while sum(entry["queued"] for entry in scheduler.snapshot()["classes"].values()) == queued:
+            time.sleep(0.001)
+
+    def _drain(self, release):
+        release()
+        for thread in self.threads:
+            thread.join(5)
+
+    def test_priority_order(self):
+        """Test that a free slot goes to interactive, then background, then batch"""
+        release = self.scheduler.acquire("llama2", "batch")
+        self._queue("batch", "batch")
+        self._queue("background", "background")
+        self._queue("interactive", "interactive")
+        self._drain(release)
+        self.assertEqual(self.order, ["interactive", "background", "batch"])
+
+    def test_tenants_take_turns(self):
+        """Test that within a class rooms alternate and each keeps its own order"""
+        release = self.scheduler.acquire("llama2", "batch")
+        for name in ("a1", "a2", "a3"):
+            self._queue(name, "batch", tenant="room-a")
+        self._queue("b1", "batch", tenant="room-b")
+        self._drain(release)
+        self.assertEqual(self.order, ["a1", "b1", "a2", "a3"])
+
+    def test_reserve_kept_for_interactive(self):
+        """Test that batch calls leave the reserved slot free for chat messages"""
+        scheduler = llm_scheduler.BackendScheduler(limit=2, reserve=1)
+        release = scheduler.acquire("llama2", "batch")
+        with self.assertRaises(llm_scheduler.QueueTimeout):
+            scheduler.acquire("llama2", "batch", timeout=0.05)
+        started = time.perf_counter()
+        scheduler.acquire("llama2", "interactive", timeout=1)()
+        self.assertLess(time.perf_counter() - started, 0.05)
+        release()
+        self.assertEqual(scheduler.snapshot()["classes"]["batch"]["timeouts"], 1)
+
+    def test_model_limit(self):
+        """Test that a model at its limit does not hold up calls for other models"""
+        scheduler = llm_scheduler.BackendScheduler(limit=4, model_limit=lambda model: 1, reserve=0)
+        release = scheduler.acquire("llama2", "interactive")
+        self._queue("llama2", "interactive", scheduler=scheduler)
+        scheduler.acquire("mistral", "batch", timeout=1)()
+        self.assertEqual(self.order, [])
+        self.assertEqual(scheduler.snapshot()["models"], {"llama2": 1, "mistral": 0})
+        self._drain(release)
+        self.assertEqual(self.order, ["llama2"])
+
+    def test_queue_metrics(self):
+        """Test queue depth and wait times per class in the snapshot"""
+        release = self.scheduler.acquire("llama2", "batch")
+        self._queue("interactive", "interactive", tenant="room-a")
+        classes = self.scheduler.snapshot()["classes"]
+        self.assertEqual((classes["interactive"]["queued"], classes["interactive"]["queued_tenants"]), (1, 1))
+        time.sleep(0.05)
+        self._drain(release)
+        classes = self.scheduler.snapshot()["classes"]
+        self.assertEqual((classes["interactive"]["admitted"], classes["batch"]["admitted"]), (1, 1))
+        self.assertGreaterEqual(classes["interactive"]["max_wait_ms"], 50)
+        self.assertEqual(classes["interactive"]["queued"], 0)
+        self.assertIsNone(classes["background"]["avg_wait_ms"])
+
+    def test_gateway_serves_chat_before_batch(self):
+        """Test that a chat call through the gateway overtakes queued batch generations"""
+        gateway = llm_gateway.LLMGateway(backend_concurrency=1, interactive_reserve=0)
+        self.addCleanup(gateway.close)
+        finished = []
+
+        def generate(name, priority, tenant):
+            with llm_scheduler.context(priority, tenant):
+                gateway.post(f"{ollama.url}/api/generate",
+                             json={"model": "llama2", "prompt": name, "stream": False})
+            finished.append(name)
+
+        with FakeOllama(latency=0.1) as ollama:
+            threads = [threading.Thread(target=generate, args=(f"batch-{n}", "batch", "project")) for n in range(3)]
+            for thread in threads:
+                thread.start()
+            time.sleep(0.05)
+            threads.append(threading.Thread(target=generate, args=("chat", "interactive", "room")))
+            threads[-1].start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(finished.index("chat"), 1)
+        queues = gateway.snapshot()["schedulers"][ollama.url]
+        self.assertEqual((queues["classes"]["batch"]["admitted"], queues["classes"]["interactive"]["admitted"]), (3, 1))
+        with self.assertRaises(ValueError):
+            with llm_scheduler.context("urgent"):
+                pass
+
+    def test_only_generations_take_slots(self):
+        """Test that a pull goes through while every generation slot is busy"""
+        gateway = llm_gateway.LLMGateway(backend_concurrency=1, interactive_reserve=0, queue_timeout=0.5)
+        self.addCleanup(gateway.close)
+        with FakeOllama(token_delay=0.05, registry=("mistral",)) as ollama:
+            streamed = gateway.post(f"{ollama.url}/api/generate", json={"model": "llama2", "prompt": "hi"}, stream=True)
+            with streamed:
+                response = gateway.post(f"{ollama.url}/api/pull", json={"model": "mistral", "stream": False})
+                self.assertEqual(response.status_code, 200)
+                with self.assertRaises(llm_gateway.ModelBusyError):
+                    gateway.post(f"{ollama.url}/api/generate", json={"model": "llama2", "prompt": "hi", "stream": False})
+        classes = gateway.snapshot()["schedulers"][ollama.url]["classes"]
+        self.assertEqual(sum(entry["admitted"] for entry in classes.values()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+# test_llm_stream.py
+
+import json
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+
+import llm_stream
+from fake_ollama import FakeOllama
+
+
+class FakeResponse:
+    """Stand-in for a streamed requests.Response"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.closed = False
+
+    def iter_lines(self, decode_unicode=False):
+        for line in self.lines:
+            yield line if decode_unicode else line.encode()
+
+    def close(self):
+        self.closed = True
+
+
+def parse_events(body):
+    """(event, data) pairs of an SSE body, skipping comments"""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if line and not line.startswith(":"))
+        if "data" in fields:
+            events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+class TestLlmStream(unittest.TestCase):
+    """Unit tests for relaying provider token streams as SSE"""
+
+    def setUp(self):
+        """Use fresh stream statistics"""
+        previous = llm_stream.stats
+        self.stats = llm_stream.stats = llm_stream.StreamStats()
+        self.addCleanup(setattr, llm_stream, "stats", previous)
+
+    def _ollama(self, ollama):
+        def produce(relay):
+            payload = {"model": "llama2", "prompt": "hi", "stream": True}
+            response = llm_stream.post_stream(relay, f"{ollama.url}/api/generate", 5, json=payload)
+            yield from llm_stream.ollama_tokens(response)
+        return produce
+
+    def test_ollama_tokens_relayed_with_ttft(self):
+        """Test that every token is relayed and the done event carries timings"""
+        completed = []
+        with FakeOllama(latency=0.1, token_delay=0.01, tokens=5) as ollama:
+            relay = llm_stream.TokenRelay("ollama", self._ollama(ollama), on_complete=completed.append)
+            events = parse_events("".join(relay.events()))
+
+        tokens = [data["token"] for event, data in events if event == "message"]
+        self.assertEqual(tokens, [f"token{n} " for n in range(5)])
+        self.assertEqual(events[-1][0], "done")
+        self.assertGreaterEqual(events[-1][1]["ttft_ms"], 100)
+        self.assertEqual(completed, ["".join(tokens)])
+        snapshot = self.stats.snapshot()["ollama"]
+        self.assertEqual((snapshot["completed"], snapshot["tokens"]), (1, 5))
+        self.assertIsNotNone(snapshot["ttft_p50_ms"])
+
+    def test_client_disconnect_cancels_upstream(self):
+        """Test that closing the SSE body closes the upstream request to the model"""
+        with FakeOllama(token_delay=0.02, tokens=500) as ollama:
+            relay = llm_stream.TokenRelay("ollama", self._ollama(ollama), heartbeat=0.05)
+            body = relay.events()
+            for _ in range(3):
+                next(body)
+            body.close()
+
+            self.assertTrue(relay.cancelled.is_set())
+            deadline = time.monotonic() + 5
+            while ollama.state.in_flight and time.monotonic() < deadline:
+                time.sleep(0.02)
+            self.assertEqual(ollama.state.in_flight, 0)
+            self.assertEqual(ollama.state.cancelled, 1)
+        self.assertEqual(self.stats.snapshot()["ollama"]["cancelled"], 1)
+
+    def test_upstream_error_becomes_error_event(self):
+        """Test that a provider error is sent as an SSE error event"""
+        with FakeOllama() as ollama:
+            def produce(relay):
+                payload = {"model": "missing", "prompt": "hi"}
+                yield from llm_stream.ollama_tokens(
+                    llm_stream.post_stream(relay, f"{ollama.url}/api/generate", 5, json=payload))
+            events = parse_events("".join(llm_stream.TokenRelay("ollama", produce).events()))
+        self.assertEqual(events[0][0], "error")
+        self.assertIn("404", events[0][1]["message"])
+
+    def test_openai_tokens_and_tool_calls(self):
+        """Test OpenAI SSE parsing with tool call fragments assembled"""
+        chunks = [
+            {"choices": [{"delta": {"content": "Hel"}}]},
+            {"choices": [{"delta": {"content": "lo"}}]},
+            {"choices": [{"delta": {"tool_calls": [{"index": 0, "id": "call_1",
+                                                    "function": {"name": "send_email", "arguments": "{\"to\""}}]}}]},
+            {"choices": [{"delta": {"tool_calls": [{"index": 0, "function": {"arguments": ": \"a@b\"}"}}]}}]},
+        ]
+        response = FakeResponse([f"data: {json.dumps(c)}" for c in chunks] + ["", "data: [DONE]"])
+        tool_calls = []
+        self.assertEqual(list(llm_stream.openai_tokens(response, tool_calls)), ["Hel", "lo"])
+        self.assertEqual(tool_calls, [{"id": "call_1", "type": "function",
+                                       "function": {"name": "send_email", "arguments": "{\"to\": \"a@b\"}"}}])
+
+    def test_anthropic_tokens(self):
+        """Test Anthropic SSE parsing"""
+        events = [
+            {"type": "message_start", "message": {}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Cze"}},
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "ść"}},
+            {"type": "message_stop"},
+        ]
+        lines = []
+        for event in events:
+            lines += [f"event: {event['type']}", f"data: {json.dumps(event)}", ""]
+        self.assertEqual(list(llm_stream.anthropic_tokens(FakeResponse(lines))), ["Cze", "ść"])
+
+
+if __name__ == "__main__":
+    unittest.main()
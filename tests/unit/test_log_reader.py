@@ -0,0 +1,97 @@
+# test_log_reader.py
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import log_reader
+
+
+class TestLogReader(unittest.TestCase):
+    """Unit tests for the tail-seek log reader"""
+
+    def setUp(self):
+        """Write a log file mixing JSON and plain text lines"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "app.log")
+        self.lines = []
+        for i in range(1, 1001):
+            if i % 2:
+                self.lines.append(json.dumps({"n": i, "message": "x" * (i % 37)}))
+            else:
+                self.lines.append(f"2025-05-10 12:00:00 - INFO - line {i}")
+        with open(self.path, "w") as f:
+            f.write("\n".join(self.lines) + "\n")
+
+    def tearDown(self):
+        """Remove the temporary log file"""
+        self.tmpdir.cleanup()
+
+    def _numbers(self, page):
+        numbers = []
+        for entry in page["logs"]:
+            numbers.append(entry["n"] if "n" in entry else int(entry["raw"].rsplit(" ", 1)[1]))
+        return numbers
+
+    def test_tail_matches_readlines(self):
+        """Test that the tail page equals the last lines of readlines()"""
+        with patch.object(log_reader, "BLOCK_SIZE", 256):
+            page = log_reader.read_page(self.path, 25)
+
+        self.assertEqual(page["total_lines"], 1000)
+        self.assertEqual(page["displayed_lines"], 25)
+        self.assertEqual(self._numbers(page), list(range(976, 1001)))
+        self.assertEqual(page["first_line"], 976)
+
+    def test_before_cursor_pages_backwards(self):
+        """Test that following the before cursor walks the whole file without gaps"""
+        seen = []
+        before = None
+        with patch.object(log_reader, "BLOCK_SIZE", 100):
+            while True:
+                page = log_reader.read_page(self.path, 70, before=before)
+                seen = self._numbers(page) + seen
+                before = page["cursor"]["before"]
+                if before is None:
+                    break
+        self.assertEqual(seen, list(range(1, 1001)))
+
+    def test_after_cursor_pages_forwards(self):
+        """Test that the after cursor returns the lines following an offset"""
+        first = log_reader.read_page(self.path, 10, after=0)
+        second = log_reader.read_page(self.path, 10, after=first["cursor"]["after"])
+        self.assertEqual(self._numbers(first), list(range(1, 11)))
+        self.assertEqual(self._numbers(second), list(range(11, 21)))
+        self.assertEqual(second["first_line"], 11)
+
+    def test_index_follows_appends_and_truncation(self):
+        """Test that the cached index is extended on append and rebuilt on truncation"""
+        with patch.object(log_reader, "INDEX_STRIDE", 512):
+            self.assertEqual(log_reader.read_page(self.path, 1)["total_lines"], 1000)
+            with open(self.path, "a") as f:
+                f.write("tail line 1001\npartial")
+            page = log_reader.read_page(self.path, 2)
+            self.assertEqual(page["total_lines"], 1002)
+            self.assertEqual(page["logs"], [{"raw": "tail line 1001"}, {"raw": "partial"}])
+            self.assertEqual(page["first_line"], 1001)
+
+            with open(self.path, "w") as f:
+                f.write("fresh\n")
+            self.assertEqual(log_reader.read_page(self.path, 5)["total_lines"], 1)
+
+    def test_empty_file(self):
+        """Test reading an empty log file"""
+        open(self.path, "w").close()
+        page = log_reader.read_page(self.path, 10)
+        self.assertEqual(page["total_lines"], 0)
+        self.assertEqual(page["logs"], [])
+        self.assertIsNone(page["cursor"]["before"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+# test_log_stream.py
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import log_stream
+
+
+class IdleFollower(log_stream.Follower):
+    """Follower whose lines are published by the test itself"""
+
+    def follow(self):
+        self._stop.wait()
+
+
+class FailingFollower(log_stream.Follower):
+    """Follower whose source breaks after the test lets it go"""
+
+    def __init__(self, key):
+        super().__init__(key)
+        self.fail = threading.Event()
+
+    def follow(self):
+        self.fail.wait(5)
+        raise OSError("container gone")
+
+
+def drain(subscription, count, timeout=5.0):
+    """Collect count lines from a subscription or fail after timeout"""
+    lines = []
+    deadline = time.monotonic() + timeout
+    while len(lines) < count and time.monotonic() < deadline:
+        line = subscription.get(timeout=0.1)
+        if line is not None:
+            lines.append(line)
+    return lines
+
+
+class TestLogStream(unittest.TestCase):
+    """Unit tests for shared log followers and SSE subscriptions"""
+
+    def setUp(self):
+        """Create an empty log file and poll it quickly"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "app.log")
+        with open(self.path, "w") as f:
+            f.write("old line that must not be streamed\n")
+        self.patcher = patch.object(log_stream, "POLL_INTERVAL", 0.02)
+        self.patcher.start()
+
+    def tearDown(self):
+        """Stop polling and remove the log file"""
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def _append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def test_one_follower_fans_out_to_all_clients(self):
+        """Test that clients of the same file share one follower and each get new lines"""
+        key, factory = log_stream.file_source(self.path)
+        first, second = log_stream.Subscription(), log_stream.Subscription()
+        follower = log_stream.subscribe(key, factory, first)
+        self.assertIs(log_stream.subscribe(key, factory, second), follower)
+        self.assertEqual(log_stream.active_followers()[key], 2)
+
+        time.sleep(0.1)
+        self._append("line 1\nline 2\npart")
+        self.assertEqual(drain(first, 2), ["line 1", "line 2"])
+        self._append("ial\n")
+        self.assertEqual(drain(second, 3), ["line 1", "line 2", "partial"])
+
+        log_stream.unsubscribe(follower, first)
+        self.assertIn(key, log_stream.active_followers())
+        log_stream.unsubscribe(follower, second)
+        self.assertNotIn(key, log_stream.active_followers())
+        follower._thread.join(2)
+        self.assertFalse(follower._thread.is_alive())
+
+    def test_follower_reopens_truncated_file(self):
+        """Test that lines written after truncation are streamed from the start"""
+        key, factory = log_stream.file_source(self.path)
+        subscription = log_stream.Subscription()
+        follower = log_stream.subscribe(key, factory, subscription)
+        try:
+            time.sleep(0.1)
+            with open(self.path, "w") as f:
+                f.write("after truncate\n")
+            self.assertEqual(drain(subscription, 1), ["after truncate"])
+        finally:
+            log_stream.unsubscribe(follower, subscription)
+
+    def test_level_and_pattern_filters(self):
+        """Test server-side filtering by minimum level and regex"""
+        subscription = log_stream.Subscription(level="warning", pattern=r"db")
+        for line in (
+            "2025-05-10 12:00:00 - monitor - INFO - db ready",
+            "2025-05-10 12:00:01 - monitor - ERROR - db locked",
+            json.dumps({"level": "WARNING", "message": "slow db query"}),
+            "2025-05-10 12:00:02 - monitor - ERROR - disk full",
+            "  continuation of db traceback",
+        ):
+            subscription.offer(line)
+
+        lines = drain(subscription, 3)
+        self.assertEqual(len(lines), 3)
+        self.assertIn("db locked", lines[0])
+        self.assertIn("slow db query", lines[1])
+        self.assertEqual(lines[2], "  continuation of db traceback")
+        with self.assertRaises(ValueError):
+            log_stream.Subscription(level="LOUD")
+        with self.assertRaises(ValueError):
+            log_stream.Subscription(pattern="a" * (log_stream.MAX_PATTERN_LENGTH + 1))
+
+    def test_rate_limit_drops_excess_lines(self):
+        """Test that a client over its rate loses lines and counts them"""
+        subscription = log_stream.Subscription(rate=5)
+        for i in range(20):
+            subscription.offer(f"line {i}")
+        self.assertEqual(len(drain(subscription, 20, timeout=0.3)), 5)
+        self.assertEqual(subscription.dropped, 15)
+
+    def test_event_stream_formats_and_unsubscribes(self):
+        """Test SSE framing and that closing the generator releases the follower"""
+        key = "test:idle"
+        subscription = log_stream.Subscription()
+        stream = log_stream.event_stream(key, lambda: IdleFollower(key), subscription)
+
+        self.assertTrue(next(stream).startswith("retry:"))
+        follower = log_stream._followers[key]
+        follower.publish("2025-05-10 12:00:00 - ERROR - boom")
+        event = next(stream)
+        self.assertTrue(event.startswith("data: ") and event.endswith("\n\n"))
+        self.assertEqual(json.loads(event[6:]), {"line": "2025-05-10 12:00:00 - ERROR - boom", "level": 40})
+
+        stream.close()
+        self.assertNotIn(key, log_stream.active_followers())
+
+    def test_failed_source_ends_streams(self):
+        """Test that a failed follower is released and its clients get an end event"""
+        key = "test:failing"
+        subscription = log_stream.Subscription()
+        stream = log_stream.event_stream(key, lambda: FailingFollower(key), subscription)
+        next(stream)
+        follower = log_stream._followers[key]
+        follower.publish("last line")
+        follower.fail.set()
+
+        self.assertEqual(json.loads(next(stream)[6:])["line"], "last line")
+        self.assertEqual(next(stream), 'event: end\ndata: {"error": "log stream interrupted: container gone"}\n\n')
+        with self.assertRaises(StopIteration):
+            next(stream)
+        self.assertNotIn(key, log_stream.active_followers())
+
+    def test_follower_requires_follow(self):
+        """Test that a follower without a source cannot be created"""
+        with self.assertRaises(TypeError):
+            log_stream.Follower("test:abstract")
+
+
+if __name__ == "__main__":
+    unittest.main()
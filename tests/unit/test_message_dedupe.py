@@ -0,0 +1,90 @@
+# test_message_dedupe.py
+
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from evodev import message_dedupe
+from evodev.message_dedupe import SeenMessages
+
+
+class TestSeenMessages(unittest.TestCase):
+    """Unit tests for the bounded, persistent store of answered message ids"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.path = os.path.join(state_dir.name, "answered.db")
+
+    def _store(self, **kwargs):
+        store = SeenMessages(self.path, **kwargs)
+        self.addCleanup(store.close)
+        return store
+
+    def test_survives_restart(self):
+        """Test that ids added before a restart are still known after it"""
+        store = SeenMessages(self.path)
+        store.add("msg-1")
+        store.add("msg-2")
+        self.assertIn("msg-1", store)
+        store.close()
+
+        reopened = self._store()
+        self.assertIn("msg-1", reopened)
+        self.assertIn("msg-2", reopened)
+        self.assertNotIn("msg-3", reopened)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.snapshot()["disk_hits"], 2)
+
+    def test_memory_is_bounded(self):
+        """Test that the memory LRU keeps at most memory_ids ids and older ones answer from disk"""
+        store = self._store(memory_ids=100)
+        for n in range(1000):
+            store.add(f"msg-{n}")
+        snapshot = store.snapshot()
+        self.assertEqual(snapshot["memory_ids"], 100)
+        self.assertEqual(snapshot["disk_ids"], 1000)
+        self.assertIn("msg-999", store)
+        self.assertIn("msg-0", store)
+        self.assertEqual(store.snapshot()["memory_hits"], 1)
+        self.assertEqual(store.snapshot()["disk_hits"], 1)
+
+    def test_memory_window(self):
+        """Test that ids not used within the window leave memory"""
+        store = self._store(memory_window=60)
+        now = time.time()
+        with patch.object(message_dedupe.time, "time", return_value=now - 120):
+            store.add("old")
+        store.add("new")
+        self.assertEqual(store.snapshot()["memory_ids"], 1)
+        self.assertIn("old", store)
+
+    def test_disk_is_bounded(self):
+        """Test that the oldest ids beyond disk_ids are pruned and re-adds are not counted twice"""
+        store = self._store(memory_ids=10, disk_ids=500)
+        for n in range(3000):
+            store.add(f"msg-{n}")
+        store.add("msg-2999")
+        self.assertLessEqual(len(store), 500 + message_dedupe.PRUNE_EVERY)
+        self.assertIn("msg-2999", store)
+        self.assertNotIn("msg-0", store)
+        store.close()
+        self.assertEqual(len(self._store(disk_ids=500)), 500)
+
+    def test_retention(self):
+        """Test that ids older than the retention are pruned on open"""
+        store = SeenMessages(self.path)
+        with patch.object(message_dedupe.time, "time", return_value=time.time() - 3600):
+            store.add("expired")
+        store.add("kept")
+        store.close()
+        reopened = self._store(retention=60)
+        self.assertNotIn("expired", reopened)
+        self.assertIn("kept", reopened)
+        self.assertEqual(reopened.snapshot()["pruned"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
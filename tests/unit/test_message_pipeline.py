@@ -0,0 +1,159 @@
+# test_message_pipeline.py
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_sync
+from evodev.message_pipeline import RoomPipeline
+from fake_rocketchat import BOT_ID, FakeRocketChat
+from src.rocketchat.bot import RocketChatBot
+
+
+class TestRoomPipeline(unittest.TestCase):
+    """Unit tests for the per-room ordered message pipeline"""
+
+    def _pipeline(self, handler, **kwargs):
+        pipeline = RoomPipeline(handler, **kwargs)
+        pipeline.start()
+        self.addCleanup(pipeline.stop, False, 5)
+        return pipeline
+
+    def test_rooms_in_parallel_messages_in_order(self):
+        """Test that rooms run concurrently while each room keeps its order"""
+        lock = threading.Lock()
+        handled = {}
+        running = {"rooms": set(), "max": 0}
+
+        def handler(item):
+            room, n = item
+            with lock:
+                self.assertNotIn(room, running["rooms"])
+                running["rooms"].add(room)
+                running["max"] = max(running["max"], len(running["rooms"]))
+            time.sleep(0.02)
+            with lock:
+                running["rooms"].discard(room)
+                handled.setdefault(room, []).append(n)
+
+        pipeline = self._pipeline(handler, workers=4)
+        started = time.perf_counter()
+        for n in range(5):
+            for room in ("a", "b", "c", "d"):
+                self.assertTrue(pipeline.submit(room, (room, n)))
+        self.assertTrue(pipeline.join(5))
+        self.assertEqual(handled, {room: list(range(5)) for room in "abcd"})
+        self.assertEqual(running["max"], 4)
+        # 20 messages x 20 ms one after another would take 0.4 s
+        self.assertLess(time.perf_counter() - started, 0.3)
+
+    def test_room_depth_and_duplicates(self):
+        """Test that a full room refuses messages, other rooms do not, and queued keys are not added twice"""
+        release = threading.Event()
+        pipeline = self._pipeline(lambda item: release.wait(5), workers=1, room_depth=2)
+        self.assertTrue(pipeline.submit("a", 1, key="m1"))
+        deadline = time.monotonic() + 5
+        while pipeline.snapshot()["busy"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.assertTrue(pipeline.submit("a", 2, key="m2"))
+        self.assertTrue(pipeline.submit("a", 2, key="m2"))
+        self.assertTrue(pipeline.submit("a", 3, key="m3"))
+        self.assertFalse(pipeline.submit("a", 4, key="m4"))
+        self.assertTrue(pipeline.submit("b", 1, key="m5"))
+        release.set()
+        self.assertTrue(pipeline.join(5))
+        snapshot = pipeline.snapshot()
+        self.assertEqual((snapshot["handled"], snapshot["rejected"], snapshot["duplicates"]), (4, 1, 1))
+        self.assertTrue(pipeline.submit("a", 2, key="m2"))
+
+    def test_errors_and_metrics(self):
+        """Test that a failing handler is counted and queue wait is reported apart from handler time"""
+        def handler(item):
+            time.sleep(0.05)
+            if item == "zły":
+                raise ValueError(item)
+
+        pipeline = self._pipeline(handler, workers=1)
+        for item in ("zły", "dobry", "dobry"):
+            pipeline.submit("a", item)
+        self.assertTrue(pipeline.join(5))
+        snapshot = pipeline.snapshot()
+        self.assertEqual((snapshot["handled"], snapshot["errors"]), (2, 1))
+        self.assertEqual(snapshot["handler"]["count"], 3)
+        self.assertGreaterEqual(snapshot["handler"]["p50_ms"], 50)
+        self.assertGreaterEqual(snapshot["queue_wait"]["max_ms"], 90)
+        self.assertLess(snapshot["queue_wait"]["p50_ms"], snapshot["queue_wait"]["max_ms"])
+
+    def test_stop_without_wait_drops_queued_items(self):
+        """Test that stop(wait=False) finishes running items, drops queued ones and leaves no rooms"""
+        started = threading.Event()
+        handled = []
+
+        def handler(item):
+            started.set()
+            time.sleep(0.1)
+            handled.append(item)
+
+        pipeline = RoomPipeline(handler, workers=1)
+        pipeline.start()
+        for n in range(3):
+            pipeline.submit("a", n, key=("a", n))
+        pipeline.submit("b", "b0", key=("b", 0))
+        self.assertTrue(started.wait(5))
+        pipeline.stop(wait=False, timeout=5)
+
+        self.assertEqual(handled, [0])
+        self.assertTrue(pipeline.join(1))
+        snapshot = pipeline.snapshot()
+        self.assertEqual((snapshot["queued"], snapshot["rooms"], snapshot["busy"]), (0, 0, 0))
+        self.assertTrue(pipeline.submit("a", 1, key=("a", 1)))
+        self.assertEqual(pipeline.snapshot()["duplicates"], 0)
+
+
+class TestRocketChatBotPipeline(unittest.TestCase):
+    """Unit tests for RocketChatBot message handling through the pipeline"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        patcher = patch.object(rocketchat_sync, "STATE_DIR", state_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_slow_room_does_not_block_others(self):
+        """Test that inline commands answer at once and slow rooms are handled in parallel"""
+        with FakeRocketChat(direct_rooms=3, channels=0) as rocketchat:
+            bot = RocketChatBot(rocketchat.url, "heyken_bot", "secret")
+            bot.register_handler(r"pomoc", lambda message: "lista komend", inline=True)
+            bot.set_default_handler(lambda message: time.sleep(0.3) or f"odpowiedź na {message.text}")
+            self.assertTrue(bot.client.login())
+            bot.pipeline.start()
+            self.addCleanup(bot.client.close)
+            self.addCleanup(bot.pipeline.stop, False, 5)
+
+            bot.client.cursors.since -= 1000
+            for text in ("pierwsze", "drugie"):
+                rocketchat.post("dm0", text)
+            rocketchat.post("dm1", "pomoc")
+            rocketchat.post("dm2", "trzecie")
+            started = time.perf_counter()
+            bot._process_messages()
+            replies = lambda room: [m["msg"] for m in rocketchat.state.messages[room] if m["u"]["_id"] == BOT_ID]
+            self.assertEqual(replies("dm1"), ["lista komend"])
+            self.assertEqual(replies("dm0"), [])
+
+            self.assertTrue(bot.pipeline.join(5))
+            self.assertLess(time.perf_counter() - started, 0.9)
+            self.assertEqual(replies("dm0"), ["odpowiedź na pierwsze", "odpowiedź na drugie"])
+            self.assertEqual(replies("dm2"), ["odpowiedź na trzecie"])
+
+
+if __name__ == "__main__":
+    unittest.main()
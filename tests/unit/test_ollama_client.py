@@ -26,7 +26,7 @@ class TestOllamaClient(unittest.TestCase):
         """Test initialization with custom URL"""
         self.assertEqual(self.custom_client.ollama_url, self.custom_url)
 
-    @patch("evodev.ollama_client.requests.post")
+    @patch("evodev.ollama_client.llm_gateway.post")
     def test_run_inference_success(self, mock_post):
         """Test successful LLM inference"""
         # Configure mock response
@@ -61,7 +61,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(response, expected_response)
 
-    @patch("evodev.ollama_client.requests.post")
+    @patch("evodev.ollama_client.llm_gateway.post")
     def test_run_inference_with_custom_model(self, mock_post):
         """Test LLM inference with custom model"""
         # Configure mock response
@@ -97,7 +97,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(response, expected_response)
 
-    @patch("evodev.ollama_client.requests.post")
+    @patch("evodev.ollama_client.llm_gateway.post")
     def test_run_inference_http_error(self, mock_post):
         """Test LLM inference with HTTP error"""
         # Configure mock response with error
@@ -120,7 +120,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(response, expected_response)
 
-    @patch("evodev.ollama_client.requests.post")
+    @patch("evodev.ollama_client.llm_gateway.post")
     def test_run_inference_connection_error(self, mock_post):
         """Test LLM inference with connection error"""
         # Configure mock to raise ConnectionError
@@ -141,7 +141,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(response, expected_response)
 
-    @patch("evodev.ollama_client.requests.post")
+    @patch("evodev.ollama_client.llm_gateway.post")
     def test_run_inference_timeout(self, mock_post):
         """Test LLM inference with timeout"""
         # Configure mock to raise Timeout
@@ -157,7 +157,7 @@ class TestOllamaClient(unittest.TestCase):
         expected_response = {"status": "error", "error": "Timeout: Request timed out"}
         self.assertEqual(response, expected_response)
 
-    @patch("evodev.ollama_client.requests.get")
+    @patch("evodev.ollama_client.llm_gateway.get")
     def test_check_status_available(self, mock_get):
         """Test status check when Ollama is available"""
         # Configure mock response
@@ -176,7 +176,7 @@ class TestOllamaClient(unittest.TestCase):
         expected_status = {"status": "available", "details": {"status": "ok"}}
         self.assertEqual(status, expected_status)
 
-    @patch("evodev.ollama_client.requests.get")
+    @patch("evodev.ollama_client.llm_gateway.get")
     def test_check_status_http_error(self, mock_get):
         """Test status check with HTTP error"""
         # Configure mock response with error
@@ -196,7 +196,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(status, expected_status)
 
-    @patch("evodev.ollama_client.requests.get")
+    @patch("evodev.ollama_client.llm_gateway.get")
     def test_check_status_connection_error(self, mock_get):
         """Test status check when Ollama is unavailable due to connection error"""
         # Configure mock to raise ConnectionError
@@ -212,7 +212,7 @@ class TestOllamaClient(unittest.TestCase):
         }
         self.assertEqual(status, expected_status)
 
-    @patch("evodev.ollama_client.requests.get")
+    @patch("evodev.ollama_client.llm_gateway.get")
     def test_check_status_timeout(self, mock_get):
         """Test status check when Ollama times out"""
         # Configure mock to raise Timeout
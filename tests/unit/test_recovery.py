@@ -3,6 +3,7 @@
 import datetime
 import json
 import os
+import time
 import unittest
 from unittest.mock import MagicMock, mock_open, patch
 
@@ -339,6 +340,25 @@ class TestRecoverySystem(unittest.TestCase):
         # Verify the result
         self.assertFalse(result)
 
+    def test_container_events_for_critical_services_only(self):
+        """Test that only state changes of critical services wake the monitoring loop"""
+        running = {"name": "gitlab", "status": "running", "health": "healthy"}
+        self.recovery_system._on_container_change("start", dict(running, name="builder"), None)
+        self.assertFalse(self.recovery_system._state_changed.is_set())
+        self.recovery_system._on_container_change("health_status", running, running)
+        self.assertFalse(self.recovery_system._state_changed.is_set())
+        self.recovery_system._on_container_change("die", dict(running, status="exited"), running)
+        self.assertTrue(self.recovery_system._state_changed.is_set())
+
+    def test_event_driven_checks_are_spaced(self):
+        """Test that an event does not start a check before the minimum interval"""
+        self.recovery_system.event_interval = 0.2
+        started = time.monotonic()
+        self.recovery_system._state_changed.set()
+        self.recovery_system._wait_for_next_check(started)
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+        self.assertFalse(self.recovery_system._state_changed.is_set())
+
 
 if __name__ == "__main__":
     unittest.main()
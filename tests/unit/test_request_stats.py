@@ -0,0 +1,135 @@
+# test_request_stats.py
+
+import math
+import os
+import random
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import db_pool
+import event_writer
+import request_stats
+
+CREATE_REQUESTS_SQL = '''
+CREATE TABLE docker_requests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, source_container TEXT,
+    destination_container TEXT, request_type TEXT, request_path TEXT, status_code INTEGER,
+    response_time REAL, request_size INTEGER, response_size INTEGER
+)
+'''
+INSERT_REQUEST_SQL = '''
+INSERT INTO docker_requests
+(timestamp, source_container, destination_container, request_type,
+request_path, status_code, response_time, request_size, response_size)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+class TestRequestStats(unittest.TestCase):
+    """Unit tests for incrementally maintained request statistics"""
+
+    def setUp(self):
+        """Create the requests table on a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = db_pool.ConnectionPool(os.path.join(self.tmpdir.name, "monitor.db"))
+        self.pool.execute(CREATE_REQUESTS_SQL)
+        self.now = datetime(2025, 5, 10, 12, 30, 15)
+        self.rng = random.Random(7)
+
+    def tearDown(self):
+        """Close the pool and remove the database"""
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def _row(self, minutes_ago=0):
+        when = self.now - timedelta(minutes=minutes_ago)
+        return (
+            when.isoformat(),
+            self.rng.choice(["web", "api"]),
+            self.rng.choice(["db", "ollama"]),
+            self.rng.choice(["GET", "POST"]),
+            "/",
+            self.rng.choice([200, 404, 500]),
+            self.rng.lognormvariate(-3, 1),
+            100,
+            0,
+        )
+
+    def _write(self, rows):
+        writer = event_writer.BatchWriter(self.pool, batch_size=100)
+        writer.add_hook(INSERT_REQUEST_SQL, request_stats.apply)
+        for row in rows:
+            writer.submit(INSERT_REQUEST_SQL, row)
+        writer.close()
+        self.assertEqual(writer.stats()["failed"], 0)
+
+    def test_totals_match_group_by(self):
+        """Test that all-time aggregates equal the full-table GROUP BY they replace"""
+        request_stats.init_schema(self.pool)
+        self._write([self._row(self.rng.randint(0, 120)) for _ in range(1000)])
+
+        stats = request_stats.query(self.pool)
+        expected = self.pool.fetchall(
+            "SELECT source_container, destination_container, COUNT(*) AS request_count, "
+            "AVG(response_time) AS avg_response_time FROM docker_requests "
+            "GROUP BY source_container, destination_container ORDER BY request_count DESC"
+        )
+        self.assertEqual(len(stats["interactions"]), len(expected))
+        by_pair = {(e["source_container"], e["destination_container"]): e for e in stats["interactions"]}
+        for row in expected:
+            entry = by_pair[(row["source_container"], row["destination_container"])]
+            self.assertEqual(entry["request_count"], row["request_count"])
+            self.assertAlmostEqual(entry["avg_response_time"], row["avg_response_time"])
+
+        methods = {e["request_type"]: e["count"] for e in stats["request_types"]}
+        self.assertEqual(sum(methods.values()), 1000)
+        self.assertEqual({e["status_code"] for e in stats["status_codes"]}, {200, 404, 500})
+
+    def test_percentiles_within_sketch_accuracy(self):
+        """Test that p50/p95/p99 are within the configured relative error"""
+        request_stats.init_schema(self.pool)
+        rows = [self._row() for _ in range(5000)]
+        self._write(rows)
+
+        stats = request_stats.query(self.pool)
+        for entry in stats["request_types"]:
+            values = sorted(row[6] for row in rows if row[3] == entry["request_type"])
+            for q in request_stats.PERCENTILES:
+                exact = values[max(1, math.ceil(len(values) * q / 100.0)) - 1]
+                self.assertAlmostEqual(entry[f"p{q}"], exact, delta=exact * request_stats.SKETCH_ACCURACY * 1.01)
+
+    def test_window_only_sums_recent_buckets(self):
+        """Test that a minutes window excludes older buckets"""
+        request_stats.init_schema(self.pool)
+        self._write([self._row(0) for _ in range(30)] + [self._row(4) for _ in range(20)] +
+                    [self._row(30) for _ in range(50)])
+
+        recent = request_stats.query(self.pool, minutes=5, now=self.now)
+        total = request_stats.query(self.pool)
+        self.assertEqual(sum(e["count"] for e in recent["request_types"]), 50)
+        self.assertEqual(sum(e["count"] for e in total["request_types"]), 100)
+        with self.assertRaises(ValueError):
+            request_stats.query(self.pool, minutes=0)
+
+    def test_backfill_and_prune(self):
+        """Test backfill of existing rows and expiry of old minute buckets"""
+        for row in [self._row(0) for _ in range(10)] + [self._row(60 * 30) for _ in range(5)]:
+            self.pool.execute(INSERT_REQUEST_SQL, row)
+        request_stats.init_schema(self.pool)
+        self.assertEqual(sum(e["count"] for e in request_stats.query(self.pool)["request_types"]), 15)
+
+        self.assertGreater(request_stats.prune(self.pool, now=self.now + timedelta(hours=request_stats.RAW_RETENTION_HOURS)), 0)
+        self.assertEqual(self.pool.fetchone("SELECT COUNT(*) AS n FROM docker_requests")["n"], 10)
+        self.assertEqual(sum(e["count"] for e in request_stats.query(self.pool)["request_types"]), 15)
+        self.assertEqual(
+            sum(e["count"] for e in request_stats.query(self.pool, minutes=24 * 60, now=self.now)["request_types"]),
+            10
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# test_retention.py
+
+import os
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import db_pool
+import retention
+
+
+class TestRetention(unittest.TestCase):
+    """Unit tests for system status rollups, expiry and range queries"""
+
+    def setUp(self):
+        """Set up the monitor tables on a temporary database"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.pool = db_pool.ConnectionPool(os.path.join(self.tmpdir.name, "monitor.db"))
+        self.pool.execute(
+            "CREATE TABLE system_status (id INTEGER PRIMARY KEY, timestamp DATETIME, "
+            "cpu_percent REAL, memory_percent REAL, disk_usage REAL, docker_status TEXT)"
+        )
+        self.pool.execute(
+            "CREATE TABLE system_events (id INTEGER PRIMARY KEY, timestamp DATETIME, "
+            "event_type TEXT, component TEXT, message TEXT, details TEXT)"
+        )
+        retention.init_schema(self.pool)
+        self.now = datetime(2025, 5, 10, 12, 0, 30)
+
+    def tearDown(self):
+        """Close the pool and remove the database"""
+        self.pool.close()
+        self.tmpdir.cleanup()
+
+    def _insert_status(self, when, cpu, memory=50.0, disk=30.0):
+        self.pool.execute(
+            "INSERT INTO system_status (timestamp, cpu_percent, memory_percent, disk_usage) VALUES (?, ?, ?, ?)",
+            (when.strftime(retention.TIME_FORMAT), cpu, memory, disk)
+        )
+
+    def test_indexes_created(self):
+        """Test that the timestamp indexes exist"""
+        names = {row["name"] for row in self.pool.fetchall("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn("idx_system_status_timestamp", names)
+        self.assertIn("idx_system_events_timestamp", names)
+
+    def test_minute_rollup_min_avg_max(self):
+        """Test that completed minutes are aggregated with min/avg/max"""
+        minute = datetime(2025, 5, 10, 11, 58)
+        for second, cpu in ((0, 10.0), (20, 20.0), (40, 60.0)):
+            self._insert_status(minute + timedelta(seconds=second), cpu)
+        # Current, incomplete minute must not be rolled up
+        self._insert_status(datetime(2025, 5, 10, 12, 0, 10), 99.0)
+
+        retention.run_retention(self.pool, now=self.now)
+
+        rows = self.pool.fetchall("SELECT * FROM system_status_1m")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["bucket"], "2025-05-10 11:58:00")
+        self.assertEqual(rows[0]["samples"], 3)
+        self.assertEqual(rows[0]["cpu_min"], 10.0)
+        self.assertAlmostEqual(rows[0]["cpu_avg"], 30.0)
+        self.assertEqual(rows[0]["cpu_max"], 60.0)
+
+    def test_hour_rollup_weighted(self):
+        """Test that hourly aggregates weight minute averages by sample count"""
+        self._insert_status(datetime(2025, 5, 10, 10, 0, 0), 10.0)
+        for second in (0, 20, 40):
+            self._insert_status(datetime(2025, 5, 10, 10, 1, second), 50.0)
+
+        retention.run_retention(self.pool, now=self.now)
+
+        row = self.pool.fetchone("SELECT * FROM system_status_1h")
+        self.assertEqual(row["bucket"], "2025-05-10 10:00:00")
+        self.assertEqual(row["samples"], 4)
+        self.assertAlmostEqual(row["cpu_avg"], 40.0)
+
+    def test_raw_rows_expire_after_rollup(self):
+        """Test that raw samples outside the window are removed but kept in rollups"""
+        old = self.now - timedelta(hours=retention.RAW_RETENTION_HOURS + 2)
+        self._insert_status(old, 42.0)
+
+        deleted = retention.run_retention(self.pool, now=self.now)
+
+        self.assertEqual(deleted["raw"], 1)
+        self.assertEqual(self.pool.fetchone("SELECT COUNT(*) AS n FROM system_status")["n"], 0)
+        self.assertEqual(self.pool.fetchone("SELECT cpu_avg FROM system_status_1h")["cpu_avg"], 42.0)
+
+    def test_choose_resolution(self):
+        """Test that automatic resolution picks the cheapest table for the span"""
+        self.assertEqual(retention.choose_resolution(self.now - timedelta(minutes=30), self.now, now=self.now), "raw")
+        self.assertEqual(retention.choose_resolution(self.now - timedelta(hours=12), self.now, now=self.now), "1m")
+        self.assertEqual(retention.choose_resolution(self.now - timedelta(days=7), self.now, now=self.now), "1h")
+        # Older than the raw window always falls back to rollups
+        start = self.now - timedelta(hours=retention.RAW_RETENTION_HOURS + 1)
+        self.assertEqual(retention.choose_resolution(start, start + timedelta(minutes=5), now=self.now), "1m")
+
+    def test_query_status_range(self):
+        """Test a raw range query with ISO bounds"""
+        self._insert_status(datetime(2025, 5, 10, 11, 0, 0), 10.0)
+        self._insert_status(datetime(2025, 5, 10, 11, 30, 0), 20.0)
+        self._insert_status(datetime(2025, 5, 10, 11, 59, 0), 30.0)
+
+        result = retention.query_status(self.pool, "2025-05-10T11:15:00Z", "2025-05-10T12:00:00Z", "raw")
+
+        self.assertEqual(result["resolution"], "raw")
+        self.assertEqual([p["cpu_percent"] for p in result["points"]], [20.0, 30.0])
+
+    def test_query_status_invalid(self):
+        """Test that invalid ranges and resolutions raise ValueError"""
+        with self.assertRaises(ValueError):
+            retention.query_status(self.pool, "2025-05-10T12:00:00", "2025-05-10T11:00:00")
+        with self.assertRaises(ValueError):
+            retention.query_status(self.pool, resolution="5m")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_rocketchat_client.py
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_sync
+from fake_rocketchat import FakeRocketChat
+from src.rocketchat import client as rocketchat_client
+from src.rocketchat.client import RocketChatClient
+
+
+class TestRocketChatClient(unittest.TestCase):
+    """Unit tests for the pooled, concurrent and re-authenticating RocketChat REST client"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.path = os.path.join(state_dir.name, "cursors.json")
+
+    def _client(self, rocketchat):
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        client.cursors = rocketchat_sync.RoomCursors(self.path)
+        self.addCleanup(client.close)
+        self.assertTrue(client.login())
+        return client
+
+    def test_connections_are_reused(self):
+        """Test that polls and sends share one keep-alive connection"""
+        with FakeRocketChat(direct_rooms=3, channels=3) as rocketchat:
+            client = self._client(rocketchat)
+            for n in range(5):
+                rocketchat.post("dm0", f"wiadomość {n}")
+                self.assertEqual(len(client.get_new_messages()), 1)
+                self.assertTrue(client.send_message("dm0", "odpowiedź"))
+            self.assertEqual(rocketchat.state.connections, 1)
+
+    def test_rooms_are_fetched_concurrently(self):
+        """Test that changed rooms are read in parallel and returned in room order"""
+        with FakeRocketChat(direct_rooms=8, channels=8, latency=0.05) as rocketchat:
+            client = self._client(rocketchat)
+            rooms = list(rocketchat.state.rooms)
+            for room_id in rooms:
+                rocketchat.post(room_id, f"w {room_id}")
+            started = time.perf_counter()
+            messages = client.get_new_messages()
+            elapsed = time.perf_counter() - started
+            self.assertEqual([message.room_id for message in messages], rooms)
+            # 2 room lists + 16 rooms sequentially would take 0.9 s
+            self.assertLess(elapsed, 0.5)
+            self.assertLessEqual(rocketchat.state.connections, rocketchat_client.FETCH_WORKERS + 1)
+
+    def test_relogin_on_expired_token(self):
+        """Test that a 401 triggers one login and the request is retried with the new token"""
+        with FakeRocketChat(direct_rooms=4, channels=4) as rocketchat:
+            client = self._client(rocketchat)
+            old_token = client.auth_token
+            rocketchat.state.expire_token()
+            for room_id in rocketchat.state.rooms:
+                rocketchat.post(room_id, "po wygaśnięciu")
+            self.assertEqual(len(client.get_new_messages()), 8)
+            self.assertNotEqual(client.auth_token, old_token)
+            self.assertEqual(rocketchat.state.calls["login"], 2)
+
+            rocketchat.state.expire_token()
+            self.assertTrue(client.send_message("ch0", "odpowiedź"))
+            self.assertEqual(rocketchat.state.calls["login"], 3)
+
+    def test_failed_relogin_is_not_retried(self):
+        """Test that a rejected login ends the request instead of looping"""
+        with FakeRocketChat() as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.state.expire_token()
+            with patch.object(client, "login", return_value=False) as login:
+                self.assertFalse(client.send_message("dm0", "odpowiedź"))
+            self.assertEqual(login.call_count, 1)
+            self.assertEqual(rocketchat.state.calls["chat.postMessage"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# test_rocketchat_realtime.py
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_realtime, rocketchat_sync
+from fake_rocketchat import BOT_ID, BOT_TOKEN, FakeRocketChat
+from src.rocketchat.client import RocketChatClient
+
+
+class TestRealtimeClient(unittest.TestCase):
+    """Unit tests for RocketChat message ingestion over the realtime API"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        patcher = patch.object(rocketchat_sync, "STATE_DIR", state_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _realtime(self, rocketchat, token=BOT_TOKEN, **kwargs):
+        client = rocketchat_realtime.RealtimeClient(rocketchat.url, lambda: (BOT_ID, token), **kwargs)
+        client.start()
+        self.addCleanup(client.stop)
+        return client
+
+    def _client(self, rocketchat):
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        self.assertTrue(client.login())
+        self.assertTrue(client.start_realtime())
+        self.addCleanup(client.stop_realtime)
+        self.assertTrue(client.realtime.wait_connected(5))
+        return client
+
+    def test_messages_pushed_without_polling(self):
+        """Test that a posted message arrives over the WebSocket within milliseconds"""
+        with FakeRocketChat() as rocketchat:
+            realtime = self._realtime(rocketchat)
+            self.assertTrue(realtime.wait_connected(5))
+            self.assertEqual(rocketchat.state.calls["sub:stream-room-messages"], 1)
+            self.assertEqual(rocketchat.state.calls["sub:stream-notify-user"], 1)
+
+            posted = time.perf_counter()
+            rocketchat.post("dm0", "cześć")
+            events = realtime.get(timeout=2)
+            self.assertLess(time.perf_counter() - posted, 0.5)
+            self.assertEqual([(event["message"]["msg"], event["room_type"]) for event in events], [("cześć", "d")])
+            self.assertNotIn("im.messages", rocketchat.state.calls)
+
+    def test_client_merges_stream_and_catch_up(self):
+        """Test that the REST client returns streamed messages once, skipping its own"""
+        with FakeRocketChat() as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.post("ch0", "pierwsza")
+            client.wait_for_messages(2)
+            self.assertEqual([message.text for message in client.get_new_messages()], ["pierwsza"])
+            self.assertTrue(client.send_message("ch0", "odpowiedź bota"))
+            client.wait_for_messages(0.2)
+            self.assertEqual(client.get_new_messages(), [])
+            # One catch-up poll after connecting, none while the stream is up
+            self.assertEqual(rocketchat.state.calls["channels.history"], 1)
+
+    def test_reconnect_and_resume(self):
+        """Test polling while the connection is down and a catch-up after it is back"""
+        with FakeRocketChat() as rocketchat:
+            client = self._client(rocketchat)
+            client.realtime.reconnect_min = 0.2
+            rocketchat.state.realtime = False
+            rocketchat.drop_realtime()
+            deadline = time.monotonic() + 5
+            while client.realtime.connected and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(client.realtime.connected)
+
+            rocketchat.post("dm0", "w czasie przerwy")
+            messages = client.get_new_messages()
+            self.assertEqual([(message.text, message.is_direct) for message in messages], [("w czasie przerwy", True)])
+
+            rocketchat.post("dm0", "przed wznowieniem")
+            rocketchat.state.realtime = True
+            self.assertTrue(client.realtime.wait_connected(5))
+            self.assertEqual([message.text for message in client.get_new_messages()], ["przed wznowieniem"])
+            rocketchat.post("dm0", "po wznowieniu")
+            client.wait_for_messages(2)
+            self.assertEqual([message.text for message in client.get_new_messages()], ["po wznowieniu"])
+            self.assertEqual(client.realtime.stats["connects"], 2)
+
+    def test_rejected_login_falls_back_to_polling(self):
+        """Test that a token the realtime API refuses leaves the client on REST polling"""
+        with FakeRocketChat() as rocketchat:
+            realtime = self._realtime(rocketchat, token="expired", reconnect_min=0.05)
+            self.assertFalse(realtime.wait_connected(0.3))
+            self.assertGreaterEqual(rocketchat.state.calls["websocket"], 2)
+            self.assertNotIn("sub:stream-room-messages", rocketchat.state.calls)
+
+    def test_ping_timeout_reconnects(self):
+        """Test that a server that stops answering is dropped after the ping timeout"""
+        with FakeRocketChat() as rocketchat:
+            realtime = self._realtime(rocketchat, ping_interval=0.1, ping_timeout=0.2, reconnect_min=0.05)
+            self.assertTrue(realtime.wait_connected(5))
+            rocketchat.state.answer_pings = False
+            deadline = time.monotonic() + 5
+            while realtime.stats["disconnects"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            rocketchat.state.answer_pings = True
+            self.assertEqual(realtime.stats["disconnects"], 1)
+            self.assertTrue(realtime.wait_connected(5))
+
+    def test_websocket_url(self):
+        """Test the realtime endpoint derived from the REST URL"""
+        self.assertEqual(rocketchat_realtime.websocket_url("http://localhost:3100/"), "ws://localhost:3100/websocket")
+        self.assertEqual(rocketchat_realtime.websocket_url("https://chat.example.com/rc"),
+                         "wss://chat.example.com/rc/websocket")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+# test_rocketchat_sync.py
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "heyken", "heyken_bot"))
+
+from evodev import rocketchat_sync
+from fake_rocketchat import FakeRocketChat
+from src.rocketchat.client import RocketChatClient
+
+
+class TestRoomCursors(unittest.TestCase):
+    """Unit tests for incremental RocketChat room sync"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        self.path = os.path.join(state_dir.name, "cursors.json")
+
+    def _client(self, rocketchat, page_size=rocketchat_sync.PAGE_SIZE):
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        client.cursors = rocketchat_sync.RoomCursors(self.path, page_size=page_size)
+        self.assertTrue(client.login())
+        return client
+
+    def test_unchanged_rooms_are_skipped(self):
+        """Test that an idle poll lists rooms but reads no room history"""
+        with FakeRocketChat(direct_rooms=5, channels=5) as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.post("ch3", "stara wiadomość")
+            client.cursors.since -= 1000
+            self.assertEqual([message.text for message in client.get_new_messages()], ["stara wiadomość"])
+            for _ in range(3):
+                self.assertEqual(client.get_new_messages(), [])
+            self.assertEqual(rocketchat.state.calls["im.list"], 4)
+            self.assertEqual(rocketchat.state.calls["channels.history"], 1)
+            self.assertNotIn("im.history", rocketchat.state.calls)
+            self.assertNotIn("channels.messages", rocketchat.state.calls)
+
+    def test_only_new_messages_are_fetched(self):
+        """Test that a poll reads the messages after the mark, page by page"""
+        with FakeRocketChat(direct_rooms=1, channels=0) as rocketchat:
+            client = self._client(rocketchat, page_size=3)
+            rocketchat.post("dm0", "przed")
+            client.get_new_messages()
+            texts = [f"wiadomość {n}" for n in range(7)]
+            for text in texts:
+                rocketchat.post("dm0", text)
+            messages = client.get_new_messages()
+            self.assertEqual([message.text for message in messages], texts)
+            self.assertTrue(all(message.is_direct for message in messages))
+            self.assertEqual(rocketchat.state.calls["im.history"], 1 + 3)
+
+    def test_own_messages_advance_the_mark(self):
+        """Test that the bot's answer moves the mark without being returned"""
+        with FakeRocketChat(direct_rooms=0, channels=1) as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.post("ch0", "pytanie")
+            self.assertEqual(len(client.get_new_messages()), 1)
+            self.assertTrue(client.send_message("ch0", "odpowiedź"))
+            self.assertEqual(client.get_new_messages(), [])
+            self.assertEqual(client.get_new_messages(), [])
+            self.assertEqual(rocketchat.state.calls["channels.history"], 2)
+
+    def test_restart_does_not_replay(self):
+        """Test that saved cursors resume after a restart, with messages from the downtime"""
+        with FakeRocketChat(direct_rooms=2, channels=0) as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.post("dm0", "przed restartem")
+            self.assertEqual(len(client.get_new_messages()), 1)
+            client.stop_realtime()
+
+            rocketchat.post("dm1", "w czasie przerwy")
+            restarted = self._client(rocketchat)
+            self.assertEqual([message.text for message in restarted.get_new_messages()], ["w czasie przerwy"])
+            self.assertEqual(restarted.get_new_messages(), [])
+
+    def test_same_millisecond_messages(self):
+        """Test that a message sharing the mark's millisecond is returned once"""
+        cursors = rocketchat_sync.RoomCursors(page_size=10)
+        mark = int(time.time() * 1000)
+        history = [{"_id": "a", "ts": rocketchat_sync.iso(mark)}]
+        requests = []
+
+        def fetch(params):
+            requests.append(params)
+            return [message for message in history if message["ts"] >= params["oldest"]][::-1]
+
+        cursors.since = mark - 1
+        self.assertEqual([message["_id"] for message in cursors.sync("room", fetch)], ["a"])
+        history.append({"_id": "b", "ts": rocketchat_sync.iso(mark)})
+        self.assertEqual([message["_id"] for message in cursors.sync("room", fetch)], ["b"])
+        self.assertEqual(cursors.sync("room", fetch), [])
+        self.assertEqual(requests[-1]["inclusive"], "true")
+        self.assertEqual(cursors.sync("room", lambda params: None), None)
+        self.assertEqual(cursors.mark("room"), mark)
+
+    def test_timestamps(self):
+        """Test ISO and DDP timestamps and a corrupt cursor file"""
+        self.assertEqual(rocketchat_sync.iso(1700000000123), "2023-11-14T22:13:20.123Z")
+        self.assertEqual(rocketchat_sync.to_millis("2023-11-14T22:13:20.123Z"), 1700000000123)
+        self.assertEqual(rocketchat_sync.to_millis({"$date": 1700000000123}), 1700000000123)
+        self.assertIsNone(rocketchat_sync.to_millis("wczoraj"))
+        with open(self.path, "w") as f:
+            f.write("{")
+        self.assertEqual(rocketchat_sync.RoomCursors(self.path).rooms, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
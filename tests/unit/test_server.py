@@ -0,0 +1,84 @@
+# test_server.py
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import server
+
+
+def slow_app(environ, start_response):
+    """WSGI app answering /slow after 0.5 s and everything else at once"""
+    if environ["PATH_INFO"] == "/slow":
+        time.sleep(0.5)
+    start_response("200 OK", [("Content-Type", "text/plain")])
+    return [environ["PATH_INFO"].encode()]
+
+
+class TestPooledServer(unittest.TestCase):
+    """Unit tests for the thread-pool WSGI server"""
+
+    def setUp(self):
+        """Serve the slow app on a free port"""
+        self.server = server.PooledWSGIServer("127.0.0.1", 0, slow_app, threads=4)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join(5)
+
+    def test_fast_requests_not_blocked_by_slow(self):
+        """Test that a slow request does not delay other requests"""
+        slow = threading.Thread(target=requests.get, args=(f"{self.base}/slow",))
+        slow.start()
+        time.sleep(0.05)
+        started = time.perf_counter()
+        self.assertEqual(requests.get(f"{self.base}/health", timeout=5).text, "/health")
+        self.assertLess(time.perf_counter() - started, 0.3)
+        slow.join()
+
+    def test_drain_waits_for_in_flight_requests(self):
+        """Test that requests running at shutdown complete before drain returns"""
+        results = []
+        slow = threading.Thread(target=lambda: results.append(requests.get(f"{self.base}/slow", timeout=5).text))
+        slow.start()
+        time.sleep(0.1)
+        self.server.shutdown()
+        self.assertEqual(self.server.drain(timeout=5), 0)
+        slow.join(5)
+        self.assertEqual(results, ["/slow"])
+
+        # The listener is closed once the server stopped
+        with self.assertRaises(requests.ConnectionError):
+            requests.get(f"{self.base}/health", timeout=1)
+
+
+class TestStreamLimiter(unittest.TestCase):
+    """Unit tests for the cap on concurrent streaming responses"""
+
+    def test_slots_refused_past_limit_and_reused(self):
+        """Test that streams past the limit are refused until one is released"""
+        limiter = server.StreamLimiter(limit=2)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.active, 2)
+
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+        limiter.release()
+        limiter.release()
+        limiter.release()
+        self.assertEqual(limiter.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
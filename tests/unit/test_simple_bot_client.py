@@ -0,0 +1,147 @@
+# test_simple_bot_client.py
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "performance"))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "heyken"))
+
+from evodev import rocketchat_sync
+from evodev.message_pipeline import RoomPipeline
+from fake_rocketchat import BOT_ID, FakeRocketChat
+
+# The bot configures logging to bot.log in the working directory on import
+_cwd = os.getcwd()
+_log_dir = tempfile.TemporaryDirectory()
+os.chdir(_log_dir.name)
+try:
+    from simple_rocketchat_ollama_bot import RocketChatClient, RocketChatLogHandler, SimpleBot
+finally:
+    os.chdir(_cwd)
+
+
+class TestSimpleBotClient(unittest.TestCase):
+    """Unit tests for message ingestion in SimpleBot's RocketChat client"""
+
+    def setUp(self):
+        state_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(state_dir.cleanup)
+        patcher = patch.object(rocketchat_sync, "STATE_DIR", state_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _client(self, rocketchat):
+        client = RocketChatClient(rocketchat.url, "heyken_bot", "secret")
+        self.assertTrue(client.login())
+        self.addCleanup(client.close)
+        return client
+
+    def test_polled_messages(self):
+        """Test that polled messages are returned once, as dicts, without the bot's own"""
+        with FakeRocketChat() as rocketchat:
+            client = self._client(rocketchat)
+            rocketchat.post("dm0", "cześć")
+            rocketchat.post("ch0", "na kanale")
+            messages = client.get_new_messages()
+            self.assertEqual(sorted((m["room_id"], m["text"], m["is_direct"]) for m in messages),
+                             [("ch0", "na kanale", False), ("dm0", "cześć", True)])
+            self.assertTrue(all(m["id"] and m["sender_id"] != BOT_ID for m in messages))
+
+            self.assertTrue(client.send_message("dm0", "odpowiedź bota"))
+            time.sleep(0.01)
+            self.assertEqual(client.get_new_messages(), [])
+
+    def test_realtime_messages(self):
+        """Test that messages pushed over the realtime API are returned without polling"""
+        with FakeRocketChat() as rocketchat:
+            client = self._client(rocketchat)
+            self.assertTrue(client.start_realtime())
+            self.addCleanup(client.stop_realtime)
+            self.assertTrue(client.realtime.wait_connected(5))
+            self.assertEqual(client.get_new_messages(), [])
+            polls = rocketchat.state.calls["im.list"]
+
+            rocketchat.post("dm0", "przez websocket")
+            client.wait_for_messages(2)
+            messages = client.get_new_messages()
+            self.assertEqual([(m["room_id"], m["text"], m["is_direct"]) for m in messages],
+                             [("dm0", "przez websocket", True)])
+            self.assertEqual(rocketchat.state.calls["im.list"], polls)
+
+            self.assertTrue(client.send_message("dm0", "odpowiedź bota"))
+            client.wait_for_messages(0.2)
+            self.assertEqual(client.get_new_messages(), [])
+
+
+class TestSimpleBotStatus(unittest.TestCase):
+    """Unit tests for SimpleBot's presence status while the pipeline answers"""
+
+    def _wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_one_status_for_all_workers(self):
+        """Test that parallel answers share one status driven by the queue"""
+        release = threading.Event()
+        bot = SimpleBot.__new__(SimpleBot)
+        bot.rocketchat = MagicMock()
+        bot._status_refresh = threading.Event()
+        bot.pipeline = RoomPipeline(lambda item: release.wait(5), workers=2)
+        bot.pipeline.start()
+        self.addCleanup(bot.pipeline.stop, False, 5)
+        bot.running = True
+        status_thread = threading.Thread(target=bot._pipeline_status_thread, args=(0.02,), daemon=True)
+        status_thread.start()
+
+        for room in ("a", "b", "c"):
+            bot.pipeline.submit(room, room)
+        busy = bot.rocketchat.set_status_busy
+        self._wait_for(lambda: busy.call_args and busy.call_args.args[0] == "Odpowiadam na pytania: 2, w kolejce: 1")
+        calls = busy.call_count
+        time.sleep(0.1)
+        self.assertEqual(busy.call_count, calls)
+        bot.rocketchat.set_status_online.assert_not_called()
+
+        release.set()
+        self.assertTrue(bot.pipeline.join(5))
+        self._wait_for(lambda: bot.rocketchat.set_status_online.called)
+        bot.running = False
+        status_thread.join(1)
+        self.assertEqual(bot.rocketchat.set_status_online.call_count, 1)
+
+
+class TestRocketChatLogHandler(unittest.TestCase):
+    """Unit tests for shipping SimpleBot's logs to RocketChat channels"""
+
+    def _record(self, text):
+        return logging.LogRecord("test", logging.INFO, __file__, 1, text, None, None)
+
+    def test_logs_sent_to_channel(self):
+        """Test that records logged before and after logging in reach the channel"""
+        with FakeRocketChat() as rocketchat:
+            handler = RocketChatLogHandler(rocketchat.url, "heyken_bot", "secret", channel_names=["ch0"])
+            handler.emit(self._record("pierwszy wpis"))
+            handler.emit(self._record("drugi wpis"))
+            self.assertTrue(handler.initialized)
+            self.assertEqual([m["msg"] for m in rocketchat.state.messages["ch0"]], ["pierwszy wpis", "drugi wpis"])
+
+    def test_no_buffering_after_failed_logins(self):
+        """Test that records are dropped once all login attempts are used up"""
+        handler = RocketChatLogHandler("http://127.0.0.1:9", "heyken_bot", "secret")
+        for n in range(handler.max_login_attempts + 10):
+            handler.emit(self._record(f"wpis {n}"))
+        self.assertFalse(handler.initialized)
+        self.assertEqual(handler.login_attempts, handler.max_login_attempts)
+        self.assertEqual(handler.buffer, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
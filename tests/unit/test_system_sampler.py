@@ -0,0 +1,66 @@
+# test_system_sampler.py
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "monitor"))
+
+import system_sampler
+
+
+class TestSystemSampler(unittest.TestCase):
+    """Unit tests for the background system sampler"""
+
+    def setUp(self):
+        """Create a fast sampler with a small ring buffer"""
+        self.sampler = system_sampler.SystemSampler(interval=0.05, history=4, top_processes=3)
+
+    def tearDown(self):
+        self.sampler.close()
+
+    def test_ring_buffer_is_bounded(self):
+        """Test that samples accumulate up to the history size, oldest dropped first"""
+        self.sampler.start()
+        self.assertTrue(self.sampler.wait_ready(timeout=2))
+        time.sleep(0.4)
+        samples = self.sampler.history()
+
+        self.assertEqual(len(samples), 4)
+        timestamps = [s["timestamp"] for s in samples]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual(self.sampler.history(since=timestamps[1]), samples[2:])
+        self.assertEqual(self.sampler.history(limit=1), samples[-1:])
+
+    def test_latest_does_not_block(self):
+        """Test that reading the latest sample is immediate"""
+        self.sampler.start()
+        self.sampler.wait_ready(timeout=2)
+        started = time.perf_counter()
+        for _ in range(1000):
+            sample = self.sampler.latest()
+        self.assertLess(time.perf_counter() - started, 0.05)
+
+        self.assertGreaterEqual(sample["cpu"]["percent"], 0)
+        self.assertGreater(sample["memory"]["total"], 0)
+        self.assertIn("percent", sample["disk"])
+        self.assertGreaterEqual(sample["network"]["bytes_recv_per_s"], 0)
+        self.assertLessEqual(len(sample["processes"]), 3)
+
+    def test_first_sample_available_after_start(self):
+        """Test that start() leaves a sample in the buffer before the first interval"""
+        sampler = system_sampler.SystemSampler(interval=60, history=4, top_processes=0)
+        self.addCleanup(sampler.close)
+        sampler.start()
+        self.assertEqual(len(sampler.history()), 1)
+        self.assertGreaterEqual(sampler.latest()["cpu"]["percent"], 0)
+
+    def test_latest_is_none_before_first_sample(self):
+        """Test that an unstarted sampler has no samples"""
+        self.assertIsNone(self.sampler.latest())
+        self.assertEqual(self.sampler.history(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()